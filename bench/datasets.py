@@ -129,6 +129,23 @@ def macro_sensor_frame(n_series: int, n_points: int, seed: int) -> Dict[str, Any
     return frame
 
 
+def macro_event_records(n: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Small flat records, as exported one per line to JSON Lines.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "ts": 1738368000.0 + i * 0.01,
+            "device": f"dev-{rng.randint(0, 99):03d}",
+            "value": rng.uniform(-50.0, 50.0),
+            "ok": rng.random() > 0.1,
+        }
+        for i in range(n)
+    ]
+
+
 # ---------- ndarray datasets (numpy lazy-imported) ----------
 
 def ndarray_pointcloud(rows: int, cols: int, dtype: str, seed: int):
@@ -138,6 +155,17 @@ def ndarray_pointcloud(rows: int, cols: int, dtype: str, seed: int):
     return rng.standard_normal((rows, cols)).astype(dtype)
 
 
+def ndarray_point_records(rows: int, seed: int):
+    """Structured numpy ndarray of LiDAR points: x, y, z (float32) and a uint64 timestamp."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    arr = np.zeros(rows, dtype=[("x", "f4"), ("y", "f4"), ("z", "f4"), ("t", "u8")])
+    for name in "xyz":
+        arr[name] = rng.standard_normal(rows)
+    arr["t"] = 1_700_000_000_000_000 + np.arange(rows) * 100
+    return arr
+
+
 def ndarray_timeseries(n: int, dtype: str, seed: int):
     """1D numpy ndarray simulating a time series vector."""
     import numpy as np
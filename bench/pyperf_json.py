@@ -1,5 +1,5 @@
 # bench/pyperf_json.py
-"""JSON serialization benchmark comparing fastjson vs stdlib json.
+"""JSON serialization (and parsing back) benchmark comparing fastjson vs stdlib json.
 
 Fair comparison: both use compact format (separators=(',', ':')) and allow_nan=True.
 """
@@ -43,6 +43,12 @@ def bench_pair(runner: pyperf.Runner, name: str, values):
         lambda: fastjson.dumps(values, separators=(",", ":"), allow_nan=True),
     )
 
+    # Parsing the document back
+    if repr(fastjson.loads(out)) != repr(json.loads(out)):
+        raise AssertionError(f"loads mismatch for {name}")
+    runner.bench_func(f"json.loads/{name}", lambda: json.loads(out))
+    runner.bench_func(f"fastjson.loads/{name}", lambda: fastjson.loads(out))
+
 
 def main():
     runner = pyperf_util.make_runner()
@@ -1,9 +1,18 @@
 # bench/pyperf_macro.py
 import pyperf
 import datasets
+import io
 import json
 import pyperf_util
 
+
+def ndjson_loop(dumps, records):
+    fp = io.StringIO()
+    for record in records:
+        fp.write(dumps(record) + "\n")
+    return fp
+
+
 def main():
     runner = pyperf_util.make_runner()
 
@@ -13,5 +22,27 @@ def main():
     runner.bench_func("json.dumps/macro", lambda: json.dumps(obj))
     runner.bench_func("fastjson.dumps/macro", lambda: fastjson.dumps(obj))
 
+    text = json.dumps(obj)
+    if fastjson.loads(text) != json.loads(text):
+        raise AssertionError("loads mismatch")
+    runner.bench_func("json.loads/macro", lambda: json.loads(text))
+    runner.bench_func("fastjson.loads/macro", lambda: fastjson.loads(text))
+
+    # Chunked output: a str per token vs 64 KiB chunks
+    if "".join(fastjson.iterencode(obj)) != json.dumps(obj):
+        raise AssertionError("iterencode mismatch")
+    runner.bench_func("json.iterencode/macro", lambda: sum(map(len, json.JSONEncoder().iterencode(obj))))
+    runner.bench_func("fastjson.iterencode/macro", lambda: sum(map(len, fastjson.iterencode(obj))))
+
+    # JSON Lines export: one write per record vs one dump_ndjson call
+    events = datasets.macro_event_records(100_000, seed=124)
+    fp = io.StringIO()
+    fastjson.dump_ndjson(events, fp)
+    if fp.getvalue() != ndjson_loop(json.dumps, events).getvalue():
+        raise AssertionError("dump_ndjson mismatch")
+    runner.bench_func("json.dumps_loop/ndjson_1e5", lambda: ndjson_loop(json.dumps, events))
+    runner.bench_func("fastjson.dumps_loop/ndjson_1e5", lambda: ndjson_loop(fastjson.dumps, events))
+    runner.bench_func("fastjson.dump_ndjson/ndjson_1e5", lambda: fastjson.dump_ndjson(events, io.StringIO()))
+
 if __name__ == "__main__":
     main()
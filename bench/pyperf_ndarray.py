@@ -5,6 +5,7 @@ Requires numpy.
 """
 
 import json
+import os
 
 import datasets
 import fastjson
@@ -52,6 +53,112 @@ def bench_ndarray(runner, name, arr):
         lambda: fastjson.dumps_ndarray(arr, precision=3),
     )
 
+    # 5) significant-digits mode: dumps_ndarray(significant_digits=6)
+    runner.bench_func(
+        f"fastjson.dumps_ndarray_s6/{name}",
+        lambda: fastjson.dumps_ndarray(arr, significant_digits=6),
+    )
+
+    # 6) parallel formatting on all cores
+    threads = os.cpu_count() or 1
+    runner.bench_func(
+        f"fastjson.dumps_ndarray_t{threads}/{name}",
+        lambda: fastjson.dumps_ndarray(arr, threads=threads),
+    )
+
+    # 7) the array inside a document: dumps(native_arrays=True)
+    runner.bench_func(
+        f"fastjson.dumps_native_arrays/{name}",
+        lambda: fastjson.dumps({"points": arr}, separators=(",", ":"), native_arrays=True),
+    )
+
+    # 8) 64 KiB chunks, formatted one at a time
+    runner.bench_func(
+        f"fastjson.iterencode_ndarray/{name}",
+        lambda: sum(map(len, fastjson.iterencode_ndarray(arr))),
+    )
+
+    # 9) JSON Lines, one row per line: a json.dumps per row vs dumps_ndjson
+    if arr.ndim == 2:
+        runner.bench_func(
+            f"tolist+json.dumps_lines/{name}",
+            lambda: "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in arr.tolist()),
+        )
+        runner.bench_func(
+            f"fastjson.dumps_ndjson/{name}",
+            lambda: fastjson.dumps_ndjson(arr),
+        )
+
+
+def bench_records(runner, name, arr):
+    """Benchmark a structured (record) ndarray: per-record dicts vs dumps_ndarray(orient=)."""
+    names = arr.dtype.names
+
+    def records_loop():
+        return [dict(zip(names, row)) for row in arr.tolist()]
+
+    # Correctness: float32 fields read back as the same float32 values
+    import numpy as np
+    rows = [tuple(r[n] for n in names) for r in json.loads(fastjson.dumps_ndarray(arr))]
+    if np.array(rows, dtype=arr.dtype).tobytes() != arr.tobytes():
+        raise AssertionError(f"round-trip mismatch for {name}")
+
+    # 1) Python loop building one dict per record + json.dumps
+    runner.bench_func(
+        f"records+json.dumps/{name}",
+        lambda: json.dumps(records_loop(), separators=(",", ":")),
+    )
+
+    # 2) the same dicts + fastjson.dumps
+    runner.bench_func(
+        f"records+fastjson.dumps/{name}",
+        lambda: fastjson.dumps(records_loop(), separators=(",", ":")),
+    )
+
+    # 3) direct: one object per record, keys escaped once per field
+    runner.bench_func(
+        f"fastjson.dumps_ndarray_records/{name}",
+        lambda: fastjson.dumps_ndarray(arr),
+    )
+
+    # 4) direct: one row per record
+    runner.bench_func(
+        f"fastjson.dumps_ndarray_values/{name}",
+        lambda: fastjson.dumps_ndarray(arr, orient="values"),
+    )
+
+
+def bench_columns(runner, name, columns):
+    """Benchmark a dict of 1D columns: tolist per column vs dumps_columns."""
+    names = list(columns)
+
+    # Correctness: the same table as the stdlib path
+    rows = [list(r) for r in zip(*(c.tolist() for c in columns.values()))]
+    if json.loads(fastjson.dumps_columns(columns, orient="values")) != rows:
+        raise AssertionError(f"mismatch for {name}")
+
+    # 1) stdlib: tolist per column, dict of lists
+    runner.bench_func(
+        f"tolist+json.dumps_columns/{name}",
+        lambda: json.dumps({k: c.tolist() for k, c in columns.items()}, separators=(",", ":")),
+    )
+
+    # 2) stdlib: one dict per row
+    runner.bench_func(
+        f"tolist+json.dumps_records/{name}",
+        lambda: json.dumps(
+            [dict(zip(names, r)) for r in zip(*(c.tolist() for c in columns.values()))],
+            separators=(",", ":"),
+        ),
+    )
+
+    # 3) direct, both orients
+    for orient in ("columns", "records"):
+        runner.bench_func(
+            f"fastjson.dumps_columns_{orient}/{name}",
+            lambda orient=orient: fastjson.dumps_columns(columns, orient=orient),
+        )
+
 
 def main():
     runner = pyperf_util.make_runner()
@@ -72,6 +179,17 @@ def main():
     f32_3e5x3 = datasets.ndarray_pointcloud(300_000, 3, "float32", seed=103)
     bench_ndarray(runner, "f32_3e5x3", f32_3e5x3)
 
+    # Structured point records (x, y, z float32 + uint64 timestamp)
+    xyzt_1e5 = datasets.ndarray_point_records(100_000, seed=104)
+    bench_records(runner, "xyzt_1e5", xyzt_1e5)
+
+    # A table of columns (float64 series + int64 timestamps)
+    table_1e5 = {
+        "t": datasets.ndarray_timeseries(100_000, "float64", seed=105).argsort(),
+        "v": datasets.ndarray_timeseries(100_000, "float64", seed=106),
+    }
+    bench_columns(runner, "table_1e5", table_1e5)
+
 
 if __name__ == "__main__":
     main()
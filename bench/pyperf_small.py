@@ -0,0 +1,42 @@
+# bench/pyperf_small.py
+"""Small-payload benchmark: per-call dispatch overhead of dumps() vs json.dumps.
+
+10- and 100-element payloads, where option handling costs as much as formatting.
+"""
+
+import json
+
+import pyperf_util
+
+import fastjson
+
+
+def payloads():
+    return {
+        "floats10": [i * 0.25 for i in range(10)],
+        "dict10": {f"k{i}": i * 0.5 for i in range(10)},
+        "floats100": [i * 0.1 for i in range(100)],
+        "records100": [{"id": i, "v": i * 0.25} for i in range(50)],
+    }
+
+
+def main():
+    runner = pyperf_util.make_runner()
+    encoder = fastjson.Encoder(separators=(",", ":"))
+
+    for name, obj in payloads().items():
+        if fastjson.dumps(obj) != json.dumps(obj):
+            raise AssertionError(f"mismatch for {name}")
+        runner.bench_func(f"json.dumps/{name}", lambda: json.dumps(obj))
+        runner.bench_func(f"fastjson.dumps/{name}", lambda: fastjson.dumps(obj))
+        runner.bench_func(
+            f"json.dumps/{name}/compact", lambda: json.dumps(obj, separators=(",", ":"))
+        )
+        runner.bench_func(
+            f"fastjson.dumps/{name}/compact", lambda: fastjson.dumps(obj, separators=(",", ":"))
+        )
+        runner.bench_func(f"fastjson.Encoder/{name}/compact", lambda: encoder(obj))
+
+
+if __name__ == "__main__":
+    main()
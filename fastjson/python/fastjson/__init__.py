@@ -2,13 +2,33 @@
 
 from __future__ import annotations
 
-from typing import Any
+import codecs as _codecs
+import io as _io
+import os as _os
+import stat as _stat
+import threading as _threading
+from typing import Any, Iterator
 
 import json as _json
 
 try:
-    from ._fastjson import dumps as _native_dumps
+    from ._fastjson import dumps
+    from ._fastjson import dumps_bytes
     from ._fastjson import dumps_ndarray as _native_dumps_ndarray
+    from ._fastjson import dumps_columns as _native_dumps_columns
+    from ._fastjson import dump as _native_dump
+    from ._fastjson import dump_ndarray as _native_dump_ndarray
+    from ._fastjson import dump_ndjson as _native_dump_ndjson
+    from ._fastjson import dumps_into as _native_dumps_into
+    from ._fastjson import dumps_ndarray_into as _native_dumps_ndarray_into
+    from ._fastjson import iterencode as _native_iterencode
+    from ._fastjson import iterencode_ndarray as _native_iterencode_ndarray
+    from ._fastjson import loads
+    from ._fastjson import set_arena_limit
+    from ._fastjson import configure_parallel
+    from ._fastjson import BufferTooSmallError
+    from ._fastjson import Encoder
+    from ._fastjson import JSONBuffer
 
     _NATIVE = True
 except ImportError as e:
@@ -21,11 +41,26 @@ except ImportError as e:
 def _is_supported_separators(separators: Any) -> bool:
     if separators is None:
         return True
-    try:
-        item_sep, key_sep = separators  # tuple/list/etc
-    except Exception:
+    if type(separators) not in (tuple, list) or len(separators) != 2:
         return False
-    return (item_sep, key_sep) in {(",", ":"), (", ", ": ")}
+    return all(type(sep) is str for sep in separators)
+
+
+def _is_supported_indent(indent: Any) -> bool:
+    # json.JSONEncoder uses a str as-is and ' ' * indent otherwise
+    return indent is None or type(indent) in (str, int, bool)
+
+
+def _is_ascii_layout(indent: Any, separators: Any) -> bool:
+    strings = list(separators or ())
+    if type(indent) is str:
+        strings.append(indent)
+    return all(sep.isascii() for sep in strings)
+
+
+def _has_line_breaks(indent: Any, separators: Any) -> bool:
+    """Whether output with this layout can contain a raw "\n" (strings escape theirs)."""
+    return indent is not None or any("\n" in sep for sep in separators or ())
 
 
 def _can_use_native_dumps(
@@ -45,27 +80,47 @@ def _can_use_native_dumps(
     # so output remains byte-for-byte identical to json.dumps().
     if skipkeys is not False:
         return False
-    if check_circular is not True:
+    if check_circular is not True and check_circular is not False:
         return False
-    # For strict drop-in behavior, defer allow_nan=False to stdlib to preserve exact exception messages,
-    # which can vary across CPython versions.
-    if allow_nan is not True:
+    # allow_nan=False is handled natively: on any error the native encoder re-runs stdlib
+    # json.dumps, so exception messages (which vary across CPython versions) match exactly.
+    if allow_nan is not True and allow_nan is not False:
         return False
     if cls is not None:
         return False
-    if indent is not None:
+    if not _is_supported_indent(indent):
         return False
     if default is not None:
         return False
-    if sort_keys is not False:
+    if sort_keys is not True and sort_keys is not False:
         return False
     if kw:
         return False
     return _is_supported_separators(separators)
 
 
-def dumps(
+def _copy_into(data: bytes, target: Any, offset: int) -> int:
+    with memoryview(target) as view:
+        if view.readonly:
+            raise BufferError("Object is not writable.")
+        with view.cast("B") as flat:
+            if not 0 <= offset <= len(flat):
+                raise ValueError(f"offset must be between 0 and {len(flat)}, got {offset}")
+            needed = offset + len(data)
+            if needed > len(flat):
+                err = BufferTooSmallError(
+                    f"target buffer too small: {needed} bytes needed, {len(flat)} available"
+                )
+                err.needed = needed
+                raise err
+            flat[offset:needed] = data
+    return len(data)
+
+
+def dumps_into(
     obj: Any,
+    target: Any,
+    offset: int = 0,
     *,
     skipkeys: bool = False,
     ensure_ascii: bool = True,
@@ -77,8 +132,16 @@ def dumps(
     default: Any = None,
     sort_keys: bool = False,
     **kw: Any,
-) -> str:
-    """Drop-in replacement for json.dumps, with optional native fast paths."""
+) -> int:
+    """Write ``dumps(...).encode()`` into a writable buffer and return its length.
+
+    ``target`` is any writable buffer-protocol object (``bytearray``, ``mmap``,
+    ``multiprocessing.shared_memory.SharedMemory.buf``, a numpy ``uint8`` array, ...);
+    the document is written starting at ``offset`` with no intermediate copy.
+    If it does not fit, BufferTooSmallError is raised; its ``needed`` attribute is
+    the minimum ``len(target)``. Bytes of ``target`` past ``offset`` may have been
+    overwritten in that case.
+    """
 
     if _can_use_native_dumps(
         skipkeys=skipkeys,
@@ -92,9 +155,19 @@ def dumps(
         sort_keys=sort_keys,
         kw=kw,
     ):
-        return _native_dumps(obj, ensure_ascii=ensure_ascii, separators=separators, allow_nan=allow_nan)
+        return _native_dumps_into(
+            obj,
+            target,
+            offset,
+            ensure_ascii=ensure_ascii,
+            indent=indent,
+            separators=separators,
+            allow_nan=allow_nan,
+            check_circular=check_circular,
+            sort_keys=sort_keys,
+        )
 
-    return _json.dumps(
+    encoded = _json.dumps(
         obj,
         skipkeys=skipkeys,
         ensure_ascii=ensure_ascii,
@@ -106,19 +179,283 @@ def dumps(
         default=default,
         sort_keys=sort_keys,
         **kw,
+    ).encode()
+    return _copy_into(encoded, target, offset)
+
+
+# Encodings in which pure-ASCII text (ensure_ascii=True output) is encoded as-is
+_ASCII_COMPATIBLE_ENCODINGS = frozenset({"utf-8", "ascii", "iso8859-1", "cp1252"})
+
+
+def _fd_for_direct_write(fp: Any, line_breaks: bool) -> int:
+    """Return a file descriptor that ASCII JSON can be written to directly, or -1.
+
+    Only plain write-only text files opened on regular files qualify: the
+    wrapper's pending output is flushed first, and the caller re-syncs its
+    position afterwards. Output with line breaks never qualifies, since the
+    wrapper would translate them for ``newline="\r\n"`` and the like, and
+    its newline setting cannot be read back.
+    """
+    if line_breaks or type(fp) is not _io.TextIOWrapper:
+        return -1
+    try:
+        if fp.readable() or not fp.writable():
+            return -1
+        if _codecs.lookup(fp.encoding).name not in _ASCII_COMPATIBLE_ENCODINGS:
+            return -1
+        fd = fp.fileno()
+        if not _stat.S_ISREG(_os.fstat(fd).st_mode):
+            return -1
+    except (AttributeError, LookupError, OSError, ValueError):
+        return -1
+    fp.flush()
+    return fd
+
+
+def _stream_target(fp: Any, ascii_only: bool, line_breaks: bool) -> tuple[bool, int]:
+    """Return (binary, fd) for streaming UTF-8 JSON to fp; fd is -1 to call fp.write.
+
+    Binary streams get bytes, and regular files opened as io.BufferedWriter or
+    io.FileIO are written to through their descriptor (after a flush). Text
+    files qualify as for _fd_for_direct_write when the output is ASCII only.
+    """
+    binary = isinstance(fp, (_io.RawIOBase, _io.BufferedIOBase))
+    fd = -1
+    if binary:
+        if type(fp) in (_io.BufferedWriter, _io.FileIO):
+            try:
+                fd = fp.fileno()
+                if not _stat.S_ISREG(_os.fstat(fd).st_mode):
+                    fd = -1
+            except (AttributeError, OSError, ValueError):
+                fd = -1
+            if fd >= 0:
+                fp.flush()
+    elif ascii_only:
+        fd = _fd_for_direct_write(fp, line_breaks)
+    return binary, fd
+
+
+def _skip_leading(chunks: Any, skip: int) -> Iterator[Any]:
+    """The chunks of an iterencode() run without their first `skip` characters (or bytes)."""
+    for chunk in chunks:
+        if skip:
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            chunk = chunk[skip:]
+            skip = 0
+        yield chunk
+
+
+def _write_remaining(fp: Any, chunks: Any, skip: int) -> None:
+    """Write the chunks of an iterencode() run, skipping `skip` leading characters."""
+    for chunk in _skip_leading(chunks, skip):
+        fp.write(chunk)
+
+
+def _rechunk(pieces: Any, chunk_size: int) -> Iterator[Any]:
+    """Join the small pieces of JSONEncoder.iterencode() into chunks of chunk_size."""
+    pending = []
+    size = 0
+    for piece in pieces:
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            data = pending[0][:0].join(pending)
+            end = len(data) - len(data) % chunk_size
+            for start in range(0, end, chunk_size):
+                yield data[start : start + chunk_size]
+            pending = [data[end:]]
+            size = len(pending[0])
+    if size:
+        yield pending[0][:0].join(pending)
+
+
+def dump(
+    obj: Any,
+    fp: Any,
+    *,
+    skipkeys: bool = False,
+    ensure_ascii: bool = True,
+    check_circular: bool = True,
+    allow_nan: bool = True,
+    cls: Any = None,
+    indent: Any = None,
+    separators: Any = None,
+    default: Any = None,
+    sort_keys: bool = False,
+    chunk_size: int = 65536,
+    **kw: Any,
+) -> None:
+    """Drop-in replacement for json.dump, streaming natively in chunk_size pieces.
+
+    Peak memory is bounded by ``chunk_size`` instead of the whole document.
+    Regular files opened for writing in text mode are written to through their
+    file descriptor (with ``ensure_ascii=True`` and no line breaks, which the
+    file may translate); other objects get ``fp.write(str)`` calls. If the
+    object cannot be encoded natively, the rest of the document is produced
+    by the json module, so output and exceptions match json.dump.
+    """
+
+    if _can_use_native_dumps(
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        check_circular=check_circular,
+        allow_nan=allow_nan,
+        cls=cls,
+        indent=indent,
+        separators=separators,
+        default=default,
+        sort_keys=sort_keys,
+        kw=kw,
+    ):
+        # The fd path writes ASCII only: ensure_ascii output with ASCII whitespace
+        ascii_only = ensure_ascii is True and _is_ascii_layout(indent, separators)
+        line_breaks = _has_line_breaks(indent, separators)
+        fd = _fd_for_direct_write(fp, line_breaks) if ascii_only else -1
+        try:
+            written = _native_dump(
+                obj,
+                None if fd >= 0 else fp.write,
+                fd=fd,
+                ensure_ascii=ensure_ascii,
+                indent=indent,
+                separators=separators,
+                allow_nan=allow_nan,
+                check_circular=check_circular,
+                sort_keys=sort_keys,
+                chunk_size=chunk_size,
+            )
+        finally:
+            if fd >= 0:
+                fp.seek(_os.lseek(fd, 0, _os.SEEK_CUR))
+        if written is None:
+            return
+        # Let the json module finish: it writes the part the native encoder
+        # could not and raises exactly what json.dump would.
+        encoder = _json.JSONEncoder(
+            ensure_ascii=ensure_ascii,
+            check_circular=check_circular,
+            allow_nan=allow_nan,
+            indent=indent,
+            separators=separators,
+            sort_keys=sort_keys,
+        )
+        _write_remaining(fp, encoder.iterencode(obj), written)
+        return
+
+    _json.dump(
+        obj,
+        fp,
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        check_circular=check_circular,
+        allow_nan=allow_nan,
+        cls=cls,
+        indent=indent,
+        separators=separators,
+        default=default,
+        sort_keys=sort_keys,
+        **kw,
     )
 
 
-def dump(obj: Any, fp: Any, *args: Any, **kwargs: Any) -> None:
-    return _json.dump(obj, fp, *args, **kwargs)
+def _iterencode_rest(
+    chunks: Any, obj: Any, options: dict[str, Any], chunk_size: int, binary: bool
+) -> Iterator[Any]:
+    """The native chunks, then whatever json.JSONEncoder produces past them."""
+    skip = 0
+    if chunks is not None:
+        yield from chunks
+        skip = chunks.fallback_at
+        if skip is None:
+            return
+    cls = options.pop("cls") or _json.JSONEncoder
+    pieces = cls(**options).iterencode(obj)
+    if binary:
+        # Raises UnicodeEncodeError for lone surrogates, like dumps(...).encode()
+        pieces = (piece.encode() for piece in pieces)
+    yield from _rechunk(_skip_leading(pieces, skip), chunk_size)
 
 
-def loads(s: Any, *args: Any, **kwargs: Any) -> Any:
-    return _json.loads(s, *args, **kwargs)
+def iterencode(
+    obj: Any,
+    *,
+    skipkeys: bool = False,
+    ensure_ascii: bool = True,
+    check_circular: bool = True,
+    allow_nan: bool = True,
+    cls: Any = None,
+    indent: Any = None,
+    separators: Any = None,
+    default: Any = None,
+    sort_keys: bool = False,
+    chunk_size: int = 65536,
+    output: str = "str",
+    **kw: Any,
+) -> Iterator[str] | Iterator[bytes]:
+    """Yield ``json.dumps(obj, ...)`` in chunks of at most ``chunk_size`` characters.
 
+    Unlike ``json.JSONEncoder.iterencode()``, which yields a string per token,
+    the native encoder formats one chunk at a time and keeps its place in
+    the document between chunks, so memory stays O(chunk_size) and the first
+    chunk is ready before the rest is encoded. The native encoder cuts
+    chunks at ``chunk_size`` bytes of UTF-8, up to 3 bytes early to keep a
+    character whole, and ``output="str"`` chunks are those bytes decoded:
+    with non-ASCII text they hold fewer than ``chunk_size`` characters.
+    Options the native encoder does not handle, and objects it cannot
+    encode, are handed to ``json.JSONEncoder.iterencode()`` where it stopped
+    (its output is cut at ``chunk_size`` characters): the joined chunks are
+    ``json.dumps(obj, ...)``, and errors are raised as
+    ``json.JSONEncoder.iterencode()`` raises them, after the chunks before.
+    """
+    if output not in ("str", "bytes"):
+        raise ValueError(f"output must be 'str' or 'bytes' for chunks, got {output!r}")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    chunks = None
+    if _can_use_native_dumps(
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        check_circular=check_circular,
+        allow_nan=allow_nan,
+        cls=cls,
+        indent=indent,
+        separators=separators,
+        default=default,
+        sort_keys=sort_keys,
+        kw=kw,
+    ):
+        chunks = _native_iterencode(
+            obj,
+            ensure_ascii=ensure_ascii,
+            indent=indent,
+            separators=separators,
+            allow_nan=allow_nan,
+            check_circular=check_circular,
+            sort_keys=sort_keys,
+            chunk_size=chunk_size,
+            output=output,
+        )
+    options = dict(
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        check_circular=check_circular,
+        allow_nan=allow_nan,
+        cls=cls,
+        indent=indent,
+        separators=separators,
+        default=default,
+        sort_keys=sort_keys,
+        **kw,
+    )
+    return _iterencode_rest(chunks, obj, options, chunk_size, output == "bytes")
 
-def load(fp: Any, *args: Any, **kwargs: Any) -> Any:
-    return _json.load(fp, *args, **kwargs)
+
+def load(fp: Any, **kwargs: Any) -> Any:
+    """Deserialize ``fp.read()`` with :func:`loads`; drop-in replacement for ``json.load()``."""
+    return loads(fp.read(), **kwargs)
 
 
 def dumps_ndarray(
@@ -126,24 +463,498 @@ def dumps_ndarray(
     *,
     nan: str = "raise",
     precision: int | None = None,
-) -> str:
-    """Serialize a 1D or 2D C-contiguous float array to a JSON string.
+    significant_digits: int | None = None,
+    negative_zero: str = "keep",
+    output: str = "str",
+    threads: int = 1,
+    indent: int | str | None = None,
+    separators: tuple[str, str] | None = None,
+    dtype: str | None = None,
+    orient: str | None = None,
+    lines: bool = False,
+) -> str | bytes | JSONBuffer:
+    """Serialize a numeric array of any shape to a JSON string of nested arrays.
 
     Parameters
     ----------
     array : numpy.ndarray or buffer-protocol object
-        Must be C-contiguous with dtype float32 or float64.
+        dtype float16, float32, float64, int8-int64, uint8-uint64 or bool
+        (written as true/false), in either byte order, or a structured dtype
+        of such fields (see ``orient``). Any number of dimensions and any
+        strides (slices, transposes, Fortran order) are read in place,
+        without a contiguous copy.
     nan : str
         How to handle NaN/Inf: 'raise' (default), 'null', or 'skip'.
     precision : int or None
-        If None, use shortest representation. If int 0-20, fixed decimal places.
+        If None, use shortest representation. If int 0-20, fixed decimal places,
+        rounded from the exact value like ``"%.*f"``.
+        Integer and bool arrays are unaffected.
+    significant_digits : int or None
+        If int 1-17, round floats to this many significant digits and write
+        that correctly rounded decimal, trailing zeros stripped, in the layout
+        of ``repr(float)`` (``1230.0``, ``0.000123``, ``1.23e-07``). At 16-17
+        digits this can be longer than ``repr`` of the nearest float
+        (``859417161.50432014``, not ``859417161.5043201``).
+        Cannot be combined with ``precision``.
+    negative_zero : str
+        'keep' (default) writes ``-0.0`` and negative values that round to
+        zero (``-0.000``) with their sign, like ``json.dumps``; 'drop' writes
+        them as ``0.0`` / ``0.000``.
+    output : str
+        'str' (default), 'bytes', or 'buffer' (a JSONBuffer that owns the native
+        output buffer and exposes it through the buffer protocol, without a copy).
+    threads : int
+        Format large arrays (at least 32768 elements per thread) in up to this many
+        ranges along the first axis on native threads. The GIL is released while
+        formatting either way; output is identical for any value.
+    indent, separators
+        As for ``json.dumps(array.tolist(), ...)``, except that the item
+        separator defaults to ``","`` (compact output) even with ``indent``,
+        and the key separator of records to ``":"`` (``": "`` with
+        ``indent``).
+    dtype : str or None
+        ``"bfloat16"`` reads 16-bit elements (for example a ``uint16`` array
+        holding bfloat16 bits) as bfloat16. float16 and bfloat16 values are
+        written as the shortest decimal that reads back as the same 16-bit
+        value, not as their float32 or float64 repr.
+    orient : str or None
+        For structured dtypes: 'records' (the default) writes each record as
+        an object ``{"x": 1.0, "t": 5}``, 'values' as an array ``[1.0, 5]``.
+        Subarray fields are nested arrays and nested structs nested records.
+    lines : bool
+        Write JSON Lines instead of one array: each entry along the first
+        axis (a row, record or number) on its own line, each line ending in
+        ``"\\n"``. Cannot be combined with ``indent``. See :func:`dumps_ndjson`.
 
     Returns
     -------
-    str
-        JSON string like "[1.0,2.0,3.0]" (1D) or "[[1.0,2.0],[3.0,4.0]]" (2D).
+    str, bytes or JSONBuffer
+        JSON string like "[1.0,2.0,3.0]" (1D) or "[[1.0,2.0],[3.0,4.0]]" (2D),
+        as ``json.dumps(array.tolist())``; a 0-d array gives a bare number.
+    """
+    return _native_dumps_ndarray(
+        array,
+        nan=nan,
+        precision=precision,
+        significant_digits=significant_digits,
+        negative_zero=negative_zero,
+        output=output,
+        threads=threads,
+        indent=indent,
+        separators=separators,
+        dtype=dtype,
+        orient=orient,
+        lines=lines,
+    )
+
+
+def dumps_ndjson(
+    array: Any,
+    *,
+    nan: str = "raise",
+    precision: int | None = None,
+    significant_digits: int | None = None,
+    negative_zero: str = "keep",
+    output: str = "str",
+    threads: int = 1,
+    separators: tuple[str, str] | None = None,
+    dtype: str | None = None,
+    orient: str | None = None,
+) -> str | bytes | JSONBuffer:
+    """Serialize an array as JSON Lines: one line per row of a 2-D array.
+
+    Same as ``dumps_ndarray(array, lines=True, ...)``: each entry along the
+    first axis is written as ``json.dumps(row.tolist())`` would (compact by
+    default) and ends in ``"\\n"``, with no enclosing brackets. A 1-D array
+    gives one number per line, a structured array one record per line. With
+    ``nan="skip"`` rows containing NaN/Inf are left out. To write to a file,
+    use ``dump_ndarray(array, fp, lines=True)``; for an iterable of Python
+    records, :func:`dump_ndjson`.
+    """
+    return _native_dumps_ndarray(
+        array,
+        nan=nan,
+        precision=precision,
+        significant_digits=significant_digits,
+        negative_zero=negative_zero,
+        output=output,
+        threads=threads,
+        separators=separators,
+        dtype=dtype,
+        orient=orient,
+        lines=True,
+    )
+
+
+def dumps_ndarray_into(
+    array: Any,
+    target: Any,
+    offset: int = 0,
+    *,
+    nan: str = "raise",
+    precision: int | None = None,
+    significant_digits: int | None = None,
+    negative_zero: str = "keep",
+    threads: int = 1,
+    indent: int | str | None = None,
+    separators: tuple[str, str] | None = None,
+    dtype: str | None = None,
+    orient: str | None = None,
+) -> int:
+    """Write ``dumps_ndarray(array, ...)`` as bytes into a writable buffer.
+
+    Returns the number of bytes written at ``offset``. Raises BufferTooSmallError
+    (with ``needed``, the minimum ``len(target)``) if the document does not fit.
+    """
+    return _native_dumps_ndarray_into(
+        array,
+        target,
+        offset,
+        nan=nan,
+        precision=precision,
+        significant_digits=significant_digits,
+        negative_zero=negative_zero,
+        threads=threads,
+        indent=indent,
+        separators=separators,
+        dtype=dtype,
+        orient=orient,
+    )
+
+
+def dump_ndarray(
+    array: Any,
+    fp: Any,
+    *,
+    nan: str = "raise",
+    precision: int | None = None,
+    significant_digits: int | None = None,
+    negative_zero: str = "keep",
+    indent: int | str | None = None,
+    separators: tuple[str, str] | None = None,
+    dtype: str | None = None,
+    orient: str | None = None,
+    lines: bool = False,
+    chunk_size: int = 65536,
+) -> None:
+    """Stream a numeric array of any shape as JSON to a file object.
+
+    Same output as ``fp.write(dumps_ndarray(array, nan=nan, ...))``,
+    but written in ``chunk_size`` pieces, so peak memory is bounded by the chunk
+    size. Binary streams (``io.RawIOBase`` / ``io.BufferedIOBase``) get bytes,
+    anything else gets str as with json.dump; regular files are written to
+    through their file descriptor (text files only for output without line
+    breaks, which they may translate). With ``nan="raise"`` the output
+    written before the error is left in place, as with json.dump.
+    """
+    line_breaks = lines or _has_line_breaks(indent, separators)
+    binary, fd = _stream_target(fp, _is_ascii_layout(indent, separators), line_breaks)
+    try:
+        _native_dump_ndarray(
+            array,
+            None if fd >= 0 else fp.write,
+            fd=fd,
+            binary=binary,
+            nan=nan,
+            precision=precision,
+            significant_digits=significant_digits,
+            negative_zero=negative_zero,
+            indent=indent,
+            separators=separators,
+            dtype=dtype,
+            orient=orient,
+            lines=lines,
+            chunk_size=chunk_size,
+        )
+    finally:
+        if fd >= 0:
+            fp.seek(_os.lseek(fd, 0, _os.SEEK_CUR))
+
+
+def dump_ndjson(
+    records: Any,
+    fp: Any,
+    *,
+    skipkeys: bool = False,
+    ensure_ascii: bool = True,
+    check_circular: bool = True,
+    allow_nan: bool = True,
+    cls: Any = None,
+    separators: Any = None,
+    default: Any = None,
+    sort_keys: bool = False,
+    chunk_size: int = 65536,
+    **kw: Any,
+) -> None:
+    """Write an iterable of records to a file object as JSON Lines.
+
+    Each record is written as ``json.dumps(record, ...)`` with the given
+    options, followed by ``"\\n"``. The whole iterable is encoded in one
+    native call that writes whole lines in batches of at least ``chunk_size``
+    bytes, instead of one ``fp.write`` per record. Records the native encoder
+    cannot handle (and all records when ``cls``, ``default`` or other options
+    need the json module) are encoded by ``json.dumps``, so output and
+    exceptions match. If a record raises, the lines before it are written.
+    File objects are handled as by :func:`dump_ndarray`. For arrays, use
+    ``dump_ndarray(array, fp, lines=True)``.
+    """
+    options = dict(
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        check_circular=check_circular,
+        allow_nan=allow_nan,
+        cls=cls,
+        separators=separators,
+        default=default,
+        sort_keys=sort_keys,
+        **kw,
+    )
+
+    def fallback(record: Any) -> str:
+        return _json.dumps(record, **options)
+
+    native = _can_use_native_dumps(
+        skipkeys=skipkeys,
+        ensure_ascii=ensure_ascii,
+        check_circular=check_circular,
+        allow_nan=allow_nan,
+        cls=cls,
+        indent=None,
+        separators=separators,
+        default=default,
+        sort_keys=sort_keys,
+        kw=kw,
+    )
+    # The fd path writes ASCII only: native ensure_ascii output (the fallback
+    # for the records it rejects uses ensure_ascii too)
+    ascii_only = native and ensure_ascii is True and _is_ascii_layout(None, separators)
+    binary, fd = _stream_target(fp, ascii_only, line_breaks=True)
+    try:
+        _native_dump_ndjson(
+            records,
+            None if fd >= 0 else fp.write,
+            fallback,
+            fd=fd,
+            binary=binary,
+            native=native,
+            ensure_ascii=bool(ensure_ascii) if native else True,
+            separators=separators if native else None,
+            allow_nan=bool(allow_nan) if native else True,
+            check_circular=bool(check_circular) if native else True,
+            sort_keys=bool(sort_keys) if native else False,
+            chunk_size=chunk_size,
+        )
+    finally:
+        if fd >= 0:
+            fp.seek(_os.lseek(fd, 0, _os.SEEK_CUR))
+
+
+def iterencode_ndarray(
+    array: Any,
+    *,
+    nan: str = "raise",
+    precision: int | None = None,
+    significant_digits: int | None = None,
+    negative_zero: str = "keep",
+    indent: int | str | None = None,
+    separators: tuple[str, str] | None = None,
+    dtype: str | None = None,
+    orient: str | None = None,
+    lines: bool = False,
+    chunk_size: int = 65536,
+    output: str = "str",
+) -> Iterator[str] | Iterator[bytes]:
+    """Yield ``dumps_ndarray(array, ...)`` in chunks of ``chunk_size`` characters.
+
+    Each ``next()`` formats about one chunk of the array with the GIL
+    released and returns it, so peak memory is O(chunk_size) and the first
+    chunk is available right away, for example for a streaming HTTP
+    response. Chunks are sized as for :func:`iterencode`. With
+    ``nan="raise"`` the error is raised by the ``next()`` that reaches it.
+    """
+    return _native_iterencode_ndarray(
+        array,
+        nan=nan,
+        precision=precision,
+        significant_digits=significant_digits,
+        negative_zero=negative_zero,
+        indent=indent,
+        separators=separators,
+        dtype=dtype,
+        orient=orient,
+        lines=lines,
+        chunk_size=chunk_size,
+        output=output,
+    )
+
+
+def dumps_columns(
+    columns: Any,
+    names: Any = None,
+    *,
+    orient: str = "columns",
+    nan: str = "raise",
+    precision: int | None = None,
+    significant_digits: int | None = None,
+    negative_zero: str = "keep",
+    output: str = "str",
+    indent: int | str | None = None,
+    separators: tuple[str, str] | None = None,
+    dtype: str | None = None,
+) -> str | bytes | JSONBuffer:
+    """Serialize a table of numeric columns to JSON, like ``DataFrame.to_json``.
+
+    Parameters
+    ----------
+    columns : mapping or 2-D array
+        A mapping of column names to equal-length 1-D arrays (numpy arrays,
+        ``array.array``, memoryviews; each with its own dtype, as for
+        :func:`dumps_ndarray`), or a 2-D array whose columns are named by
+        ``names``. Columns are read in place, strided: a row-major array is
+        written column by column without a transposed copy.
+    names : sequence of str or None
+        The column names of a 2-D array, one per column.
+    orient : str
+        'columns' (default) ``{"x": [1.0, 2.0], "t": [5, 6]}``,
+        'records' ``[{"x": 1.0, "t": 5}, {"x": 2.0, "t": 6}]``,
+        'split' ``{"columns": ["x", "t"], "data": [[1.0, 5], [2.0, 6]]}`` or
+        'values' ``[[1.0, 5], [2.0, 6]]``. Names are escaped once, not once
+        per row.
+    nan : str
+        'raise' (default), 'null', or 'skip', which drops the rows with a
+        NaN/Inf in any column, from every column.
+    precision, significant_digits, negative_zero, output, indent, separators, dtype
+        As for :func:`dumps_ndarray`, applied to every column.
+
+    Returns
+    -------
+    str, bytes or JSONBuffer
+        The same JSON as ``json.dumps()`` of the equivalent lists and dicts
+        (with ``dumps_ndarray``'s default separators).
+    """
+    return _native_dumps_columns(
+        columns,
+        names,
+        orient=orient,
+        nan=nan,
+        precision=precision,
+        significant_digits=significant_digits,
+        negative_zero=negative_zero,
+        output=output,
+        indent=indent,
+        separators=separators,
+        dtype=dtype,
+    )
+
+
+# asyncio: formatting off the event loop, or one chunk at a time on it
+
+_async_executor = None
+_async_executor_lock = _threading.Lock()
+
+
+def _get_async_executor() -> Any:
+    """The thread pool of dumps_async() and dumps_ndarray_async(), started on first use."""
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _async_executor = ThreadPoolExecutor(
+                max_workers=max(2, _os.cpu_count() or 1), thread_name_prefix="fastjson"
+            )
+        return _async_executor
+
+
+def _forget_async_executor() -> None:
+    # The pool's threads do not survive fork(); the child starts its own
+    global _async_executor, _async_executor_lock
+    _async_executor = None
+    _async_executor_lock = _threading.Lock()
+
+
+if hasattr(_os, "register_at_fork"):
+    _os.register_at_fork(after_in_child=_forget_async_executor)
+
+
+def _dumps_in_chunks(obj: Any, chunk_size: int, kwargs: dict[str, Any]) -> str:
+    """dumps(obj, **kwargs), formatted chunk by chunk so the GIL can change hands in between."""
+    if not kwargs.get("native_arrays"):
+        try:
+            chunks = []
+            # A Python-level loop: the interpreter only hands the GIL over
+            # between bytecodes, never inside str.join() of a C iterator
+            for chunk in iterencode(obj, chunk_size=chunk_size, **kwargs):
+                chunks.append(chunk)
+            return "".join(chunks)
+        except Exception:
+            pass  # dumps() raises exactly what json.dumps would
+    return dumps(obj, **kwargs)
+
+
+async def dumps_async(obj: Any, *, chunk_size: int = 65536, **kwargs: Any) -> str:
+    """``await dumps_async(obj, **kwargs)``: ``dumps(obj, **kwargs)`` on a worker thread.
+
+    The document is encoded on fastjson's own thread pool, one ``chunk_size``
+    chunk at a time as in :func:`iterencode`, so the event loop thread can
+    take the GIL between chunks instead of waiting for the whole document.
+    Arrays inside the document (``native_arrays=True``) are formatted with
+    the GIL released. The result and exceptions are those of :func:`dumps`.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_async_executor(), _dumps_in_chunks, obj, chunk_size, kwargs
+    )
+
+
+async def dumps_ndarray_async(array: Any, **kwargs: Any) -> str | bytes | JSONBuffer:
+    """``await dumps_ndarray_async(array, **kwargs)``: :func:`dumps_ndarray` on a worker thread.
+
+    The array is formatted with the GIL released on fastjson's own thread
+    pool (and ``threads=`` native threads), so the event loop keeps running
+    for the whole call.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_async_executor(), lambda: dumps_ndarray(array, **kwargs)
+    )
+
+
+async def _write_chunks(chunks: Any, writer: Any) -> None:
+    for chunk in chunks:
+        writer.write(chunk)
+        await writer.drain()
+
+
+async def dump_async(obj: Any, writer: Any, *, chunk_size: int = 65536, **kwargs: Any) -> None:
+    """Write ``dumps(obj, **kwargs)`` as UTF-8 to an ``asyncio.StreamWriter``.
+
+    The document is formatted one ``chunk_size`` chunk at a time
+    (:func:`iterencode`), and ``await writer.drain()`` follows every
+    ``writer.write(chunk)``: the event loop is held for at most one chunk's
+    formatting, and a slow peer pauses encoding instead of filling the
+    transport's buffer. ``writer`` can be any object with ``write(bytes)``
+    and an awaitable ``drain()``. Takes the keyword arguments of
+    :func:`iterencode`; errors are raised as it raises them, after the
+    chunks before them have been written.
+    """
+    await _write_chunks(iterencode(obj, chunk_size=chunk_size, output="bytes", **kwargs), writer)
+
+
+async def dump_ndarray_async(
+    array: Any, writer: Any, *, chunk_size: int = 65536, **kwargs: Any
+) -> None:
+    """Write ``dumps_ndarray(array, **kwargs)`` as UTF-8 to an ``asyncio.StreamWriter``.
+
+    Like :func:`dump_async`, with the chunks of :func:`iterencode_ndarray`
+    (each formatted with the GIL released).
     """
-    return _native_dumps_ndarray(array, nan=nan, precision=precision)
+    chunks = iterencode_ndarray(array, chunk_size=chunk_size, output="bytes", **kwargs)
+    await _write_chunks(chunks, writer)
 
 
 JSONEncoder = _json.JSONEncoder
@@ -152,11 +963,29 @@ JSONDecodeError = _json.JSONDecodeError
 
 
 __all__ = [
+    "configure_parallel",
     "dump",
+    "dump_async",
+    "dump_ndarray",
+    "dump_ndarray_async",
+    "dump_ndjson",
     "dumps",
+    "dumps_async",
+    "dumps_bytes",
+    "dumps_columns",
+    "dumps_into",
     "dumps_ndarray",
+    "dumps_ndarray_async",
+    "dumps_ndarray_into",
+    "dumps_ndjson",
+    "iterencode",
+    "iterencode_ndarray",
     "load",
     "loads",
+    "set_arena_limit",
+    "BufferTooSmallError",
+    "Encoder",
+    "JSONBuffer",
     "JSONDecodeError",
     "JSONDecoder",
     "JSONEncoder",
@@ -1,28 +1,134 @@
 #define PY_SSIZE_T_CLEAN
 #include <Python.h>
+#include <pythread.h>
+#include <structmember.h>
 #include <float.h>
 #include <stdio.h>
 #include <string.h>
 #include <math.h>
 #include <stdlib.h>
+#include <stdint.h>
+#include <errno.h>
+#include <limits.h>
+#ifdef _WIN32
+#include <io.h>
+#else
+#include <unistd.h>
+#endif
 #include "zmij-c.h"
 
+/* SSE2 is baseline on x86-64; build with -DFASTJSON_HAVE_SSE2=0 to use the portable scanner */
+#ifndef FASTJSON_HAVE_SSE2
+#if defined(__SSE2__) || defined(_M_X64) || (defined(_M_IX86_FP) && _M_IX86_FP >= 2)
+#define FASTJSON_HAVE_SSE2 1
+#else
+#define FASTJSON_HAVE_SSE2 0
+#endif
+#endif
+#if FASTJSON_HAVE_SSE2
+#include <emmintrin.h>
+#endif
+#if defined(_MSC_VER)
+#include <intrin.h>
+#endif
+
 /* Using vitaut/zmij for fast float formatting */
 
 /*
  * fastjson - High-performance JSON serializer
  * 
- * Fast path: list[float] or tuple[float] with direct C formatting
+ * Fast path: list[float] / list[int] (or tuples) with direct C formatting
+ * Native path: recursive C encoder for dict/list/tuple/str/int/float/bool/None
  * Slow path: delegate to Python json module
+ * Streaming: dump()/dump_ndarray() flush fixed-size chunks to fp.write or an fd
+ * Chunks: iterencode()/iterencode_ndarray() resume the encoder chunk by chunk
+ * Into: dumps_into()/dumps_ndarray_into() write into a caller's writable buffer
+ * Decoding: loads() parses str/bytes natively, json.loads() for hooks and errors
  */
 
 /* Dynamic buffer for building JSON string */
-typedef struct {
+typedef struct Buffer {
     char* data;
     size_t size;
     size_t capacity;
+    /* Optional streaming sink (dump): when the buffer is full, `flush` hands
+       a prefix of the data to `sink` and returns its length (or -1 on error)
+       instead of the buffer growing. */
+    Py_ssize_t (*flush)(struct Buffer* buf);
+    void* sink;
+    size_t flushed;  /* total bytes handed to the sink so far */
+    /* data is caller-owned storage (dumps_into): it is never freed or
+       realloc'd, and outgrowing it moves the data to the heap */
+    int external;
 } Buffer;
 
+/*
+ * Free-threaded builds (3.13t+): container reads go through critical
+ * sections, and settings shared by all threads use relaxed atomics. With
+ * the GIL (or before 3.13) these compile to plain blocks and accesses.
+ */
+#ifndef Py_BEGIN_CRITICAL_SECTION
+#define Py_BEGIN_CRITICAL_SECTION(op) {
+#define Py_END_CRITICAL_SECTION() }
+#endif
+
+#ifdef Py_GIL_DISABLED
+#define LOAD_SSIZE(p) _Py_atomic_load_ssize_relaxed(p)
+#define STORE_SSIZE(p, v) _Py_atomic_store_ssize_relaxed(p, v)
+#define EXCHANGE_SSIZE(p, v) _Py_atomic_exchange_ssize(p, v)
+#define LOAD_INT(p) _Py_atomic_load_int_relaxed(p)
+#define STORE_INT(p, v) _Py_atomic_store_int_relaxed(p, v)
+#else
+#define LOAD_SSIZE(p) (*(p))
+#define STORE_SSIZE(p, v) (*(p) = (v))
+static inline Py_ssize_t exchange_ssize(Py_ssize_t* p, Py_ssize_t v) {
+    Py_ssize_t old = *p;
+    *p = v;
+    return old;
+}
+#define EXCHANGE_SSIZE(p, v) exchange_ssize(p, v)
+#define LOAD_INT(p) (*(p))
+#define STORE_INT(p, v) (*(p) = (v))
+#endif
+
+/* Keyword arguments of json.dumps() (and output= of dumps_bytes()) */
+typedef enum {
+    OPT_SKIPKEYS, OPT_ENSURE_ASCII, OPT_CHECK_CIRCULAR, OPT_ALLOW_NAN, OPT_CLS,
+    OPT_INDENT, OPT_SEPARATORS, OPT_DEFAULT, OPT_SORT_KEYS, OPT_OUTPUT, OPT_NATIVE_ARRAYS,
+    DUMPS_N_OPTIONS
+} DumpsOption;
+
+static const char* const dumps_option_names[DUMPS_N_OPTIONS] = {
+    "skipkeys", "ensure_ascii", "check_circular", "allow_nan", "cls",
+    "indent", "separators", "default", "sort_keys", "output", "native_arrays"
+};
+
+struct Float16Repr;
+
+/* Per-module state (multi-phase init) */
+typedef struct {
+    PyTypeObject* json_buffer_type;
+    PyTypeObject* encoder_type;
+    PyTypeObject* chunk_iterator_type;
+    PyObject* buffer_too_small_error;
+    PyObject* arena_key;  /* key of the arena capsule in the thread state dict */
+    PyObject* json_dumps;  /* json.dumps, the fallback of dumps() */
+    PyObject* json_loads;  /* json.loads, the fallback of loads() */
+    PyObject* array_default;  /* default= of that fallback with native_arrays=True */
+    PyObject* option_names[DUMPS_N_OPTIONS];  /* interned, in DumpsOption order */
+    /* float16 and bfloat16 reprs, built on first use; see float16_repr_table() */
+    struct Float16Repr* float16_reprs[2];
+#ifdef Py_GIL_DISABLED
+    PyMutex float16_reprs_lock;
+#endif
+} ModuleState;
+
+static inline ModuleState* get_module_state(PyObject* module) {
+    return (ModuleState*)PyModule_GetState(module);
+}
+
+static int buffer_init(Buffer* buf, size_t initial_capacity);
+static int buffer_reserve(Buffer* buf, size_t len);
 static int buffer_append(Buffer* buf, const char* str, size_t len);
 static int buffer_append_char(Buffer* buf, char c);
 
@@ -83,32 +189,209 @@ static int buffer_append_double_json(Buffer* buf, double x, int allow_nan) {
     return buffer_append_finite_double(buf, x);
 }
 
+/* Two-digit lookup table for integer formatting (as in zmij.c) */
+static const char digits2[] =
+    "00010203040506070809"
+    "10111213141516171819"
+    "20212223242526272829"
+    "30313233343536373839"
+    "40414243444546474849"
+    "50515253545556575859"
+    "60616263646566676869"
+    "70717273747576777879"
+    "80818283848586878889"
+    "90919293949596979899";
+
+static inline int clz64(uint64_t x) {
+#if defined(_MSC_VER)
+    unsigned long idx;
+    _BitScanReverse64(&idx, x);
+    return 63 - (int)idx;
+#else
+    return __builtin_clzll(x);
+#endif
+}
+
+static const uint64_t powers_of_10[20] = {
+    1ULL, 10ULL, 100ULL, 1000ULL, 10000ULL, 100000ULL, 1000000ULL, 10000000ULL,
+    100000000ULL, 1000000000ULL, 10000000000ULL, 100000000000ULL, 1000000000000ULL,
+    10000000000000ULL, 100000000000000ULL, 1000000000000000ULL, 10000000000000000ULL,
+    100000000000000000ULL, 1000000000000000000ULL, 10000000000000000000ULL,
+};
+
+/* Number of decimal digits of v (1 for 0), from its bit length without a loop */
+static inline size_t count_digits_u64(uint64_t v) {
+    v |= 1;
+    int t = ((64 - clz64(v)) * 1233) >> 12;  /* 1233 / 4096 ~ log10(2) */
+    return (size_t)t + (v >= powers_of_10[t]);
+}
+
+/*
+ * Write the decimal digits of v to dst (room for 20 bytes); returns length.
+ * The length is known up front, so digits are written in place from the
+ * end, two at a time, in 32-bit arithmetic once v fits.
+ */
+static size_t write_u64(char* dst, uint64_t v) {
+    size_t len = count_digits_u64(v);
+    char* p = dst + len;
+    while (v >= 0x100000000ULL) {
+        unsigned r = (unsigned)(v % 100);
+        v /= 100;
+        p -= 2;
+        memcpy(p, digits2 + r * 2, 2);
+    }
+    uint32_t w = (uint32_t)v;
+    while (w >= 100) {
+        unsigned r = w % 100;
+        w /= 100;
+        p -= 2;
+        memcpy(p, digits2 + r * 2, 2);
+    }
+    if (w >= 10) {
+        memcpy(p - 2, digits2 + w * 2, 2);
+    } else {
+        p[-1] = (char)('0' + w);
+    }
+    return len;
+}
+
+static int buffer_append_int64(Buffer* buf, long long v) {
+    if (buffer_reserve(buf, 21) < 0) return -1;
+    char* dst = buf->data + buf->size;
+    uint64_t u = (uint64_t)v;
+    if (v < 0) {
+        *dst++ = '-';
+        u = 0 - u;
+        buf->size++;
+    }
+    buf->size += write_u64(dst, u);
+    return 0;
+}
+
+static int buffer_append_uint64(Buffer* buf, uint64_t v) {
+    if (buffer_reserve(buf, 20) < 0) return -1;
+    buf->size += write_u64(buf->data + buf->size, v);
+    return 0;
+}
+
+/*
+ * Append int.__repr__(obj) (also for int subclasses such as IntEnum, like
+ * stdlib). Values that fit in 64 bits are formatted without allocating.
+ */
+static int buffer_append_long(Buffer* buf, PyObject* obj) {
+    int overflow;
+    long long v = PyLong_AsLongLongAndOverflow(obj, &overflow);
+    if (overflow == 0) {
+        if (v == -1 && PyErr_Occurred()) return -1;
+        return buffer_append_int64(buf, v);
+    }
+    if (overflow > 0) {
+        unsigned long long u = PyLong_AsUnsignedLongLong(obj);
+        if (!(u == (unsigned long long)-1 && PyErr_Occurred())) {
+            return buffer_append_uint64(buf, u);
+        }
+        PyErr_Clear();
+    }
+    /* Arbitrary size: int.__repr__ also enforces sys.set_int_max_str_digits() */
+    PyObject* s = PyLong_Type.tp_repr(obj);
+    if (s == NULL) return -1;
+    int rc = buffer_append(buf, (const char*)PyUnicode_1BYTE_DATA(s),
+                           (size_t)PyUnicode_GET_LENGTH(s));
+    Py_DECREF(s);
+    return rc;
+}
+
 static int buffer_init(Buffer* buf, size_t initial_capacity) {
-    buf->data = (char*)malloc(initial_capacity);
+    buf->flush = NULL;
+    buf->sink = NULL;
+    buf->flushed = 0;
+    buf->external = 0;
+    buf->size = 0;
+    buf->capacity = 0;
+    buf->data = (char*)PyMem_RawMalloc(initial_capacity ? initial_capacity : 1);
     if (buf->data == NULL) return -1;
+    buf->capacity = initial_capacity ? initial_capacity : 1;
+    return 0;
+}
+
+/* Use caller-owned storage (e.g. a writable buffer-protocol object) */
+static void buffer_init_external(Buffer* buf, char* data, size_t capacity) {
+    buf->flush = NULL;
+    buf->sink = NULL;
+    buf->flushed = 0;
+    buf->external = 1;
+    buf->data = data;
     buf->size = 0;
-    buf->capacity = initial_capacity;
+    buf->capacity = capacity;
+}
+
+/* Hand buffered data to the streaming sink; keeps any unconsumed tail */
+static int buffer_flush(Buffer* buf) {
+    Py_ssize_t n = buf->flush(buf);
+    if (n < 0) return -1;
+    memmove(buf->data, buf->data + n, buf->size - (size_t)n);
+    buf->size -= (size_t)n;
+    buf->flushed += (size_t)n;
+    return 0;
+}
+
+/* False when streaming or writing into caller-owned storage */
+static int buffer_is_growable(const Buffer* buf) {
+    return buf->flush == NULL && !buf->external;
+}
+
+/* Pre-size the buffer for an expected output length (no-op unless growable) */
+static int buffer_presize(Buffer* buf, size_t len) {
+    if (!buffer_is_growable(buf) || buf->size + len <= buf->capacity) return 0;
+    char* new_data = (char*)PyMem_RawRealloc(buf->data, buf->size + len);
+    if (new_data == NULL) return -1;
+    buf->data = new_data;
+    buf->capacity = buf->size + len;
     return 0;
 }
 
 static void buffer_free(Buffer* buf) {
-    free(buf->data);
+    if (!buf->external) PyMem_RawFree(buf->data);
     buf->data = NULL;
     buf->size = 0;
     buf->capacity = 0;
 }
 
-static int buffer_append(Buffer* buf, const char* str, size_t len) {
+/* Double small buffers; grow large ones by 1.5x so a slightly low size
+   estimate does not cost a full extra copy of the document */
+static size_t buffer_grown_capacity(size_t capacity) {
+    return capacity < ((size_t)1 << 20) ? capacity * 2 : capacity + capacity / 2;
+}
+
+/* Ensure room for `len` more bytes at buf->data + buf->size */
+static int buffer_reserve(Buffer* buf, size_t len) {
     if (buf->size + len > buf->capacity) {
-        size_t new_capacity = buf->capacity * 2;
+        if (buf->flush != NULL && buf->size > 0) {
+            if (buffer_flush(buf) < 0) return -1;
+            if (buf->size + len <= buf->capacity) return 0;
+        }
+        size_t new_capacity = buf->capacity ? buffer_grown_capacity(buf->capacity) : 64;
         while (new_capacity < buf->size + len) {
-            new_capacity *= 2;
+            new_capacity = buffer_grown_capacity(new_capacity);
+        }
+        char* new_data;
+        if (buf->external) {
+            new_data = (char*)PyMem_RawMalloc(new_capacity);
+            if (new_data == NULL) return -1;
+            memcpy(new_data, buf->data, buf->size);
+            buf->external = 0;
+        } else {
+            new_data = (char*)PyMem_RawRealloc(buf->data, new_capacity);
+            if (new_data == NULL) return -1;
         }
-        char* new_data = (char*)realloc(buf->data, new_capacity);
-        if (new_data == NULL) return -1;
         buf->data = new_data;
         buf->capacity = new_capacity;
     }
+    return 0;
+}
+
+static int buffer_append(Buffer* buf, const char* str, size_t len) {
+    if (buffer_reserve(buf, len) < 0) return -1;
     memcpy(buf->data + buf->size, str, len);
     buf->size += len;
     return 0;
@@ -118,721 +401,7331 @@ static int buffer_append_char(Buffer* buf, char c) {
     return buffer_append(buf, &c, 1);
 }
 
-/*
- * Check if object is a list or tuple containing only floats
- * Returns: 1 = yes, 0 = no
- */
-static int is_float_sequence(PyObject* obj) {
-    if (PyList_CheckExact(obj)) {
-        Py_ssize_t n = PyList_GET_SIZE(obj);
-        for (Py_ssize_t i = 0; i < n; i++) {
-            if (!PyFloat_CheckExact(PyList_GET_ITEM(obj, i))) {
-                return 0;
-            }
-        }
-        return 1;
-    }
-    else if (PyTuple_CheckExact(obj)) {
-        Py_ssize_t n = PyTuple_GET_SIZE(obj);
-        for (Py_ssize_t i = 0; i < n; i++) {
-            if (!PyFloat_CheckExact(PyTuple_GET_ITEM(obj, i))) {
-                return 0;
-            }
-        }
-        return 1;
+/* ======================================================================
+ * Per-thread output arena: the output buffer of dumps()/dumps_ndarray() is
+ * kept between calls (up to arena_limit bytes) instead of being malloc'd
+ * and freed every time. Disabled (0) by default; see set_arena_limit().
+ * ====================================================================== */
+
+typedef struct {
+    char* data;  /* NULL while lent out to a Buffer */
+    size_t capacity;
+} Arena;
+
+static Py_ssize_t arena_limit = 0;  /* process-wide */
+
+static void arena_capsule_destructor(PyObject* capsule) {
+    Arena* arena = (Arena*)PyCapsule_GetPointer(capsule, "fastjson.arena");
+    if (arena != NULL) {
+        PyMem_RawFree(arena->data);
+        PyMem_RawFree(arena);
     }
-    return 0;
 }
 
-static int separators_equal_ascii_pair(PyObject* separators, const char* item_sep, const char* key_sep) {
-    if (separators == NULL || separators == Py_None) {
-        return 0;
+/* The calling thread's arena, created on first use; NULL (no exception) on failure */
+static Arena* thread_arena(ModuleState* st) {
+    PyObject* dict = PyThreadState_GetDict();
+    if (dict == NULL) return NULL;
+    PyObject* capsule = PyDict_GetItemWithError(dict, st->arena_key);
+    if (capsule != NULL) {
+        return (Arena*)PyCapsule_GetPointer(capsule, "fastjson.arena");
     }
-
-    PyObject* seq = PySequence_Fast(separators, NULL);
-    if (seq == NULL) {
+    if (PyErr_Occurred()) {
         PyErr_Clear();
-        return 0;
+        return NULL;
     }
-
-    if (PySequence_Fast_GET_SIZE(seq) != 2) {
-        Py_DECREF(seq);
-        return 0;
+    Arena* arena = (Arena*)PyMem_RawCalloc(1, sizeof(Arena));
+    if (arena == NULL) return NULL;
+    capsule = PyCapsule_New(arena, "fastjson.arena", arena_capsule_destructor);
+    if (capsule == NULL) {
+        PyMem_RawFree(arena);
+        PyErr_Clear();
+        return NULL;
     }
-
-    PyObject* item = PySequence_Fast_GET_ITEM(seq, 0);
-    PyObject* key = PySequence_Fast_GET_ITEM(seq, 1);
-    if (!PyUnicode_Check(item) || !PyUnicode_Check(key)) {
-        Py_DECREF(seq);
-        return 0;
+    int rc = PyDict_SetItem(dict, st->arena_key, capsule);
+    Py_DECREF(capsule);  /* the thread dict owns the arena now */
+    if (rc < 0) {
+        PyErr_Clear();
+        return NULL;
     }
+    return arena;
+}
 
-    int item_ok = (PyUnicode_CompareWithASCIIString(item, item_sep) == 0);
-    int key_ok = (PyUnicode_CompareWithASCIIString(key, key_sep) == 0);
-    Py_DECREF(seq);
-
-    if (item_ok && key_ok) {
-        return 1;
+/* buffer_init(), borrowing the thread's arena block when there is one */
+static int buffer_init_pooled(ModuleState* st, Buffer* buf, size_t initial_capacity) {
+    if (LOAD_SSIZE(&arena_limit) > 0) {
+        Arena* arena = thread_arena(st);
+        if (arena != NULL && arena->data != NULL) {
+            buffer_init_external(buf, arena->data, arena->capacity);
+            buf->external = 0;  /* the block is ours until buffer_release() */
+            arena->data = NULL;
+            return 0;
+        }
     }
-    return 0;
+    return buffer_init(buf, initial_capacity);
 }
 
-static int get_supported_float_item_separator(PyObject* separators, const char** out, Py_ssize_t* out_len) {
-    /* Match stdlib json.dumps separators for arrays.
-       - separators is None / not provided => ", " (stdlib default)
-       - separators == (",", ":") => "," (compact)
-       - separators == (", ", ": ") => ", " (stdlib default, explicit) */
-    if (separators == NULL || separators == Py_None) {
-        *out = ", ";
-        *out_len = 2;
-        return 1;
+/*
+ * Release a finished buffer: keep its block as the thread's arena (shrunk to
+ * arena_limit) when the arena is enabled and empty, otherwise free it.
+ */
+static void buffer_release(ModuleState* st, Buffer* buf) {
+    Arena* arena;
+    size_t limit = (size_t)LOAD_SSIZE(&arena_limit);
+    if (limit == 0 || buf->external || buf->data == NULL || PyErr_Occurred()
+        || (arena = thread_arena(st)) == NULL || arena->data != NULL) {
+        buffer_free(buf);
+        return;
     }
-
-    if (separators_equal_ascii_pair(separators, ",", ":")) {
-        *out = ",";
-        *out_len = 1;
-        return 1;
+    if (buf->capacity > limit) {
+        char* shrunk = (char*)PyMem_RawRealloc(buf->data, limit);
+        if (shrunk == NULL) {
+            buffer_free(buf);
+            return;
+        }
+        buf->data = shrunk;
+        buf->capacity = limit;
     }
+    arena->data = buf->data;
+    arena->capacity = buf->capacity;
+    buf->data = NULL;
+    buf->size = 0;
+    buf->capacity = 0;
+}
 
-    if (separators_equal_ascii_pair(separators, ", ", ": ")) {
-        *out = ", ";
-        *out_len = 2;
-        return 1;
-    }
+/* ======================================================================
+ * Output modes: str (default), bytes, or a JSONBuffer owning the data
+ * ====================================================================== */
 
-    return 0;
-}
+typedef enum {
+    OUTPUT_STR    = 0,
+    OUTPUT_BYTES  = 1,
+    OUTPUT_BUFFER = 2,
+} OutputMode;
 
-static int get_item_separator(PyObject* separators, const char** out, Py_ssize_t* out_len) {
-    if (separators == NULL || separators == Py_None) {
-        *out = ", ";
-        *out_len = 2;
+static int parse_output_mode(PyObject* output_arg, OutputMode* out) {
+    if (output_arg == NULL || output_arg == Py_None) {
+        *out = OUTPUT_STR;
         return 0;
     }
-
-    PyObject* seq = PySequence_Fast(separators, NULL);
-    if (seq == NULL) {
-        PyErr_Clear();
-        return -1;
-    }
-    if (PySequence_Fast_GET_SIZE(seq) != 2) {
-        Py_DECREF(seq);
-        return -1;
-    }
-    PyObject* item_sep = PySequence_Fast_GET_ITEM(seq, 0);
-    if (!PyUnicode_Check(item_sep)) {
-        Py_DECREF(seq);
+    if (!PyUnicode_Check(output_arg)) {
+        PyErr_SetString(PyExc_TypeError,
+            "output parameter must be 'str', 'bytes', or 'buffer'");
         return -1;
     }
-    *out = PyUnicode_AsUTF8AndSize(item_sep, out_len);
-    Py_DECREF(seq);
-    if (*out == NULL) {
-        PyErr_Clear();
+    if (PyUnicode_CompareWithASCIIString(output_arg, "str") == 0) {
+        *out = OUTPUT_STR;
+    } else if (PyUnicode_CompareWithASCIIString(output_arg, "bytes") == 0) {
+        *out = OUTPUT_BYTES;
+    } else if (PyUnicode_CompareWithASCIIString(output_arg, "buffer") == 0) {
+        *out = OUTPUT_BUFFER;
+    } else {
+        PyErr_Format(PyExc_ValueError,
+            "output parameter must be 'str', 'bytes', or 'buffer', got '%U'",
+            output_arg);
         return -1;
     }
     return 0;
 }
 
-static PyObject*
-dumps_sequence_hybrid(PyObject* obj, PyObject* ensure_ascii, int allow_nan, PyObject* separators) {
-    Py_ssize_t n;
-    PyObject** items;
+/*
+ * JSONBuffer: read-only buffer-protocol object that owns the native output
+ * buffer, so the encoded JSON can be passed to socket.send(), file.write(),
+ * memoryview(), ... without any copy.
+ */
+typedef struct {
+    PyObject_HEAD
+    char* data;
+    Py_ssize_t size;
+} JSONBufferObject;
 
-    if (PyList_CheckExact(obj)) {
-        n = PyList_GET_SIZE(obj);
-        items = ((PyListObject*)obj)->ob_item;
-    }
-    else if (PyTuple_CheckExact(obj)) {
-        n = PyTuple_GET_SIZE(obj);
-        items = ((PyTupleObject*)obj)->ob_item;
-    }
-    else {
-        PyErr_SetString(PyExc_TypeError, "Expected list or tuple");
+/* Take ownership of buf->data; buf is left empty */
+static PyObject* json_buffer_from_buffer(PyTypeObject* type, Buffer* buf) {
+    JSONBufferObject* self = PyObject_New(JSONBufferObject, type);
+    if (self == NULL) {
+        buffer_free(buf);
         return NULL;
     }
-
-    const char* item_sep;
-    Py_ssize_t item_sep_len;
-    if (get_item_separator(separators, &item_sep, &item_sep_len) < 0) {
-        return NULL;
+    /* Give back the unused part of the size estimate */
+    if (buf->capacity > buf->size + 4096) {
+        char* shrunk = (char*)PyMem_RawRealloc(buf->data, buf->size ? buf->size : 1);
+        if (shrunk != NULL) {
+            buf->data = shrunk;
+        }
     }
+    self->data = buf->data;
+    self->size = (Py_ssize_t)buf->size;
+    buf->data = NULL;
+    buf->size = 0;
+    buf->capacity = 0;
+    return (PyObject*)self;
+}
 
-    PyObject* json_module = PyImport_ImportModule("json");
-    if (json_module == NULL) return NULL;
-    PyObject* dumps_func = PyObject_GetAttrString(json_module, "dumps");
-    Py_DECREF(json_module);
-    if (dumps_func == NULL) return NULL;
-
-    PyObject* json_kwargs = PyDict_New();
-    if (json_kwargs == NULL) {
-        Py_DECREF(dumps_func);
+static PyObject*
+json_buffer_new(PyTypeObject* type, PyObject* args, PyObject* kwargs) {
+    Py_buffer src;
+    static char* kwlist[] = {"data", NULL};
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*:JSONBuffer", kwlist, &src)) {
         return NULL;
     }
-    PyDict_SetItemString(json_kwargs, "ensure_ascii", ensure_ascii);
-    PyDict_SetItemString(json_kwargs, "allow_nan", allow_nan ? Py_True : Py_False);
-    if (separators != NULL && separators != Py_None) {
-        PyDict_SetItemString(json_kwargs, "separators", separators);
+    Buffer buf;
+    if (buffer_init(&buf, (size_t)src.len + 1) < 0
+        || buffer_append(&buf, (const char*)src.buf, (size_t)src.len) < 0) {
+        PyBuffer_Release(&src);
+        buffer_free(&buf);
+        return PyErr_NoMemory();
     }
+    PyBuffer_Release(&src);
+    return json_buffer_from_buffer(type, &buf);
+}
 
-    PyObject* call_args = PyTuple_New(1);
-    if (call_args == NULL) {
-        Py_DECREF(dumps_func);
-        Py_DECREF(json_kwargs);
-        return NULL;
-    }
-    Py_INCREF(Py_None);
-    PyTuple_SET_ITEM(call_args, 0, Py_None);
+static void json_buffer_dealloc(JSONBufferObject* self) {
+    PyTypeObject* type = Py_TYPE(self);
+    PyMem_RawFree(self->data);
+    type->tp_free((PyObject*)self);
+    Py_DECREF(type);
+}
 
-    Buffer buf;
-    if (buffer_init(&buf, n * 32 + 2) < 0) {
-        Py_DECREF(dumps_func);
-        Py_DECREF(json_kwargs);
-        Py_DECREF(call_args);
-        PyErr_NoMemory();
-        return NULL;
-    }
+static int json_buffer_getbuffer(JSONBufferObject* self, Py_buffer* view, int flags) {
+    return PyBuffer_FillInfo(view, (PyObject*)self, self->data, self->size, 1, flags);
+}
 
-    if (buffer_append_char(&buf, '[') < 0) goto error;
+static Py_ssize_t json_buffer_length(JSONBufferObject* self) {
+    return self->size;
+}
 
-    for (Py_ssize_t i = 0; i < n; i++) {
-        PyObject* item = items[i];
+static PyObject* json_buffer_bytes(JSONBufferObject* self, PyObject* Py_UNUSED(ignored)) {
+    return PyBytes_FromStringAndSize(self->data, self->size);
+}
 
-        if (PyFloat_CheckExact(item)) {
-            double x = PyFloat_AS_DOUBLE(item);
-            if (buffer_append_double_json(&buf, x, allow_nan) < 0) goto error;
-        }
-        else if (item == Py_None) {
-            if (buffer_append(&buf, "null", 4) < 0) goto error;
-        }
-        else if (item == Py_True) {
-            if (buffer_append(&buf, "true", 4) < 0) goto error;
-        }
-        else if (item == Py_False) {
-            if (buffer_append(&buf, "false", 5) < 0) goto error;
-        }
-        else if (PyLong_CheckExact(item)) {
-            PyObject* s = PyObject_Str(item);
-            if (s == NULL) goto error;
-            Py_ssize_t slen;
-            const char* sp = PyUnicode_AsUTF8AndSize(s, &slen);
-            if (sp == NULL) {
-                Py_DECREF(s);
-                goto error;
-            }
-            if (buffer_append(&buf, sp, (size_t)slen) < 0) {
-                Py_DECREF(s);
-                goto error;
-            }
-            Py_DECREF(s);
-        }
-        else {
-            PyObject* prev = PyTuple_GET_ITEM(call_args, 0);
-            Py_DECREF(prev);
-            Py_INCREF(item);
-            PyTuple_SET_ITEM(call_args, 0, item);
-
-            PyObject* s = PyObject_Call(dumps_func, call_args, json_kwargs);
-            if (s == NULL) goto error;
-            Py_ssize_t slen;
-            const char* sp = PyUnicode_AsUTF8AndSize(s, &slen);
-            if (sp == NULL) {
-                Py_DECREF(s);
-                goto error;
-            }
-            if (buffer_append(&buf, sp, (size_t)slen) < 0) {
-                Py_DECREF(s);
-                goto error;
-            }
-            Py_DECREF(s);
-        }
+static PyObject* json_buffer_decode(JSONBufferObject* self, PyObject* Py_UNUSED(ignored)) {
+    return PyUnicode_DecodeUTF8(self->data, self->size, NULL);
+}
 
-        if (i < n - 1) {
-            if (buffer_append(&buf, item_sep, (size_t)item_sep_len) < 0) goto error;
-        }
-    }
+static PyObject* json_buffer_repr(JSONBufferObject* self) {
+    return PyUnicode_FromFormat("<JSONBuffer size=%zd>", self->size);
+}
 
-    if (buffer_append_char(&buf, ']') < 0) goto error;
+static PyMethodDef json_buffer_methods[] = {
+    {"__bytes__", (PyCFunction)json_buffer_bytes, METH_NOARGS,
+     "Return a copy of the encoded JSON as bytes."},
+    {"decode", (PyCFunction)json_buffer_decode, METH_NOARGS,
+     "Return the encoded JSON as str."},
+    {NULL, NULL, 0, NULL}
+};
 
-    PyObject* result = PyUnicode_DecodeUTF8(buf.data, buf.size, NULL);
-    buffer_free(&buf);
-    Py_DECREF(dumps_func);
-    Py_DECREF(json_kwargs);
-    Py_DECREF(call_args);
-    return result;
+static PyType_Slot json_buffer_slots[] = {
+    {Py_tp_dealloc, json_buffer_dealloc},
+    {Py_tp_repr, json_buffer_repr},
+    {Py_sq_length, json_buffer_length},
+    {Py_bf_getbuffer, json_buffer_getbuffer},
+    {Py_tp_doc, "JSONBuffer(data)\n\n"
+                "Read-only UTF-8 encoded JSON document exposing the buffer protocol.\n"
+                "Returned by the output='buffer' modes; it owns the native output buffer."},
+    {Py_tp_methods, json_buffer_methods},
+    {Py_tp_new, json_buffer_new},
+    {0, NULL},
+};
 
-error:
-    buffer_free(&buf);
-    Py_DECREF(dumps_func);
-    Py_DECREF(json_kwargs);
-    Py_DECREF(call_args);
-    if (!PyErr_Occurred()) PyErr_NoMemory();
-    return NULL;
-}
+static PyType_Spec json_buffer_spec = {
+    .name = "fastjson.JSONBuffer",
+    .basicsize = sizeof(JSONBufferObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+    .slots = json_buffer_slots,
+};
 
 /*
- * Fast path: serialize list/tuple of floats to JSON
+ * Convert a finished output buffer into the requested result object and
+ * release the buffer. `has_surrogates` is set when lone surrogates were
+ * written ("surrogatepass"): bytes output then fails exactly like
+ * dumps(...).encode() would.
  */
-static PyObject*
-dumps_float_sequence(PyObject* obj, int allow_nan, const char* item_sep, Py_ssize_t item_sep_len) {
-    Py_ssize_t n;
-    PyObject** items;
-    
-    if (PyList_CheckExact(obj)) {
-        n = PyList_GET_SIZE(obj);
-        items = ((PyListObject*)obj)->ob_item;
+static PyObject* buffer_finish(ModuleState* st, Buffer* buf, OutputMode output, int ascii_only,
+                               int has_surrogates) {
+    PyObject* result;
+    if (output == OUTPUT_STR || has_surrogates) {
+        if (ascii_only) {
+            result = PyUnicode_DecodeASCII(buf->data, buf->size, NULL);
+        } else {
+            result = PyUnicode_DecodeUTF8(buf->data, buf->size, "surrogatepass");
+        }
+        buffer_release(st, buf);
+        if (result != NULL && output != OUTPUT_STR) {
+            /* Raises UnicodeEncodeError */
+            Py_SETREF(result, PyUnicode_AsUTF8String(result));
+        }
+        return result;
     }
-    else if (PyTuple_CheckExact(obj)) {
-        n = PyTuple_GET_SIZE(obj);
-        items = ((PyTupleObject*)obj)->ob_item;
+    if (output == OUTPUT_BYTES) {
+        result = PyBytes_FromStringAndSize(buf->data, (Py_ssize_t)buf->size);
+        buffer_release(st, buf);
+        return result;
     }
-    else {
-        PyErr_SetString(PyExc_TypeError, "Expected list or tuple");
-        return NULL;
+    return json_buffer_from_buffer(st->json_buffer_type, buf);
+}
+
+/* Convert a str produced by the stdlib fallback into the requested output */
+static PyObject* str_to_output(ModuleState* st, PyObject* s, OutputMode output) {
+    if (s == NULL || output == OUTPUT_STR) {
+        return s;
+    }
+    PyObject* encoded = PyUnicode_AsUTF8String(s);
+    Py_DECREF(s);
+    if (encoded == NULL || output == OUTPUT_BYTES) {
+        return encoded;
     }
-    
-    /* Initialize buffer with reasonable initial size (+2 for optional ".0") */
     Buffer buf;
-    if (buffer_init(&buf, n * 36 + (size_t)(n > 0 ? (n - 1) * item_sep_len : 0) + 2) < 0) {
-        PyErr_NoMemory();
-        return NULL;
+    if (buffer_init(&buf, (size_t)PyBytes_GET_SIZE(encoded) + 1) < 0
+        || buffer_append(&buf, PyBytes_AS_STRING(encoded), (size_t)PyBytes_GET_SIZE(encoded)) < 0) {
+        Py_DECREF(encoded);
+        buffer_free(&buf);
+        return PyErr_NoMemory();
     }
-    
-    /* Opening bracket */
-    if (buffer_append_char(&buf, '[') < 0) goto error;
-    
-    /* Format each float */
-    for (Py_ssize_t i = 0; i < n; i++) {
-        double x = PyFloat_AS_DOUBLE(items[i]);
-        if (buffer_append_double_json(&buf, x, allow_nan) < 0) goto error;
-        
-        /* Item separator (not after last element) */
-        if (i < n - 1) {
-            if (buffer_append(&buf, item_sep, (size_t)item_sep_len) < 0) goto error;
-        }
+    Py_DECREF(encoded);
+    return json_buffer_from_buffer(st->json_buffer_type, &buf);
+}
+
+/* ======================================================================
+ * Writable-target output (dumps_into): encode into caller-owned memory
+ * ====================================================================== */
+
+/* Raise BufferTooSmallError; its `needed` attribute is the minimum len(target) */
+static void raise_buffer_too_small(ModuleState* st, Py_ssize_t needed, Py_ssize_t available) {
+    PyObject* msg = PyUnicode_FromFormat(
+        "target buffer too small: %zd bytes needed, %zd available", needed, available);
+    if (msg == NULL) return;
+    PyObject* exc = PyObject_CallOneArg(st->buffer_too_small_error, msg);
+    Py_DECREF(msg);
+    if (exc == NULL) return;
+    PyObject* needed_obj = PyLong_FromSsize_t(needed);
+    if (needed_obj != NULL && PyObject_SetAttrString(exc, "needed", needed_obj) == 0) {
+        PyErr_SetObject(st->buffer_too_small_error, exc);
     }
-    
-    /* Closing bracket */
-    if (buffer_append_char(&buf, ']') < 0) goto error;
-    
-    /* Convert to Python string (ASCII is safe since JSON uses only ASCII) */
-    PyObject* result = PyUnicode_DecodeASCII(buf.data, buf.size, NULL);
-    buffer_free(&buf);
-    return result;
-    
-error:
-    buffer_free(&buf);
-    return NULL;
+    Py_XDECREF(needed_obj);
+    Py_DECREF(exc);
 }
 
 /*
- * Slow path: delegate to Python json module
+ * Acquire a writable, contiguous view of target and check offset.
+ * On success the caller must PyBuffer_Release(view).
  */
-static PyObject*
-dumps_via_json(PyObject* obj, PyObject* ensure_ascii, int allow_nan, PyObject* separators) {
-    /* Import json module */
-    PyObject* json_module = PyImport_ImportModule("json");
-    if (json_module == NULL) {
-        return NULL;
+static int get_target_view(PyObject* target, Py_ssize_t offset, Py_buffer* view) {
+    if (PyObject_GetBuffer(target, view, PyBUF_WRITABLE) < 0) {
+        return -1;
     }
-    
-    /* Get json.dumps function */
-    PyObject* dumps_func = PyObject_GetAttrString(json_module, "dumps");
-    Py_DECREF(json_module);
-    
-    if (dumps_func == NULL) {
-        return NULL;
-    }
-    
-    /* Build kwargs for json.dumps */
-    PyObject* json_kwargs = PyDict_New();
-    if (json_kwargs == NULL) {
-        Py_DECREF(dumps_func);
-        return NULL;
-    }
-    
-    /* Add ensure_ascii */
-    PyDict_SetItemString(json_kwargs, "ensure_ascii", ensure_ascii);
-    
-    /* Add allow_nan */
-    PyDict_SetItemString(json_kwargs, "allow_nan", allow_nan ? Py_True : Py_False);
-    
-    /* Add separators if provided */
-    if (separators != NULL && separators != Py_None) {
-        PyDict_SetItemString(json_kwargs, "separators", separators);
-    }
-    
-    /* Call json.dumps(obj, **kwargs) */
-    PyObject* result = PyObject_Call(dumps_func, PyTuple_Pack(1, obj), json_kwargs);
-    
-    Py_DECREF(dumps_func);
-    Py_DECREF(json_kwargs);
-    
-    return result;
-}
-
-static PyObject*
-dumps(PyObject* self, PyObject* args, PyObject* kwargs) {
+    if (offset < 0 || offset > view->len) {
+        PyErr_Format(PyExc_ValueError,
+            "offset must be between 0 and %zd, got %zd", view->len, offset);
+        PyBuffer_Release(view);
+        return -1;
+    }
+    return 0;
+}
+
+static void buffer_init_target(Buffer* buf, Py_buffer* view, Py_ssize_t offset) {
+    buffer_init_external(buf, (char*)view->buf + offset, (size_t)(view->len - offset));
+}
+
+/*
+ * Finish an encode into target: returns the number of bytes written, or
+ * raises BufferTooSmallError when the output outgrew the target. Frees buf.
+ */
+static PyObject* buffer_finish_target(ModuleState* st, Buffer* buf, Py_buffer* view,
+                                      Py_ssize_t offset, int has_surrogates) {
+    if (has_surrogates) {
+        /* Raises the UnicodeEncodeError of dumps(...).encode() */
+        PyObject* res = buffer_finish(st, buf, OUTPUT_BYTES, 0, 1);
+        if (res == NULL) return NULL;
+        Py_DECREF(res);
+        PyErr_SetString(PyExc_RuntimeError, "unexpected surrogate state");
+        return NULL;
+    }
+    size_t n = buf->size;
+    int fits = n <= (size_t)(view->len - offset);
+    if (fits && !buf->external) {
+        /* A worst-case reservation near the end moved the data to the heap */
+        memcpy((char*)view->buf + offset, buf->data, n);
+    }
+    buffer_free(buf);
+    if (!fits) {
+        raise_buffer_too_small(st, offset + (Py_ssize_t)n, view->len);
+        return NULL;
+    }
+    return PyLong_FromSize_t(n);
+}
+
+/* Copy already-encoded output (stdlib fallback) into target */
+static PyObject* copy_into_target(ModuleState* st, PyObject* encoded, Py_buffer* view,
+                                  Py_ssize_t offset) {
+    if (encoded == NULL) return NULL;
+    Py_ssize_t n = PyBytes_GET_SIZE(encoded);
+    if (n > view->len - offset) {
+        Py_DECREF(encoded);
+        raise_buffer_too_small(st, offset + n, view->len);
+        return NULL;
+    }
+    memcpy((char*)view->buf + offset, PyBytes_AS_STRING(encoded), (size_t)n);
+    Py_DECREF(encoded);
+    return PyLong_FromSsize_t(n);
+}
+
+/* ======================================================================
+ * Streaming output (dump): flush fixed-size chunks to fp.write or an fd
+ * ====================================================================== */
+
+#define DEFAULT_CHUNK_SIZE 65536
+
+typedef struct {
+    PyObject* write;  /* bound fp.write, or NULL to write straight to fd */
+    int fd;
+    int binary;       /* fp.write takes bytes instead of str */
+    int ascii_only;   /* output is pure ASCII (ensure_ascii=True) */
+    int failed;       /* the sink itself raised (not an encoding error) */
+    size_t written;   /* units accepted by the sink: str chars, or bytes */
+} StreamSink;
+
+/* Length of the longest prefix of data[0:size] ending on a UTF-8 boundary */
+static size_t utf8_complete_prefix(const char* data, size_t size) {
+    size_t i = size;
+    size_t back = 0;
+    while (i > 0 && back < 4 && ((unsigned char)data[i - 1] & 0xC0) == 0x80) {
+        i--;
+        back++;
+    }
+    if (i == 0) return size;
+    unsigned char lead = (unsigned char)data[i - 1];
+    size_t need = lead >= 0xF0 ? 4 : lead >= 0xE0 ? 3 : lead >= 0xC0 ? 2 : 1;
+    return back + 1 >= need ? size : i - 1;
+}
+
+static Py_ssize_t sink_write_fd(StreamSink* sink, const char* data, size_t size) {
+    size_t off = 0;
+    while (off < size) {
+        size_t chunk = size - off;
+        Py_ssize_t n;
+#ifdef _WIN32
+        if (chunk > INT_MAX) chunk = INT_MAX;
+        Py_BEGIN_ALLOW_THREADS
+        n = _write(sink->fd, data + off, (unsigned int)chunk);
+        Py_END_ALLOW_THREADS
+#else
+        if (chunk > PY_SSIZE_T_MAX) chunk = PY_SSIZE_T_MAX;
+        Py_BEGIN_ALLOW_THREADS
+        n = write(sink->fd, data + off, chunk);
+        Py_END_ALLOW_THREADS
+#endif
+        if (n < 0) {
+            if (errno == EINTR) {
+                if (PyErr_CheckSignals() < 0) return -1;
+                continue;
+            }
+            PyErr_SetFromErrno(PyExc_OSError);
+            return -1;
+        }
+        off += (size_t)n;
+    }
+    return (Py_ssize_t)size;
+}
+
+static Py_ssize_t stream_sink_flush(Buffer* buf) {
+    StreamSink* sink = (StreamSink*)buf->sink;
+    size_t n = buf->size;
+    PyObject* chunk;
+
+    if (sink->write == NULL) {
+        Py_ssize_t rc = sink_write_fd(sink, buf->data, n);
+        if (rc < 0) {
+            sink->failed = 1;
+            return -1;
+        }
+        sink->written += n;
+        return rc;
+    }
+
+    if (sink->binary) {
+        chunk = PyBytes_FromStringAndSize(buf->data, (Py_ssize_t)n);
+    } else if (sink->ascii_only) {
+        chunk = PyUnicode_New((Py_ssize_t)n, 127);
+        if (chunk != NULL) memcpy(PyUnicode_1BYTE_DATA(chunk), buf->data, n);
+    } else {
+        /* Never split a UTF-8 sequence across two write() calls */
+        n = utf8_complete_prefix(buf->data, n);
+        if (n == 0) return 0;
+        chunk = PyUnicode_DecodeUTF8(buf->data, (Py_ssize_t)n, "surrogatepass");
+    }
+    if (chunk == NULL) {
+        sink->failed = 1;
+        return -1;
+    }
+    size_t units = sink->binary ? n : (size_t)PyUnicode_GET_LENGTH(chunk);
+    PyObject* res = PyObject_CallOneArg(sink->write, chunk);
+    Py_DECREF(chunk);
+    if (res == NULL) {
+        sink->failed = 1;
+        return -1;
+    }
+    Py_DECREF(res);
+    sink->written += units;
+    return (Py_ssize_t)n;
+}
+
+static int stream_init(Buffer* buf, StreamSink* sink, PyObject* write, int fd,
+                       Py_ssize_t chunk_size) {
+    if (chunk_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "chunk_size must be positive");
+        return -1;
+    }
+    if (write == Py_None) write = NULL;
+    if (write == NULL && fd < 0) {
+        PyErr_SetString(PyExc_ValueError, "either write or fd must be given");
+        return -1;
+    }
+    if (write != NULL && !PyCallable_Check(write)) {
+        PyErr_SetString(PyExc_TypeError, "write must be callable");
+        return -1;
+    }
+    sink->write = write;
+    sink->fd = fd;
+    sink->failed = 0;
+    sink->written = 0;
+    if (buffer_init(buf, (size_t)chunk_size) < 0) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    buf->flush = stream_sink_flush;
+    buf->sink = sink;
+    return 0;
+}
+
+/* Flush everything still buffered */
+static int stream_finish(Buffer* buf) {
+    while (buf->size > 0) {
+        if (buffer_flush(buf) < 0) return -1;
+    }
+    return 0;
+}
+
+/*
+ * Check if object is a list or tuple containing only floats
+ * Returns: 1 = yes, 0 = no
+ */
+static int is_float_sequence(PyObject* obj) {
+    if (PyList_CheckExact(obj)) {
+        Py_ssize_t n = PyList_GET_SIZE(obj);
+        for (Py_ssize_t i = 0; i < n; i++) {
+            if (!PyFloat_CheckExact(PyList_GET_ITEM(obj, i))) {
+                return 0;
+            }
+        }
+        return 1;
+    }
+    else if (PyTuple_CheckExact(obj)) {
+        Py_ssize_t n = PyTuple_GET_SIZE(obj);
+        for (Py_ssize_t i = 0; i < n; i++) {
+            if (!PyFloat_CheckExact(PyTuple_GET_ITEM(obj, i))) {
+                return 0;
+            }
+        }
+        return 1;
+    }
+    return 0;
+}
+
+/*
+ * Check if object is a list or tuple containing only ints (not bools)
+ * Returns: 1 = yes, 0 = no
+ */
+static int is_int_sequence(PyObject* obj) {
+    if (PyList_CheckExact(obj)) {
+        Py_ssize_t n = PyList_GET_SIZE(obj);
+        for (Py_ssize_t i = 0; i < n; i++) {
+            if (!PyLong_CheckExact(PyList_GET_ITEM(obj, i))) {
+                return 0;
+            }
+        }
+        return 1;
+    }
+    else if (PyTuple_CheckExact(obj)) {
+        Py_ssize_t n = PyTuple_GET_SIZE(obj);
+        for (Py_ssize_t i = 0; i < n; i++) {
+            if (!PyLong_CheckExact(PyTuple_GET_ITEM(obj, i))) {
+                return 0;
+            }
+        }
+        return 1;
+    }
+    return 0;
+}
+
+/*
+ * Separators and indentation as UTF-8. The strings are borrowed from
+ * literals or from the str objects passed in; get_supported_separators()
+ * hands out an `owner` reference that keeps them alive when needed.
+ */
+typedef struct {
+    const char* item;
+    Py_ssize_t item_len;
+    const char* key;
+    Py_ssize_t key_len;
+    /* indent: "\n" followed by one indent; NULL (and 0) for indent=None */
+    const char* newline;
+    Py_ssize_t newline_len;
+    int ascii;  /* all of the above are ASCII */
+} Separators;
+
+/* b"\n" + the indent string of json.JSONEncoder (' ' * indent for an int), or NULL */
+static PyObject* indent_newline(PyObject* indent) {
+    if (PyUnicode_CheckExact(indent)) {
+        Py_ssize_t len;
+        const char* s = PyUnicode_AsUTF8AndSize(indent, &len);
+        if (s == NULL) return NULL;
+        PyObject* nl = PyBytes_FromStringAndSize(NULL, len + 1);
+        if (nl == NULL) return NULL;
+        PyBytes_AS_STRING(nl)[0] = '\n';
+        memcpy(PyBytes_AS_STRING(nl) + 1, s, (size_t)len);
+        return nl;
+    }
+    /* ' ' * indent: ints, bools and other __index__ types (numpy integers) */
+    if (!PyIndex_Check(indent)) return NULL;
+    Py_ssize_t n = PyNumber_AsSsize_t(indent, PyExc_OverflowError);
+    if (n == -1 && PyErr_Occurred()) return NULL;
+    if (n < 0) n = 0;
+    PyObject* nl = PyBytes_FromStringAndSize(NULL, n + 1);
+    if (nl == NULL) return NULL;
+    PyBytes_AS_STRING(nl)[0] = '\n';
+    memset(PyBytes_AS_STRING(nl) + 1, ' ', (size_t)n);
+    return nl;
+}
+
+/*
+ * Resolve separators= and indent= like json.JSONEncoder:
+ * - separators None => (", ", ": "), or (",", ": ") when indent is set
+ * - otherwise a tuple/list of two str, written as-is
+ * - indent None => single line; a str, or an int for that many spaces
+ * Returns 1 when the native encoder supports them, 0 otherwise (no
+ * exception set: the caller falls back to the json module). On success
+ * *owner is NULL or a reference the caller must hold while using *out.
+ */
+static int get_supported_separators(PyObject* separators, PyObject* indent, Separators* out,
+                                    PyObject** owner) {
+    int has_indent = indent != NULL && indent != Py_None;
+    PyObject* item_obj = NULL;
+    PyObject* nl_obj = NULL;
+    *owner = NULL;
+
+    if (separators == NULL || separators == Py_None) {
+        out->item = has_indent ? "," : ", ";
+        out->item_len = has_indent ? 1 : 2;
+        out->key = ": ";
+        out->key_len = 2;
+        out->ascii = 1;
+    }
+    else {
+        if ((!PyTuple_CheckExact(separators) && !PyList_CheckExact(separators))
+            || PySequence_Fast_GET_SIZE(separators) != 2) {
+            return 0;
+        }
+        item_obj = PySequence_Fast_GET_ITEM(separators, 0);
+        PyObject* key_obj = PySequence_Fast_GET_ITEM(separators, 1);
+        if (!PyUnicode_CheckExact(item_obj) || !PyUnicode_CheckExact(key_obj)) {
+            return 0;
+        }
+        out->item = PyUnicode_AsUTF8AndSize(item_obj, &out->item_len);
+        out->key = out->item == NULL ? NULL : PyUnicode_AsUTF8AndSize(key_obj, &out->key_len);
+        if (out->key == NULL) {
+            /* Lone surrogates */
+            PyErr_Clear();
+            return 0;
+        }
+        out->ascii = PyUnicode_IS_ASCII(item_obj) && PyUnicode_IS_ASCII(key_obj);
+        if (PyList_CheckExact(separators)) {
+            /* The list may change; keep its current items */
+            *owner = PyTuple_Pack(2, item_obj, key_obj);
+            if (*owner == NULL) {
+                PyErr_Clear();
+                return 0;
+            }
+        }
+    }
+
+    out->newline = NULL;
+    out->newline_len = 0;
+    if (has_indent) {
+        nl_obj = indent_newline(indent);
+        if (nl_obj == NULL) {
+            PyErr_Clear();
+            Py_CLEAR(*owner);
+            return 0;
+        }
+        out->newline = PyBytes_AS_STRING(nl_obj);
+        out->newline_len = PyBytes_GET_SIZE(nl_obj);
+        for (Py_ssize_t i = 0; i < out->newline_len; i++) {
+            if ((unsigned char)out->newline[i] >= 0x80) out->ascii = 0;
+        }
+        if (*owner == NULL) {
+            *owner = nl_obj;
+        }
+        else {
+            Py_SETREF(*owner, PyTuple_Pack(2, *owner, nl_obj));
+            Py_DECREF(nl_obj);
+            if (*owner == NULL) {
+                PyErr_Clear();
+                return 0;
+            }
+        }
+    }
+    return 1;
+}
+
+/*
+ * Before item i of a top-level array: the item separator (i > 0), then the
+ * newline and one indent when indenting.
+ */
+static int buffer_append_item_prefix(Buffer* buf, const Separators* seps, Py_ssize_t i) {
+    if (i > 0 && buffer_append(buf, seps->item, (size_t)seps->item_len) < 0) return -1;
+    if (seps->newline_len == 0) return 0;
+    return buffer_append(buf, seps->newline, (size_t)seps->newline_len);
+}
+
+/* Closing bracket of a top-level array of n items */
+static int buffer_append_array_end(Buffer* buf, const Separators* seps, Py_ssize_t n) {
+    if (seps->newline_len > 0 && n > 0 && buffer_append_char(buf, '\n') < 0) return -1;
+    return buffer_append_char(buf, ']');
+}
+
+/* ======================================================================
+ * Native recursive encoder for dict/list/tuple/str/int/float/bool/None
+ * ====================================================================== */
+
+static const char hexdigits[] = "0123456789abcdef";
+
+static void write_u_escape(char* dst, Py_UCS4 c) {
+    dst[0] = '\\';
+    dst[1] = 'u';
+    dst[2] = hexdigits[(c >> 12) & 0xf];
+    dst[3] = hexdigits[(c >> 8) & 0xf];
+    dst[4] = hexdigits[(c >> 4) & 0xf];
+    dst[5] = hexdigits[c & 0xf];
+}
+
+/*
+ * Write the JSON escape sequence for a code point that must be escaped,
+ * matching stdlib encode_basestring / encode_basestring_ascii.
+ * Returns the number of bytes written (at most 12).
+ */
+static size_t write_escape(char* dst, Py_UCS4 c) {
+    char short_esc = 0;
+    switch (c) {
+    case '"':  short_esc = '"';  break;
+    case '\\': short_esc = '\\'; break;
+    case '\b': short_esc = 'b';  break;
+    case '\f': short_esc = 'f';  break;
+    case '\n': short_esc = 'n';  break;
+    case '\r': short_esc = 'r';  break;
+    case '\t': short_esc = 't';  break;
+    }
+    if (short_esc) {
+        dst[0] = '\\';
+        dst[1] = short_esc;
+        return 2;
+    }
+    if (c >= 0x10000) {
+        Py_UCS4 v = c - 0x10000;
+        write_u_escape(dst, 0xd800 | ((v >> 10) & 0x3ff));
+        write_u_escape(dst + 6, 0xdc00 | (v & 0x3ff));
+        return 12;
+    }
+    write_u_escape(dst, c);
+    return 6;
+}
+
+/* UTF-8 encode one code point; lone surrogates are passed through
+   ("surrogatepass") and restored when the buffer is decoded. */
+static size_t write_utf8(char* dst, Py_UCS4 c) {
+    if (c < 0x80) {
+        dst[0] = (char)c;
+        return 1;
+    }
+    if (c < 0x800) {
+        dst[0] = (char)(0xc0 | (c >> 6));
+        dst[1] = (char)(0x80 | (c & 0x3f));
+        return 2;
+    }
+    if (c < 0x10000) {
+        dst[0] = (char)(0xe0 | (c >> 12));
+        dst[1] = (char)(0x80 | ((c >> 6) & 0x3f));
+        dst[2] = (char)(0x80 | (c & 0x3f));
+        return 3;
+    }
+    dst[0] = (char)(0xf0 | (c >> 18));
+    dst[1] = (char)(0x80 | ((c >> 12) & 0x3f));
+    dst[2] = (char)(0x80 | ((c >> 6) & 0x3f));
+    dst[3] = (char)(0x80 | (c & 0x3f));
+    return 4;
+}
+
+/* Printable ASCII that is copied verbatim in both ensure_ascii modes */
+#define IS_PLAIN_ASCII(c) ((c) >= 0x20 && (c) < 0x7f && (c) != '"' && (c) != '\\')
+
+static inline int ctz64(uint64_t x) {
+#if defined(_MSC_VER)
+    unsigned long idx;
+    _BitScanForward64(&idx, x);
+    return (int)idx;
+#else
+    return __builtin_ctzll(x);
+#endif
+}
+
+/*
+ * Return the index of the first byte in src[i:n] that is not plain ASCII
+ * (control character, '"', '\\', DEL or non-ASCII), or n if there is none.
+ * Scans 16 bytes at a time with SSE2, or 8 bytes at a time (SWAR) elsewhere.
+ */
+static Py_ssize_t scan_plain_ascii(const Py_UCS1* src, Py_ssize_t i, Py_ssize_t n) {
+#if FASTJSON_HAVE_SSE2
+    const __m128i quote = _mm_set1_epi8('"');
+    const __m128i backslash = _mm_set1_epi8('\\');
+    const __m128i del = _mm_set1_epi8(0x7f);
+    const __m128i space = _mm_set1_epi8(0x20);
+    for (; i + 16 <= n; i += 16) {
+        __m128i v = _mm_loadu_si128((const __m128i*)(src + i));
+        /* Signed compare: bytes >= 0x80 are negative, so they count as < 0x20 */
+        __m128i bad = _mm_or_si128(
+            _mm_or_si128(_mm_cmplt_epi8(v, space), _mm_cmpeq_epi8(v, del)),
+            _mm_or_si128(_mm_cmpeq_epi8(v, quote), _mm_cmpeq_epi8(v, backslash)));
+        int mask = _mm_movemask_epi8(bad);
+        if (mask != 0) {
+            return i + ctz64((uint64_t)mask);
+        }
+    }
+#elif PY_LITTLE_ENDIAN
+    const uint64_t ones = 0x0101010101010101ULL;
+    const uint64_t highs = 0x8080808080808080ULL;
+    for (; i + 8 <= n; i += 8) {
+        uint64_t x;
+        memcpy(&x, src + i, 8);
+        uint64_t q = x ^ (ones * '"');
+        uint64_t b = x ^ (ones * '\\');
+        uint64_t d = x ^ (ones * 0x7f);
+        /* Per-byte "is zero" / "is < 0x20" tests; borrows only produce false
+           positives above a true positive, so the lowest flagged byte is exact. */
+        uint64_t bad = ((x - ones * 0x20) & ~x)
+                       | ((q - ones) & ~q)
+                       | ((b - ones) & ~b)
+                       | ((d - ones) & ~d)
+                       | x;
+        bad &= highs;
+        if (bad != 0) {
+            return i + (ctz64(bad) >> 3);
+        }
+    }
+#endif
+    while (i < n && IS_PLAIN_ASCII(src[i])) {
+        i++;
+    }
+    return i;
+}
+
+#define DEFINE_STRING_ENCODER(NAME, CHAR_T)                                   \
+static int NAME(Buffer* buf, const CHAR_T* src, Py_ssize_t n,                 \
+                int ensure_ascii) {                                           \
+    Py_ssize_t i = 0;                                                         \
+    int surrogates = 0;                                                       \
+    while (i < n) {                                                           \
+        Py_ssize_t start = i;                                                 \
+        if (sizeof(CHAR_T) == 1) {                                            \
+            i = scan_plain_ascii((const Py_UCS1*)src, i, n);                  \
+        } else {                                                              \
+            while (i < n && IS_PLAIN_ASCII(src[i])) {                         \
+                i++;                                                          \
+            }                                                                 \
+        }                                                                     \
+        if (i > start) {                                                      \
+            if (buffer_reserve(buf, (size_t)(i - start)) < 0) return -1;      \
+            char* dst = buf->data + buf->size;                                \
+            if (sizeof(CHAR_T) == 1) {                                        \
+                memcpy(dst, src + start, (size_t)(i - start));                \
+            } else {                                                          \
+                for (Py_ssize_t j = start; j < i; j++) {                      \
+                    *dst++ = (char)src[j];                                    \
+                }                                                             \
+            }                                                                 \
+            buf->size += (size_t)(i - start);                                 \
+        }                                                                     \
+        if (i == n) break;                                                    \
+        Py_UCS4 c = src[i++];                                                 \
+        if (buffer_reserve(buf, 12) < 0) return -1;                           \
+        if (ensure_ascii || c < 0x20 || c == '"' || c == '\\') {              \
+            buf->size += write_escape(buf->data + buf->size, c);              \
+        } else {                                                              \
+            surrogates |= Py_UNICODE_IS_SURROGATE(c);                         \
+            buf->size += write_utf8(buf->data + buf->size, c);                \
+        }                                                                     \
+    }                                                                         \
+    return surrogates;                                                        \
+}
+
+DEFINE_STRING_ENCODER(encode_string_ucs1, Py_UCS1)
+DEFINE_STRING_ENCODER(encode_string_ucs2, Py_UCS2)
+DEFINE_STRING_ENCODER(encode_string_ucs4, Py_UCS4)
+
+/*
+ * Append a quoted, escaped JSON string.
+ * Output matches json.encoder.encode_basestring_ascii (ensure_ascii=True)
+ * or encode_basestring (ensure_ascii=False).
+ * Returns -1 on error, 1 if lone surrogates were written, 0 otherwise.
+ */
+static int buffer_append_json_string(Buffer* buf, PyObject* s, int ensure_ascii) {
+#if PY_VERSION_HEX < 0x030C0000
+    if (PyUnicode_READY(s) < 0) return -1;
+#endif
+    Py_ssize_t n = PyUnicode_GET_LENGTH(s);
+    if (buffer_reserve(buf, (size_t)n + 2) < 0) return -1;
+    buf->data[buf->size++] = '"';
+
+    int rc;
+    switch (PyUnicode_KIND(s)) {
+    case PyUnicode_1BYTE_KIND:
+        rc = encode_string_ucs1(buf, PyUnicode_1BYTE_DATA(s), n, ensure_ascii);
+        break;
+    case PyUnicode_2BYTE_KIND:
+        rc = encode_string_ucs2(buf, PyUnicode_2BYTE_DATA(s), n, ensure_ascii);
+        break;
+    default:
+        rc = encode_string_ucs4(buf, PyUnicode_4BYTE_DATA(s), n, ensure_ascii);
+        break;
+    }
+    if (rc < 0) return -1;
+    if (buffer_append_char(buf, '"') < 0) return -1;
+    return rc;
+}
+
+typedef struct {
+    PyObject* key;
+    PyObject* value;
+    Py_ssize_t index;  /* insertion position, while sorting */
+} KeyValue;
+
+/* sort_keys: the key order of a dict seen earlier */
+typedef struct {
+    Py_ssize_t size;
+    Py_uhash_t signature;  /* XOR of the key hashes */
+    PyObject** keys;       /* sorted, strong references */
+    PyObject** insertion;  /* the same keys in the dict's insertion order */
+    Py_ssize_t* rank;      /* rank[i]: sorted position of insertion[i] */
+} SortedKeys;
+
+#define SORT_CACHE_SLOTS 8
+
+static void sorted_keys_clear(SortedKeys* order) {
+    if (order->keys == NULL) return;
+    for (Py_ssize_t i = 0; i < order->size; i++) {
+        Py_DECREF(order->keys[i]);
+    }
+    PyMem_Free(order->keys);
+    order->keys = NULL;
+}
+
+typedef struct {
+    Buffer* buf;
+    Separators seps;
+    int ensure_ascii;
+    int allow_nan;
+    int check_circular;
+    int sort_keys;
+    int has_surrogates;
+    /* Containers currently being encoded (the ancestors of the current
+       object); equivalent to the stdlib `markers` dict. */
+    PyObject** markers;
+    Py_ssize_t n_markers;
+    Py_ssize_t markers_capacity;
+    /* indent: nesting level of the current container, and "\n" followed
+       by the indent repeated for the deepest level seen so far */
+    Py_ssize_t depth;
+    char* newline;
+    size_t newline_size;
+    /* sort_keys: key orders of recent dicts with exact str keys */
+    SortedKeys sort_cache[SORT_CACHE_SLOTS];
+    int sort_cache_next;
+    int sort_cache_last;  /* slot of the last match, tried first */
+    /* native_arrays=True: the module state for encode_native_array(), else NULL */
+    ModuleState* arrays;
+} EncoderState;
+
+static int encoder_encode_obj(EncoderState* st, PyObject* obj);
+static int encode_native_array(EncoderState* st, PyObject* obj);
+
+static int encoder_encode_string(EncoderState* st, PyObject* s) {
+    int rc = buffer_append_json_string(st->buf, s, st->ensure_ascii);
+    if (rc > 0) {
+        st->has_surrogates = 1;
+        rc = 0;
+    }
+    return rc;
+}
+
+static int encoder_enter(EncoderState* st, PyObject* container) {
+    if (Py_EnterRecursiveCall(" while encoding a JSON object")) {
+        return -1;
+    }
+    if (!st->check_circular) {
+        return 0;
+    }
+    for (Py_ssize_t i = 0; i < st->n_markers; i++) {
+        if (st->markers[i] == container) {
+            Py_LeaveRecursiveCall();
+            PyErr_SetString(PyExc_ValueError, "Circular reference detected");
+            return -1;
+        }
+    }
+    if (st->n_markers == st->markers_capacity) {
+        Py_ssize_t new_capacity = st->markers_capacity ? st->markers_capacity * 2 : 16;
+        PyObject** new_markers = PyMem_Realloc(st->markers,
+                                               (size_t)new_capacity * sizeof(PyObject*));
+        if (new_markers == NULL) {
+            Py_LeaveRecursiveCall();
+            PyErr_NoMemory();
+            return -1;
+        }
+        st->markers = new_markers;
+        st->markers_capacity = new_capacity;
+    }
+    st->markers[st->n_markers++] = container;
+    return 0;
+}
+
+static void encoder_leave(EncoderState* st) {
+    if (st->check_circular) {
+        st->n_markers--;
+    }
+    Py_LeaveRecursiveCall();
+}
+
+/* Newline plus `level` indents (indent set only) */
+static int encoder_newline(EncoderState* st, Py_ssize_t level) {
+    const Separators* seps = &st->seps;
+    if (level <= 1) {
+        return buffer_append(st->buf, seps->newline, level == 1 ? (size_t)seps->newline_len : 1);
+    }
+    size_t indent_len = (size_t)seps->newline_len - 1;
+    size_t size = 1 + (size_t)level * indent_len;
+    if (size > st->newline_size) {
+        /* Room for a few more levels */
+        size_t new_size = 1 + (size_t)(level + 8) * indent_len;
+        char* newline = PyMem_Realloc(st->newline, new_size);
+        if (newline == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        newline[0] = '\n';
+        for (size_t off = 1; off < new_size; off += indent_len) {
+            memcpy(newline + off, seps->newline + 1, indent_len);
+        }
+        st->newline = newline;
+        st->newline_size = new_size;
+    }
+    return buffer_append(st->buf, st->newline, size);
+}
+
+/* Item separator (idx > 0), then newline and indent for the current level */
+static int encoder_item_prefix(EncoderState* st, Py_ssize_t idx) {
+    if (idx > 0 && buffer_append(st->buf, st->seps.item, (size_t)st->seps.item_len) < 0) return -1;
+    if (st->seps.newline == NULL) return 0;
+    return encoder_newline(st, st->depth);
+}
+
+/* Closing bracket of a non-empty container */
+static int encoder_close(EncoderState* st, char bracket) {
+    if (st->seps.newline != NULL && encoder_newline(st, st->depth - 1) < 0) return -1;
+    return buffer_append_char(st->buf, bracket);
+}
+
+/*
+ * Size and items are re-read every iteration: dict subclasses (items())
+ * and streaming sinks (fp.write) may run Python code that mutates seq.
+ */
+static int encoder_encode_items(EncoderState* st, PyObject* seq) {
+    Buffer* buf = st->buf;
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+        if (encoder_item_prefix(st, i) < 0) return -1;
+        if (i >= PySequence_Fast_GET_SIZE(seq)) {
+            PyErr_SetString(PyExc_RuntimeError, "list changed during encoding");
+            return -1;
+        }
+        PyObject* item = PySequence_Fast_GET_ITEM(seq, i);
+        if (PyFloat_CheckExact(item)) {
+            if (buffer_append_double_json(buf, PyFloat_AS_DOUBLE(item), st->allow_nan) < 0) return -1;
+            continue;
+        }
+        Py_INCREF(item);
+        int rc = encoder_encode_obj(st, item);
+        Py_DECREF(item);
+        if (rc < 0) return -1;
+    }
+    return 0;
+}
+
+/* `seq` is the list or tuple of the items of `obj` (obj itself, or a copy) */
+static int encoder_encode_list(EncoderState* st, PyObject* obj, PyObject* seq) {
+    Buffer* buf = st->buf;
+    if (PySequence_Fast_GET_SIZE(seq) == 0) {
+        return buffer_append(buf, "[]", 2);
+    }
+    if (encoder_enter(st, obj) < 0) return -1;
+    st->depth++;
+    if (buffer_append_char(buf, '[') < 0) goto error;
+
+    int rc;
+    Py_BEGIN_CRITICAL_SECTION(seq);
+    rc = encoder_encode_items(st, seq);
+    Py_END_CRITICAL_SECTION();
+    if (rc < 0) goto error;
+
+    if (encoder_close(st, ']') < 0) goto error;
+    st->depth--;
+    encoder_leave(st);
+    return 0;
+
+error:
+    st->depth--;
+    encoder_leave(st);
+    return -1;
+}
+
+static int encoder_encode_sequence(EncoderState* st, PyObject* seq) {
+    if (PyList_CheckExact(seq) || PyTuple_CheckExact(seq)) {
+        return encoder_encode_list(st, seq, seq);
+    }
+    /* Subclasses are iterated, as stdlib's PySequence_Fast() does: their
+       __iter__ may not yield what their storage holds. With indent, stdlib's
+       Python encoder first tests `not lst` and writes [] for a false one. */
+    if (st->seps.newline != NULL) {
+        int empty = PyObject_Not(seq);
+        if (empty < 0) return -1;
+        if (empty) return buffer_append(st->buf, "[]", 2);
+    }
+    PyObject* items = PySequence_Fast(seq, "_iterencode_list needs a sequence");
+    if (items == NULL) return -1;
+    int rc = encoder_encode_list(st, seq, items);
+    Py_DECREF(items);
+    return rc;
+}
+
+/* Encode a dict key as a JSON string, following stdlib key coercion rules */
+static int encoder_encode_key(EncoderState* st, PyObject* key) {
+    Buffer* buf = st->buf;
+    if (PyUnicode_Check(key)) {
+        return encoder_encode_string(st, key);
+    }
+    if (buffer_append_char(buf, '"') < 0) return -1;
+    int rc;
+    if (PyFloat_Check(key)) {
+        rc = buffer_append_double_json(buf, PyFloat_AS_DOUBLE(key), st->allow_nan);
+    }
+    else if (key == Py_True) {
+        rc = buffer_append(buf, "true", 4);
+    }
+    else if (key == Py_False) {
+        rc = buffer_append(buf, "false", 5);
+    }
+    else if (key == Py_None) {
+        rc = buffer_append(buf, "null", 4);
+    }
+    else if (PyLong_Check(key)) {
+        rc = buffer_append_long(buf, key);
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "keys must be str, int, float, bool or None, not %.100s",
+                     Py_TYPE(key)->tp_name);
+        return -1;
+    }
+    if (rc < 0) return -1;
+    return buffer_append_char(buf, '"');
+}
+
+/* Separator, key and key separator of a dict item */
+static int encoder_encode_item_key(EncoderState* st, Py_ssize_t idx, PyObject* key) {
+    if (encoder_item_prefix(st, idx) < 0) return -1;
+    if (encoder_encode_key(st, key) < 0) return -1;
+    return buffer_append(st->buf, st->seps.key, (size_t)st->seps.key_len);
+}
+
+static int encoder_encode_item(EncoderState* st, Py_ssize_t idx, PyObject* key, PyObject* value) {
+    if (encoder_encode_item_key(st, idx, key) < 0) return -1;
+    return encoder_encode_obj(st, value);
+}
+
+/* Code point order of two exact str, like str.__lt__ */
+static int compare_str_codepoints(PyObject* a, PyObject* b) {
+    Py_ssize_t len_a = PyUnicode_GET_LENGTH(a);
+    Py_ssize_t len_b = PyUnicode_GET_LENGTH(b);
+    Py_ssize_t n = len_a < len_b ? len_a : len_b;
+    int kind_a = PyUnicode_KIND(a);
+    int kind_b = PyUnicode_KIND(b);
+    const void* data_a = PyUnicode_DATA(a);
+    const void* data_b = PyUnicode_DATA(b);
+    if (kind_a == PyUnicode_1BYTE_KIND && kind_b == PyUnicode_1BYTE_KIND) {
+        int c = memcmp(data_a, data_b, (size_t)n);
+        if (c != 0) return c;
+    }
+    else {
+        for (Py_ssize_t i = 0; i < n; i++) {
+            Py_UCS4 ca = PyUnicode_READ(kind_a, data_a, i);
+            Py_UCS4 cb = PyUnicode_READ(kind_b, data_b, i);
+            if (ca != cb) return ca < cb ? -1 : 1;
+        }
+    }
+    return (len_a > len_b) - (len_a < len_b);
+}
+
+static int compare_key_values(const void* a, const void* b) {
+    return compare_str_codepoints(((const KeyValue*)a)->key, ((const KeyValue*)b)->key);
+}
+
+static void release_key_values(KeyValue* items, Py_ssize_t n) {
+    for (Py_ssize_t i = 0; i < n; i++) {
+        Py_DECREF(items[i].key);
+        Py_DECREF(items[i].value);
+    }
+}
+
+/*
+ * The common case: dct has the very same key objects, inserted in the
+ * same order as the dict `order` was made from. Fills items and returns 1.
+ */
+static int sorted_keys_same_insertion(const SortedKeys* order, PyObject* dct, KeyValue* items) {
+    Py_ssize_t pos = 0;
+    Py_ssize_t i = 0;
+    PyObject* key;
+    PyObject* value;
+    while (PyDict_Next(dct, &pos, &key, &value)) {
+        if (key != order->insertion[i]) return 0;
+        items[order->rank[i]].value = value;
+        i++;
+    }
+    for (i = 0; i < order->size; i++) {
+        items[i].key = Py_NewRef(order->keys[i]);
+        Py_INCREF(items[i].value);
+    }
+    return 1;
+}
+
+/*
+ * Same key set, in any insertion order or as other (equal) str objects:
+ * look the cached keys up in dct. Fills items and returns 1 on a match.
+ */
+static int sorted_keys_lookup(const SortedKeys* order, PyObject* dct, KeyValue* items) {
+    for (Py_ssize_t i = 0; i < order->size; i++) {
+        PyObject* value = PyDict_GetItemWithError(dct, order->keys[i]);
+        if (value == NULL) {
+            PyErr_Clear();
+            release_key_values(items, i);
+            return 0;
+        }
+        items[i].key = Py_NewRef(order->keys[i]);
+        items[i].value = Py_NewRef(value);
+    }
+    return 1;
+}
+
+/* Remember the order of items (exact str keys, sorted) for later dicts */
+static void sorted_keys_remember(EncoderState* st, const KeyValue* items, Py_ssize_t n,
+                                 Py_uhash_t signature) {
+    /* keys, insertion and rank in one block */
+    PyObject** keys = PyMem_Malloc((size_t)(n > 0 ? n : 1)
+                                   * (2 * sizeof(PyObject*) + sizeof(Py_ssize_t)));
+    if (keys == NULL) return;  /* just not cached */
+    PyObject** insertion = keys + n;
+    Py_ssize_t* rank = (Py_ssize_t*)(insertion + n);
+    for (Py_ssize_t i = 0; i < n; i++) {
+        keys[i] = Py_NewRef(items[i].key);
+        insertion[items[i].index] = items[i].key;
+        rank[items[i].index] = i;
+    }
+    int k = st->sort_cache_next;
+    st->sort_cache_next = (k + 1) % SORT_CACHE_SLOTS;
+    SortedKeys* slot = &st->sort_cache[k];
+    sorted_keys_clear(slot);
+    slot->size = n;
+    slot->signature = signature;
+    slot->keys = keys;
+    slot->insertion = insertion;
+    slot->rank = rank;
+    st->sort_cache_last = k;
+}
+
+/*
+ * Fill items (n = len(dct)) with new references to the items of an exact
+ * dict in key order, like sorted(dct.items()). Dicts whose keys are all
+ * exact str are ordered by code point natively, and the order is reused
+ * for later dicts with the same key set; other keys are compared by Python
+ * (and may raise TypeError, like stdlib).
+ */
+static int sorted_dict_items(EncoderState* st, PyObject* dct, KeyValue* items, Py_ssize_t n) {
+    const SortedKeys* last = &st->sort_cache[st->sort_cache_last];
+    if (last->keys != NULL && last->size == n && sorted_keys_same_insertion(last, dct, items)) {
+        return 0;
+    }
+
+    /* Order-independent signature of the key set, from the cached str hashes */
+    Py_uhash_t signature = 0;
+    Py_ssize_t pos = 0;
+    PyObject* key;
+    PyObject* value;
+    int all_str = 1;
+    while (PyDict_Next(dct, &pos, &key, &value)) {
+        if (!PyUnicode_CheckExact(key)) {
+            all_str = 0;
+            break;
+        }
+        signature ^= (Py_uhash_t)PyObject_Hash(key);
+    }
+
+    if (!all_str) {
+        /* Other keys: sort the (key, value) tuples in Python, like stdlib */
+        PyObject* list = PyDict_Items(dct);
+        if (list == NULL || PyList_Sort(list) < 0) {
+            Py_XDECREF(list);
+            return -1;
+        }
+        for (Py_ssize_t i = 0; i < n; i++) {
+            PyObject* item = PyList_GET_ITEM(list, i);
+            items[i].key = Py_NewRef(PyTuple_GET_ITEM(item, 0));
+            items[i].value = Py_NewRef(PyTuple_GET_ITEM(item, 1));
+        }
+        Py_DECREF(list);
+        return 0;
+    }
+
+    for (int k = 0; k < SORT_CACHE_SLOTS; k++) {
+        const SortedKeys* order = &st->sort_cache[k];
+        if (order->keys != NULL && order->size == n && order->signature == signature
+            && (sorted_keys_same_insertion(order, dct, items)
+                || sorted_keys_lookup(order, dct, items))) {
+            st->sort_cache_last = k;
+            return 0;
+        }
+    }
+
+    Py_ssize_t i = 0;
+    pos = 0;
+    while (i < n && PyDict_Next(dct, &pos, &key, &value)) {
+        items[i].key = Py_NewRef(key);
+        items[i].value = Py_NewRef(value);
+        items[i].index = i;
+        i++;
+    }
+    qsort(items, (size_t)n, sizeof(KeyValue), compare_key_values);
+    sorted_keys_remember(st, items, n, signature);
+    return 0;
+}
+
+/* Dicts up to this size are sorted without a heap allocation */
+#define SORT_STACK_ITEMS 32
+
+static int encoder_encode_dict(EncoderState* st, PyObject* dct) {
+    if (PyDict_GET_SIZE(dct) == 0) {
+        return buffer_append(st->buf, "{}", 2);
+    }
+    if (encoder_enter(st, dct) < 0) return -1;
+    st->depth++;
+    if (buffer_append_char(st->buf, '{') < 0) goto error;
+
+    if (st->sort_keys && PyDict_CheckExact(dct)) {
+        KeyValue small[SORT_STACK_ITEMS];
+        KeyValue* items = small;
+        Py_ssize_t n = PyDict_GET_SIZE(dct);
+        if (n > SORT_STACK_ITEMS) {
+            items = PyMem_Malloc((size_t)n * sizeof(KeyValue));
+            if (items == NULL) {
+                PyErr_NoMemory();
+                goto error;
+            }
+        }
+        int rc;
+        Py_BEGIN_CRITICAL_SECTION(dct);
+        rc = sorted_dict_items(st, dct, items, n);
+        Py_END_CRITICAL_SECTION();
+        if (rc == 0) {
+            for (Py_ssize_t i = 0; rc == 0 && i < n; i++) {
+                rc = encoder_encode_item(st, i, items[i].key, items[i].value);
+            }
+            release_key_values(items, n);
+        }
+        if (items != small) PyMem_Free(items);
+        if (rc < 0) goto error;
+    }
+    else if (PyDict_CheckExact(dct)) {
+        Py_ssize_t pos = 0;
+        Py_ssize_t idx = 0;
+        PyObject* key;
+        PyObject* value;
+        int rc = 0;
+        Py_BEGIN_CRITICAL_SECTION(dct);
+        while (rc == 0 && PyDict_Next(dct, &pos, &key, &value)) {
+            Py_INCREF(key);
+            Py_INCREF(value);
+            rc = encoder_encode_item(st, idx++, key, value);
+            Py_DECREF(key);
+            Py_DECREF(value);
+        }
+        Py_END_CRITICAL_SECTION();
+        if (rc < 0) goto error;
+    }
+    else {
+        /* dict subclasses: go through items() exactly like stdlib */
+        PyObject* items = PyMapping_Items(dct);
+        if (items == NULL) goto error;
+        if (st->sort_keys && PyList_Sort(items) < 0) {
+            Py_DECREF(items);
+            goto error;
+        }
+        for (Py_ssize_t i = 0; i < PyList_GET_SIZE(items); i++) {
+            PyObject* item = PyList_GET_ITEM(items, i);
+            if (!PyTuple_Check(item) || PyTuple_GET_SIZE(item) != 2) {
+                PyErr_SetString(PyExc_ValueError, "items must return 2-tuples");
+                Py_DECREF(items);
+                goto error;
+            }
+            if (encoder_encode_item(st, i, PyTuple_GET_ITEM(item, 0),
+                                    PyTuple_GET_ITEM(item, 1)) < 0) {
+                Py_DECREF(items);
+                goto error;
+            }
+        }
+        Py_DECREF(items);
+    }
+
+    if (encoder_close(st, '}') < 0) goto error;
+    st->depth--;
+    encoder_leave(st);
+    return 0;
+
+error:
+    st->depth--;
+    encoder_leave(st);
+    return -1;
+}
+
+static int encoder_encode_obj(EncoderState* st, PyObject* obj) {
+    Buffer* buf = st->buf;
+    if (obj == Py_None) {
+        return buffer_append(buf, "null", 4);
+    }
+    if (obj == Py_True) {
+        return buffer_append(buf, "true", 4);
+    }
+    if (obj == Py_False) {
+        return buffer_append(buf, "false", 5);
+    }
+    if (PyUnicode_Check(obj)) {
+        return encoder_encode_string(st, obj);
+    }
+    if (PyLong_Check(obj)) {
+        return buffer_append_long(buf, obj);
+    }
+    if (PyFloat_Check(obj)) {
+        return buffer_append_double_json(buf, PyFloat_AS_DOUBLE(obj), st->allow_nan);
+    }
+    if (PyList_Check(obj) || PyTuple_Check(obj)) {
+        return encoder_encode_sequence(st, obj);
+    }
+    if (PyDict_Check(obj)) {
+        return encoder_encode_dict(st, obj);
+    }
+    if (st->arrays != NULL && PyObject_CheckBuffer(obj)
+        && !PyBytes_Check(obj) && !PyByteArray_Check(obj)) {
+        return encode_native_array(st, obj);
+    }
+    PyErr_Format(PyExc_TypeError, "Object of type %.200s is not JSON serializable",
+                 Py_TYPE(obj)->tp_name);
+    return -1;
+}
+
+/*
+ * General path: encode any document made of dict/list/tuple/str/int/float/
+ * bool/None natively into buf, and numeric buffers (numpy arrays,
+ * array.array, ...) when `arrays` is set (native_arrays=True). Any error
+ * (unsupported type, circular reference, non-finite float with
+ * allow_nan=False, ...) is reported as -1; the caller re-runs stdlib to
+ * raise the exact stdlib exception.
+ */
+static void encoder_state_init(EncoderState* st, Buffer* buf, const Separators* seps,
+                               int ensure_ascii, int allow_nan, int check_circular,
+                               int sort_keys, ModuleState* arrays) {
+    st->buf = buf;
+    st->seps = *seps;
+    st->ensure_ascii = ensure_ascii;
+    st->allow_nan = allow_nan;
+    st->check_circular = check_circular;
+    st->sort_keys = sort_keys;
+    st->has_surrogates = 0;
+    st->markers = NULL;
+    st->n_markers = 0;
+    st->markers_capacity = 0;
+    st->depth = 0;
+    st->newline = NULL;
+    st->newline_size = 0;
+    memset(st->sort_cache, 0, sizeof(st->sort_cache));
+    st->sort_cache_next = 0;
+    st->sort_cache_last = 0;
+    st->arrays = arrays;
+}
+
+static void encoder_state_free(EncoderState* st) {
+    PyMem_Free(st->markers);
+    st->markers = NULL;
+    PyMem_Free(st->newline);
+    st->newline = NULL;
+    for (int k = 0; k < SORT_CACHE_SLOTS; k++) {
+        sorted_keys_clear(&st->sort_cache[k]);
+    }
+}
+
+static int
+encode_native(Buffer* buf, PyObject* obj, const Separators* seps, int ensure_ascii,
+              int allow_nan, int check_circular, int sort_keys, ModuleState* arrays,
+              int* has_surrogates) {
+    EncoderState st;
+    encoder_state_init(&st, buf, seps, ensure_ascii, allow_nan, check_circular, sort_keys,
+                       arrays);
+    int rc = encoder_encode_obj(&st, obj);
+    encoder_state_free(&st);
+    if (rc < 0 && !PyErr_Occurred()) PyErr_NoMemory();
+    *has_surrogates = st.has_surrogates;
+    return rc;
+}
+
+/* ======================================================================
+ * Native worker threads for parallel formatting (no GIL, no Python objects)
+ *
+ * configure_parallel(workers=N) keeps N-1 threads parked on a lock so that
+ * large list[float] and dumps_ndarray(threads=) calls don't pay for thread
+ * creation; calls that cannot use the pool (busy, too small) start threads
+ * of their own.
+ * ====================================================================== */
+
+typedef void (*ParallelTask)(void* arg);
+
+typedef struct {
+    ParallelTask fn;
+    void* arg;
+    PyThread_type_lock done;  /* held until fn(arg) has returned */
+    PyThread_type_lock start; /* pool workers: released to run fn(arg) */
+} WorkerJob;
+
+#define PARALLEL_MAX_WORKERS 256
+
+static struct {
+    PyThread_type_lock mutex;  /* held by the call that uses the pool */
+    WorkerJob* workers;
+    int n_workers;
+    long pid;  /* the pool's threads do not survive fork() */
+} pool;
+
+static int parallel_workers = 1;             /* 1 = list[float] stays serial */
+static Py_ssize_t parallel_min_size = 1 << 17;
+
+/* Serializes configure_parallel(); with the GIL, the GIL does */
+#ifdef Py_GIL_DISABLED
+static PyMutex pool_config_lock;
+#define POOL_CONFIG_LOCK() PyMutex_Lock(&pool_config_lock)
+#define POOL_CONFIG_UNLOCK() PyMutex_Unlock(&pool_config_lock)
+#else
+#define POOL_CONFIG_LOCK()
+#define POOL_CONFIG_UNLOCK()
+#endif
+
+static long current_pid(void) {
+#ifdef _WIN32
+    return 0;
+#else
+    return (long)getpid();
+#endif
+}
+
+static void worker_main(void* p) {
+    WorkerJob* job = (WorkerJob*)p;
+    job->fn(job->arg);
+    PyThread_release_lock(job->done);
+}
+
+static void pool_worker_main(void* p) {
+    WorkerJob* job = (WorkerJob*)p;
+    for (;;) {
+        PyThread_acquire_lock(job->start, WAIT_LOCK);
+        if (job->fn == NULL) break;  /* pool shutdown */
+        job->fn(job->arg);
+        PyThread_release_lock(job->done);
+    }
+    PyThread_release_lock(job->done);
+}
+
+/* Make sure the pool (state) belongs to this process; call with the GIL */
+static int pool_check_fork(void) {
+    if (pool.mutex != NULL && pool.pid == current_pid()) return 0;
+    /* First use, or a forked child: the parent's threads and locks are gone */
+    pool.mutex = PyThread_allocate_lock();
+    pool.workers = NULL;
+    pool.n_workers = 0;
+    pool.pid = current_pid();
+    if (pool.mutex == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    return 0;
+}
+
+/* Stop the pool threads; call with pool.mutex held */
+static void pool_shutdown(void) {
+    for (int i = 0; i < pool.n_workers; i++) {
+        WorkerJob* job = &pool.workers[i];
+        job->fn = NULL;
+        PyThread_release_lock(job->start);
+        PyThread_acquire_lock(job->done, WAIT_LOCK);
+        PyThread_free_lock(job->start);
+        PyThread_free_lock(job->done);
+    }
+    PyMem_RawFree(pool.workers);
+    pool.workers = NULL;
+    pool.n_workers = 0;
+}
+
+/* (Re)start n parked threads; call with pool.mutex held */
+static void pool_start(int n) {
+    pool.workers = (WorkerJob*)PyMem_RawCalloc((size_t)n, sizeof(WorkerJob));
+    if (pool.workers == NULL) return;
+    for (int i = 0; i < n; i++) {
+        WorkerJob* job = &pool.workers[i];
+        job->start = PyThread_allocate_lock();
+        job->done = PyThread_allocate_lock();
+        if (job->start == NULL || job->done == NULL) goto fail;
+        PyThread_acquire_lock(job->start, WAIT_LOCK);
+        PyThread_acquire_lock(job->done, WAIT_LOCK);
+        if (PyThread_start_new_thread(pool_worker_main, job) == PYTHREAD_INVALID_THREAD_ID)
+            goto fail;
+        pool.n_workers++;
+        continue;
+    fail:
+        if (job->start != NULL) PyThread_free_lock(job->start);
+        if (job->done != NULL) PyThread_free_lock(job->done);
+        break;
+    }
+}
+
+/*
+ * Run fn on each of the n items of `args` (an array of arg_size-byte
+ * structs) and wait for all of them: items 1..n-1 on pool or new native
+ * threads, item 0 on the calling thread. Items whose thread cannot be
+ * started run on the calling thread. Call without the GIL; fn must not
+ * use the C API.
+ */
+static void run_parallel(ParallelTask fn, void* args, size_t arg_size, int n) {
+    if (n > 1 && pool.mutex != NULL && pool.pid == current_pid()
+        && PyThread_acquire_lock(pool.mutex, NOWAIT_LOCK)) {
+        if (pool.n_workers >= n - 1) {
+            for (int i = 1; i < n; i++) {
+                WorkerJob* job = &pool.workers[i - 1];
+                job->fn = fn;
+                job->arg = (char*)args + (size_t)i * arg_size;
+                PyThread_release_lock(job->start);
+            }
+            fn(args);
+            for (int i = 1; i < n; i++) {
+                PyThread_acquire_lock(pool.workers[i - 1].done, WAIT_LOCK);
+            }
+            PyThread_release_lock(pool.mutex);
+            return;
+        }
+        PyThread_release_lock(pool.mutex);
+    }
+
+    WorkerJob* jobs = n > 1 ? (WorkerJob*)PyMem_RawCalloc((size_t)n, sizeof(WorkerJob)) : NULL;
+    for (int i = 1; i < n && jobs != NULL; i++) {
+        WorkerJob* job = &jobs[i];
+        job->fn = fn;
+        job->arg = (char*)args + (size_t)i * arg_size;
+        job->done = PyThread_allocate_lock();
+        if (job->done == NULL) continue;
+        PyThread_acquire_lock(job->done, WAIT_LOCK);
+        if (PyThread_start_new_thread(worker_main, job) == PYTHREAD_INVALID_THREAD_ID) {
+            PyThread_release_lock(job->done);
+            PyThread_free_lock(job->done);
+            job->done = NULL;
+        }
+    }
+
+    fn(args);
+    for (int i = 1; i < n; i++) {
+        if (jobs != NULL && jobs[i].done != NULL) {
+            PyThread_acquire_lock(jobs[i].done, WAIT_LOCK);
+            PyThread_free_lock(jobs[i].done);
+        } else {
+            fn((char*)args + (size_t)i * arg_size);
+        }
+    }
+    PyMem_RawFree(jobs);
+}
+
+/* ======================================================================
+ * Output size estimation: format an evenly spaced sample of the elements
+ * and extrapolate, instead of pre-sizing for the worst case per element
+ * ====================================================================== */
+
+#define SIZE_SAMPLE 64
+
+/* Appends the formatted element i of ctx to buf; returns -1 on error */
+typedef int (*SampleFormatter)(Buffer* buf, const void* ctx, Py_ssize_t i);
+
+/*
+ * Estimated total length of n formatted elements. Inputs of up to
+ * SIZE_SAMPLE elements are sized with `worst` bytes per element (exact
+ * sampling would cost as much as formatting them).
+ */
+static size_t estimate_elements_size(Py_ssize_t n, size_t worst,
+                                     SampleFormatter format, const void* ctx) {
+    if (n <= SIZE_SAMPLE) {
+        return (size_t)n * worst;
+    }
+    char stack[128];
+    Buffer scratch;
+    buffer_init_external(&scratch, stack, sizeof(stack));
+    size_t total = 0;
+    for (Py_ssize_t k = 0; k < SIZE_SAMPLE; k++) {
+        Py_ssize_t i = (Py_ssize_t)(((double)k + 0.5) * (double)n / SIZE_SAMPLE);
+        scratch.size = 0;
+        if (format(&scratch, ctx, i) < 0) {
+            PyErr_Clear();
+            scratch.size = worst;
+        }
+        total += scratch.size;
+    }
+    buffer_free(&scratch);
+    /* Mean sampled length times n, plus 1/16 headroom for sampling error */
+    size_t est = (size_t)((double)total / SIZE_SAMPLE * (double)n);
+    return est + est / 16 + 64;
+}
+
+static int sample_float_item(Buffer* buf, const void* seq, Py_ssize_t i) {
+    PyObject* item = PySequence_Fast_GET_ITEM((PyObject*)seq, i);
+    return buffer_append_double_json(buf, PyFloat_AS_DOUBLE(item), 1);
+}
+
+static int sample_int_item(Buffer* buf, const void* seq, Py_ssize_t i) {
+    return buffer_append_long(buf, PySequence_Fast_GET_ITEM((PyObject*)seq, i));
+}
+
+/* Pre-size buf for n items plus separators and brackets; the estimate is
+   stored in *est_out (0 when buf cannot be pre-sized) */
+static int buffer_presize_sequence(Buffer* buf, PyObject* seq, size_t worst,
+                                   SampleFormatter format, const Separators* seps,
+                                   size_t* est_out) {
+    if (est_out != NULL) *est_out = 0;
+    if (!buffer_is_growable(buf)) return 0;
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(seq);
+    size_t est = estimate_elements_size(n, worst, format, seq)
+                 + (size_t)(n > 0 ? (n - 1) * seps->item_len + n * seps->newline_len + 1 : 0)
+                 + 2;
+    if (est_out != NULL) *est_out = est;
+    return buffer_presize(buf, est);
+}
+
+/* A range of snapshotted doubles, formatted into its own buffer */
+typedef struct {
+    const double* values;
+    Py_ssize_t start;
+    Py_ssize_t end;
+    const Separators* seps;
+    size_t estimate;
+    Buffer out;
+    int status;
+} FloatRange;
+
+/* ParallelTask: format one range of doubles (no GIL) */
+static void format_floats_task(void* arg) {
+    FloatRange* r = (FloatRange*)arg;
+    r->status = -1;
+    if (buffer_init(&r->out, r->estimate) < 0) return;
+    for (Py_ssize_t i = r->start; i < r->end; i++) {
+        if (buffer_append_item_prefix(&r->out, r->seps, i - r->start) < 0) return;
+        /* allow_nan=1 never raises; non-finite values were checked under the GIL */
+        if (buffer_append_double_json(&r->out, r->values[i], 1) < 0) return;
+    }
+    r->status = 0;
+}
+
+/* Minimum number of floats per parallel range */
+#define PARALLEL_MIN_FLOATS 16384
+
+/*
+ * Parallel list[float]: snapshot the doubles under the GIL, then format
+ * ranges on worker threads without it and join them in order. The output is
+ * identical to the serial loop. Returns 1 (nothing written) when the serial
+ * loop should run instead, e.g. to raise for NaN with allow_nan=False.
+ */
+static int encode_float_sequence_parallel(Buffer* buf, PyObject* seq, int allow_nan,
+                                          const Separators* seps, size_t est) {
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(seq);
+    int nranges = LOAD_INT(&parallel_workers);
+    if (n / PARALLEL_MIN_FLOATS < nranges) nranges = (int)(n / PARALLEL_MIN_FLOATS);
+    if (nranges < 2) return 1;
+
+    double* values = (double*)PyMem_RawMalloc((size_t)n * sizeof(double));
+    FloatRange* ranges = (FloatRange*)PyMem_RawCalloc((size_t)nranges, sizeof(FloatRange));
+    if (values == NULL || ranges == NULL) {
+        PyMem_RawFree(values);
+        PyMem_RawFree(ranges);
+        return 1;
+    }
+    PyObject** items = PySequence_Fast_ITEMS(seq);
+    for (Py_ssize_t i = 0; i < n; i++) {
+        double x = PyFloat_AS_DOUBLE(items[i]);
+        if (!allow_nan && !isfinite(x)) {
+            PyMem_RawFree(values);
+            PyMem_RawFree(ranges);
+            return 1;
+        }
+        values[i] = x;
+    }
+    for (int k = 0; k < nranges; k++) {
+        ranges[k].values = values;
+        ranges[k].start = n * k / nranges;
+        ranges[k].end = n * (k + 1) / nranges;
+        ranges[k].seps = seps;
+        ranges[k].estimate = est / (size_t)nranges + 64;
+    }
+
+    int rc = 0;
+    Py_BEGIN_ALLOW_THREADS
+    run_parallel(format_floats_task, ranges, sizeof(FloatRange), nranges);
+    if (buffer_append_char(buf, '[') < 0) rc = -1;
+    for (int k = 0; k < nranges; k++) {
+        FloatRange* r = &ranges[k];
+        if (rc == 0 && r->status < 0) rc = -1;
+        /* Every range starts with its own newline and indent */
+        if (rc == 0 && k > 0 && buffer_append(buf, seps->item, (size_t)seps->item_len) < 0) rc = -1;
+        if (rc == 0 && buffer_append(buf, r->out.data, r->out.size) < 0) rc = -1;
+        buffer_free(&r->out);
+    }
+    if (rc == 0 && buffer_append_array_end(buf, seps, n) < 0) rc = -1;
+    Py_END_ALLOW_THREADS
+
+    PyMem_RawFree(ranges);
+    PyMem_RawFree(values);
+    return rc;
+}
+
+/*
+ * Fast path: serialize list/tuple of floats to JSON.
+ * Size and items are re-read every iteration: when streaming (dump), the
+ * sink runs Python code (fp.write) that may mutate the list.
+ */
+static int
+encode_float_sequence(Buffer* buf, PyObject* seq, int allow_nan, const Separators* seps) {
+    /* Worst case per element: 24 bytes ("-1.2345678901234567e-308") */
+    size_t est;
+    if (buffer_presize_sequence(buf, seq, 24, sample_float_item, seps, &est) < 0)
+        return -1;
+
+    /* Not when streaming: flushes call fp.write, which needs the GIL */
+    if (LOAD_INT(&parallel_workers) > 1 && buf->flush == NULL
+        && PySequence_Fast_GET_SIZE(seq) >= LOAD_SSIZE(&parallel_min_size)) {
+        int rc = encode_float_sequence_parallel(buf, seq, allow_nan, seps, est);
+        if (rc <= 0) return rc;
+    }
+
+    /* Opening bracket */
+    if (buffer_append_char(buf, '[') < 0) return -1;
+
+    /* Format each float */
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+        /* Item separator (not before first element), newline and indent */
+        if (buffer_append_item_prefix(buf, seps, i) < 0) return -1;
+        if (i >= PySequence_Fast_GET_SIZE(seq)) goto changed;
+        PyObject* item = PySequence_Fast_GET_ITEM(seq, i);
+        if (!PyFloat_CheckExact(item)) goto changed;
+        if (buffer_append_double_json(buf, PyFloat_AS_DOUBLE(item), allow_nan) < 0) return -1;
+    }
+
+    /* Closing bracket */
+    return buffer_append_array_end(buf, seps, PySequence_Fast_GET_SIZE(seq));
+
+changed:
+    PyErr_SetString(PyExc_RuntimeError, "list changed during encoding");
+    return -1;
+}
+
+/*
+ * Fast path: serialize list/tuple of ints to JSON
+ */
+static int
+encode_int_sequence(Buffer* buf, PyObject* seq, const Separators* seps) {
+    /* Worst case per int64 element: 20 bytes ("-9223372036854775808") */
+    if (buffer_presize_sequence(buf, seq, 20, sample_int_item, seps, NULL) < 0)
+        return -1;
+
+    if (buffer_append_char(buf, '[') < 0) return -1;
+
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+        if (buffer_append_item_prefix(buf, seps, i) < 0) return -1;
+        if (i >= PySequence_Fast_GET_SIZE(seq)) goto changed;
+        PyObject* item = PySequence_Fast_GET_ITEM(seq, i);
+        if (!PyLong_CheckExact(item)) goto changed;
+        Py_INCREF(item);
+        int rc = buffer_append_long(buf, item);
+        Py_DECREF(item);
+        if (rc < 0) return -1;
+    }
+
+    return buffer_append_array_end(buf, seps, PySequence_Fast_GET_SIZE(seq));
+
+changed:
+    PyErr_SetString(PyExc_RuntimeError, "list changed during encoding");
+    return -1;
+}
+
+/*
+ * Encode obj into buf, picking the list[float] / list[int] fast paths or the
+ * general native encoder (see encode_native for `arrays`). On error returns
+ * -1 with an exception set.
+ */
+static int
+encode_document(Buffer* buf, PyObject* obj, const Separators* seps, int ensure_ascii,
+                int allow_nan, int check_circular, int sort_keys, ModuleState* arrays,
+                int* has_surrogates) {
+    int rc = 1;
+    *has_surrogates = 0;
+    if (PyList_CheckExact(obj) || PyTuple_CheckExact(obj)) {
+        /* Free-threaded builds: other threads cannot mutate the list meanwhile */
+        Py_BEGIN_CRITICAL_SECTION(obj);
+        if (is_float_sequence(obj)) {
+            rc = encode_float_sequence(buf, obj, allow_nan, seps);
+        }
+        else if (is_int_sequence(obj)) {
+            rc = encode_int_sequence(buf, obj, seps);
+        }
+        Py_END_CRITICAL_SECTION();
+    }
+    if (rc > 0) {
+        return encode_native(buf, obj, seps, ensure_ascii, allow_nan, check_circular, sort_keys,
+                             arrays, has_surrogates);
+    }
+    if (rc < 0 && !PyErr_Occurred()) PyErr_NoMemory();
+    return rc;
+}
+
+static PyObject*
+dumps_document(ModuleState* st, PyObject* obj, const Separators* seps, int ensure_ascii,
+               int allow_nan, int check_circular, int sort_keys, int native_arrays,
+               OutputMode output) {
+    Buffer buf;
+    int rc = output == OUTPUT_BUFFER ? buffer_init(&buf, 256) : buffer_init_pooled(st, &buf, 256);
+    if (rc < 0) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    int has_surrogates;
+    if (encode_document(&buf, obj, seps, ensure_ascii, allow_nan, check_circular, sort_keys,
+                        native_arrays ? st : NULL, &has_surrogates) < 0) {
+        buffer_free(&buf);
+        return NULL;
+    }
+
+    return buffer_finish(st, &buf, output, ensure_ascii && seps->ascii, has_surrogates);
+}
+
+/*
+ * The options json.dumps() accepts that the native encoder handles only at
+ * their defaults (identity checks, like stdlib's own fast paths). Returns 1
+ * when obj can go through the native encoder with these options.
+ */
+static int native_options_supported(PyObject* skipkeys, PyObject* check_circular,
+                                    PyObject* allow_nan, PyObject* cls, PyObject* indent,
+                                    PyObject* default_, PyObject* sort_keys,
+                                    PyObject* separators, Separators* seps,
+                                    PyObject** seps_owner) {
+    *seps_owner = NULL;
+    if (skipkeys != Py_False) return 0;
+    if (check_circular != Py_True && check_circular != Py_False) return 0;
+    if (allow_nan != Py_True && allow_nan != Py_False) return 0;
+    if (cls != Py_None || default_ != Py_None) return 0;
+    if (sort_keys != Py_True && sort_keys != Py_False) return 0;
+    return get_supported_separators(separators, indent, seps, seps_owner);
+}
+
+/* Index of a json.dumps() keyword in ModuleState.option_names, or -1 */
+static int find_dumps_option(ModuleState* st, PyObject* name) {
+    for (int k = 0; k < DUMPS_N_OPTIONS; k++) {
+        if (name == st->option_names[k]) return k;
+    }
+    /* Not interned (e.g. built at runtime for **kwargs) */
+    for (int k = 0; k < DUMPS_N_OPTIONS; k++) {
+        if (PyUnicode_Compare(name, st->option_names[k]) == 0) return k;
+    }
+    return -1;
+}
+
+static PyObject* array_encoder_class(PyObject* cls);
+
+/*
+ * json.dumps(*args, **kwargs) with the arguments dumps()/dumps_bytes()
+ * received, minus the keywords json.dumps() does not take: `skip` and
+ * `skip_arrays` are the indexes in kwnames of dumps_bytes()' output= and of
+ * native_arrays=, or -1. A non-NULL `value` is passed as the option
+ * `replace` (OPT_DEFAULT or OPT_CLS) instead of the caller's.
+ */
+static PyObject* call_json_dumps(ModuleState* st, PyObject* const* args, Py_ssize_t nargs,
+                                 PyObject* kwnames, Py_ssize_t skip, Py_ssize_t skip_arrays,
+                                 int replace, PyObject* value) {
+    if (skip < 0 && skip_arrays < 0 && value == NULL) {
+        return PyObject_Vectorcall(st->json_dumps, args, (size_t)nargs, kwnames);
+    }
+    Py_ssize_t nkw = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+    /* The arguments, then the keyword names (borrowed) */
+    PyObject** stack = (PyObject**)PyMem_Malloc((size_t)(nargs + 2 * (nkw + 1))
+                                                * sizeof(PyObject*));
+    if (stack == NULL) return PyErr_NoMemory();
+    PyObject** kw = stack + nargs + nkw + 1;
+    memcpy(stack, args, (size_t)nargs * sizeof(PyObject*));
+    Py_ssize_t j = 0;
+    for (Py_ssize_t i = 0; i < nkw; i++) {
+        if (i == skip || i == skip_arrays) continue;
+        PyObject* name = PyTuple_GET_ITEM(kwnames, i);
+        PyObject* arg = args[nargs + i];
+        if (value != NULL && find_dumps_option(st, name) == replace) {
+            arg = value;
+            value = NULL;
+        }
+        kw[j] = name;
+        stack[nargs + j] = arg;
+        j++;
+    }
+    if (value != NULL) {
+        kw[j] = st->option_names[replace];
+        stack[nargs + j] = value;
+        j++;
+    }
+    PyObject* names = PyTuple_New(j);
+    if (names == NULL) {
+        PyMem_Free(stack);
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < j; i++) {
+        PyTuple_SET_ITEM(names, i, Py_NewRef(kw[i]));
+    }
+    PyObject* result = PyObject_Vectorcall(st->json_dumps, stack, (size_t)nargs, names);
+    Py_DECREF(names);
+    PyMem_Free(stack);
+    return result;
+}
+
+/*
+ * Slow path of dumps_into(): json.dumps(obj, ...) with its options, through
+ * the cached json.dumps like the other fallbacks
+ */
+static PyObject*
+dumps_via_json(ModuleState* st, PyObject* obj, PyObject* ensure_ascii, int allow_nan,
+               int check_circular, int sort_keys, PyObject* indent, PyObject* separators) {
+    PyObject* args[] = {
+        obj, ensure_ascii, allow_nan ? Py_True : Py_False,
+        check_circular ? Py_True : Py_False, sort_keys ? Py_True : Py_False, indent,
+        separators != NULL ? separators : Py_None
+    };
+    PyObject* kwnames = PyTuple_Pack(6, st->option_names[OPT_ENSURE_ASCII],
+                                     st->option_names[OPT_ALLOW_NAN],
+                                     st->option_names[OPT_CHECK_CIRCULAR],
+                                     st->option_names[OPT_SORT_KEYS],
+                                     st->option_names[OPT_INDENT],
+                                     st->option_names[OPT_SEPARATORS]);
+    if (kwnames == NULL) return NULL;
+    PyObject* result = call_json_dumps(st, args, 1, kwnames, -1, -1, 0, NULL);
+    Py_DECREF(kwnames);
+    return result;
+}
+
+/*
+ * dumps()/dumps_bytes(): the json.dumps() signature, parsed natively
+ * (vectorcall). Calls the native encoder when the options allow it, and
+ * json.dumps() with the very same arguments otherwise or on any error, so
+ * results and exceptions are exactly stdlib's.
+ */
+static PyObject*
+dumps_dispatch(PyObject* module, PyObject* const* args, Py_ssize_t nargs,
+               PyObject* kwnames, int bytes_api)
+{
+    ModuleState* st = get_module_state(module);
+    PyObject* options[DUMPS_N_OPTIONS] = {
+        Py_False, Py_True, Py_True, Py_True, Py_None, Py_None, Py_None, Py_None, Py_False, NULL,
+        Py_False
+    };
+    int extra = 0;
+    Py_ssize_t output_index = -1;
+    Py_ssize_t arrays_index = -1;
+    Py_ssize_t nkw = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+
+    for (Py_ssize_t i = 0; i < nkw; i++) {
+        int k = find_dumps_option(st, PyTuple_GET_ITEM(kwnames, i));
+        if (k == OPT_OUTPUT && !bytes_api) k = -1;  /* json.dumps(**kw) passes it to cls */
+        if (k < 0) {
+            extra = 1;
+            continue;
+        }
+        options[k] = args[nargs + i];
+        if (k == OPT_OUTPUT) output_index = i;
+        if (k == OPT_NATIVE_ARRAYS) arrays_index = i;
+    }
+    int native_arrays = PyObject_IsTrue(options[OPT_NATIVE_ARRAYS]);
+    if (native_arrays < 0) return NULL;
+
+    OutputMode output = OUTPUT_STR;
+    if (bytes_api) {
+        output = OUTPUT_BYTES;
+        PyObject* output_arg = options[OPT_OUTPUT];
+        if (output_arg != NULL
+            && (parse_output_mode(output_arg, &output) < 0 || output == OUTPUT_STR)) {
+            PyErr_Clear();
+            PyErr_Format(PyExc_ValueError,
+                "output parameter must be 'bytes' or 'buffer', got %R", output_arg);
+            return NULL;
+        }
+    }
+
+    Separators seps;
+    PyObject* seps_owner;
+    if (nargs == 1 && !extra
+        && native_options_supported(options[OPT_SKIPKEYS], options[OPT_CHECK_CIRCULAR],
+                                    options[OPT_ALLOW_NAN], options[OPT_CLS],
+                                    options[OPT_INDENT], options[OPT_DEFAULT],
+                                    options[OPT_SORT_KEYS], options[OPT_SEPARATORS], &seps,
+                                    &seps_owner)) {
+        int ascii = PyObject_IsTrue(options[OPT_ENSURE_ASCII]);
+        PyObject* result = ascii < 0 ? NULL
+            : dumps_document(st, args[0], &seps, ascii, options[OPT_ALLOW_NAN] == Py_True,
+                             options[OPT_CHECK_CIRCULAR] == Py_True,
+                             options[OPT_SORT_KEYS] == Py_True, native_arrays, output);
+        Py_XDECREF(seps_owner);
+        if (result != NULL) {
+            return result;
+        }
+        /* Slow path: re-run through the Python json module so that the
+           exception type, message and notes match json.dumps exactly (they
+           vary across CPython versions). */
+        PyErr_Clear();
+    }
+
+    /* native_arrays=True: arrays become lists, unless default= was given.
+       A cls= keeps its own default() for everything else. */
+    if (!native_arrays || options[OPT_DEFAULT] != Py_None) {
+        return str_to_output(
+            st, call_json_dumps(st, args, nargs, kwnames, output_index, arrays_index, 0, NULL),
+            output);
+    }
+    if (options[OPT_CLS] == Py_None) {
+        return str_to_output(
+            st, call_json_dumps(st, args, nargs, kwnames, output_index, arrays_index,
+                                OPT_DEFAULT, st->array_default),
+            output);
+    }
+    PyObject* array_cls = array_encoder_class(options[OPT_CLS]);
+    if (array_cls == NULL) return NULL;
+    PyObject* result = call_json_dumps(st, args, nargs, kwnames, output_index, arrays_index,
+                                       OPT_CLS, array_cls);
+    Py_DECREF(array_cls);
+    return str_to_output(st, result, output);
+}
+
+static PyObject*
+dumps(PyObject* module, PyObject* const* args, Py_ssize_t nargs, PyObject* kwnames)
+{
+    return dumps_dispatch(module, args, nargs, kwnames, 0);
+}
+
+static PyObject*
+dumps_bytes(PyObject* module, PyObject* const* args, Py_ssize_t nargs, PyObject* kwnames)
+{
+    return dumps_dispatch(module, args, nargs, kwnames, 1);
+}
+
+/*
+ * dump(obj, write, *, fd=-1, ...): stream obj in chunk_size pieces to
+ * write(str), or straight to the file descriptor fd when write is None.
+ *
+ * Returns None on success. When the native encoder cannot handle obj, the
+ * error is cleared and the number of characters already written is
+ * returned, so the caller can finish (or fail) exactly like json.dump.
+ * Errors raised by the sink itself are propagated.
+ */
+static PyObject*
+dump(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyObject* obj;
+    PyObject* write;
+    int fd = -1;
+    PyObject* ensure_ascii = Py_True;
+    PyObject* indent = Py_None;
+    PyObject* separators = NULL;
+    int allow_nan = 1;
+    int check_circular = 1;
+    int sort_keys = 0;
+    Py_ssize_t chunk_size = DEFAULT_CHUNK_SIZE;
+
+    static char* kwlist[] = {"obj", "write", "fd", "ensure_ascii", "indent", "separators",
+                             "allow_nan", "check_circular", "sort_keys", "chunk_size", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|$iOOOpppn", kwlist,
+                                     &obj, &write, &fd, &ensure_ascii, &indent, &separators,
+                                     &allow_nan, &check_circular, &sort_keys, &chunk_size)) {
+        return NULL;
+    }
+
+    Separators seps;
+    PyObject* seps_owner;
+    if (!get_supported_separators(separators, indent, &seps, &seps_owner)) {
+        return PyLong_FromLong(0);
+    }
+    int ascii = PyObject_IsTrue(ensure_ascii);
+    if (ascii < 0) {
+        Py_XDECREF(seps_owner);
+        return NULL;
+    }
+
+    StreamSink sink;
+    Buffer buf;
+    sink.binary = 0;
+    sink.ascii_only = ascii && seps.ascii;
+    if (stream_init(&buf, &sink, write, fd, chunk_size) < 0) {
+        Py_XDECREF(seps_owner);
+        return NULL;
+    }
+
+    int has_surrogates;
+    int rc = encode_document(&buf, obj, &seps, ascii, allow_nan, check_circular, sort_keys,
+                             NULL, &has_surrogates);
+    if (rc == 0) {
+        rc = stream_finish(&buf);
+    }
+    buffer_free(&buf);
+    Py_XDECREF(seps_owner);
+    if (rc == 0) {
+        Py_RETURN_NONE;
+    }
+    if (sink.failed) {
+        return NULL;
+    }
+    PyErr_Clear();
+    return PyLong_FromSize_t(sink.written);
+}
+
+/* Write out the complete lines buffered by dump_ndjson */
+static int flush_lines(Buffer* buf) {
+    buf->flush = stream_sink_flush;
+    int rc = stream_finish(buf);
+    buf->flush = NULL;
+    return rc;
+}
+
+/* A record as fallback(record) encodes it (json.dumps with the caller's options) */
+static int append_fallback_record(Buffer* buf, StreamSink* sink, PyObject* fallback,
+                                  PyObject* record) {
+    PyObject* text = PyObject_CallOneArg(fallback, record);
+    if (text == NULL) return -1;
+    if (!PyUnicode_Check(text)) {
+        PyErr_Format(PyExc_TypeError, "fallback must return str, not %.200s",
+                     Py_TYPE(text)->tp_name);
+        Py_DECREF(text);
+        return -1;
+    }
+    if (!PyUnicode_IS_ASCII(text)) sink->ascii_only = 0;
+    /* Lone surrogates only survive as far as a str write(): bytes raise
+       UnicodeEncodeError like dumps_bytes() */
+    PyObject* utf8 = PyUnicode_AsEncodedString(text, "utf-8",
+                                               sink->binary ? "strict" : "surrogatepass");
+    Py_DECREF(text);
+    if (utf8 == NULL) return -1;
+    int rc = buffer_append(buf, PyBytes_AS_STRING(utf8), (size_t)PyBytes_GET_SIZE(utf8));
+    Py_DECREF(utf8);
+    if (rc < 0) PyErr_NoMemory();
+    return rc;
+}
+
+/*
+ * dump_ndjson(records, write, fallback, *, fd=-1, binary=False, native=True,
+ * ...): each record of the iterable as one line of JSON, written to
+ * write(str | bytes) or fd in batches of at least chunk_size bytes. Batches
+ * end on a line boundary, so a record the native encoder rejects is rolled
+ * back and appended as fallback(record) instead, which also raises what
+ * json.dumps would. With native=False every record goes through fallback
+ * (options the native encoder does not support). When a record or the
+ * iterator fails, the lines before it are written and the error propagates,
+ * as json.dump leaves the output written before an error.
+ */
+static PyObject*
+dump_ndjson(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyObject* records;
+    PyObject* write;
+    PyObject* fallback;
+    int fd = -1;
+    int binary = 0;
+    int native = 1;
+    PyObject* ensure_ascii = Py_True;
+    PyObject* separators = NULL;
+    int allow_nan = 1;
+    int check_circular = 1;
+    int sort_keys = 0;
+    Py_ssize_t chunk_size = DEFAULT_CHUNK_SIZE;
+
+    static char* kwlist[] = {"records", "write", "fallback", "fd", "binary", "native",
+                             "ensure_ascii", "separators", "allow_nan", "check_circular",
+                             "sort_keys", "chunk_size", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOO|$ippOOpppn", kwlist,
+                                     &records, &write, &fallback, &fd, &binary, &native,
+                                     &ensure_ascii, &separators, &allow_nan, &check_circular,
+                                     &sort_keys, &chunk_size)) {
+        return NULL;
+    }
+    if (!PyCallable_Check(fallback)) {
+        PyErr_SetString(PyExc_TypeError, "fallback must be callable");
+        return NULL;
+    }
+
+    Separators seps;
+    PyObject* seps_owner = NULL;
+    int ascii = 1;
+    if (native && !get_supported_separators(separators, Py_None, &seps, &seps_owner)) {
+        native = 0;  /* separators the native encoder does not take */
+    }
+    if (native) {
+        ascii = PyObject_IsTrue(ensure_ascii);
+        if (ascii < 0) {
+            Py_XDECREF(seps_owner);
+            return NULL;
+        }
+    }
+
+    PyObject* it = PyObject_GetIter(records);
+    if (it == NULL) {
+        Py_XDECREF(seps_owner);
+        return NULL;
+    }
+
+    StreamSink sink;
+    Buffer buf;
+    sink.binary = binary;
+    sink.ascii_only = !native || (ascii && seps.ascii);  /* until a non-ASCII fallback line */
+    if (stream_init(&buf, &sink, write, fd, chunk_size) < 0) {
+        Py_DECREF(it);
+        Py_XDECREF(seps_owner);
+        return NULL;
+    }
+    /* Only flushed between lines (flush_lines), never inside a record */
+    buf.flush = NULL;
+
+    int rc = 0;
+    PyObject* record;
+    while ((record = PyIter_Next(it)) != NULL) {
+        size_t line_start = buf.size;
+        if (native) {
+            int has_surrogates;
+            rc = encode_document(&buf, record, &seps, ascii, allow_nan, check_circular,
+                                 sort_keys, NULL, &has_surrogates);
+            if (rc == 0 && has_surrogates && binary) {
+                rc = -1;  /* the fallback raises UnicodeEncodeError for it */
+            }
+            if (rc < 0) {
+                buf.size = line_start;
+                PyErr_Clear();
+            }
+        }
+        if (!native || rc < 0) {
+            rc = append_fallback_record(&buf, &sink, fallback, record);
+        }
+        Py_DECREF(record);
+        if (rc == 0 && buffer_append_char(&buf, '\n') < 0) {
+            PyErr_NoMemory();
+            rc = -1;
+        }
+        if (rc < 0) {
+            buf.size = line_start;
+            break;
+        }
+        if (buf.size >= (size_t)chunk_size && flush_lines(&buf) < 0) {
+            rc = -1;
+            break;
+        }
+    }
+    if (rc == 0 && PyErr_Occurred()) rc = -1;  /* the iterator raised */
+
+    if (rc == 0) {
+        rc = flush_lines(&buf);
+    }
+    else if (!sink.failed && buf.size > 0) {
+        PyObject *type, *value, *traceback;
+        PyErr_Fetch(&type, &value, &traceback);
+        if (flush_lines(&buf) == 0) {
+            PyErr_Restore(type, value, traceback);
+        } else {
+            Py_XDECREF(type);
+            Py_XDECREF(value);
+            Py_XDECREF(traceback);
+        }
+    }
+    buffer_free(&buf);
+    Py_DECREF(it);
+    Py_XDECREF(seps_owner);
+    if (rc < 0) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+/*
+ * dumps_into(obj, target, offset=0, ...): write the UTF-8 document into the
+ * writable buffer target at offset and return the number of bytes written.
+ */
+static PyObject*
+dumps_into(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyObject* obj;
+    PyObject* target;
+    Py_ssize_t offset = 0;
+    PyObject* ensure_ascii = Py_True;
+    PyObject* indent = Py_None;
+    PyObject* separators = NULL;
+    int allow_nan = 1;
+    int check_circular = 1;
+    int sort_keys = 0;
+
+    static char* kwlist[] = {"obj", "target", "offset", "ensure_ascii", "indent", "separators",
+                             "allow_nan", "check_circular", "sort_keys", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|n$OOOppp", kwlist,
+                                     &obj, &target, &offset, &ensure_ascii, &indent, &separators,
+                                     &allow_nan, &check_circular, &sort_keys)) {
+        return NULL;
+    }
+
+    ModuleState* st = get_module_state(self);
+    Py_buffer view;
+    if (get_target_view(target, offset, &view) < 0) {
+        return NULL;
+    }
+
+    PyObject* result = NULL;
+    Separators seps;
+    PyObject* seps_owner;
+    if (get_supported_separators(separators, indent, &seps, &seps_owner)) {
+        int ascii = PyObject_IsTrue(ensure_ascii);
+        if (ascii < 0) {
+            Py_XDECREF(seps_owner);
+            PyBuffer_Release(&view);
+            return NULL;
+        }
+        Buffer buf;
+        buffer_init_target(&buf, &view, offset);
+        int has_surrogates;
+        int rc = encode_document(&buf, obj, &seps, ascii, allow_nan, check_circular, sort_keys,
+                             NULL, &has_surrogates);
+        Py_XDECREF(seps_owner);
+        if (rc == 0) {
+            result = buffer_finish_target(st, &buf, &view, offset, has_surrogates);
+            PyBuffer_Release(&view);
+            return result;
+        }
+        buffer_free(&buf);
+        /* Re-run through the json module for the exact exception */
+        PyErr_Clear();
+    }
+
+    result = copy_into_target(
+        st,
+        str_to_output(st, dumps_via_json(st, obj, ensure_ascii, allow_nan, check_circular,
+                                         sort_keys, indent, separators),
+                      OUTPUT_BYTES),
+        &view, offset);
+    PyBuffer_Release(&view);
+    return result;
+}
+
+/* ======================================================================
+ * Encoder: json.dumps options validated once, for many small documents
+ * ====================================================================== */
+
+typedef struct {
+    PyObject_HEAD
+    vectorcallfunc vectorcall;
+    PyObject* fallback;  /* bound encode() of the equivalent json.JSONEncoder */
+    Separators seps;
+    PyObject* separators;  /* keep the strings seps points into alive */
+    PyObject* seps_owner;
+    int native;
+    int ensure_ascii;
+    int allow_nan;
+    int check_circular;
+    int sort_keys;
+    int native_arrays;
+    OutputMode output;
+} EncoderObject;
+
+static PyObject* encoder_vectorcall(PyObject* callable, PyObject* const* args,
+                                    size_t nargsf, PyObject* kwnames);
+
+/*
+ * Encoder(*, skipkeys=False, ensure_ascii=True, ..., output='str', **kw):
+ * the json.dumps() keyword arguments, checked once. Unknown keywords go to
+ * cls, exactly like json.dumps(**kw).
+ */
+static PyObject*
+encoder_new(PyTypeObject* type, PyObject* args, PyObject* kwargs)
+{
+    if (PyTuple_GET_SIZE(args) != 0) {
+        PyErr_SetString(PyExc_TypeError, "Encoder() takes only keyword arguments");
+        return NULL;
+    }
+
+    ModuleState* st = (ModuleState*)PyType_GetModuleState(type);
+    PyObject* options[DUMPS_N_OPTIONS] = {
+        Py_False, Py_True, Py_True, Py_True, Py_None, Py_None, Py_None, Py_None, Py_False, NULL,
+        Py_False
+    };
+    PyObject* extra = PyDict_New();
+    if (extra == NULL) return NULL;
+
+    if (kwargs != NULL) {
+        Py_ssize_t pos = 0;
+        PyObject* key;
+        PyObject* value;
+        while (PyDict_Next(kwargs, &pos, &key, &value)) {
+            int k = find_dumps_option(st, key);
+            if (k >= 0) {
+                options[k] = value;
+            }
+            else if (PyDict_SetItem(extra, key, value) < 0) {
+                Py_DECREF(extra);
+                return NULL;
+            }
+        }
+    }
+
+    OutputMode output;
+    int native_arrays = PyObject_IsTrue(options[OPT_NATIVE_ARRAYS]);
+    if (native_arrays < 0 || parse_output_mode(options[OPT_OUTPUT], &output) < 0) {
+        Py_DECREF(extra);
+        return NULL;
+    }
+
+    int has_extra = PyDict_GET_SIZE(extra) > 0;
+
+    /* The encoder json.dumps() would use: cls(**options, **kw) */
+    PyObject* cls = options[OPT_CLS];
+    if (cls == Py_None) {
+        PyObject* json_module = PyImport_ImportModule("json");
+        if (json_module == NULL) {
+            Py_DECREF(extra);
+            return NULL;
+        }
+        cls = PyObject_GetAttrString(json_module, "JSONEncoder");
+        Py_DECREF(json_module);
+    }
+    else if (native_arrays && options[OPT_DEFAULT] == Py_None) {
+        /* cls keeps its own default() for everything but arrays */
+        cls = array_encoder_class(cls);
+    }
+    else {
+        Py_INCREF(cls);
+    }
+    PyObject* cls_kwargs = cls == NULL ? NULL : PyDict_Copy(extra);
+    Py_DECREF(extra);
+    if (cls_kwargs == NULL) {
+        Py_XDECREF(cls);
+        return NULL;
+    }
+    for (int k = 0; k < OPT_OUTPUT; k++) {
+        /* native_arrays=True: the fallback turns arrays into lists */
+        PyObject* value = k == OPT_DEFAULT && native_arrays && options[k] == Py_None
+                && options[OPT_CLS] == Py_None
+            ? st->array_default : options[k];
+        if (k != OPT_CLS && PyDict_SetItem(cls_kwargs, st->option_names[k], value) < 0) {
+            Py_DECREF(cls_kwargs);
+            Py_DECREF(cls);
+            return NULL;
+        }
+    }
+    PyObject* empty = PyTuple_New(0);
+    PyObject* json_encoder = empty == NULL ? NULL : PyObject_Call(cls, empty, cls_kwargs);
+    Py_XDECREF(empty);
+    Py_DECREF(cls_kwargs);
+    Py_DECREF(cls);
+    if (json_encoder == NULL) return NULL;
+    PyObject* fallback = PyObject_GetAttrString(json_encoder, "encode");
+    Py_DECREF(json_encoder);
+    if (fallback == NULL) return NULL;
+
+    EncoderObject* self = (EncoderObject*)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        Py_DECREF(fallback);
+        return NULL;
+    }
+    self->vectorcall = encoder_vectorcall;
+    self->fallback = fallback;
+    self->output = output;
+    self->allow_nan = options[OPT_ALLOW_NAN] == Py_True;
+    self->check_circular = options[OPT_CHECK_CIRCULAR] == Py_True;
+    self->sort_keys = options[OPT_SORT_KEYS] == Py_True;
+    self->native_arrays = native_arrays;
+    self->native = !has_extra && native_options_supported(
+        options[OPT_SKIPKEYS], options[OPT_CHECK_CIRCULAR], options[OPT_ALLOW_NAN],
+        options[OPT_CLS], options[OPT_INDENT], options[OPT_DEFAULT], options[OPT_SORT_KEYS],
+        options[OPT_SEPARATORS], &self->seps, &self->seps_owner);
+    self->separators = Py_NewRef(options[OPT_SEPARATORS]);
+    if (self->native) {
+        self->ensure_ascii = PyObject_IsTrue(options[OPT_ENSURE_ASCII]);
+        if (self->ensure_ascii < 0) {
+            Py_DECREF(self);
+            return NULL;
+        }
+    }
+    return (PyObject*)self;
+}
+
+/* Encode obj with the compiled options */
+static PyObject* encoder_encode_document(EncoderObject* self, PyObject* obj) {
+    ModuleState* st = (ModuleState*)PyType_GetModuleState(Py_TYPE(self));
+    if (self->native) {
+        PyObject* result = dumps_document(st, obj, &self->seps, self->ensure_ascii,
+                                          self->allow_nan, self->check_circular, self->sort_keys,
+                                          self->native_arrays, self->output);
+        if (result != NULL) {
+            return result;
+        }
+        /* Re-run through the json encoder for the exact exception */
+        PyErr_Clear();
+    }
+    return str_to_output(st, PyObject_CallOneArg(self->fallback, obj), self->output);
+}
+
+static PyObject* encoder_vectorcall(PyObject* callable, PyObject* const* args,
+                                    size_t nargsf, PyObject* kwnames) {
+    Py_ssize_t nargs = PyVectorcall_NARGS(nargsf);
+    if (nargs != 1 || (kwnames != NULL && PyTuple_GET_SIZE(kwnames) != 0)) {
+        PyErr_Format(PyExc_TypeError,
+            "Encoder() takes exactly one positional argument (%zd given)", nargs);
+        return NULL;
+    }
+    return encoder_encode_document((EncoderObject*)callable, args[0]);
+}
+
+static PyObject* encoder_encode(EncoderObject* self, PyObject* obj) {
+    return encoder_encode_document(self, obj);
+}
+
+static int encoder_traverse(EncoderObject* self, visitproc visit, void* arg) {
+    Py_VISIT(Py_TYPE(self));
+    Py_VISIT(self->fallback);
+    Py_VISIT(self->separators);
+    Py_VISIT(self->seps_owner);
+    return 0;
+}
+
+static int encoder_clear(EncoderObject* self) {
+    Py_CLEAR(self->fallback);
+    Py_CLEAR(self->separators);
+    Py_CLEAR(self->seps_owner);
+    return 0;
+}
+
+static void encoder_dealloc(EncoderObject* self) {
+    PyTypeObject* type = Py_TYPE(self);
+    PyObject_GC_UnTrack(self);
+    encoder_clear(self);
+    type->tp_free((PyObject*)self);
+    Py_DECREF(type);
+}
+
+static PyObject* encoder_get_native(EncoderObject* self, void* Py_UNUSED(closure)) {
+    return PyBool_FromLong(self->native);
+}
+
+static PyMethodDef encoder_methods[] = {
+    {"encode", (PyCFunction)encoder_encode, METH_O,
+     "encode(obj) -> str | bytes | JSONBuffer\n\n"
+     "Serialize obj with this encoder's options (same as calling the encoder)."},
+    {NULL, NULL, 0, NULL}
+};
+
+static PyGetSetDef encoder_getset[] = {
+    {"native", (getter)encoder_get_native, NULL,
+     "True when the options are handled by the native encoder (else json.JSONEncoder).",
+     NULL},
+    {NULL, NULL, NULL, NULL, NULL}
+};
+
+static PyMemberDef encoder_members[] = {
+    {"__vectorcalloffset__", T_PYSSIZET, offsetof(EncoderObject, vectorcall), READONLY, NULL},
+    {NULL, 0, 0, 0, NULL}
+};
+
+static PyType_Slot encoder_slots[] = {
+    {Py_tp_new, encoder_new},
+    {Py_tp_dealloc, encoder_dealloc},
+    {Py_tp_traverse, encoder_traverse},
+    {Py_tp_clear, encoder_clear},
+    {Py_tp_call, PyVectorcall_Call},
+    {Py_tp_methods, encoder_methods},
+    {Py_tp_getset, encoder_getset},
+    {Py_tp_members, encoder_members},
+    {Py_tp_doc, "Encoder(*, skipkeys=False, ensure_ascii=True, check_circular=True,\n"
+                "        allow_nan=True, cls=None, indent=None, separators=None,\n"
+                "        default=None, sort_keys=False, native_arrays=False,\n"
+                "        output='str', **kw)\n\n"
+                "Reusable dumps(): the options are validated once, and calling the\n"
+                "encoder with an object returns the same result as\n"
+                "json.dumps(obj, **options) (encoded per output=, like dumps_bytes())."},
+    {0, NULL},
+};
+
+static PyType_Spec encoder_spec = {
+    .name = "fastjson.Encoder",
+    .basicsize = sizeof(EncoderObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC | Py_TPFLAGS_IMMUTABLETYPE
+             | Py_TPFLAGS_HAVE_VECTORCALL,
+    .slots = encoder_slots,
+};
+
+/* ======================================================================
+ * dumps_ndarray() - Fast ndarray serialization via PEP 3118 buffer protocol
+ * ====================================================================== */
+
+typedef enum {
+    NAN_RAISE = 0,
+    NAN_NULL  = 1,
+    NAN_SKIP  = 2,
+    NAN_LITERAL = 3,  /* NaN / Infinity / -Infinity, as json.dumps(allow_nan=True) */
+} NanMode;
+
+static int parse_nan_mode(PyObject* nan_arg, NanMode* out) {
+    if (nan_arg == NULL || nan_arg == Py_None) {
+        *out = NAN_RAISE;
+        return 0;
+    }
+    if (!PyUnicode_Check(nan_arg)) {
+        PyErr_SetString(PyExc_TypeError,
+            "nan parameter must be 'raise', 'null', or 'skip'");
+        return -1;
+    }
+    if (PyUnicode_CompareWithASCIIString(nan_arg, "raise") == 0) {
+        *out = NAN_RAISE;
+    } else if (PyUnicode_CompareWithASCIIString(nan_arg, "null") == 0) {
+        *out = NAN_NULL;
+    } else if (PyUnicode_CompareWithASCIIString(nan_arg, "skip") == 0) {
+        *out = NAN_SKIP;
+    } else {
+        PyErr_Format(PyExc_ValueError,
+            "nan parameter must be 'raise', 'null', or 'skip', got '%U'",
+            nan_arg);
+        return -1;
+    }
+    return 0;
+}
+
+typedef struct {
+    NanMode nan_mode;
+    int use_precision;
+    int precision;
+    int significant_digits;  /* 1-17, or 0 for the shortest repr */
+    int drop_negative_zero;  /* negative_zero='drop': no sign on zero output */
+    /* 'f' = float32, 'd' = float64, 'e' = float16, 'b' = bfloat16,
+       'i' / 'u' = signed / unsigned integer of itemsize bytes, '?' = bool */
+    char format;
+    int itemsize;
+    int swap;      /* elements are stored in non-native byte order */
+    int bfloat16;  /* dtype='bfloat16': read 16-bit elements as bfloat16 */
+    const struct Float16Repr* float16_reprs;  /* 'e' / 'b' lookup table, or NULL */
+    /* Layout (indent=, separators=): between elements or sub-arrays, item_sep,
+       then (indent only) a newline and one indent per nesting level */
+    const char* item_sep;
+    Py_ssize_t item_sep_len;
+    const char* newline;  /* "\n" + one indent, or NULL */
+    Py_ssize_t indent_len;
+    int base_level;  /* nesting level of the array in the document (dumps) */
+    const char* key_sep;
+    Py_ssize_t key_sep_len;
+    int ascii;
+    int lines;  /* NDJSON: first-axis entries one per line, without the outer brackets */
+    /* Structured dtypes (format 'T'): the fields of a record, written as an
+       object (orient='records') or as an array (orient='values') */
+    struct RecordField* fields;
+    int n_fields;
+    int records;  /* 1 = 'records', 0 = 'values', -1 = orient not given */
+} FormatConfig;
+
+/* A field of a structured dtype */
+typedef struct RecordField {
+    FormatConfig cfg;  /* the element format, or the nested record */
+    Py_ssize_t offset;
+    Py_ssize_t item_size;
+    /* Subarray fields "(2,3)f": written as nested arrays; ndim 0 for a scalar */
+    int ndim;
+    Py_ssize_t shape[PyBUF_MAX_NDIM];
+    Py_ssize_t count;  /* elements: the product of shape */
+    char* key;  /* the escaped, quoted name and the key separator */
+    Py_ssize_t key_len;
+} RecordField;
+
+/* Free the fields of a structured FormatConfig */
+static void format_config_clear(FormatConfig* cfg) {
+    for (int i = 0; i < cfg->n_fields; i++) {
+        format_config_clear(&cfg->fields[i].cfg);
+        PyMem_RawFree(cfg->fields[i].key);
+    }
+    PyMem_RawFree(cfg->fields);
+    cfg->fields = NULL;
+    cfg->n_fields = 0;
+}
+
+/*
+ * Status codes of the element formatting loops, which run without the GIL
+ * and so cannot raise; raise_serialize_error() converts them afterwards.
+ */
+#define SERIALIZE_NOMEM     (-1)  /* or a streaming sink error, already raised */
+#define SERIALIZE_NONFINITE (-2)
+
+static int raise_serialize_error(int status) {
+    switch (status) {
+    case SERIALIZE_NONFINITE:
+        PyErr_SetString(PyExc_ValueError,
+            "Out of range float values are not JSON compliant");
+        break;
+    default:
+        if (!PyErr_Occurred()) PyErr_NoMemory();
+        break;
+    }
+    return -1;
+}
+
+/* Indentation for the given nesting level (indent only) */
+static int write_layout_indent(Buffer* buf, const FormatConfig* cfg, int level) {
+    for (int k = 0; k < cfg->base_level + level; k++) {
+        if (buffer_append(buf, cfg->newline + 1, (size_t)cfg->indent_len) < 0)
+            return SERIALIZE_NOMEM;
+    }
+    return 0;
+}
+
+/* Separator before an item of an array at nesting level `level` - 1 */
+static inline int write_layout_separator(Buffer* buf, const FormatConfig* cfg, int need_comma,
+                                         int level) {
+    if (need_comma) {
+        int rc = cfg->item_sep_len == 1
+            ? buffer_append_char(buf, cfg->item_sep[0])
+            : buffer_append(buf, cfg->item_sep, (size_t)cfg->item_sep_len);
+        if (rc < 0) return SERIALIZE_NOMEM;
+    }
+    if (cfg->newline == NULL) return 0;
+    if (buffer_append_char(buf, '\n') < 0) return SERIALIZE_NOMEM;
+    return write_layout_indent(buf, cfg, level);
+}
+
+/* Closing bracket (or brace) of a non-empty array (or record) at the given nesting level */
+static int write_layout_close(Buffer* buf, const FormatConfig* cfg, int level, char bracket) {
+    if (cfg->newline != NULL) {
+        if (buffer_append_char(buf, '\n') < 0) return SERIALIZE_NOMEM;
+        int rc = write_layout_indent(buf, cfg, level);
+        if (rc < 0) return rc;
+    }
+    return buffer_append_char(buf, bracket) < 0 ? SERIALIZE_NOMEM : 0;
+}
+
+#if defined(_MSC_VER)
+#define BSWAP16(x) _byteswap_ushort(x)
+#define BSWAP32(x) _byteswap_ulong(x)
+#define BSWAP64(x) _byteswap_uint64(x)
+#else
+#define BSWAP16(x) __builtin_bswap16(x)
+#define BSWAP32(x) __builtin_bswap32(x)
+#define BSWAP64(x) __builtin_bswap64(x)
+#endif
+
+/* Load an element, which may be unaligned and in either byte order */
+static inline float load_float(const void* ptr, int swap) {
+    uint32_t bits;
+    float x;
+    memcpy(&bits, ptr, sizeof(bits));
+    if (swap) bits = BSWAP32(bits);
+    memcpy(&x, &bits, sizeof(x));
+    return x;
+}
+
+static inline double load_double(const void* ptr, int swap) {
+    uint64_t bits;
+    double x;
+    memcpy(&bits, ptr, sizeof(bits));
+    if (swap) bits = BSWAP64(bits);
+    memcpy(&x, &bits, sizeof(x));
+    return x;
+}
+
+#define FORMAT_IS_FLOAT(format) \
+    ((format) == 'f' || (format) == 'd' || (format) == 'e' || (format) == 'b')
+#define FORMAT_IS_INTEGER(format) ((format) == 'i' || (format) == 'u' || (format) == '?')
+/* FormatConfig.format of structured dtypes */
+#define FORMAT_RECORD 'T'
+
+static inline uint16_t load_uint16(const void* ptr, int swap) {
+    uint16_t bits;
+    memcpy(&bits, ptr, sizeof(bits));
+    return swap ? BSWAP16(bits) : bits;
+}
+
+/* Sign, exponent and fraction layout of a 16-bit float format */
+#define FLOAT16_FRAC_BITS  10
+#define FLOAT16_BIAS       15
+#define BFLOAT16_FRAC_BITS 7
+#define BFLOAT16_BIAS      127
+
+static inline int is_nonfinite_16(uint16_t bits, int frac_bits) {
+    uint16_t exp_mask = (uint16_t)(0x7fff & ~((1u << frac_bits) - 1));
+    return (bits & exp_mask) == exp_mask;
+}
+
+/*
+ * A finite, non-zero 16-bit float magnitude decoded exactly into doubles:
+ * its value and the bounds of the values that round to it (to nearest,
+ * ties to even), which are themselves included when its significand is even.
+ */
+typedef struct {
+    double value;
+    double lower;
+    double upper;
+    int inclusive;
+} Float16Interval;
+
+static void decode_float16(uint16_t bits, int frac_bits, int bias, Float16Interval* h) {
+    int exp_field = (bits & 0x7fff) >> frac_bits;
+    uint32_t frac = bits & ((1u << frac_bits) - 1);
+    uint32_t m = exp_field ? frac | (1u << frac_bits) : frac;
+    int e = (exp_field ? exp_field : 1) - bias - frac_bits;
+    double half_ulp = ldexp(1.0, e - 1);
+    h->value = ldexp((double)m, e);
+    h->upper = h->value + half_ulp;
+    /* Just above a power of two the spacing below is half as wide */
+    h->lower = h->value - (frac == 0 && exp_field > 1 ? half_ulp / 2 : half_ulp);
+    h->inclusive = (m & 1) == 0;
+}
+
+/* 10^0 .. 10^22, the powers of ten that are exact in a double */
+static const double exact_powers_of_10[23] = {
+    1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+    1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22,
+};
+
+static double power_of_10(int n) {
+    if (n >= 0 && n <= 22) return exact_powers_of_10[n];
+    if (n < 0 && n >= -22) return 1.0 / exact_powers_of_10[-n];
+    return pow(10.0, n);
+}
+
+static int float16_interval_contains(const Float16Interval* h, double v) {
+    return h->inclusive ? (v >= h->lower && v <= h->upper) : (v > h->lower && v < h->upper);
+}
+
+/*
+ * The shortest decimal, *digits * 10^*exp, that reads back as h (parsed to a
+ * double, as json.loads does, then rounded to the 16-bit type), and of those
+ * the closest to it. For each length the candidates are the decimals of that
+ * many significant digits on either side of x; they are computed with exact
+ * double operands where the scale allows, and with snprintf/strtod otherwise.
+ */
+static void shortest_float16_digits(const Float16Interval* h, uint64_t* digits, int* exp) {
+    double x = h->value;
+    int e2;
+    frexp(x, &e2);
+    int k = (int)floor((e2 - 1) * 0.30102999566398120);  /* floor(log10(x)), or one less */
+    if (x >= power_of_10(k + 1)) k++;
+
+    for (int p = 1; p <= 17; p++) {
+        int q = k - p + 1;  /* exponent of the last digit */
+        uint64_t cand[2];
+        double value[2];
+        int ncand;
+        if (q >= -22 && q <= 22) {
+            double scaled = q <= 0 ? x * exact_powers_of_10[-q] : x / exact_powers_of_10[q];
+            double below = floor(scaled);
+            cand[0] = (uint64_t)below;
+            cand[1] = cand[0] + 1;
+            ncand = scaled > below ? 2 : 1;
+            for (int i = 0; i < ncand; i++) {
+                value[i] = q <= 0 ? (double)cand[i] / exact_powers_of_10[-q]
+                                  : (double)cand[i] * exact_powers_of_10[q];
+            }
+        }
+        else {
+            /* Digits and exponent only, so the locale's decimal point does not matter */
+            char tmp[48];
+            snprintf(tmp, sizeof(tmp), "%.*e", p - 1, x);
+            uint64_t nearest = 0;
+            const char* c = tmp;
+            for (; *c != 'e'; c++) {
+                if (*c >= '0' && *c <= '9') nearest = nearest * 10 + (uint64_t)(*c - '0');
+            }
+            q = (int)strtol(c + 1, NULL, 10) - p + 1;
+            cand[0] = nearest;
+            snprintf(tmp, sizeof(tmp), "%llue%d", (unsigned long long)nearest, q);
+            value[0] = strtod(tmp, NULL);
+            cand[1] = value[0] < x ? nearest + 1 : nearest - 1;
+            snprintf(tmp, sizeof(tmp), "%llue%d", (unsigned long long)cand[1], q);
+            value[1] = strtod(tmp, NULL);
+            ncand = 2;
+        }
+
+        int best = -1;
+        for (int i = 0; i < ncand; i++) {
+            if (!float16_interval_contains(h, value[i])) continue;
+            if (best < 0) {
+                best = i;
+                continue;
+            }
+            double dist = fabs(value[i] - x), best_dist = fabs(value[best] - x);
+            if (dist < best_dist || (dist == best_dist && cand[i] % 2 == 0)) best = i;
+        }
+        if (best >= 0) {
+            *digits = cand[best];
+            *exp = q;
+            return;
+        }
+    }
+    /* Not reached: 17 digits always read back as the exact double */
+    *digits = 0;
+    *exp = 0;
+}
+
+/* Longest 16-bit float element, with room to copy a whole Float16Repr */
+#define FLOAT16_ELEMENT_MAX 32
+
+/* Write d * 10^exp (d > 0), trailing zeros stripped, in the layout of
+   repr(float) (fixed or exponent notation, ".0" for integers); returns the end */
+static char* write_float_repr(char* dst, uint64_t d, int exp) {
+    while (d % 10 == 0) {
+        d /= 10;
+        exp++;
+    }
+    char digits[20];
+    size_t n = write_u64(digits, d);
+    int exp10 = exp + (int)n - 1;  /* exponent of the first digit */
+
+    if (exp10 < -4 || exp10 >= 16) {
+        *dst++ = digits[0];
+        if (n > 1) {
+            *dst++ = '.';
+            memcpy(dst, digits + 1, n - 1);
+            dst += n - 1;
+        }
+        *dst++ = 'e';
+        *dst++ = exp10 < 0 ? '-' : '+';
+        unsigned a = (unsigned)(exp10 < 0 ? -exp10 : exp10);
+        if (a >= 100) *dst++ = (char)('0' + a / 100);
+        memcpy(dst, digits2 + (a % 100) * 2, 2);
+        return dst + 2;
+    }
+    if (exp10 < 0) {
+        memcpy(dst, "0.", 2);
+        dst += 2;
+        for (int i = -1; i > exp10; i--) *dst++ = '0';
+        memcpy(dst, digits, n);
+        return dst + n;
+    }
+    size_t int_len = (size_t)exp10 + 1;
+    if (int_len >= n) {
+        memcpy(dst, digits, n);
+        dst += n;
+        for (size_t i = n; i < int_len; i++) *dst++ = '0';
+        memcpy(dst, ".0", 2);
+        return dst + 2;
+    }
+    memcpy(dst, digits, int_len);
+    dst += int_len;
+    *dst++ = '.';
+    memcpy(dst, digits + int_len, n - int_len);
+    return dst + (n - int_len);
+}
+
+/* Write a finite 16-bit float magnitude as its shortest round-trip repr */
+static char* write_float16_magnitude(char* dst, uint16_t bits, int frac_bits, int bias) {
+    if (bits == 0) {
+        memcpy(dst, "0.0", 3);
+        return dst + 3;
+    }
+    Float16Interval h;
+    uint64_t d;
+    int exp;
+    decode_float16(bits, frac_bits, bias, &h);
+    shortest_float16_digits(&h, &d, &exp);
+    return write_float_repr(dst, d, exp);
+}
+
+/*
+ * The repr of every 16-bit magnitude (0x0000-0x7fff) of a format, so that
+ * large arrays copy each element's text instead of searching for its digits.
+ * len is 0 for NaN and Inf.
+ */
+typedef struct Float16Repr {
+    uint8_t len;
+    char text[19];  /* at most 18 used, as in bfloat16 "1234000000000000.0" */
+} Float16Repr;
+
+#define FLOAT16_MAGNITUDES 0x8000
+/* Arrays at least this large are formatted through the table */
+#define FLOAT16_TABLE_MIN_ELEMENTS 4096
+
+/* The table of format 'e' or 'b', built on first use; NULL if out of memory */
+static const Float16Repr* float16_repr_table(ModuleState* st, char format) {
+    int frac_bits = format == 'e' ? FLOAT16_FRAC_BITS : BFLOAT16_FRAC_BITS;
+    int bias = format == 'e' ? FLOAT16_BIAS : BFLOAT16_BIAS;
+    Float16Repr** slot = &st->float16_reprs[format == 'e' ? 0 : 1];
+#ifdef Py_GIL_DISABLED
+    PyMutex_Lock(&st->float16_reprs_lock);
+#endif
+    if (*slot == NULL) {
+        Float16Repr* table = (Float16Repr*)PyMem_RawMalloc(FLOAT16_MAGNITUDES * sizeof(Float16Repr));
+        if (table != NULL) {
+            for (uint32_t bits = 0; bits < FLOAT16_MAGNITUDES; bits++) {
+                char tmp[FLOAT16_ELEMENT_MAX];
+                size_t len = 0;
+                if (!is_nonfinite_16((uint16_t)bits, frac_bits)) {
+                    len = (size_t)(write_float16_magnitude(tmp, (uint16_t)bits, frac_bits, bias)
+                                   - tmp);
+                }
+                table[bits].len = (uint8_t)len;
+                memcpy(table[bits].text, tmp, len);
+            }
+        }
+        *slot = table;
+    }
+    const Float16Repr* table = *slot;
+#ifdef Py_GIL_DISABLED
+    PyMutex_Unlock(&st->float16_reprs_lock);
+#endif
+    return table;
+}
+
+/* Append a finite 16-bit float as its shortest round-trip repr */
+static int buffer_append_float16(Buffer* buf, uint16_t bits, const FormatConfig* cfg,
+                                 int frac_bits, int bias) {
+    if (buffer_reserve(buf, FLOAT16_ELEMENT_MAX) < 0) return SERIALIZE_NOMEM;
+    char* dst = buf->data + buf->size;
+    if (bits & 0x8000) *dst++ = '-';
+    if (cfg->float16_reprs != NULL) {
+        const Float16Repr* r = &cfg->float16_reprs[bits & 0x7fff];
+        memcpy(dst, r->text, sizeof(r->text));
+        dst += r->len;
+    }
+    else {
+        dst = write_float16_magnitude(dst, bits & 0x7fff, frac_bits, bias);
+    }
+    buf->size = (size_t)(dst - buf->data);
+    return 0;
+}
+
+/*
+ * precision= and significant_digits=: x rounded to nearest, ties to even,
+ * from its exact binary value, as printf("%.*f") and format(x, ".*e") round.
+ * |x| * 10^j is computed in 128-bit integer arithmetic when it fits, which
+ * covers the usual magnitudes; otherwise from the exact decimal expansion.
+ */
+
+/* 5^0 .. 5^27, the powers of five that fit in 64 bits */
+static const uint64_t powers_of_5[28] = {
+    1ULL, 5ULL, 25ULL, 125ULL, 625ULL, 3125ULL, 15625ULL, 78125ULL, 390625ULL, 1953125ULL,
+    9765625ULL, 48828125ULL, 244140625ULL, 1220703125ULL, 6103515625ULL, 30517578125ULL,
+    152587890625ULL, 762939453125ULL, 3814697265625ULL, 19073486328125ULL,
+    95367431640625ULL, 476837158203125ULL, 2384185791015625ULL, 11920928955078125ULL,
+    59604644775390625ULL, 298023223876953125ULL, 1490116119384765625ULL,
+    7450580596923828125ULL,
+};
+
+typedef struct {
+    uint64_t hi;
+    uint64_t lo;
+} UInt128;
+
+static inline UInt128 umul64(uint64_t a, uint64_t b) {
+    UInt128 r;
+#if defined(__SIZEOF_INT128__)
+    unsigned __int128 p = (unsigned __int128)a * b;
+    r.hi = (uint64_t)(p >> 64);
+    r.lo = (uint64_t)p;
+#else
+    uint64_t a_lo = (uint32_t)a, a_hi = a >> 32, b_lo = (uint32_t)b, b_hi = b >> 32;
+    uint64_t ll = a_lo * b_lo, lh = a_lo * b_hi, hl = a_hi * b_lo;
+    uint64_t mid = (ll >> 32) + (uint32_t)lh + (uint32_t)hl;
+    r.lo = (mid << 32) | (uint32_t)ll;
+    r.hi = a_hi * b_hi + (lh >> 32) + (hl >> 32) + (mid >> 32);
+#endif
+    return r;
+}
+
+/* a / 2^s (0 < s < 128) rounded to nearest, ties to even; -1 if over 64 bits */
+static inline int round_shift_u128(UInt128 a, int s, uint64_t* q) {
+    uint64_t quot, round_bit, sticky;
+    if (s < 64) {
+        if (a.hi >> s) return -1;
+        quot = (a.lo >> s) | (a.hi << (64 - s));
+        round_bit = (a.lo >> (s - 1)) & 1;
+        sticky = a.lo & ((1ULL << (s - 1)) - 1);
+    }
+    else if (s == 64) {
+        quot = a.hi;
+        round_bit = a.lo >> 63;
+        sticky = a.lo & ~(1ULL << 63);
+    }
+    else {
+        quot = a.hi >> (s - 64);
+        round_bit = (a.hi >> (s - 65)) & 1;
+        sticky = (a.hi & ((1ULL << (s - 65)) - 1)) | a.lo;
+    }
+    if (round_bit && (sticky || (quot & 1))) {
+        if (++quot == 0) return -1;
+    }
+    *q = quot;
+    return 0;
+}
+
+/*
+ * round(m * 2^e * 10^j) for m < 2^53, in 64/128-bit integer arithmetic.
+ * Returns -1 if an operand or the result does not fit.
+ */
+static int round_scaled_u64(uint64_t m, int e, int j, uint64_t* q) {
+    if (j >= 0) {
+        if (j > 27) return -1;
+        /* m * 10^j * 2^e = (m * 5^j) * 2^(e + j), and m * 5^j < 2^116 */
+        UInt128 a = umul64(m, powers_of_5[j]);
+        int shift = e + j;
+        if (shift >= 0) {
+            if (a.hi != 0 || shift >= 64 || (shift > 0 && a.lo >> (64 - shift) != 0))
+                return -1;
+            *q = a.lo << shift;
+            return 0;
+        }
+        if (-shift >= 128) {
+            *q = 0;  /* below one half */
+            return 0;
+        }
+        return round_shift_u128(a, -shift, q);
+    }
+    /* m * 2^e / 10^t = m * 2^(e - t) / 5^t */
+    int t = -j;
+    if (t > 27) return -1;
+    uint64_t n = m, d = powers_of_5[t];
+    int shift = e - t;
+    if (shift > 0) {
+        if (shift >= 64 || m >> (64 - shift) != 0) return -1;
+        n = m << shift;
+    }
+    else if (shift < 0) {
+        if (-shift >= 64 || d >> (64 + shift) != 0) {
+            *q = 0;  /* d >= 2^64 > 2m */
+            return 0;
+        }
+        d <<= -shift;
+    }
+    uint64_t quot = n / d, rem = n % d;
+    if (rem > d - rem || (rem == d - rem && (quot & 1))) quot++;
+    *q = quot;
+    return 0;
+}
+
+/* Base-10^9 limbs for the exact decimal value of a double: at most 767 digits */
+#define EXACT_LIMBS  90
+#define EXACT_DIGITS (EXACT_LIMBS * 9 + 32)
+
+/*
+ * Digits of round(m * 2^e * 10^j) for m < 2^53 and any e and j (slow path of
+ * round_scaled_u64), from the exact decimal expansion of m * 2^e: for e < 0
+ * that is m * 5^-e digits scaled by 10^e. Writes at most EXACT_DIGITS bytes
+ * without leading zeros ("0" for zero) and returns the count.
+ */
+static size_t round_scaled_digits(uint64_t m, int e, int j, char* digits) {
+    if (m == 0) {
+        digits[0] = '0';
+        return 1;
+    }
+    uint32_t limbs[EXACT_LIMBS];
+    int nlimbs = 0;
+    for (; m != 0; m /= 1000000000) limbs[nlimbs++] = (uint32_t)(m % 1000000000);
+    for (int remaining = e >= 0 ? e : -e; remaining > 0;) {
+        int step = remaining < (e >= 0 ? 29 : 13) ? remaining : (e >= 0 ? 29 : 13);
+        uint64_t factor = e >= 0 ? 1ULL << step : powers_of_5[step];
+        uint64_t carry = 0;
+        for (int i = 0; i < nlimbs; i++) {
+            uint64_t cur = limbs[i] * factor + carry;
+            limbs[i] = (uint32_t)(cur % 1000000000);
+            carry = cur / 1000000000;
+        }
+        for (; carry != 0; carry /= 1000000000) limbs[nlimbs++] = (uint32_t)(carry % 1000000000);
+        remaining -= step;
+    }
+    int n = (int)write_u64(digits, limbs[nlimbs - 1]);
+    for (int i = nlimbs - 2; i >= 0; i--, n += 9) {
+        uint32_t v = limbs[i];
+        for (int k = 8; k >= 0; k--, v /= 10) digits[n + k] = (char)('0' + v % 10);
+    }
+
+    /* The value is digits * 10^(e < 0 ? e : 0); keep the digits left of 10^-j */
+    int keep = n + (e < 0 ? e : 0) + j;
+    if (keep >= n) {
+        memset(digits + n, '0', (size_t)(keep - n));
+        return (size_t)keep;
+    }
+    int up = 0;
+    if (keep >= 0) {
+        up = digits[keep] > '5';
+        if (digits[keep] == '5') {
+            int sticky = 0;
+            for (int i = keep + 1; i < n && !sticky; i++) sticky = digits[i] != '0';
+            up = sticky || (keep > 0 && ((digits[keep - 1] - '0') & 1));
+        }
+    }
+    if (keep <= 0) {
+        digits[0] = up ? '1' : '0';
+        return 1;
+    }
+    if (up) {
+        int i = keep - 1;
+        while (i >= 0 && digits[i] == '9') digits[i--] = '0';
+        if (i >= 0) {
+            digits[i]++;
+        }
+        else {
+            memmove(digits + 1, digits, (size_t)keep);
+            digits[0] = '1';
+            keep++;
+        }
+    }
+    return (size_t)keep;
+}
+
+/* Sign, significand and binary exponent of a double: |x| = m * 2^e */
+static inline int decompose_double(double x, uint64_t* m, int* e) {
+    uint64_t bits;
+    memcpy(&bits, &x, sizeof(bits));
+    int exp_field = (int)(bits >> 52) & 0x7ff;
+    *m = bits & ((1ULL << 52) - 1);
+    if (exp_field) *m |= 1ULL << 52;
+    *e = (exp_field ? exp_field : 1) - 1075;
+    return (int)(bits >> 63);
+}
+
+/* Longest precision= element: sign, 309 integer digits, point, 20 decimals */
+#define FIXED_ELEMENT_MAX 336
+
+/* Write finite x with `precision` decimals, as printf("%.*f") in the C locale */
+static char* write_fixed_double(char* dst, double x, int precision, int drop_negative_zero) {
+    uint64_t m, q;
+    int e;
+    int negative = decompose_double(x, &m, &e);
+    char digits[EXACT_DIGITS];
+    size_t n = round_scaled_u64(m, e, precision, &q) == 0
+        ? write_u64(digits, q) : round_scaled_digits(m, e, precision, digits);
+
+    if (negative && !(drop_negative_zero && n == 1 && digits[0] == '0')) *dst++ = '-';
+    size_t p = (size_t)precision;
+    if (n > p) {
+        memcpy(dst, digits, n - p);
+        dst += n - p;
+        if (p == 0) return dst;
+        *dst++ = '.';
+        memcpy(dst, digits + n - p, p);
+        return dst + p;
+    }
+    memcpy(dst, "0.", 2);
+    dst += 2;
+    memset(dst, '0', p - n);
+    dst += p - n;
+    memcpy(dst, digits, n);
+    return dst + n;
+}
+
+/* Longest significant_digits= element, as in "-1.2345678901234567e-308" */
+#define SIGNIFICANT_ELEMENT_MAX 32
+
+/* Write finite x correctly rounded to `significant` digits (1-17), in the
+   layout of repr(float); not the shortest repr of the rounded double */
+static char* write_significant_double(char* dst, double x, int significant,
+                                      int drop_negative_zero) {
+    uint64_t m, q;
+    int e;
+    int negative = decompose_double(x, &m, &e);
+    if (m == 0) {
+        if (negative && !drop_negative_zero) *dst++ = '-';
+        memcpy(dst, "0.0", 3);
+        return dst + 3;
+    }
+    if (negative) *dst++ = '-';
+
+    /* k = floor(log10(x)), or one less; the loop corrects it */
+    int k = (int)floor((e + 63 - clz64(m)) * 0.30102999566398120);
+    for (;;) {
+        int j = significant - 1 - k;
+        if (round_scaled_u64(m, e, j, &q) < 0) {
+            char digits[EXACT_DIGITS];
+            size_t n = round_scaled_digits(m, e, j, digits);
+            q = 0;
+            for (size_t i = 0; i < n; i++) q = q * 10 + (uint64_t)(digits[i] - '0');
+        }
+        if (q < powers_of_10[significant]) return write_float_repr(dst, q, -j);
+        k++;
+    }
+}
+
+/* Append finite x under precision= or significant_digits= */
+static int buffer_append_rounded_double(Buffer* buf, double x, const FormatConfig* cfg) {
+    if (buffer_reserve(buf, FIXED_ELEMENT_MAX) < 0) return SERIALIZE_NOMEM;
+    char* dst = buf->data + buf->size;
+    dst = cfg->use_precision
+        ? write_fixed_double(dst, x, cfg->precision, cfg->drop_negative_zero)
+        : write_significant_double(dst, x, cfg->significant_digits, cfg->drop_negative_zero);
+    buf->size = (size_t)(dst - buf->data);
+    return 0;
+}
+
+/* The NaN or Inf element x under the nan= mode (see format_element) */
+static int format_nonfinite(Buffer* buf, const FormatConfig* cfg, double x) {
+    switch (cfg->nan_mode) {
+    case NAN_RAISE:
+        return SERIALIZE_NONFINITE;
+    case NAN_NULL:
+        return buffer_append(buf, "null", 4) < 0 ? SERIALIZE_NOMEM : 1;
+    case NAN_LITERAL: {
+        int rc = isnan(x) ? buffer_append(buf, "NaN", 3)
+            : x > 0 ? buffer_append(buf, "Infinity", 8)
+            : buffer_append(buf, "-Infinity", 9);
+        return rc < 0 ? SERIALIZE_NOMEM : 1;
+    }
+    default:
+        return 0;
+    }
+}
+
+/* Load an integer element of cfg->itemsize bytes, sign- or zero-extended to 64 bits */
+static inline uint64_t load_integer(const void* ptr, const FormatConfig* cfg) {
+    int is_signed = cfg->format == 'i';
+    switch (cfg->itemsize) {
+    case 1: {
+        uint8_t v;
+        memcpy(&v, ptr, sizeof(v));
+        return is_signed ? (uint64_t)(int64_t)(int8_t)v : v;
+    }
+    case 2: {
+        uint16_t v;
+        memcpy(&v, ptr, sizeof(v));
+        if (cfg->swap) v = BSWAP16(v);
+        return is_signed ? (uint64_t)(int64_t)(int16_t)v : v;
+    }
+    case 4: {
+        uint32_t v;
+        memcpy(&v, ptr, sizeof(v));
+        if (cfg->swap) v = BSWAP32(v);
+        return is_signed ? (uint64_t)(int64_t)(int32_t)v : v;
+    }
+    default: {
+        uint64_t v;
+        memcpy(&v, ptr, sizeof(v));
+        return cfg->swap ? BSWAP64(v) : v;
+    }
+    }
+}
+
+/* Longest integer element: "-9223372036854775808" or 2**64 - 1 */
+#define INTEGER_ELEMENT_MAX 20
+
+/*
+ * Write an integer element as json.dumps(int) would, or a bool as
+ * true/false, to dst (room for INTEGER_ELEMENT_MAX bytes); returns the end
+ */
+static inline char* write_integer_element(char* dst, const void* ptr, const FormatConfig* cfg) {
+    if (cfg->format == '?') {
+        if (*(const unsigned char*)ptr) {
+            memcpy(dst, "true", 4);
+            return dst + 4;
+        }
+        memcpy(dst, "false", 5);
+        return dst + 5;
+    }
+    uint64_t v = load_integer(ptr, cfg);
+    if (cfg->format == 'i' && (int64_t)v < 0) {
+        *dst++ = '-';
+        v = 0 - v;
+    }
+    return dst + write_u64(dst, v);
+}
+
+static int format_integer_element(Buffer* buf, const void* ptr, const FormatConfig* cfg) {
+    if (buffer_reserve(buf, INTEGER_ELEMENT_MAX) < 0) return SERIALIZE_NOMEM;
+    char* end = write_integer_element(buf->data + buf->size, ptr, cfg);
+    buf->size = (size_t)(end - buf->data);
+    return 1;
+}
+
+/* Elements per reservation in write_integer_run */
+#define INTEGER_BATCH 64
+
+/*
+ * n integer elements along one axis, without indent: room for a batch is
+ * reserved at once and the separators and digits are written in place.
+ */
+static int write_integer_run(Buffer* buf, const FormatConfig* cfg, const char* ptr,
+                             Py_ssize_t n, Py_ssize_t stride, int need_comma) {
+    const char* sep = cfg->item_sep;
+    size_t sep_len = (size_t)cfg->item_sep_len;
+    while (n > 0) {
+        Py_ssize_t batch = n < INTEGER_BATCH ? n : INTEGER_BATCH;
+        if (buffer_reserve(buf, (size_t)batch * (INTEGER_ELEMENT_MAX + sep_len)) < 0)
+            return SERIALIZE_NOMEM;
+        char* dst = buf->data + buf->size;
+        for (Py_ssize_t k = 0; k < batch; k++, ptr += stride) {
+            if (need_comma) {
+                if (sep_len == 1) {
+                    *dst++ = sep[0];
+                } else {
+                    memcpy(dst, sep, sep_len);
+                    dst += sep_len;
+                }
+            }
+            need_comma = 1;
+            dst = write_integer_element(dst, ptr, cfg);
+        }
+        buf->size = (size_t)(dst - buf->data);
+        n -= batch;
+    }
+    return 0;
+}
+
+/*
+ * Format a single element from the data pointer.
+ * Returns: 1 = written, 0 = skipped (NAN_SKIP), < 0 = SERIALIZE_* error
+ */
+static int format_element(Buffer* buf, const void* ptr, const FormatConfig* cfg) {
+    int rc;
+    if (!FORMAT_IS_FLOAT(cfg->format)) {
+        return format_integer_element(buf, ptr, cfg);
+    }
+    if (cfg->format == 'f') {
+        float x = load_float(ptr, cfg->swap);
+        if (!isfinite(x))
+            return format_nonfinite(buf, cfg, (double)x);
+        if (cfg->use_precision || cfg->significant_digits)
+            rc = buffer_append_rounded_double(buf, (double)x, cfg);
+        else
+            rc = buffer_append_finite_float(buf, cfg->drop_negative_zero && x == 0 ? 0.0f : x);
+    } else if (cfg->format == 'e' || cfg->format == 'b') {
+        int frac_bits = cfg->format == 'e' ? FLOAT16_FRAC_BITS : BFLOAT16_FRAC_BITS;
+        int bias = cfg->format == 'e' ? FLOAT16_BIAS : BFLOAT16_BIAS;
+        uint16_t bits = load_uint16(ptr, cfg->swap);
+        if (is_nonfinite_16(bits, frac_bits)) {
+            double x = bits & ((1u << frac_bits) - 1) ? NAN : bits & 0x8000 ? -HUGE_VAL : HUGE_VAL;
+            return format_nonfinite(buf, cfg, x);
+        }
+        if (cfg->use_precision || cfg->significant_digits) {
+            Float16Interval h;
+            decode_float16(bits, frac_bits, bias, &h);
+            rc = buffer_append_rounded_double(buf, bits & 0x8000 ? -h.value : h.value, cfg);
+        }
+        else if (cfg->drop_negative_zero && bits == 0x8000)
+            rc = buffer_append_float16(buf, 0, cfg, frac_bits, bias);
+        else
+            rc = buffer_append_float16(buf, bits, cfg, frac_bits, bias);
+    } else {
+        double x = load_double(ptr, cfg->swap);
+        if (!isfinite(x))
+            return format_nonfinite(buf, cfg, x);
+        if (cfg->use_precision || cfg->significant_digits)
+            rc = buffer_append_rounded_double(buf, x, cfg);
+        else
+            rc = buffer_append_finite_double(buf, cfg->drop_negative_zero && x == 0 ? 0.0 : x);
+    }
+    return rc < 0 ? rc : 1;
+}
+
+static int record_has_nonfinite(const char* ptr, const FormatConfig* cfg);
+
+static int is_nonfinite_element(const void* ptr, const FormatConfig* cfg) {
+    if (cfg->format == FORMAT_RECORD)
+        return record_has_nonfinite((const char*)ptr, cfg);
+    if (cfg->format == 'f')
+        return !isfinite(load_float(ptr, cfg->swap));
+    if (cfg->format == 'd')
+        return !isfinite(load_double(ptr, cfg->swap));
+    if (cfg->format == 'e')
+        return is_nonfinite_16(load_uint16(ptr, cfg->swap), FLOAT16_FRAC_BITS);
+    if (cfg->format == 'b')
+        return is_nonfinite_16(load_uint16(ptr, cfg->swap), BFLOAT16_FRAC_BITS);
+    return 0;
+}
+
+static int record_has_nonfinite(const char* ptr, const FormatConfig* cfg) {
+    for (int i = 0; i < cfg->n_fields; i++) {
+        const RecordField* f = &cfg->fields[i];
+        const char* item = ptr + f->offset;
+        for (Py_ssize_t k = 0; k < f->count; k++, item += f->item_size) {
+            if (is_nonfinite_element(item, &f->cfg)) return 1;
+        }
+    }
+    return 0;
+}
+
+static int format_entry(Buffer* buf, const char* ptr, const FormatConfig* cfg, int level);
+
+/* The elements of a subarray field from *ptr on (C order), as nested arrays */
+static int write_field_array(Buffer* buf, const RecordField* f, const char** ptr, int dim,
+                             int level) {
+    Py_ssize_t n = f->shape[dim];
+    if (buffer_append_char(buf, '[') < 0) return SERIALIZE_NOMEM;
+    for (Py_ssize_t j = 0; j < n; j++) {
+        int rc = write_layout_separator(buf, &f->cfg, j > 0, level + 1);
+        if (rc < 0) return rc;
+        if (dim == f->ndim - 1) {
+            rc = format_entry(buf, *ptr, &f->cfg, level + 1);
+            if (rc == 0) rc = SERIALIZE_NONFINITE;
+            *ptr += f->item_size;
+        }
+        else {
+            rc = write_field_array(buf, f, ptr, dim + 1, level + 1);
+        }
+        if (rc < 0) return rc;
+    }
+    if (n == 0) return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+    return write_layout_close(buf, &f->cfg, level, ']');
+}
+
+/*
+ * A record of a structured dtype whose opening bracket is at nesting level
+ * `level`: {"name": value, ...} or [value, ...]. Returns 1 or a SERIALIZE_*
+ * error; records with a NaN or Inf are dropped by the caller for nan='skip'.
+ */
+static int format_record(Buffer* buf, const char* ptr, const FormatConfig* cfg, int level) {
+    char close = cfg->records ? '}' : ']';
+    if (buffer_append_char(buf, cfg->records ? '{' : '[') < 0) return SERIALIZE_NOMEM;
+    for (int i = 0; i < cfg->n_fields; i++) {
+        const RecordField* f = &cfg->fields[i];
+        int rc = write_layout_separator(buf, cfg, i > 0, level + 1);
+        if (rc < 0) return rc;
+        if (cfg->records && buffer_append(buf, f->key, (size_t)f->key_len) < 0)
+            return SERIALIZE_NOMEM;
+        const char* field = ptr + f->offset;
+        if (f->ndim > 0) {
+            rc = write_field_array(buf, f, &field, 0, level + 1);
+        }
+        else {
+            rc = format_entry(buf, field, &f->cfg, level + 1);
+            if (rc == 0) rc = SERIALIZE_NONFINITE;
+        }
+        if (rc < 0) return rc;
+    }
+    int rc = cfg->n_fields == 0
+        ? (buffer_append_char(buf, close) < 0 ? SERIALIZE_NOMEM : 0)
+        : write_layout_close(buf, cfg, level, close);
+    return rc < 0 ? rc : 1;
+}
+
+/* An element or a record at nesting level `level`; returns like format_element */
+static int format_entry(Buffer* buf, const char* ptr, const FormatConfig* cfg, int level) {
+    if (cfg->format == FORMAT_RECORD) return format_record(buf, ptr, cfg, level);
+    return format_element(buf, ptr, cfg);
+}
+
+/*
+ * A range of entries along the first axis of an N-D strided array: elements
+ * (1D) or sub-arrays (N-D). need_comma is set once anything has been
+ * written, so ranges can be formatted separately and joined.
+ */
+typedef struct {
+    const char* data;
+    Py_ssize_t start;
+    Py_ssize_t end;
+    int ndim;
+    const Py_ssize_t* shape;
+    const Py_ssize_t* strides;  /* in bytes, possibly negative */
+    const FormatConfig* cfg;
+    int need_comma;
+    /* Parallel formatting only */
+    size_t estimate;
+    Buffer out;
+    int status;
+} NdarrayRange;
+
+/* Address of the element at a flat (C order) index */
+static const char* element_at(const NdarrayRange* r, Py_ssize_t flat) {
+    const char* ptr = r->data;
+    for (int d = r->ndim - 1; d >= 0; d--) {
+        ptr += (flat % r->shape[d]) * r->strides[d];
+        flat /= r->shape[d];
+    }
+    return ptr;
+}
+
+static int sample_element(Buffer* buf, const void* ctx, Py_ssize_t i) {
+    const NdarrayRange* r = (const NdarrayRange*)ctx;
+    const char* ptr = element_at(r, i);
+    if (is_nonfinite_element(ptr, r->cfg)) {
+        return buffer_append(buf, "null", 4);
+    }
+    return format_entry(buf, ptr, r->cfg, 1);
+}
+
+/* Worst case length of an element: shortest float64 repr, a float32 with
+   `precision` decimals or a 64-bit integer with its sign; records add their
+   keys, separators and a few levels of indentation */
+static size_t element_worst_size(const FormatConfig* cfg) {
+    if (cfg->format == FORMAT_RECORD) {
+        size_t sep = (size_t)cfg->item_sep_len;
+        if (cfg->newline != NULL) sep += 1 + 4 * (size_t)cfg->indent_len;
+        size_t worst = 2 + sep;
+        for (int i = 0; i < cfg->n_fields; i++) {
+            const RecordField* f = &cfg->fields[i];
+            worst += (size_t)f->key_len + 2 + (size_t)f->count * (element_worst_size(&f->cfg) + sep);
+        }
+        return worst;
+    }
+    if (FORMAT_IS_FLOAT(cfg->format))
+        return cfg->use_precision ? (size_t)cfg->precision + 42 : 24;
+    return 20;
+}
+
+/* Estimated length of the n elements of the array */
+static size_t estimate_ndarray_size(const NdarrayRange* r, Py_ssize_t n) {
+    return estimate_elements_size(n, element_worst_size(r->cfg), sample_element, r);
+}
+
+/* Whether the sub-array at ptr, spanning axes dim and up, has a NaN or Inf */
+static int subarray_has_nonfinite(const NdarrayRange* r, const char* ptr, int dim) {
+    Py_ssize_t n = r->shape[dim];
+    Py_ssize_t stride = r->strides[dim];
+    int last = dim == r->ndim - 1;
+    for (Py_ssize_t j = 0; j < n; j++, ptr += stride) {
+        if (last ? is_nonfinite_element(ptr, r->cfg) : subarray_has_nonfinite(r, ptr, dim + 1))
+            return 1;
+    }
+    return 0;
+}
+
+/* Write the sub-array at ptr, spanning axes dim (>= 1) and up, as nested arrays */
+static int write_subarray(Buffer* buf, const NdarrayRange* r, const char* ptr, int dim) {
+    const FormatConfig* cfg = r->cfg;
+    Py_ssize_t n = r->shape[dim];
+    Py_ssize_t stride = r->strides[dim];
+    int last = dim == r->ndim - 1;
+
+    if (buffer_append_char(buf, '[') < 0) return SERIALIZE_NOMEM;
+    if (last && cfg->newline == NULL && FORMAT_IS_INTEGER(cfg->format)) {
+        int rc = write_integer_run(buf, cfg, ptr, n, stride, 0);
+        if (rc < 0) return rc;
+        return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+    }
+    for (Py_ssize_t j = 0; j < n; j++, ptr += stride) {
+        int rc = write_layout_separator(buf, cfg, j > 0, dim + 1);
+        if (rc < 0) return rc;
+        rc = last ? format_entry(buf, ptr, cfg, dim + 1) : write_subarray(buf, r, ptr, dim + 1);
+        if (rc < 0) return rc;
+    }
+    if (n == 0) return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+    return write_layout_close(buf, cfg, dim, ']');
+}
+
+/* nan='skip' drops the first-axis entries (elements or sub-arrays) with a NaN or Inf */
+static int write_range(Buffer* buf, NdarrayRange* r) {
+    const FormatConfig* cfg = r->cfg;
+    Py_ssize_t stride = r->strides[0];
+    int nested = r->ndim > 1;
+    int skip_nonfinite = cfg->nan_mode == NAN_SKIP && !FORMAT_IS_INTEGER(cfg->format);
+    const char* ptr = r->data + r->start * stride;
+    if (!nested && cfg->newline == NULL && !cfg->lines && FORMAT_IS_INTEGER(cfg->format)) {
+        int rc = write_integer_run(buf, cfg, ptr, r->end - r->start, stride, r->need_comma);
+        if (rc < 0) return rc;
+        if (r->end > r->start) r->need_comma = 1;
+        return 0;
+    }
+    for (Py_ssize_t i = r->start; i < r->end; i++, ptr += stride) {
+        if (skip_nonfinite
+            && (nested ? subarray_has_nonfinite(r, ptr, 1) : is_nonfinite_element(ptr, cfg)))
+            continue;
+
+        int rc = cfg->lines ? 0 : write_layout_separator(buf, cfg, r->need_comma, 1);
+        if (rc < 0) return rc;
+        rc = nested ? write_subarray(buf, r, ptr, 1) : format_entry(buf, ptr, cfg, 1);
+        if (rc < 0) return rc;
+        if (cfg->lines && buffer_append_char(buf, '\n') < 0) return SERIALIZE_NOMEM;
+        r->need_comma = 1;
+    }
+    return 0;
+}
+
+/* ParallelTask: format one range into its own buffer */
+static void format_range_task(void* arg) {
+    NdarrayRange* r = (NdarrayRange*)arg;
+    if (buffer_init(&r->out, r->estimate) < 0) {
+        r->status = SERIALIZE_NOMEM;
+        return;
+    }
+    r->status = write_range(&r->out, r);
+}
+
+/* Arrays at least this large are formatted with the GIL released */
+#define NOGIL_MIN_ELEMENTS 1024
+/* Minimum number of elements per parallel range */
+#define PARALLEL_MIN_ELEMENTS 32768
+
+/* "[" opening the whole array (none for lines) */
+static int write_array_start(Buffer* buf, const FormatConfig* cfg) {
+    if (cfg->lines) return 0;
+    return buffer_append_char(buf, '[') < 0 ? SERIALIZE_NOMEM : 0;
+}
+
+/* "]" closing the whole array, after a newline if anything was written */
+static int write_array_end(Buffer* buf, const FormatConfig* cfg, int nonempty) {
+    if (cfg->lines) return 0;
+    if (nonempty) return write_layout_close(buf, cfg, 0, ']');
+    return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+}
+
+/* Format the ranges on worker threads and join them into buf */
+static int serialize_parallel(Buffer* buf, NdarrayRange* whole, int nranges, size_t est) {
+    NdarrayRange* ranges = (NdarrayRange*)PyMem_RawCalloc((size_t)nranges, sizeof(NdarrayRange));
+    if (ranges == NULL) return SERIALIZE_NOMEM;
+    Py_ssize_t units = whole->end;
+    for (int k = 0; k < nranges; k++) {
+        ranges[k] = *whole;
+        ranges[k].start = units * k / nranges;
+        ranges[k].end = units * (k + 1) / nranges;
+        ranges[k].estimate = est / (size_t)nranges + 64;
+    }
+
+    run_parallel(format_range_task, ranges, sizeof(NdarrayRange), nranges);
+
+    int status = write_array_start(buf, whole->cfg);
+    int need_comma = 0;
+    for (int k = 0; k < nranges; k++) {
+        NdarrayRange* r = &ranges[k];
+        if (status == 0) {
+            /* The first failing range is where the serial loop would fail */
+            status = r->status;
+        }
+        if (status == 0 && r->need_comma) {
+            /* Each range starts with its own newline and indent, if any; lines
+               end with their own newline */
+            if ((need_comma && !whole->cfg->lines
+                 && buffer_append(buf, whole->cfg->item_sep, (size_t)whole->cfg->item_sep_len) < 0)
+                || buffer_append(buf, r->out.data, r->out.size) < 0) {
+                status = SERIALIZE_NOMEM;
+            }
+            need_comma = 1;
+        }
+        buffer_free(&r->out);
+    }
+    PyMem_RawFree(ranges);
+    if (status == 0) status = write_array_end(buf, whole->cfg, need_comma);
+    return status;
+}
+
+/*
+ * Serialize a validated view (see get_ndarray_view) into buf. Large arrays
+ * are formatted with the GIL released (it only touches the exported buffer),
+ * on up to `threads` native threads, unless buf streams to Python code.
+ */
+static int serialize_ndarray(Buffer* buf, const Py_buffer* view, const FormatConfig* cfg,
+                             int threads) {
+    if (view->ndim == 0) {
+        /* A 0-d array is a scalar, which nan='skip' cannot drop */
+        int status = format_entry(buf, (const char*)view->buf, cfg, 0);
+        if (status == 0) status = SERIALIZE_NONFINITE;
+        if (status > 0 && cfg->lines && buffer_append_char(buf, '\n') < 0)
+            status = SERIALIZE_NOMEM;
+        return status < 0 ? raise_serialize_error(status) : 0;
+    }
+
+    NdarrayRange whole;
+    memset(&whole, 0, sizeof(whole));
+    whole.data = (const char*)view->buf;
+    whole.start = 0;
+    whole.end = view->shape[0];
+    whole.ndim = view->ndim;
+    whole.shape = view->shape;
+    whole.strides = view->strides;
+    whole.cfg = cfg;
+    Py_ssize_t c_strides[PyBUF_MAX_NDIM];
+    if (view->strides == NULL) {
+        /* The exporter may leave out the strides of a C-contiguous buffer */
+        Py_ssize_t stride = view->itemsize;
+        for (int d = view->ndim - 1; d >= 0; d--) {
+            c_strides[d] = stride;
+            stride *= view->shape[d];
+        }
+        whole.strides = c_strides;
+    }
+    Py_ssize_t n = 1;
+    Py_ssize_t subarrays = 0;  /* nested "[...]", across all levels */
+    for (int d = 0; d < view->ndim; d++) {
+        n *= view->shape[d];
+        if (d < view->ndim - 1) subarrays += n;
+    }
+
+    size_t est = 0;
+    if (buffer_is_growable(buf)) {
+        /* Elements and sub-arrays, each with a separator and (indent) a newline and
+           indentation, plus "[" "]" per sub-array */
+        size_t sep = (size_t)cfg->item_sep_len;
+        if (cfg->newline != NULL) sep += 1 + (size_t)cfg->indent_len * (size_t)view->ndim;
+        est = estimate_ndarray_size(&whole, n) + (size_t)(n + subarrays) * sep
+            + (size_t)subarrays * 2 + 2;
+        if (buffer_presize(buf, est) < 0) return raise_serialize_error(SERIALIZE_NOMEM);
+    }
+
+    if (buf->flush != NULL) {
+        /* Streaming: flushes call fp.write, so keep the GIL */
+        int status = write_array_start(buf, cfg);
+        if (status == 0) status = write_range(buf, &whole);
+        if (status == 0) status = write_array_end(buf, cfg, whole.need_comma);
+        return status < 0 ? raise_serialize_error(status) : 0;
+    }
+
+    int nranges = threads;
+    if (n / PARALLEL_MIN_ELEMENTS < nranges) nranges = (int)(n / PARALLEL_MIN_ELEMENTS);
+    if (whole.end < nranges) nranges = (int)whole.end;
+
+    int status;
+    PyThreadState* ts = n >= NOGIL_MIN_ELEMENTS ? PyEval_SaveThread() : NULL;
+    if (nranges >= 2) {
+        status = serialize_parallel(buf, &whole, nranges, est);
+    } else {
+        status = write_array_start(buf, cfg);
+        if (status == 0) status = write_range(buf, &whole);
+        if (status == 0) status = write_array_end(buf, cfg, whole.need_comma);
+    }
+    if (ts != NULL) PyEval_RestoreThread(ts);
+    return status < 0 ? raise_serialize_error(status) : 0;
+}
+
+/*
+ * Parse the nan=, precision=, significant_digits=, negative_zero=, dtype=
+ * and orient= arguments shared by the ndarray functions
+ */
+static int parse_format_config(PyObject* nan_arg, PyObject* precision_arg,
+                               PyObject* significant_arg, PyObject* negative_zero_arg,
+                               PyObject* dtype_arg, PyObject* orient_arg, FormatConfig* cfg) {
+    if (parse_nan_mode(nan_arg, &cfg->nan_mode) < 0)
+        return -1;
+
+    cfg->fields = NULL;
+    cfg->n_fields = 0;
+    cfg->records = -1;
+    if (orient_arg != NULL && orient_arg != Py_None) {
+        int records = PyUnicode_Check(orient_arg)
+            ? PyUnicode_CompareWithASCIIString(orient_arg, "records") == 0 : 0;
+        int values = PyUnicode_Check(orient_arg)
+            ? PyUnicode_CompareWithASCIIString(orient_arg, "values") == 0 : 0;
+        if (!records && !values) {
+            PyErr_Format(PyExc_ValueError,
+                "orient must be 'records' or 'values', got %R", orient_arg);
+            return -1;
+        }
+        cfg->records = records;
+    }
+
+    cfg->bfloat16 = 0;
+    if (dtype_arg != NULL && dtype_arg != Py_None) {
+        int match = PyUnicode_Check(dtype_arg)
+            ? PyUnicode_CompareWithASCIIString(dtype_arg, "bfloat16") == 0 : 0;
+        if (!match) {
+            PyErr_Format(PyExc_ValueError,
+                "dtype must be None or 'bfloat16', got %R", dtype_arg);
+            return -1;
+        }
+        cfg->bfloat16 = 1;
+    }
+
+    cfg->use_precision = 0;
+    cfg->precision = 0;
+    if (precision_arg != NULL && precision_arg != Py_None) {
+        int precision = (int)PyLong_AsLong(precision_arg);
+        if (precision == -1 && PyErr_Occurred())
+            return -1;
+        if (precision < 0 || precision > 20) {
+            PyErr_SetString(PyExc_ValueError, "precision must be between 0 and 20");
+            return -1;
+        }
+        cfg->use_precision = 1;
+        cfg->precision = precision;
+    }
+
+    cfg->significant_digits = 0;
+    if (significant_arg != NULL && significant_arg != Py_None) {
+        int significant = (int)PyLong_AsLong(significant_arg);
+        if (significant == -1 && PyErr_Occurred())
+            return -1;
+        if (significant < 1 || significant > 17) {
+            PyErr_SetString(PyExc_ValueError, "significant_digits must be between 1 and 17");
+            return -1;
+        }
+        if (cfg->use_precision) {
+            PyErr_SetString(PyExc_ValueError,
+                "precision and significant_digits cannot both be set");
+            return -1;
+        }
+        cfg->significant_digits = significant;
+    }
+
+    cfg->drop_negative_zero = 0;
+    if (negative_zero_arg != NULL && negative_zero_arg != Py_None) {
+        int keep = PyUnicode_Check(negative_zero_arg)
+            ? PyUnicode_CompareWithASCIIString(negative_zero_arg, "keep") == 0 : 0;
+        int drop = PyUnicode_Check(negative_zero_arg)
+            ? PyUnicode_CompareWithASCIIString(negative_zero_arg, "drop") == 0 : 0;
+        if (!keep && !drop) {
+            PyErr_Format(PyExc_ValueError,
+                "negative_zero must be 'keep' or 'drop', got %R", negative_zero_arg);
+            return -1;
+        }
+        cfg->drop_negative_zero = drop;
+    }
+    return 0;
+}
+
+/*
+ * Parse the indent= and separators= arguments of the ndarray functions, as
+ * json.dumps() would apply them to array.tolist(), except that the default
+ * item separator is ',' (compact). On success *owner (possibly NULL) keeps
+ * cfg's strings alive and must be released by the caller.
+ */
+static int parse_layout(PyObject* indent, PyObject* separators, FormatConfig* cfg,
+                        PyObject** owner) {
+    Separators seps;
+    if (!get_supported_separators(separators, indent, &seps, owner)) {
+        PyErr_SetString(PyExc_TypeError,
+            "indent must be None, an int or a str, and separators None or a pair of str");
+        return -1;
+    }
+    if (separators == NULL || separators == Py_None) {
+        cfg->item_sep = ",";
+        cfg->item_sep_len = 1;
+        cfg->key_sep = seps.newline != NULL ? ": " : ":";
+        cfg->key_sep_len = seps.newline != NULL ? 2 : 1;
+    }
+    else {
+        cfg->item_sep = seps.item;
+        cfg->item_sep_len = seps.item_len;
+        cfg->key_sep = seps.key;
+        cfg->key_sep_len = seps.key_len;
+    }
+    cfg->newline = seps.newline;
+    cfg->indent_len = seps.newline_len > 0 ? seps.newline_len - 1 : 0;
+    cfg->base_level = 0;
+    cfg->ascii = seps.ascii;
+    cfg->lines = 0;
+    return 0;
+}
+
+/* parse_layout, and lines=True (NDJSON): one first-axis entry per line */
+static int parse_layout_lines(PyObject* indent, PyObject* separators, int lines,
+                              FormatConfig* cfg, PyObject** owner) {
+    if (lines && indent != Py_None) {
+        PyErr_SetString(PyExc_ValueError, "indent cannot be used with lines=True");
+        return -1;
+    }
+    if (parse_layout(indent, separators, cfg, owner) < 0) return -1;
+    cfg->lines = lines;
+    return 0;
+}
+
+static int check_threads(int threads) {
+    if (threads < 1) {
+        PyErr_Format(PyExc_ValueError, "threads must be at least 1, got %d", threads);
+        return -1;
+    }
+    return 0;
+}
+
+/*
+ * Set the element format of a struct-module type code in cfg (see
+ * parse_element_format) and return its size, or 0 if unsupported
+ */
+static Py_ssize_t parse_element_code(char code, int native_size, int little_endian,
+                                     FormatConfig* cfg) {
+    cfg->swap = little_endian != PY_LITTLE_ENDIAN;
+
+    char kind = 'i';
+    int size;
+    switch (code) {
+    case 'f': kind = 'f'; size = 4; break;
+    case 'd': kind = 'd'; size = 8; break;
+    case 'e': kind = 'e'; size = 2; break;
+    case '?': kind = '?'; size = 1; break;
+    case 'B': kind = 'u'; /* fall through */
+    case 'b': size = 1; break;
+    case 'H': kind = 'u'; /* fall through */
+    case 'h': size = native_size ? (int)sizeof(short) : 2; break;
+    case 'I': kind = 'u'; /* fall through */
+    case 'i': size = native_size ? (int)sizeof(int) : 4; break;
+    case 'L': kind = 'u'; /* fall through */
+    case 'l': size = native_size ? (int)sizeof(long) : 4; break;
+    case 'Q': kind = 'u'; /* fall through */
+    case 'q': size = 8; break;
+    default:
+        return 0;
+    }
+    if (size != 1 && size != 2 && size != 4 && size != 8) return 0;
+    cfg->format = kind;
+    cfg->itemsize = size;
+    return size;
+}
+
+/*
+ * Parse a struct-module element format: an optional byte-order prefix
+ * ('@', '=', '<', '>' or '!') and a type code. Sets cfg->format,
+ * cfg->itemsize and cfg->swap and returns the element size, or 0 if
+ * unsupported. Without a prefix or with '@', integer codes have their
+ * native C sizes; otherwise their standard struct sizes.
+ */
+static Py_ssize_t parse_element_format(const char* format, FormatConfig* cfg) {
+    int little_endian = PY_LITTLE_ENDIAN;
+    int native_size = 1;
+    switch (*format) {
+    case '@':
+        format++;
+        break;
+    case '=':
+        native_size = 0;
+        format++;
+        break;
+    case '<':
+        little_endian = 1;
+        native_size = 0;
+        format++;
+        break;
+    case '>':
+    case '!':
+        little_endian = 0;
+        native_size = 0;
+        format++;
+        break;
+    }
+    if (format[0] == '\0' || format[1] != '\0') return 0;
+    return parse_element_code(format[0], native_size, little_endian, cfg);
+}
+
+/* Result of parse_record_format for formats it does not support */
+#define RECORD_UNSUPPORTED (-2)
+
+/* Apply a byte-order prefix; returns 0 if c is not one */
+static int parse_byte_order(char c, int* little_endian, int* native_size) {
+    switch (c) {
+    case '@':
+        *little_endian = PY_LITTLE_ENDIAN;
+        *native_size = 1;
+        return 1;
+    case '=':
+        *little_endian = PY_LITTLE_ENDIAN;
+        *native_size = 0;
+        return 1;
+    case '<':
+        *little_endian = 1;
+        *native_size = 0;
+        return 1;
+    case '>':
+    case '!':
+        *little_endian = 0;
+        *native_size = 0;
+        return 1;
+    default:
+        return 0;
+    }
+}
+
+/* "\"name\"" escaped like json.dumps() (ASCII), then the key separator */
+static int build_json_key(PyObject* name, const FormatConfig* cfg, char** key,
+                          Py_ssize_t* key_len) {
+    Buffer out;
+    int rc = buffer_init(&out, (size_t)PyUnicode_GET_LENGTH(name) + 8);
+    if (rc == 0) rc = buffer_append_json_string(&out, name, 1);
+    if (rc == 0) rc = buffer_append(&out, cfg->key_sep, (size_t)cfg->key_sep_len);
+    if (rc < 0) {
+        buffer_free(&out);
+        if (!PyErr_Occurred()) PyErr_NoMemory();
+        return -1;
+    }
+    *key = out.data;
+    *key_len = (Py_ssize_t)out.size;
+    return 0;
+}
+
+static int build_record_key(RecordField* f, const char* name, Py_ssize_t len,
+                            const FormatConfig* cfg) {
+    PyObject* s = PyUnicode_DecodeUTF8(name, len, "strict");
+    if (s == NULL) return -1;
+    int rc = build_json_key(s, cfg, &f->key, &f->key_len);
+    Py_DECREF(s);
+    return rc;
+}
+
+/*
+ * A struct repeated in a subarray field: numpy leaves the struct's trailing
+ * padding out of the format (while the padding after the field is written
+ * out), so "(2)T{d:a:B:b:}" is the same for packed and aligned dtypes. When
+ * the field spans enough bytes for C-aligned elements, they are that far
+ * apart. Returns 0 if span cannot tell.
+ */
+static int resolve_record_stride(RecordField* f, Py_ssize_t align, Py_ssize_t span) {
+    Py_ssize_t aligned = (f->item_size + align - 1) / align * align;
+    if (f->count == 0 || aligned == f->item_size) return 1;
+    if (span < 0) return 0;
+    if (span / f->count >= aligned) f->item_size = aligned;
+    return 1;
+}
+
+/*
+ * Parse the fields of a struct format "T{...}" from just after its "T{" up
+ * to the closing "}" into cfg->fields; *format is left past the "}". Fields
+ * inherit cfg's options. Numeric and bool fields, subarray fields "(2,3)f",
+ * nested structs and padding "4x" are supported; numpy spells out padding
+ * between fields but not after the last one. The byte order in
+ * *little_endian and *native_size runs on across nested structs, as numpy
+ * writes it. size is the struct's size if known, else -1. *alignment
+ * receives the C alignment of an all-native struct, else 1. Returns the
+ * size the format describes, -1 with an exception set, or
+ * RECORD_UNSUPPORTED.
+ */
+static Py_ssize_t parse_record_format(const char** format, FormatConfig* cfg, Py_ssize_t size,
+                                      int* little_endian, int* native_size,
+                                      Py_ssize_t* alignment) {
+    const char* p = *format;
+    FormatConfig base = *cfg;
+    Py_ssize_t offset = 0;
+    Py_ssize_t max_align = 1;
+    int all_native = *native_size;
+    int pending = -1;  /* field whose stride waits for the next offset */
+    Py_ssize_t pending_align = 1;
+    int capacity = 0;
+    Py_ssize_t rc = RECORD_UNSUPPORTED;
+
+    base.format = FORMAT_RECORD;
+    base.itemsize = 0;
+    base.swap = 0;
+    base.float16_reprs = NULL;
+    base.fields = NULL;
+    base.n_fields = 0;
+    *cfg = base;
+
+    while (*p != '}') {
+        if (*p == '\0') goto error;
+        if (parse_byte_order(*p, little_endian, native_size)) {
+            p++;
+            all_native &= *native_size;
+            continue;
+        }
+
+        RecordField field;
+        memset(&field, 0, sizeof(field));
+        field.cfg = base;
+        Py_ssize_t repeat = 1;
+        if (Py_ISDIGIT(*p)) {
+            repeat = 0;
+            while (Py_ISDIGIT(*p) && repeat < PY_SSIZE_T_MAX / 10)
+                repeat = repeat * 10 + (*p++ - '0');
+        }
+        if (*p == 'x') {
+            /* Padding (unnamed) */
+            p++;
+            if (*p == ':') goto error;
+            offset += repeat;
+            continue;
+        }
+        if (*p == '(') {
+            do {
+                p++;
+                Py_ssize_t dim = 0;
+                if (!Py_ISDIGIT(*p) || field.ndim == PyBUF_MAX_NDIM) goto error;
+                while (Py_ISDIGIT(*p) && dim < PY_SSIZE_T_MAX / 10)
+                    dim = dim * 10 + (*p++ - '0');
+                field.shape[field.ndim++] = dim;
+            } while (*p == ',');
+            if (*p++ != ')') goto error;
+            /* numpy writes the byte order after the shape: "(3)<f" */
+            if (parse_byte_order(*p, little_endian, native_size)) {
+                p++;
+                all_native &= *native_size;
+            }
+        }
+        if (repeat != 1) {
+            if (field.ndim > 0) goto error;
+            field.shape[field.ndim++] = repeat;
+        }
+
+        Py_ssize_t field_align;
+        int nested = p[0] == 'T' && p[1] == '{';
+        if (nested) {
+            p += 2;
+            field.item_size = parse_record_format(&p, &field.cfg, -1, little_endian,
+                                                  native_size, &field_align);
+            all_native &= *native_size;
+        }
+        else {
+            field.item_size = parse_element_code(*p++, *native_size, *little_endian,
+                                                 &field.cfg);
+            if (field.item_size == 0) field.item_size = RECORD_UNSUPPORTED;
+            field_align = field.item_size;
+        }
+        if (field.item_size < 0) {
+            rc = field.item_size;
+            goto error;
+        }
+        if (field_align > max_align) max_align = field_align;
+
+        const char* name = p + 1;
+        const char* end = *p == ':' ? strchr(name, ':') : NULL;
+        if (end == NULL) {
+            format_config_clear(&field.cfg);
+            goto error;
+        }
+        p = end + 1;
+
+        field.count = 1;
+        for (int d = 0; d < field.ndim; d++) field.count *= field.shape[d];
+        if (pending >= 0) {
+            RecordField* prev = &cfg->fields[pending];
+            resolve_record_stride(prev, pending_align, offset - prev->offset);
+            pending = -1;
+        }
+        if (nested && field.ndim > 0) {
+            pending = cfg->n_fields;
+            pending_align = field_align;
+        }
+        field.offset = offset;
+        offset += field.item_size * field.count;
+
+        if (cfg->n_fields == capacity) {
+            capacity = capacity ? capacity * 2 : 8;
+            RecordField* fields = (RecordField*)PyMem_RawRealloc(
+                cfg->fields, (size_t)capacity * sizeof(RecordField));
+            if (fields == NULL) {
+                PyErr_NoMemory();
+                format_config_clear(&field.cfg);
+                rc = -1;
+                goto error;
+            }
+            cfg->fields = fields;
+        }
+        if (build_record_key(&field, name, end - name, cfg) < 0) {
+            format_config_clear(&field.cfg);
+            rc = -1;
+            goto error;
+        }
+        cfg->fields[cfg->n_fields++] = field;
+    }
+    if (pending >= 0) {
+        RecordField* last = &cfg->fields[pending];
+        if (!resolve_record_stride(last, pending_align, size < 0 ? -1 : size - last->offset))
+            goto error;
+    }
+    *format = p + 1;
+    *alignment = all_native ? max_align : 1;
+    return offset;
+
+error:
+    format_config_clear(cfg);
+    return rc;
+}
+
+/*
+ * Acquire and validate the buffer of array_obj, of any shape and strides;
+ * sets the element (or record) format in cfg. On success the caller must
+ * release_ndarray_view(view, cfg).
+ */
+static int get_ndarray_view(ModuleState* st, PyObject* array_obj, Py_buffer* view,
+                            FormatConfig* cfg) {
+    if (PyObject_GetBuffer(array_obj, view, PyBUF_STRIDES | PyBUF_FORMAT) < 0)
+        return -1;
+
+    if (view->ndim > PyBUF_MAX_NDIM) {
+        PyErr_Format(PyExc_ValueError,
+            "at most %d dimensions are supported, got %d", PyBUF_MAX_NDIM, view->ndim);
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    /* orient='records' is the default for structured dtypes */
+    int records_given = cfg->records == 1;
+    if (cfg->records < 0) cfg->records = 1;
+    Py_ssize_t itemsize = RECORD_UNSUPPORTED;
+    if (view->format != NULL && view->format[0] == 'T' && view->format[1] == '{') {
+        const char* p = view->format + 2;
+        int little_endian = PY_LITTLE_ENDIAN;
+        int native_size = 1;
+        Py_ssize_t alignment;
+        itemsize = parse_record_format(&p, cfg, view->itemsize, &little_endian, &native_size,
+                                       &alignment);
+        if (itemsize == -1) {
+            PyBuffer_Release(view);
+            return -1;
+        }
+        if (itemsize >= 0 && (*p != '\0' || itemsize > view->itemsize)) {
+            /* Trailing data, or more fields than fit in an item */
+            format_config_clear(cfg);
+            itemsize = RECORD_UNSUPPORTED;
+        }
+        else if (itemsize >= 0) {
+            itemsize = view->itemsize;  /* with any trailing padding */
+        }
+    }
+    else if (view->format != NULL) {
+        itemsize = parse_element_format(view->format, cfg);
+        if (itemsize == 0) itemsize = RECORD_UNSUPPORTED;
+    }
+    if (itemsize == RECORD_UNSUPPORTED) {
+        PyErr_Format(PyExc_TypeError,
+            "only float32 ('f'), float64 ('d'), float16 ('e'), integer and bool dtypes, "
+            "and structured dtypes of them, are supported, got '%s'",
+            view->format ? view->format : "(null)");
+        PyBuffer_Release(view);
+        return -1;
+    }
+    if (records_given && cfg->format != FORMAT_RECORD) {
+        PyErr_SetString(PyExc_ValueError, "orient='records' needs a structured dtype");
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    if (cfg->bfloat16) {
+        if (itemsize != 2 || cfg->format == '?' || cfg->format == FORMAT_RECORD) {
+            PyErr_Format(PyExc_TypeError,
+                "dtype='bfloat16' needs 16-bit elements ('e', 'h' or 'H'), got '%s'",
+                view->format);
+            format_config_clear(cfg);
+            PyBuffer_Release(view);
+            return -1;
+        }
+        cfg->format = 'b';
+    }
+
+    cfg->float16_reprs = NULL;
+    if ((cfg->format == 'e' || cfg->format == 'b') && !cfg->use_precision
+        && view->len / itemsize >= FLOAT16_TABLE_MIN_ELEMENTS) {
+        cfg->float16_reprs = float16_repr_table(st, cfg->format);
+    }
+
+    if (view->itemsize != itemsize) {
+        format_config_clear(cfg);
+        PyBuffer_Release(view);
+        PyErr_SetString(PyExc_RuntimeError, "itemsize mismatch");
+        return -1;
+    }
+    return 0;
+}
+
+static void release_ndarray_view(Py_buffer* view, FormatConfig* cfg) {
+    format_config_clear(cfg);
+    PyBuffer_Release(view);
+}
+
+/*
+ * dumps(native_arrays=True): a buffer-protocol object in the document,
+ * written by the ndarray formatter with the document's separators, indent
+ * and allow_nan, as json.dumps(obj.tolist()) would lay it out
+ */
+static int encode_native_array(EncoderState* st, PyObject* obj) {
+    FormatConfig cfg;
+    memset(&cfg, 0, sizeof(cfg));
+    cfg.nan_mode = st->allow_nan ? NAN_LITERAL : NAN_RAISE;
+    cfg.item_sep = st->seps.item;
+    cfg.item_sep_len = st->seps.item_len;
+    cfg.newline = st->seps.newline;
+    cfg.indent_len = st->seps.newline_len > 0 ? st->seps.newline_len - 1 : 0;
+    cfg.base_level = (int)st->depth;
+    cfg.key_sep = st->seps.key;
+    cfg.key_sep_len = st->seps.key_len;
+    cfg.ascii = st->seps.ascii;
+
+    Py_buffer view;
+    if (get_ndarray_view(st->arrays, obj, &view, &cfg) < 0)
+        return -1;
+    int rc = serialize_ndarray(st->buf, &view, &cfg, LOAD_INT(&parallel_workers));
+    release_ndarray_view(&view, &cfg);
+    return rc;
+}
+
+/* default= of the json.dumps() fallback with native_arrays=True */
+static PyObject* array_to_list(PyObject* module, PyObject* obj) {
+    if (!PyObject_CheckBuffer(obj) || PyBytes_Check(obj) || PyByteArray_Check(obj)) {
+        PyErr_Format(PyExc_TypeError, "Object of type %.200s is not JSON serializable",
+                     Py_TYPE(obj)->tp_name);
+        return NULL;
+    }
+    /* numpy arrays and scalars, array.array, memoryview */
+    PyObject* list = PyObject_CallMethod(obj, "tolist", NULL);
+    if (list != NULL || !PyErr_ExceptionMatches(PyExc_AttributeError))
+        return list;
+    PyErr_Clear();
+    PyObject* view = PyMemoryView_FromObject(obj);
+    if (view == NULL)
+        return NULL;
+    list = PyObject_CallMethod(view, "tolist", NULL);
+    Py_DECREF(view);
+    return list;
+}
+
+static PyMethodDef array_to_list_def = {
+    "_array_to_list", (PyCFunction)array_to_list, METH_O,
+    "Convert a buffer-protocol array to nested lists (native_arrays fallback)."
+};
+
+/* default() of a cls= encoder in that fallback: arrays become lists, other
+   objects go to the encoder's own default(), bound as `encoder_default` */
+static PyObject* array_then_default(PyObject* encoder_default, PyObject* obj) {
+    if (!PyObject_CheckBuffer(obj) || PyBytes_Check(obj) || PyByteArray_Check(obj))
+        return PyObject_CallOneArg(encoder_default, obj);
+    return array_to_list(NULL, obj);
+}
+
+static PyMethodDef array_then_default_def = {
+    "default", (PyCFunction)array_then_default, METH_O,
+    "Convert buffer-protocol arrays to lists, then defer to the encoder's default()."
+};
+
+/* cls(*args, **kwargs) with its default() wrapped by array_then_default() */
+static PyObject* make_array_encoder(PyObject* cls, PyObject* args, PyObject* kwargs) {
+    PyObject* encoder = PyObject_Call(cls, args, kwargs);
+    if (encoder == NULL)
+        return NULL;
+    PyObject* own_default = PyObject_GetAttrString(encoder, "default");
+    PyObject* wrapped = own_default == NULL
+        ? NULL : PyCFunction_New(&array_then_default_def, own_default);
+    Py_XDECREF(own_default);
+    if (wrapped == NULL || PyObject_SetAttrString(encoder, "default", wrapped) < 0) {
+        Py_XDECREF(wrapped);
+        Py_DECREF(encoder);
+        return NULL;
+    }
+    Py_DECREF(wrapped);
+    return encoder;
+}
+
+static PyMethodDef make_array_encoder_def = {
+    "_array_encoder", (PyCFunction)make_array_encoder,
+    METH_VARARGS | METH_KEYWORDS,
+    "cls(**kw) for the native_arrays fallback, converting arrays before its default()."
+};
+
+/* Stand-in for cls= in the native_arrays fallback when the caller gave a cls */
+static PyObject* array_encoder_class(PyObject* cls) {
+    return PyCFunction_New(&make_array_encoder_def, cls);
+}
+
+static PyObject*
+py_dumps_ndarray(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    PyObject* array_obj;
+    PyObject* nan_arg = NULL;
+    PyObject* precision_arg = NULL;
+    PyObject* significant_arg = NULL;
+    PyObject* negative_zero_arg = NULL;
+    PyObject* output_arg = NULL;
+    PyObject* indent = Py_None;
+    PyObject* separators = Py_None;
+    PyObject* dtype_arg = NULL;
+    PyObject* orient_arg = NULL;
+    int threads = 1;
+    int lines = 0;
+
+    static char* kwlist[] = {"array", "nan", "precision", "significant_digits",
+                             "negative_zero", "output", "threads", "indent", "separators",
+                             "dtype", "orient", "lines", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|$OOOOOiOOOOp", kwlist,
+                                     &array_obj, &nan_arg, &precision_arg, &significant_arg,
+                                     &negative_zero_arg, &output_arg, &threads, &indent,
+                                     &separators, &dtype_arg, &orient_arg, &lines))
+        return NULL;
+
+    if (check_threads(threads) < 0)
+        return NULL;
+
+    FormatConfig cfg;
+    if (parse_format_config(nan_arg, precision_arg, significant_arg, negative_zero_arg,
+                            dtype_arg, orient_arg, &cfg) < 0)
+        return NULL;
+
+    OutputMode output;
+    if (parse_output_mode(output_arg, &output) < 0)
+        return NULL;
+
+    PyObject* layout_owner;
+    if (parse_layout_lines(indent, separators, lines, &cfg, &layout_owner) < 0)
+        return NULL;
+
+    Py_buffer view;
+    if (get_ndarray_view(get_module_state(self), array_obj, &view, &cfg) < 0) {
+        Py_XDECREF(layout_owner);
+        return NULL;
+    }
+
+    /* A JSONBuffer takes the output block, so it never comes from the arena */
+    Buffer buf;
+    ModuleState* st = get_module_state(self);
+    int rc = output == OUTPUT_BUFFER ? buffer_init(&buf, 256) : buffer_init_pooled(st, &buf, 256);
+    if (rc < 0) {
+        release_ndarray_view(&view, &cfg);
+        Py_XDECREF(layout_owner);
+        return PyErr_NoMemory();
+    }
+
+    rc = serialize_ndarray(&buf, &view, &cfg, threads);
+    release_ndarray_view(&view, &cfg);
+    Py_XDECREF(layout_owner);
+    if (rc < 0) {
+        buffer_free(&buf);
+        return NULL;
+    }
+    return buffer_finish(st, &buf, output, cfg.ascii, 0);
+}
+
+static PyObject*
+py_dump_ndarray(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    PyObject* array_obj;
+    PyObject* write;
+    int fd = -1;
+    int binary = 0;
+    PyObject* nan_arg = NULL;
+    PyObject* precision_arg = NULL;
+    PyObject* significant_arg = NULL;
+    PyObject* negative_zero_arg = NULL;
+    PyObject* indent = Py_None;
+    PyObject* separators = Py_None;
+    PyObject* dtype_arg = NULL;
+    PyObject* orient_arg = NULL;
+    int lines = 0;
+    Py_ssize_t chunk_size = DEFAULT_CHUNK_SIZE;
+
+    static char* kwlist[] = {"array", "write", "fd", "binary", "nan", "precision",
+                             "significant_digits", "negative_zero", "indent", "separators",
+                             "dtype", "orient", "lines", "chunk_size", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|$ipOOOOOOOOpn", kwlist,
+                                     &array_obj, &write, &fd, &binary, &nan_arg,
+                                     &precision_arg, &significant_arg, &negative_zero_arg,
+                                     &indent, &separators, &dtype_arg, &orient_arg, &lines,
+                                     &chunk_size))
+        return NULL;
+
+    FormatConfig cfg;
+    if (parse_format_config(nan_arg, precision_arg, significant_arg, negative_zero_arg,
+                            dtype_arg, orient_arg, &cfg) < 0)
+        return NULL;
+
+    PyObject* layout_owner;
+    if (parse_layout_lines(indent, separators, lines, &cfg, &layout_owner) < 0)
+        return NULL;
+
+    Py_buffer view;
+    if (get_ndarray_view(get_module_state(self), array_obj, &view, &cfg) < 0) {
+        Py_XDECREF(layout_owner);
+        return NULL;
+    }
+
+    StreamSink sink;
+    Buffer buf;
+    sink.binary = binary;
+    sink.ascii_only = cfg.ascii;
+    if (stream_init(&buf, &sink, write, fd, chunk_size) < 0) {
+        release_ndarray_view(&view, &cfg);
+        Py_XDECREF(layout_owner);
+        return NULL;
+    }
+
+    int rc = serialize_ndarray(&buf, &view, &cfg, 1);
+    if (rc == 0) {
+        rc = stream_finish(&buf);
+    }
+    release_ndarray_view(&view, &cfg);
+    Py_XDECREF(layout_owner);
+    buffer_free(&buf);
+    if (rc < 0) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject*
+py_dumps_ndarray_into(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    PyObject* array_obj;
+    PyObject* target;
+    Py_ssize_t offset = 0;
+    PyObject* nan_arg = NULL;
+    PyObject* precision_arg = NULL;
+    PyObject* significant_arg = NULL;
+    PyObject* negative_zero_arg = NULL;
+    PyObject* indent = Py_None;
+    PyObject* separators = Py_None;
+    PyObject* dtype_arg = NULL;
+    PyObject* orient_arg = NULL;
+    int threads = 1;
+
+    static char* kwlist[] = {"array", "target", "offset", "nan", "precision",
+                             "significant_digits", "negative_zero", "threads", "indent",
+                             "separators", "dtype", "orient", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|n$OOOOiOOOO", kwlist,
+                                     &array_obj, &target, &offset, &nan_arg, &precision_arg,
+                                     &significant_arg, &negative_zero_arg, &threads, &indent,
+                                     &separators, &dtype_arg, &orient_arg))
+        return NULL;
+
+    if (check_threads(threads) < 0)
+        return NULL;
+
+    FormatConfig cfg;
+    if (parse_format_config(nan_arg, precision_arg, significant_arg, negative_zero_arg,
+                            dtype_arg, orient_arg, &cfg) < 0)
+        return NULL;
+
+    PyObject* layout_owner;
+    if (parse_layout(indent, separators, &cfg, &layout_owner) < 0)
+        return NULL;
+
+    Py_buffer view;
+    if (get_ndarray_view(get_module_state(self), array_obj, &view, &cfg) < 0) {
+        Py_XDECREF(layout_owner);
+        return NULL;
+    }
+
+    Py_buffer target_view;
+    if (get_target_view(target, offset, &target_view) < 0) {
+        release_ndarray_view(&view, &cfg);
+        Py_XDECREF(layout_owner);
+        return NULL;
+    }
+
+    Buffer buf;
+    buffer_init_target(&buf, &target_view, offset);
+    PyObject* result = NULL;
+    if (serialize_ndarray(&buf, &view, &cfg, threads) == 0) {
+        result = buffer_finish_target(get_module_state(self), &buf, &target_view, offset, 0);
+    } else {
+        buffer_free(&buf);
+    }
+    PyBuffer_Release(&target_view);
+    release_ndarray_view(&view, &cfg);
+    Py_XDECREF(layout_owner);
+    return result;
+}
+
+/* ======================================================================
+ * Chunked output: iterencode() and iterencode_ndarray()
+ *
+ * An iterator that keeps the encoder's position between next() calls and
+ * formats just past chunk_size bytes each time, so the output is produced
+ * in fixed-size str or bytes chunks with O(chunk_size) memory. Documents
+ * keep a stack of the containers being written (ChunkFrame); arrays keep
+ * the next first-axis index.
+ * ====================================================================== */
+
+typedef enum {
+    FRAME_SEQUENCE,  /* list or tuple */
+    FRAME_DICT,      /* exact dict, walked with PyDict_Next */
+    FRAME_ITEMS,     /* dict items() list: sort_keys or dict subclasses */
+} FrameKind;
+
+typedef struct {
+    FrameKind kind;
+    PyObject* container;  /* the list, tuple or dict (also the circular marker) */
+    PyObject* items;      /* FRAME_ITEMS only */
+    Py_ssize_t index;     /* items written */
+    Py_ssize_t pos;       /* FRAME_DICT: PyDict_Next position */
+    Py_ssize_t size;      /* FRAME_DICT: size when started */
+} ChunkFrame;
+
+/* Containers nested deeper than this are written whole by the recursive encoder */
+#define CHUNK_MAX_FRAMES 64
+
+typedef struct {
+    PyObject_HEAD
+    Buffer buf;
+    Py_ssize_t chunk_size;
+    int binary;      /* yield bytes instead of str */
+    int ascii_only;  /* str chunks: the output is pure ASCII */
+    int started;
+    int done;        /* everything has been formatted into buf */
+    size_t emitted;  /* str chars or bytes yielded so far */
+    Py_ssize_t fallback_at;  /* -1, or where the json module must take over */
+    int is_array;
+    /* Documents */
+    PyObject* obj;
+    EncoderState enc;
+    PyObject* seps_owner;
+    ChunkFrame frames[CHUNK_MAX_FRAMES];
+    int n_frames;
+    /* Arrays */
+    Py_buffer view;
+    FormatConfig cfg;
+    PyObject* layout_owner;
+    NdarrayRange range;
+    Py_ssize_t c_strides[PyBUF_MAX_NDIM];
+    Py_ssize_t row_elements;  /* elements per first-axis entry */
+    Py_ssize_t rows_per_step;
+} ChunkIteratorObject;
+
+static ChunkIteratorObject* chunk_iterator_new(ModuleState* st, Py_ssize_t chunk_size,
+                                               PyObject* output_arg) {
+    OutputMode output;
+    if (parse_output_mode(output_arg, &output) < 0)
+        return NULL;
+    if (output == OUTPUT_BUFFER) {
+        PyErr_SetString(PyExc_ValueError, "output must be 'str' or 'bytes' for chunks");
+        return NULL;
+    }
+    if (chunk_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "chunk_size must be positive");
+        return NULL;
+    }
+    ChunkIteratorObject* self = PyObject_GC_New(ChunkIteratorObject, st->chunk_iterator_type);
+    if (self == NULL)
+        return NULL;
+    /* Everything after the header starts out zero (no references, no view) */
+    memset((char*)self + sizeof(PyObject), 0, sizeof(ChunkIteratorObject) - sizeof(PyObject));
+    self->chunk_size = chunk_size;
+    self->binary = output == OUTPUT_BYTES;
+    self->fallback_at = -1;
+    /* A chunk and the last entry written past it */
+    if (buffer_init(&self->buf, (size_t)chunk_size + 1024) < 0) {
+        Py_DECREF(self);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    PyObject_GC_Track(self);
+    return self;
+}
+
+/* Circular check for a container written across chunks (no C recursion) */
+static int chunk_frame_enter(EncoderState* st, PyObject* container) {
+    if (!st->check_circular) return 0;
+    /* Borrow encoder_enter's checks, without keeping its recursion count */
+    if (encoder_enter(st, container) < 0) return -1;
+    Py_LeaveRecursiveCall();
+    return 0;
+}
+
+/* Write the opening bracket of a non-empty container and start a frame for it */
+static int chunk_push_frame(ChunkIteratorObject* self, PyObject* container) {
+    EncoderState* st = &self->enc;
+    ChunkFrame* f = &self->frames[self->n_frames];
+    memset(f, 0, sizeof(*f));
+    if (chunk_frame_enter(st, container) < 0) return -1;
+    if (PyDict_Check(container)) {
+        if (PyDict_CheckExact(container) && !st->sort_keys) {
+            f->kind = FRAME_DICT;
+            f->size = PyDict_GET_SIZE(container);
+        }
+        else {
+            /* Like json: sorted(dct.items()), and items() of subclasses */
+            f->kind = FRAME_ITEMS;
+            f->items = PyMapping_Items(container);
+            if (f->items == NULL || (st->sort_keys && PyList_Sort(f->items) < 0)) goto error;
+        }
+    }
+    else {
+        f->kind = FRAME_SEQUENCE;
+    }
+    if (buffer_append_char(&self->buf, f->kind == FRAME_SEQUENCE ? '[' : '{') < 0) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    f->container = Py_NewRef(container);
+    self->n_frames++;
+    return 0;
+
+error:
+    Py_CLEAR(f->items);
+    if (st->check_circular) st->n_markers--;
+    return -1;
+}
+
+static void chunk_pop_frame(ChunkIteratorObject* self) {
+    ChunkFrame* f = &self->frames[--self->n_frames];
+    Py_CLEAR(f->container);
+    Py_CLEAR(f->items);
+    if (self->enc.check_circular) self->enc.n_markers--;
+}
+
+/* A value inside the top frame (or the document itself): non-empty containers
+   get a frame of their own, anything else is written whole */
+static int chunk_encode_value(ChunkIteratorObject* self, PyObject* value) {
+    if (self->n_frames < CHUNK_MAX_FRAMES) {
+        /* list and tuple subclasses are written whole, through their __iter__ */
+        if (((PyList_CheckExact(value) || PyTuple_CheckExact(value))
+             && PySequence_Fast_GET_SIZE(value) > 0)
+            || (PyDict_Check(value) && PyDict_GET_SIZE(value) > 0)) {
+            return chunk_push_frame(self, value);
+        }
+    }
+    self->enc.depth = self->n_frames;
+    return encoder_encode_obj(&self->enc, value);
+}
+
+/*
+ * The next item of the top frame: writes its separator (and key), and sets
+ * *value to a new reference. Returns 0 when the container is exhausted.
+ */
+static int chunk_frame_next(ChunkIteratorObject* self, ChunkFrame* f, PyObject** value) {
+    EncoderState* st = &self->enc;
+    PyObject* key;
+    switch (f->kind) {
+    case FRAME_SEQUENCE:
+        if (f->index >= PySequence_Fast_GET_SIZE(f->container)) return 0;
+        *value = Py_NewRef(PySequence_Fast_GET_ITEM(f->container, f->index));
+        return encoder_item_prefix(st, f->index++) < 0 ? -1 : 1;
+    case FRAME_DICT:
+        if (PyDict_GET_SIZE(f->container) != f->size) {
+            PyErr_SetString(PyExc_RuntimeError, "dictionary changed size during iteration");
+            return -1;
+        }
+        if (!PyDict_Next(f->container, &f->pos, &key, value)) return 0;
+        break;
+    case FRAME_ITEMS: {
+        if (f->index >= PyList_GET_SIZE(f->items)) return 0;
+        PyObject* item = PyList_GET_ITEM(f->items, f->index);
+        if (!PyTuple_Check(item) || PyTuple_GET_SIZE(item) != 2) {
+            PyErr_SetString(PyExc_ValueError, "items must return 2-tuples");
+            return -1;
+        }
+        key = PyTuple_GET_ITEM(item, 0);
+        *value = PyTuple_GET_ITEM(item, 1);
+        break;
+    }
+    }
+    Py_INCREF(key);
+    Py_INCREF(*value);
+    int rc = encoder_encode_item_key(st, f->index++, key);
+    Py_DECREF(key);
+    if (rc < 0) {
+        Py_CLEAR(*value);
+        return -1;
+    }
+    return 1;
+}
+
+/* Format the document until buf holds at least a chunk (or all of it) */
+static int chunk_fill_document(ChunkIteratorObject* self) {
+    Buffer* buf = &self->buf;
+    EncoderState* st = &self->enc;
+    if (!self->started) {
+        self->started = 1;
+        if (chunk_encode_value(self, self->obj) < 0) return -1;
+    }
+    while (buf->size < (size_t)self->chunk_size) {
+        if (self->n_frames == 0) {
+            self->done = 1;
+            return 0;
+        }
+        ChunkFrame* f = &self->frames[self->n_frames - 1];
+        st->depth = self->n_frames;
+        if (f->kind == FRAME_SEQUENCE) {
+            /* Runs of floats without a round trip through chunk_frame_next */
+            PyObject* seq = f->container;
+            while (buf->size < (size_t)self->chunk_size
+                   && f->index < PySequence_Fast_GET_SIZE(seq)
+                   && PyFloat_CheckExact(PySequence_Fast_GET_ITEM(seq, f->index))) {
+                double x = PyFloat_AS_DOUBLE(PySequence_Fast_GET_ITEM(seq, f->index));
+                if (encoder_item_prefix(st, f->index++) < 0
+                    || buffer_append_double_json(buf, x, st->allow_nan) < 0) return -1;
+            }
+            if (buf->size >= (size_t)self->chunk_size) break;
+        }
+        PyObject* value;
+        int rc = chunk_frame_next(self, f, &value);
+        if (rc < 0) return -1;
+        if (rc == 0) {
+            if (encoder_close(st, f->kind == FRAME_SEQUENCE ? ']' : '}') < 0) return -1;
+            chunk_pop_frame(self);
+            continue;
+        }
+        rc = chunk_encode_value(self, value);
+        Py_DECREF(value);
+        if (rc < 0) return -1;
+    }
+    return 0;
+}
+
+/* Format array entries until buf holds at least a chunk (or all of them) */
+static int chunk_fill_array(ChunkIteratorObject* self) {
+    Buffer* buf = &self->buf;
+    NdarrayRange* r = &self->range;
+    const FormatConfig* cfg = &self->cfg;
+    int status = 0;
+    if (!self->started) {
+        self->started = 1;
+        if (self->view.ndim == 0) {
+            self->done = 1;
+            return serialize_ndarray(buf, &self->view, cfg, 1);
+        }
+        status = write_array_start(buf, cfg);
+    }
+    Py_ssize_t rows = self->view.shape[0];
+    while (status == 0 && buf->size < (size_t)self->chunk_size && r->end < rows) {
+        r->start = r->end;
+        r->end = r->start + self->rows_per_step < rows ? r->start + self->rows_per_step : rows;
+        PyThreadState* ts = NULL;
+        if ((r->end - r->start) * self->row_elements >= NOGIL_MIN_ELEMENTS)
+            ts = PyEval_SaveThread();
+        status = write_range(buf, r);
+        if (ts != NULL) PyEval_RestoreThread(ts);
+    }
+    if (status == 0 && r->end >= rows) {
+        status = write_array_end(buf, cfg, r->need_comma);
+        self->done = 1;
+    }
+    return status < 0 ? raise_serialize_error(status) : 0;
+}
+
+/* Length of the UTF-8 sequence starting with lead byte c */
+static size_t utf8_sequence_length(unsigned char c) {
+    return c >= 0xF0 ? 4 : c >= 0xE0 ? 3 : c >= 0xC0 ? 2 : 1;
+}
+
+/* The next chunk: up to chunk_size bytes of buf, not splitting a character in str chunks */
+static PyObject* chunk_take(ChunkIteratorObject* self) {
+    Buffer* buf = &self->buf;
+    size_t n = buf->size < (size_t)self->chunk_size ? buf->size : (size_t)self->chunk_size;
+    PyObject* chunk;
+    size_t units;
+    if (self->binary) {
+        chunk = PyBytes_FromStringAndSize(buf->data, (Py_ssize_t)n);
+        units = n;
+    }
+    else if (self->ascii_only) {
+        chunk = PyUnicode_New((Py_ssize_t)n, 127);
+        if (chunk != NULL) memcpy(PyUnicode_1BYTE_DATA(chunk), buf->data, n);
+        units = n;
+    }
+    else {
+        size_t complete = utf8_complete_prefix(buf->data, n);
+        if (complete == 0) {
+            /* chunk_size is shorter than the first character */
+            complete = utf8_sequence_length((unsigned char)buf->data[0]);
+            if (complete > buf->size) complete = buf->size;
+        }
+        n = complete;
+        chunk = PyUnicode_DecodeUTF8(buf->data, (Py_ssize_t)n, "surrogatepass");
+        units = chunk == NULL ? 0 : (size_t)PyUnicode_GET_LENGTH(chunk);
+    }
+    if (chunk == NULL) return NULL;
+    memmove(buf->data, buf->data + n, buf->size - n);
+    buf->size -= n;
+    self->emitted += units;
+    return chunk;
+}
+
+static PyObject* chunk_iterator_next(ChunkIteratorObject* self) {
+    Buffer* buf = &self->buf;
+    if (!self->done && buf->size < (size_t)self->chunk_size) {
+        int rc = self->is_array ? chunk_fill_array(self) : chunk_fill_document(self);
+        if (rc == 0 && self->binary && self->enc.has_surrogates) {
+            /* dumps(...).encode() raises for lone surrogates: json produces that */
+            PyErr_SetString(PyExc_UnicodeError, "surrogates not allowed");
+            rc = -1;
+        }
+        if (rc < 0) {
+            self->done = 1;
+            buf->size = 0;
+            if (self->is_array) return NULL;
+            /* The json module writes the rest and raises its own exception */
+            PyErr_Clear();
+            self->fallback_at = (Py_ssize_t)self->emitted;
+            return NULL;
+        }
+    }
+    if (buf->size == 0) return NULL;
+    return chunk_take(self);
+}
+
+static int chunk_iterator_traverse(ChunkIteratorObject* self, visitproc visit, void* arg) {
+    Py_VISIT(Py_TYPE(self));
+    Py_VISIT(self->obj);
+    for (int i = 0; i < self->n_frames; i++) {
+        Py_VISIT(self->frames[i].container);
+        Py_VISIT(self->frames[i].items);
+    }
+    Py_VISIT(self->view.obj);
+    return 0;
+}
+
+static int chunk_iterator_clear(ChunkIteratorObject* self) {
+    while (self->n_frames > 0) {
+        chunk_pop_frame(self);
+    }
+    Py_CLEAR(self->obj);
+    Py_CLEAR(self->seps_owner);
+    if (self->view.obj != NULL) {
+        release_ndarray_view(&self->view, &self->cfg);
+    }
+    Py_CLEAR(self->layout_owner);
+    return 0;
+}
+
+static void chunk_iterator_dealloc(ChunkIteratorObject* self) {
+    PyTypeObject* type = Py_TYPE(self);
+    PyObject_GC_UnTrack(self);
+    chunk_iterator_clear(self);
+    encoder_state_free(&self->enc);
+    if (self->buf.data != NULL) buffer_free(&self->buf);
+    PyObject_GC_Del(self);
+    Py_DECREF(type);
+}
+
+static PyObject* chunk_iterator_get_fallback_at(ChunkIteratorObject* self,
+                                                void* Py_UNUSED(closure)) {
+    if (self->fallback_at < 0) Py_RETURN_NONE;
+    return PyLong_FromSsize_t(self->fallback_at);
+}
+
+static PyGetSetDef chunk_iterator_getset[] = {
+    {"fallback_at", (getter)chunk_iterator_get_fallback_at, NULL,
+     "None, or the number of str characters (bytes for output='bytes') yielded\n"
+     "before the native encoder stopped; the json module produces the rest.",
+     NULL},
+    {NULL, NULL, NULL, NULL, NULL}
+};
+
+static PyType_Slot chunk_iterator_slots[] = {
+    {Py_tp_dealloc, chunk_iterator_dealloc},
+    {Py_tp_traverse, chunk_iterator_traverse},
+    {Py_tp_clear, chunk_iterator_clear},
+    {Py_tp_iter, PyObject_SelfIter},
+    {Py_tp_iternext, chunk_iterator_next},
+    {Py_tp_getset, chunk_iterator_getset},
+    {Py_tp_doc, "Iterator over the fixed-size chunks of a JSON document or array."},
+    {0, NULL},
+};
+
+static PyType_Spec chunk_iterator_spec = {
+    .name = "fastjson.ChunkIterator",
+    .basicsize = sizeof(ChunkIteratorObject),
+    .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC | Py_TPFLAGS_IMMUTABLETYPE
+             | Py_TPFLAGS_DISALLOW_INSTANTIATION,
+    .slots = chunk_iterator_slots,
+};
+
+/*
+ * iterencode(obj, *, ensure_ascii=True, indent=None, separators=None,
+ * allow_nan=True, check_circular=True, sort_keys=False, chunk_size=65536,
+ * output='str'): the chunks of dumps(obj). If the native encoder stops
+ * (unsupported layout or object, or any error), iteration ends early and
+ * .fallback_at tells the caller where json.JSONEncoder.iterencode() resumes.
+ */
+static PyObject*
+py_iterencode(PyObject* self, PyObject* args, PyObject* kwargs) {
     PyObject* obj;
     PyObject* ensure_ascii = Py_True;
-    PyObject* separators = NULL;
+    PyObject* indent = Py_None;
+    PyObject* separators = Py_None;
     int allow_nan = 1;
-    
-    static char* kwlist[] = {"obj", "ensure_ascii", "separators", "allow_nan", NULL};
-    
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|$OOi", kwlist,
-                                     &obj, &ensure_ascii, &separators, &allow_nan)) {
-        return NULL;
-    }
-    
-    /* Try fast path for list/tuple of floats */
-    if (is_float_sequence(obj)) {
-        const char* item_sep;
-        Py_ssize_t item_sep_len;
-        if (get_supported_float_item_separator(separators, &item_sep, &item_sep_len)) {
-            PyObject* result = dumps_float_sequence(obj, allow_nan, item_sep, item_sep_len);
-            if (result != NULL || PyErr_Occurred()) {
-                return result;
-            }
-            /* If fast path failed, clear error and try slow path */
-            PyErr_Clear();
+    int check_circular = 1;
+    int sort_keys = 0;
+    Py_ssize_t chunk_size = DEFAULT_CHUNK_SIZE;
+    PyObject* output_arg = NULL;
+
+    static char* kwlist[] = {"obj", "ensure_ascii", "indent", "separators", "allow_nan",
+                             "check_circular", "sort_keys", "chunk_size", "output", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|$OOOpppnO", kwlist,
+                                     &obj, &ensure_ascii, &indent, &separators, &allow_nan,
+                                     &check_circular, &sort_keys, &chunk_size, &output_arg)) {
+        return NULL;
+    }
+    int ascii = PyObject_IsTrue(ensure_ascii);
+    if (ascii < 0)
+        return NULL;
+
+    ChunkIteratorObject* it = chunk_iterator_new(get_module_state(self), chunk_size, output_arg);
+    if (it == NULL)
+        return NULL;
+    Separators seps;
+    if (!get_supported_separators(separators, indent, &seps, &it->seps_owner)) {
+        /* All of it from the json module */
+        it->done = 1;
+        it->fallback_at = 0;
+        return (PyObject*)it;
+    }
+    encoder_state_init(&it->enc, &it->buf, &seps, ascii, allow_nan, check_circular, sort_keys,
+                       NULL);
+    it->ascii_only = ascii && seps.ascii;
+    it->obj = Py_NewRef(obj);
+    return (PyObject*)it;
+}
+
+/*
+ * iterencode_ndarray(array, *, nan=..., ..., lines=False, chunk_size=65536,
+ * output='str'): the chunks of dumps_ndarray(array, ...)
+ */
+static PyObject*
+py_iterencode_ndarray(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyObject* array_obj;
+    PyObject* nan_arg = NULL;
+    PyObject* precision_arg = NULL;
+    PyObject* significant_arg = NULL;
+    PyObject* negative_zero_arg = NULL;
+    PyObject* indent = Py_None;
+    PyObject* separators = Py_None;
+    PyObject* dtype_arg = NULL;
+    PyObject* orient_arg = NULL;
+    int lines = 0;
+    Py_ssize_t chunk_size = DEFAULT_CHUNK_SIZE;
+    PyObject* output_arg = NULL;
+
+    static char* kwlist[] = {"array", "nan", "precision", "significant_digits",
+                             "negative_zero", "indent", "separators", "dtype", "orient",
+                             "lines", "chunk_size", "output", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|$OOOOOOOOpnO", kwlist,
+                                     &array_obj, &nan_arg, &precision_arg, &significant_arg,
+                                     &negative_zero_arg, &indent, &separators, &dtype_arg,
+                                     &orient_arg, &lines, &chunk_size, &output_arg))
+        return NULL;
+
+    ModuleState* st = get_module_state(self);
+    ChunkIteratorObject* it = chunk_iterator_new(st, chunk_size, output_arg);
+    if (it == NULL)
+        return NULL;
+    it->is_array = 1;
+    if (parse_format_config(nan_arg, precision_arg, significant_arg, negative_zero_arg,
+                            dtype_arg, orient_arg, &it->cfg) < 0
+        || parse_layout_lines(indent, separators, lines, &it->cfg, &it->layout_owner) < 0
+        || get_ndarray_view(st, array_obj, &it->view, &it->cfg) < 0) {
+        /* it->view.obj is still NULL: nothing to release */
+        Py_DECREF(it);
+        return NULL;
+    }
+    it->ascii_only = it->cfg.ascii;
+
+    const Py_buffer* view = &it->view;
+    NdarrayRange* r = &it->range;
+    r->data = (const char*)view->buf;
+    r->ndim = view->ndim;
+    r->shape = view->shape;
+    r->strides = view->strides;
+    r->cfg = &it->cfg;
+    if (view->ndim > 0) {
+        if (view->strides == NULL) {
+            Py_ssize_t stride = view->itemsize;
+            for (int d = view->ndim - 1; d >= 0; d--) {
+                it->c_strides[d] = stride;
+                stride *= view->shape[d];
+            }
+            r->strides = it->c_strides;
         }
+        /* About a chunk of entries per step, at >= 8 bytes per element */
+        Py_ssize_t per_row = 1;
+        for (int d = 1; d < view->ndim; d++) per_row *= view->shape[d];
+        it->row_elements = per_row;
+        it->rows_per_step = per_row > 0 ? chunk_size / (8 * per_row) : chunk_size;
+        if (it->rows_per_step < 1) it->rows_per_step = 1;
     }
+    return (PyObject*)it;
+}
 
-    /* Hybrid fast path: list/tuple with mixed types (float/None/bool/int + fallback) */
-    if (PyList_CheckExact(obj) || PyTuple_CheckExact(obj)) {
-        PyObject* result = dumps_sequence_hybrid(obj, ensure_ascii, allow_nan, separators);
-        if (result != NULL || PyErr_Occurred()) {
-            return result;
+/*
+ * Columnar tables (dumps_columns): equal-length 1-D columns, each its own
+ * buffer with its own dtype and stride, or the columns of a 2-D array read
+ * in place along its first axis.
+ */
+typedef enum {
+    TABLE_COLUMNS = 0,  /* {"x": [...], "y": [...]} */
+    TABLE_RECORDS = 1,  /* [{"x": .., "y": ..}, ...] */
+    TABLE_SPLIT = 2,    /* {"columns": ["x", "y"], "data": [[.., ..], ...]} */
+    TABLE_VALUES = 3,   /* [[.., ..], ...] */
+} TableOrient;
+
+typedef struct {
+    const char* data;
+    Py_ssize_t stride;
+    FormatConfig cfg;  /* the element format, with the shared options */
+    char* key;         /* the escaped, quoted name and the key separator */
+    Py_ssize_t key_len;
+} TableColumn;
+
+typedef struct {
+    TableColumn* columns;
+    int n_columns;
+    Py_ssize_t n_rows;
+    TableOrient orient;
+    const FormatConfig* cfg;  /* layout and options */
+    const unsigned char* skip;  /* nan='skip': rows with a NaN or Inf, or NULL */
+} ColumnTable;
+
+static int sample_column_element(Buffer* buf, const void* ctx, Py_ssize_t i) {
+    const TableColumn* c = (const TableColumn*)ctx;
+    const char* ptr = c->data + i * c->stride;
+    if (is_nonfinite_element(ptr, &c->cfg)) return buffer_append(buf, "null", 4);
+    return format_element(buf, ptr, &c->cfg);
+}
+
+/* The row as {"x": .., "y": ..} (keys) or [.., ..], opening at nesting level `level` */
+static int write_table_row(Buffer* buf, const ColumnTable* t, Py_ssize_t i, int keys,
+                           int level) {
+    char close = keys ? '}' : ']';
+    if (buffer_append_char(buf, keys ? '{' : '[') < 0) return SERIALIZE_NOMEM;
+    for (int j = 0; j < t->n_columns; j++) {
+        const TableColumn* c = &t->columns[j];
+        int rc = write_layout_separator(buf, t->cfg, j > 0, level + 1);
+        if (rc < 0) return rc;
+        if (keys && buffer_append(buf, c->key, (size_t)c->key_len) < 0) return SERIALIZE_NOMEM;
+        rc = format_element(buf, c->data + i * c->stride, &c->cfg);
+        if (rc == 0) rc = SERIALIZE_NONFINITE;
+        if (rc < 0) return rc;
+    }
+    if (t->n_columns == 0) return buffer_append_char(buf, close) < 0 ? SERIALIZE_NOMEM : 0;
+    return write_layout_close(buf, t->cfg, level, close);
+}
+
+/* The rows as an array at nesting level `level`, skipping t->skip rows */
+static int write_table_rows(Buffer* buf, const ColumnTable* t, int keys, int level) {
+    int need_comma = 0;
+    if (buffer_append_char(buf, '[') < 0) return SERIALIZE_NOMEM;
+    for (Py_ssize_t i = 0; i < t->n_rows; i++) {
+        if (t->skip != NULL && t->skip[i]) continue;
+        int rc = write_layout_separator(buf, t->cfg, need_comma, level + 1);
+        if (rc < 0) return rc;
+        rc = write_table_row(buf, t, i, keys, level + 1);
+        if (rc < 0) return rc;
+        need_comma = 1;
+    }
+    if (!need_comma) return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+    return write_layout_close(buf, t->cfg, level, ']');
+}
+
+/* One column as an array at nesting level 1 */
+static int write_table_column(Buffer* buf, const ColumnTable* t, const TableColumn* c) {
+    if (buffer_append_char(buf, '[') < 0) return SERIALIZE_NOMEM;
+    if (t->skip == NULL && t->cfg->newline == NULL && FORMAT_IS_INTEGER(c->cfg.format)) {
+        int rc = write_integer_run(buf, &c->cfg, c->data, t->n_rows, c->stride, 0);
+        if (rc < 0) return rc;
+        return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+    }
+    int need_comma = 0;
+    const char* ptr = c->data;
+    for (Py_ssize_t i = 0; i < t->n_rows; i++, ptr += c->stride) {
+        if (t->skip != NULL && t->skip[i]) continue;
+        int rc = write_layout_separator(buf, t->cfg, need_comma, 2);
+        if (rc < 0) return rc;
+        rc = format_element(buf, ptr, &c->cfg);
+        if (rc == 0) rc = SERIALIZE_NONFINITE;
+        if (rc < 0) return rc;
+        need_comma = 1;
+    }
+    if (!need_comma) return buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0;
+    return write_layout_close(buf, t->cfg, 1, ']');
+}
+
+/* "key": at nesting level 1 of the outer object */
+static int write_table_key(Buffer* buf, const ColumnTable* t, int need_comma, const char* key,
+                           Py_ssize_t key_len) {
+    int rc = write_layout_separator(buf, t->cfg, need_comma, 1);
+    if (rc < 0) return rc;
+    if (buffer_append(buf, key, (size_t)key_len) < 0) return SERIALIZE_NOMEM;
+    return buffer_append(buf, t->cfg->key_sep, (size_t)t->cfg->key_sep_len) < 0
+        ? SERIALIZE_NOMEM : 0;
+}
+
+static int write_table(Buffer* buf, const ColumnTable* t) {
+    const FormatConfig* cfg = t->cfg;
+    int rc = 0;
+    switch (t->orient) {
+    case TABLE_RECORDS:
+    case TABLE_VALUES:
+        return write_table_rows(buf, t, t->orient == TABLE_RECORDS, 0);
+    case TABLE_COLUMNS:
+        if (buffer_append_char(buf, '{') < 0) return SERIALIZE_NOMEM;
+        for (int j = 0; j < t->n_columns && rc == 0; j++) {
+            const TableColumn* c = &t->columns[j];
+            rc = write_layout_separator(buf, cfg, j > 0, 1);
+            if (rc == 0 && buffer_append(buf, c->key, (size_t)c->key_len) < 0)
+                rc = SERIALIZE_NOMEM;
+            if (rc == 0) rc = write_table_column(buf, t, c);
+        }
+        if (rc < 0) return rc;
+        if (t->n_columns == 0) return buffer_append_char(buf, '}') < 0 ? SERIALIZE_NOMEM : 0;
+        return write_layout_close(buf, cfg, 0, '}');
+    case TABLE_SPLIT:
+        if (buffer_append_char(buf, '{') < 0) return SERIALIZE_NOMEM;
+        rc = write_table_key(buf, t, 0, "\"columns\"", 9);
+        if (rc == 0 && buffer_append_char(buf, '[') < 0) rc = SERIALIZE_NOMEM;
+        for (int j = 0; j < t->n_columns && rc == 0; j++) {
+            const TableColumn* c = &t->columns[j];
+            rc = write_layout_separator(buf, cfg, j > 0, 2);
+            if (rc == 0
+                && buffer_append(buf, c->key, (size_t)(c->key_len - cfg->key_sep_len)) < 0)
+                rc = SERIALIZE_NOMEM;
+        }
+        if (rc == 0) {
+            rc = t->n_columns == 0
+                ? (buffer_append_char(buf, ']') < 0 ? SERIALIZE_NOMEM : 0)
+                : write_layout_close(buf, cfg, 1, ']');
+        }
+        if (rc == 0) rc = write_table_key(buf, t, 1, "\"data\"", 6);
+        if (rc == 0) rc = write_table_rows(buf, t, 0, 1);
+        if (rc < 0) return rc;
+        return write_layout_close(buf, cfg, 0, '}');
+    }
+    return 0;
+}
+
+/*
+ * Serialize a table into buf: presized from sampled element lengths, and
+ * formatted with the GIL released when large
+ */
+static int serialize_table(Buffer* buf, ColumnTable* t) {
+    const FormatConfig* cfg = t->cfg;
+    unsigned char* skip = NULL;
+    if (cfg->nan_mode == NAN_SKIP && t->n_rows > 0) {
+        /* A row is dropped from every column, so the columns stay aligned */
+        int any_float = 0;
+        for (int j = 0; j < t->n_columns; j++)
+            any_float |= FORMAT_IS_FLOAT(t->columns[j].cfg.format);
+        if (any_float) {
+            skip = (unsigned char*)PyMem_RawMalloc((size_t)t->n_rows);
+            if (skip == NULL) return raise_serialize_error(SERIALIZE_NOMEM);
+            for (Py_ssize_t i = 0; i < t->n_rows; i++) {
+                skip[i] = 0;
+                for (int j = 0; j < t->n_columns && !skip[i]; j++) {
+                    const TableColumn* c = &t->columns[j];
+                    skip[i] = (unsigned char)is_nonfinite_element(c->data + i * c->stride, &c->cfg);
+                }
+            }
+        }
+    }
+    t->skip = skip;
+
+    size_t sep = (size_t)cfg->item_sep_len;
+    if (cfg->newline != NULL) sep += 1 + 3 * (size_t)cfg->indent_len;
+    size_t est = 32 + (size_t)t->n_rows * (4 + sep);
+    for (int j = 0; j < t->n_columns; j++) {
+        TableColumn* c = &t->columns[j];
+        est += estimate_elements_size(t->n_rows, element_worst_size(&c->cfg),
+                                      sample_column_element, c)
+            + (size_t)t->n_rows * sep + 2 * (size_t)c->key_len + 2 * sep;
+        if (t->orient == TABLE_RECORDS) est += (size_t)t->n_rows * (size_t)c->key_len;
+    }
+    if (buffer_presize(buf, est) < 0) {
+        PyMem_RawFree(skip);
+        return raise_serialize_error(SERIALIZE_NOMEM);
+    }
+
+    PyThreadState* ts = (double)t->n_rows * t->n_columns >= NOGIL_MIN_ELEMENTS
+        ? PyEval_SaveThread() : NULL;
+    int status = write_table(buf, t);
+    if (ts != NULL) PyEval_RestoreThread(ts);
+    PyMem_RawFree(skip);
+    t->skip = NULL;
+    return status < 0 ? raise_serialize_error(status) : 0;
+}
+
+static int parse_table_orient(PyObject* orient_arg, TableOrient* out) {
+    static const char* names[] = {"columns", "records", "split", "values"};
+    *out = TABLE_COLUMNS;
+    if (orient_arg == NULL || orient_arg == Py_None) return 0;
+    for (int k = 0; k < 4; k++) {
+        if (PyUnicode_Check(orient_arg)
+            && PyUnicode_CompareWithASCIIString(orient_arg, names[k]) == 0) {
+            *out = (TableOrient)k;
+            return 0;
+        }
+    }
+    PyErr_Format(PyExc_ValueError,
+        "orient must be 'columns', 'records', 'split' or 'values', got %R", orient_arg);
+    return -1;
+}
+
+/* Acquired buffers of a table: one per column, or the single 2-D array */
+typedef struct {
+    Py_buffer* views;
+    int n_views;
+    TableColumn* columns;
+    int n_columns;
+} TableBuffers;
+
+static void release_table(TableBuffers* tb) {
+    for (int k = 0; k < tb->n_views; k++) PyBuffer_Release(&tb->views[k]);
+    for (int j = 0; j < tb->n_columns; j++) {
+        format_config_clear(&tb->columns[j].cfg);
+        PyMem_RawFree(tb->columns[j].key);
+    }
+    PyMem_RawFree(tb->views);
+    PyMem_RawFree(tb->columns);
+    memset(tb, 0, sizeof(*tb));
+}
+
+static int add_table_column(TableBuffers* tb, ColumnTable* t, PyObject* name,
+                            const char* data, Py_ssize_t stride, const FormatConfig* cfg) {
+    if (!PyUnicode_Check(name)) {
+        PyErr_Format(PyExc_TypeError, "column names must be str, not %.200s",
+                     Py_TYPE(name)->tp_name);
+        return -1;
+    }
+    TableColumn* c = &tb->columns[tb->n_columns];
+    memset(c, 0, sizeof(*c));
+    if (build_json_key(name, cfg, &c->key, &c->key_len) < 0) return -1;
+    c->data = data;
+    c->stride = stride;
+    c->cfg = *cfg;
+    tb->n_columns++;
+    t->n_columns = tb->n_columns;
+    return 0;
+}
+
+/* The 1-D array of the column `name`; sets its length in *n_rows if < 0 */
+static int get_column_view(ModuleState* st, PyObject* name, PyObject* obj, Py_buffer* view,
+                           FormatConfig* cfg, Py_ssize_t* n_rows) {
+    if (get_ndarray_view(st, obj, view, cfg) < 0) return -1;
+    if (cfg->format == FORMAT_RECORD) {
+        PyErr_Format(PyExc_TypeError,
+            "structured dtypes are not supported as columns, got '%s' for column %R",
+            view->format, name);
+    }
+    else if (view->ndim != 1) {
+        PyErr_Format(PyExc_ValueError,
+            "columns must be 1-D, got %d dimensions for column %R", view->ndim, name);
+    }
+    else if (*n_rows >= 0 && view->shape[0] != *n_rows) {
+        PyErr_Format(PyExc_ValueError,
+            "all columns must have the same length, got %zd rows for column %R, expected %zd",
+            view->shape[0], name, *n_rows);
+    }
+    else {
+        *n_rows = view->shape[0];
+        return 0;
+    }
+    release_ndarray_view(view, cfg);
+    return -1;
+}
+
+/* The columns of a 2-D array, named by names */
+static int collect_array_columns(ModuleState* st, PyObject* array_obj, PyObject* names,
+                                 const FormatConfig* cfg, TableBuffers* tb, ColumnTable* t) {
+    if (names == Py_None) {
+        PyErr_SetString(PyExc_TypeError, "names is required with a 2-D array");
+        return -1;
+    }
+    PyObject* seq = PySequence_Fast(names, "names must be a sequence of str");
+    if (seq == NULL) return -1;
+    int rc = -1;
+    FormatConfig col_cfg = *cfg;
+    tb->views = (Py_buffer*)PyMem_RawCalloc(1, sizeof(Py_buffer));
+    if (tb->views == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    if (get_ndarray_view(st, array_obj, &tb->views[0], &col_cfg) < 0) goto done;
+    tb->n_views = 1;
+    Py_buffer* view = &tb->views[0];
+    if (col_cfg.format == FORMAT_RECORD) {
+        PyErr_Format(PyExc_TypeError,
+            "structured dtypes are not supported as columns, got '%s'", view->format);
+        format_config_clear(&col_cfg);
+        goto done;
+    }
+    if (view->ndim != 2) {
+        PyErr_Format(PyExc_ValueError,
+            "columns must be a mapping of 1-D arrays or a 2-D array, got %d dimensions",
+            view->ndim);
+        goto done;
+    }
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(seq);
+    if (n != view->shape[1]) {
+        PyErr_Format(PyExc_ValueError,
+            "names must have one name per column, got %zd names for %zd columns",
+            n, view->shape[1]);
+        goto done;
+    }
+    if (n > INT_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "too many columns");
+        goto done;
+    }
+    tb->columns = (TableColumn*)PyMem_RawCalloc((size_t)(n > 0 ? n : 1), sizeof(TableColumn));
+    if (tb->columns == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    Py_ssize_t row_stride = view->strides ? view->strides[0] : view->itemsize * view->shape[1];
+    Py_ssize_t col_stride = view->strides ? view->strides[1] : view->itemsize;
+    for (Py_ssize_t j = 0; j < n; j++) {
+        const char* data = (const char*)view->buf + j * col_stride;
+        if (add_table_column(tb, t, PySequence_Fast_GET_ITEM(seq, j), data, row_stride,
+                             &col_cfg) < 0)
+            goto done;
+    }
+    t->n_rows = view->shape[0];
+    rc = 0;
+done:
+    Py_DECREF(seq);
+    return rc;
+}
+
+/* The columns of a mapping of names to 1-D arrays, in its order */
+static int collect_mapping_columns(ModuleState* st, PyObject* mapping, PyObject* names,
+                                   const FormatConfig* cfg, TableBuffers* tb, ColumnTable* t) {
+    if (names != Py_None) {
+        PyErr_SetString(PyExc_TypeError, "names is only used with a 2-D array");
+        return -1;
+    }
+    PyObject* items = PyMapping_Check(mapping) && !PySequence_Check(mapping)
+        ? PyMapping_Items(mapping) : NULL;
+    if (items == NULL) {
+        if (!PyErr_Occurred()) {
+            PyErr_Format(PyExc_TypeError,
+                "columns must be a mapping of 1-D arrays or a 2-D array, not %.200s",
+                Py_TYPE(mapping)->tp_name);
+        }
+        return -1;
+    }
+    int rc = -1;
+    Py_ssize_t n = PyList_GET_SIZE(items);
+    if (n > INT_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "too many columns");
+        goto done;
+    }
+    size_t alloc = (size_t)(n > 0 ? n : 1);
+    tb->views = (Py_buffer*)PyMem_RawCalloc(alloc, sizeof(Py_buffer));
+    tb->columns = (TableColumn*)PyMem_RawCalloc(alloc, sizeof(TableColumn));
+    if (tb->views == NULL || tb->columns == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    t->n_rows = -1;
+    for (Py_ssize_t j = 0; j < n; j++) {
+        PyObject* name = PyTuple_GET_ITEM(PyList_GET_ITEM(items, j), 0);
+        PyObject* column = PyTuple_GET_ITEM(PyList_GET_ITEM(items, j), 1);
+        FormatConfig col_cfg = *cfg;
+        Py_buffer* view = &tb->views[tb->n_views];
+        if (get_column_view(st, name, column, view, &col_cfg, &t->n_rows) < 0) goto done;
+        tb->n_views++;
+        Py_ssize_t stride = view->strides ? view->strides[0] : view->itemsize;
+        if (add_table_column(tb, t, name, (const char*)view->buf, stride, &col_cfg) < 0)
+            goto done;
+    }
+    if (t->n_rows < 0) t->n_rows = 0;
+    rc = 0;
+done:
+    Py_DECREF(items);
+    return rc;
+}
+
+static PyObject*
+py_dumps_columns(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    PyObject* columns_obj;
+    PyObject* names = Py_None;
+    PyObject* orient_arg = NULL;
+    PyObject* nan_arg = NULL;
+    PyObject* precision_arg = NULL;
+    PyObject* significant_arg = NULL;
+    PyObject* negative_zero_arg = NULL;
+    PyObject* output_arg = NULL;
+    PyObject* indent = Py_None;
+    PyObject* separators = Py_None;
+    PyObject* dtype_arg = NULL;
+
+    static char* kwlist[] = {"columns", "names", "orient", "nan", "precision",
+                             "significant_digits", "negative_zero", "output", "indent",
+                             "separators", "dtype", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|O$OOOOOOOOO", kwlist,
+                                     &columns_obj, &names, &orient_arg, &nan_arg,
+                                     &precision_arg, &significant_arg, &negative_zero_arg,
+                                     &output_arg, &indent, &separators, &dtype_arg))
+        return NULL;
+
+    ColumnTable t;
+    memset(&t, 0, sizeof(t));
+    if (parse_table_orient(orient_arg, &t.orient) < 0)
+        return NULL;
+
+    FormatConfig cfg;
+    if (parse_format_config(nan_arg, precision_arg, significant_arg, negative_zero_arg,
+                            dtype_arg, NULL, &cfg) < 0)
+        return NULL;
+
+    OutputMode output;
+    if (parse_output_mode(output_arg, &output) < 0)
+        return NULL;
+
+    PyObject* layout_owner;
+    if (parse_layout(indent, separators, &cfg, &layout_owner) < 0)
+        return NULL;
+    t.cfg = &cfg;
+
+    ModuleState* st = get_module_state(self);
+    TableBuffers tb;
+    memset(&tb, 0, sizeof(tb));
+    int rc = PyObject_CheckBuffer(columns_obj)
+        ? collect_array_columns(st, columns_obj, names, &cfg, &tb, &t)
+        : collect_mapping_columns(st, columns_obj, names, &cfg, &tb, &t);
+    t.columns = tb.columns;
+
+    Buffer buf;
+    buf.data = NULL;
+    if (rc == 0) {
+        /* A JSONBuffer takes the output block, so it never comes from the arena */
+        rc = output == OUTPUT_BUFFER ? buffer_init(&buf, 256) : buffer_init_pooled(st, &buf, 256);
+        if (rc < 0) PyErr_NoMemory();
+    }
+    if (rc == 0) {
+        rc = serialize_table(&buf, &t);
+        if (rc < 0) buffer_free(&buf);
+    }
+    release_table(&tb);
+    Py_XDECREF(layout_owner);
+    if (rc < 0) return NULL;
+    return buffer_finish(st, &buf, output, cfg.ascii, 0);
+}
+
+/* ======================================================================
+ * Native decoder: loads() for str, bytes and bytearray documents
+ *
+ * A recursive descent parser over UTF-8 text that builds the same objects
+ * as json.loads(). Array items are collected on one value stack shared by
+ * the whole document and moved into an exactly sized list when the array
+ * closes. Floats are converted with the Clinger fast path or the
+ * Eisel-Lemire algorithm (w * 10^q from a 128-bit approximation of 5^q),
+ * which are correctly rounded for up to 19 significant digits; longer
+ * mantissas go through PyOS_string_to_double(). Any syntax error or
+ * exception re-runs json.loads(), so error types, messages and positions
+ * are stdlib's.
+ * ====================================================================== */
+
+/* 128-bit approximations of 5^q for q = -342 .. 308, most significant bit
+   set: truncated for q >= 0, rounded up for q < 0 (as in fast_float's
+   table_generation.py) */
+#define POW5_MIN_Q (-342)
+#define POW5_MAX_Q 308
+static const UInt128 powers_of_5_128[POW5_MAX_Q - POW5_MIN_Q + 1] = {
+    {0xeef453d6923bd65aULL, 0x113faa2906a13b3fULL},
+    {0x9558b4661b6565f8ULL, 0x4ac7ca59a424c507ULL},
+    {0xbaaee17fa23ebf76ULL, 0x5d79bcf00d2df649ULL},
+    {0xe95a99df8ace6f53ULL, 0xf4d82c2c107973dcULL},
+    {0x91d8a02bb6c10594ULL, 0x79071b9b8a4be869ULL},
+    {0xb64ec836a47146f9ULL, 0x9748e2826cdee284ULL},
+    {0xe3e27a444d8d98b7ULL, 0xfd1b1b2308169b25ULL},
+    {0x8e6d8c6ab0787f72ULL, 0xfe30f0f5e50e20f7ULL},
+    {0xb208ef855c969f4fULL, 0xbdbd2d335e51a935ULL},
+    {0xde8b2b66b3bc4723ULL, 0xad2c788035e61382ULL},
+    {0x8b16fb203055ac76ULL, 0x4c3bcb5021afcc31ULL},
+    {0xaddcb9e83c6b1793ULL, 0xdf4abe242a1bbf3dULL},
+    {0xd953e8624b85dd78ULL, 0xd71d6dad34a2af0dULL},
+    {0x87d4713d6f33aa6bULL, 0x8672648c40e5ad68ULL},
+    {0xa9c98d8ccb009506ULL, 0x680efdaf511f18c2ULL},
+    {0xd43bf0effdc0ba48ULL, 0x0212bd1b2566def2ULL},
+    {0x84a57695fe98746dULL, 0x014bb630f7604b57ULL},
+    {0xa5ced43b7e3e9188ULL, 0x419ea3bd35385e2dULL},
+    {0xcf42894a5dce35eaULL, 0x52064cac828675b9ULL},
+    {0x818995ce7aa0e1b2ULL, 0x7343efebd1940993ULL},
+    {0xa1ebfb4219491a1fULL, 0x1014ebe6c5f90bf8ULL},
+    {0xca66fa129f9b60a6ULL, 0xd41a26e077774ef6ULL},
+    {0xfd00b897478238d0ULL, 0x8920b098955522b4ULL},
+    {0x9e20735e8cb16382ULL, 0x55b46e5f5d5535b0ULL},
+    {0xc5a890362fddbc62ULL, 0xeb2189f734aa831dULL},
+    {0xf712b443bbd52b7bULL, 0xa5e9ec7501d523e4ULL},
+    {0x9a6bb0aa55653b2dULL, 0x47b233c92125366eULL},
+    {0xc1069cd4eabe89f8ULL, 0x999ec0bb696e840aULL},
+    {0xf148440a256e2c76ULL, 0xc00670ea43ca250dULL},
+    {0x96cd2a865764dbcaULL, 0x380406926a5e5728ULL},
+    {0xbc807527ed3e12bcULL, 0xc605083704f5ecf2ULL},
+    {0xeba09271e88d976bULL, 0xf7864a44c633682eULL},
+    {0x93445b8731587ea3ULL, 0x7ab3ee6afbe0211dULL},
+    {0xb8157268fdae9e4cULL, 0x5960ea05bad82964ULL},
+    {0xe61acf033d1a45dfULL, 0x6fb92487298e33bdULL},
+    {0x8fd0c16206306babULL, 0xa5d3b6d479f8e056ULL},
+    {0xb3c4f1ba87bc8696ULL, 0x8f48a4899877186cULL},
+    {0xe0b62e2929aba83cULL, 0x331acdabfe94de87ULL},
+    {0x8c71dcd9ba0b4925ULL, 0x9ff0c08b7f1d0b14ULL},
+    {0xaf8e5410288e1b6fULL, 0x07ecf0ae5ee44dd9ULL},
+    {0xdb71e91432b1a24aULL, 0xc9e82cd9f69d6150ULL},
+    {0x892731ac9faf056eULL, 0xbe311c083a225cd2ULL},
+    {0xab70fe17c79ac6caULL, 0x6dbd630a48aaf406ULL},
+    {0xd64d3d9db981787dULL, 0x092cbbccdad5b108ULL},
+    {0x85f0468293f0eb4eULL, 0x25bbf56008c58ea5ULL},
+    {0xa76c582338ed2621ULL, 0xaf2af2b80af6f24eULL},
+    {0xd1476e2c07286faaULL, 0x1af5af660db4aee1ULL},
+    {0x82cca4db847945caULL, 0x50d98d9fc890ed4dULL},
+    {0xa37fce126597973cULL, 0xe50ff107bab528a0ULL},
+    {0xcc5fc196fefd7d0cULL, 0x1e53ed49a96272c8ULL},
+    {0xff77b1fcbebcdc4fULL, 0x25e8e89c13bb0f7aULL},
+    {0x9faacf3df73609b1ULL, 0x77b191618c54e9acULL},
+    {0xc795830d75038c1dULL, 0xd59df5b9ef6a2417ULL},
+    {0xf97ae3d0d2446f25ULL, 0x4b0573286b44ad1dULL},
+    {0x9becce62836ac577ULL, 0x4ee367f9430aec32ULL},
+    {0xc2e801fb244576d5ULL, 0x229c41f793cda73fULL},
+    {0xf3a20279ed56d48aULL, 0x6b43527578c1110fULL},
+    {0x9845418c345644d6ULL, 0x830a13896b78aaa9ULL},
+    {0xbe5691ef416bd60cULL, 0x23cc986bc656d553ULL},
+    {0xedec366b11c6cb8fULL, 0x2cbfbe86b7ec8aa8ULL},
+    {0x94b3a202eb1c3f39ULL, 0x7bf7d71432f3d6a9ULL},
+    {0xb9e08a83a5e34f07ULL, 0xdaf5ccd93fb0cc53ULL},
+    {0xe858ad248f5c22c9ULL, 0xd1b3400f8f9cff68ULL},
+    {0x91376c36d99995beULL, 0x23100809b9c21fa1ULL},
+    {0xb58547448ffffb2dULL, 0xabd40a0c2832a78aULL},
+    {0xe2e69915b3fff9f9ULL, 0x16c90c8f323f516cULL},
+    {0x8dd01fad907ffc3bULL, 0xae3da7d97f6792e3ULL},
+    {0xb1442798f49ffb4aULL, 0x99cd11cfdf41779cULL},
+    {0xdd95317f31c7fa1dULL, 0x40405643d711d583ULL},
+    {0x8a7d3eef7f1cfc52ULL, 0x482835ea666b2572ULL},
+    {0xad1c8eab5ee43b66ULL, 0xda3243650005eecfULL},
+    {0xd863b256369d4a40ULL, 0x90bed43e40076a82ULL},
+    {0x873e4f75e2224e68ULL, 0x5a7744a6e804a291ULL},
+    {0xa90de3535aaae202ULL, 0x711515d0a205cb36ULL},
+    {0xd3515c2831559a83ULL, 0x0d5a5b44ca873e03ULL},
+    {0x8412d9991ed58091ULL, 0xe858790afe9486c2ULL},
+    {0xa5178fff668ae0b6ULL, 0x626e974dbe39a872ULL},
+    {0xce5d73ff402d98e3ULL, 0xfb0a3d212dc8128fULL},
+    {0x80fa687f881c7f8eULL, 0x7ce66634bc9d0b99ULL},
+    {0xa139029f6a239f72ULL, 0x1c1fffc1ebc44e80ULL},
+    {0xc987434744ac874eULL, 0xa327ffb266b56220ULL},
+    {0xfbe9141915d7a922ULL, 0x4bf1ff9f0062baa8ULL},
+    {0x9d71ac8fada6c9b5ULL, 0x6f773fc3603db4a9ULL},
+    {0xc4ce17b399107c22ULL, 0xcb550fb4384d21d3ULL},
+    {0xf6019da07f549b2bULL, 0x7e2a53a146606a48ULL},
+    {0x99c102844f94e0fbULL, 0x2eda7444cbfc426dULL},
+    {0xc0314325637a1939ULL, 0xfa911155fefb5308ULL},
+    {0xf03d93eebc589f88ULL, 0x793555ab7eba27caULL},
+    {0x96267c7535b763b5ULL, 0x4bc1558b2f3458deULL},
+    {0xbbb01b9283253ca2ULL, 0x9eb1aaedfb016f16ULL},
+    {0xea9c227723ee8bcbULL, 0x465e15a979c1cadcULL},
+    {0x92a1958a7675175fULL, 0x0bfacd89ec191ec9ULL},
+    {0xb749faed14125d36ULL, 0xcef980ec671f667bULL},
+    {0xe51c79a85916f484ULL, 0x82b7e12780e7401aULL},
+    {0x8f31cc0937ae58d2ULL, 0xd1b2ecb8b0908810ULL},
+    {0xb2fe3f0b8599ef07ULL, 0x861fa7e6dcb4aa15ULL},
+    {0xdfbdcece67006ac9ULL, 0x67a791e093e1d49aULL},
+    {0x8bd6a141006042bdULL, 0xe0c8bb2c5c6d24e0ULL},
+    {0xaecc49914078536dULL, 0x58fae9f773886e18ULL},
+    {0xda7f5bf590966848ULL, 0xaf39a475506a899eULL},
+    {0x888f99797a5e012dULL, 0x6d8406c952429603ULL},
+    {0xaab37fd7d8f58178ULL, 0xc8e5087ba6d33b83ULL},
+    {0xd5605fcdcf32e1d6ULL, 0xfb1e4a9a90880a64ULL},
+    {0x855c3be0a17fcd26ULL, 0x5cf2eea09a55067fULL},
+    {0xa6b34ad8c9dfc06fULL, 0xf42faa48c0ea481eULL},
+    {0xd0601d8efc57b08bULL, 0xf13b94daf124da26ULL},
+    {0x823c12795db6ce57ULL, 0x76c53d08d6b70858ULL},
+    {0xa2cb1717b52481edULL, 0x54768c4b0c64ca6eULL},
+    {0xcb7ddcdda26da268ULL, 0xa9942f5dcf7dfd09ULL},
+    {0xfe5d54150b090b02ULL, 0xd3f93b35435d7c4cULL},
+    {0x9efa548d26e5a6e1ULL, 0xc47bc5014a1a6dafULL},
+    {0xc6b8e9b0709f109aULL, 0x359ab6419ca1091bULL},
+    {0xf867241c8cc6d4c0ULL, 0xc30163d203c94b62ULL},
+    {0x9b407691d7fc44f8ULL, 0x79e0de63425dcf1dULL},
+    {0xc21094364dfb5636ULL, 0x985915fc12f542e4ULL},
+    {0xf294b943e17a2bc4ULL, 0x3e6f5b7b17b2939dULL},
+    {0x979cf3ca6cec5b5aULL, 0xa705992ceecf9c42ULL},
+    {0xbd8430bd08277231ULL, 0x50c6ff782a838353ULL},
+    {0xece53cec4a314ebdULL, 0xa4f8bf5635246428ULL},
+    {0x940f4613ae5ed136ULL, 0x871b7795e136be99ULL},
+    {0xb913179899f68584ULL, 0x28e2557b59846e3fULL},
+    {0xe757dd7ec07426e5ULL, 0x331aeada2fe589cfULL},
+    {0x9096ea6f3848984fULL, 0x3ff0d2c85def7621ULL},
+    {0xb4bca50b065abe63ULL, 0x0fed077a756b53a9ULL},
+    {0xe1ebce4dc7f16dfbULL, 0xd3e8495912c62894ULL},
+    {0x8d3360f09cf6e4bdULL, 0x64712dd7abbbd95cULL},
+    {0xb080392cc4349decULL, 0xbd8d794d96aacfb3ULL},
+    {0xdca04777f541c567ULL, 0xecf0d7a0fc5583a0ULL},
+    {0x89e42caaf9491b60ULL, 0xf41686c49db57244ULL},
+    {0xac5d37d5b79b6239ULL, 0x311c2875c522ced5ULL},
+    {0xd77485cb25823ac7ULL, 0x7d633293366b828bULL},
+    {0x86a8d39ef77164bcULL, 0xae5dff9c02033197ULL},
+    {0xa8530886b54dbdebULL, 0xd9f57f830283fdfcULL},
+    {0xd267caa862a12d66ULL, 0xd072df63c324fd7bULL},
+    {0x8380dea93da4bc60ULL, 0x4247cb9e59f71e6dULL},
+    {0xa46116538d0deb78ULL, 0x52d9be85f074e608ULL},
+    {0xcd795be870516656ULL, 0x67902e276c921f8bULL},
+    {0x806bd9714632dff6ULL, 0x00ba1cd8a3db53b6ULL},
+    {0xa086cfcd97bf97f3ULL, 0x80e8a40eccd228a4ULL},
+    {0xc8a883c0fdaf7df0ULL, 0x6122cd128006b2cdULL},
+    {0xfad2a4b13d1b5d6cULL, 0x796b805720085f81ULL},
+    {0x9cc3a6eec6311a63ULL, 0xcbe3303674053bb0ULL},
+    {0xc3f490aa77bd60fcULL, 0xbedbfc4411068a9cULL},
+    {0xf4f1b4d515acb93bULL, 0xee92fb5515482d44ULL},
+    {0x991711052d8bf3c5ULL, 0x751bdd152d4d1c4aULL},
+    {0xbf5cd54678eef0b6ULL, 0xd262d45a78a0635dULL},
+    {0xef340a98172aace4ULL, 0x86fb897116c87c34ULL},
+    {0x9580869f0e7aac0eULL, 0xd45d35e6ae3d4da0ULL},
+    {0xbae0a846d2195712ULL, 0x8974836059cca109ULL},
+    {0xe998d258869facd7ULL, 0x2bd1a438703fc94bULL},
+    {0x91ff83775423cc06ULL, 0x7b6306a34627ddcfULL},
+    {0xb67f6455292cbf08ULL, 0x1a3bc84c17b1d542ULL},
+    {0xe41f3d6a7377eecaULL, 0x20caba5f1d9e4a93ULL},
+    {0x8e938662882af53eULL, 0x547eb47b7282ee9cULL},
+    {0xb23867fb2a35b28dULL, 0xe99e619a4f23aa43ULL},
+    {0xdec681f9f4c31f31ULL, 0x6405fa00e2ec94d4ULL},
+    {0x8b3c113c38f9f37eULL, 0xde83bc408dd3dd04ULL},
+    {0xae0b158b4738705eULL, 0x9624ab50b148d445ULL},
+    {0xd98ddaee19068c76ULL, 0x3badd624dd9b0957ULL},
+    {0x87f8a8d4cfa417c9ULL, 0xe54ca5d70a80e5d6ULL},
+    {0xa9f6d30a038d1dbcULL, 0x5e9fcf4ccd211f4cULL},
+    {0xd47487cc8470652bULL, 0x7647c3200069671fULL},
+    {0x84c8d4dfd2c63f3bULL, 0x29ecd9f40041e073ULL},
+    {0xa5fb0a17c777cf09ULL, 0xf468107100525890ULL},
+    {0xcf79cc9db955c2ccULL, 0x7182148d4066eeb4ULL},
+    {0x81ac1fe293d599bfULL, 0xc6f14cd848405530ULL},
+    {0xa21727db38cb002fULL, 0xb8ada00e5a506a7cULL},
+    {0xca9cf1d206fdc03bULL, 0xa6d90811f0e4851cULL},
+    {0xfd442e4688bd304aULL, 0x908f4a166d1da663ULL},
+    {0x9e4a9cec15763e2eULL, 0x9a598e4e043287feULL},
+    {0xc5dd44271ad3cdbaULL, 0x40eff1e1853f29fdULL},
+    {0xf7549530e188c128ULL, 0xd12bee59e68ef47cULL},
+    {0x9a94dd3e8cf578b9ULL, 0x82bb74f8301958ceULL},
+    {0xc13a148e3032d6e7ULL, 0xe36a52363c1faf01ULL},
+    {0xf18899b1bc3f8ca1ULL, 0xdc44e6c3cb279ac1ULL},
+    {0x96f5600f15a7b7e5ULL, 0x29ab103a5ef8c0b9ULL},
+    {0xbcb2b812db11a5deULL, 0x7415d448f6b6f0e7ULL},
+    {0xebdf661791d60f56ULL, 0x111b495b3464ad21ULL},
+    {0x936b9fcebb25c995ULL, 0xcab10dd900beec34ULL},
+    {0xb84687c269ef3bfbULL, 0x3d5d514f40eea742ULL},
+    {0xe65829b3046b0afaULL, 0x0cb4a5a3112a5112ULL},
+    {0x8ff71a0fe2c2e6dcULL, 0x47f0e785eaba72abULL},
+    {0xb3f4e093db73a093ULL, 0x59ed216765690f56ULL},
+    {0xe0f218b8d25088b8ULL, 0x306869c13ec3532cULL},
+    {0x8c974f7383725573ULL, 0x1e414218c73a13fbULL},
+    {0xafbd2350644eeacfULL, 0xe5d1929ef90898faULL},
+    {0xdbac6c247d62a583ULL, 0xdf45f746b74abf39ULL},
+    {0x894bc396ce5da772ULL, 0x6b8bba8c328eb783ULL},
+    {0xab9eb47c81f5114fULL, 0x066ea92f3f326564ULL},
+    {0xd686619ba27255a2ULL, 0xc80a537b0efefebdULL},
+    {0x8613fd0145877585ULL, 0xbd06742ce95f5f36ULL},
+    {0xa798fc4196e952e7ULL, 0x2c48113823b73704ULL},
+    {0xd17f3b51fca3a7a0ULL, 0xf75a15862ca504c5ULL},
+    {0x82ef85133de648c4ULL, 0x9a984d73dbe722fbULL},
+    {0xa3ab66580d5fdaf5ULL, 0xc13e60d0d2e0ebbaULL},
+    {0xcc963fee10b7d1b3ULL, 0x318df905079926a8ULL},
+    {0xffbbcfe994e5c61fULL, 0xfdf17746497f7052ULL},
+    {0x9fd561f1fd0f9bd3ULL, 0xfeb6ea8bedefa633ULL},
+    {0xc7caba6e7c5382c8ULL, 0xfe64a52ee96b8fc0ULL},
+    {0xf9bd690a1b68637bULL, 0x3dfdce7aa3c673b0ULL},
+    {0x9c1661a651213e2dULL, 0x06bea10ca65c084eULL},
+    {0xc31bfa0fe5698db8ULL, 0x486e494fcff30a62ULL},
+    {0xf3e2f893dec3f126ULL, 0x5a89dba3c3efccfaULL},
+    {0x986ddb5c6b3a76b7ULL, 0xf89629465a75e01cULL},
+    {0xbe89523386091465ULL, 0xf6bbb397f1135823ULL},
+    {0xee2ba6c0678b597fULL, 0x746aa07ded582e2cULL},
+    {0x94db483840b717efULL, 0xa8c2a44eb4571cdcULL},
+    {0xba121a4650e4ddebULL, 0x92f34d62616ce413ULL},
+    {0xe896a0d7e51e1566ULL, 0x77b020baf9c81d17ULL},
+    {0x915e2486ef32cd60ULL, 0x0ace1474dc1d122eULL},
+    {0xb5b5ada8aaff80b8ULL, 0x0d819992132456baULL},
+    {0xe3231912d5bf60e6ULL, 0x10e1fff697ed6c69ULL},
+    {0x8df5efabc5979c8fULL, 0xca8d3ffa1ef463c1ULL},
+    {0xb1736b96b6fd83b3ULL, 0xbd308ff8a6b17cb2ULL},
+    {0xddd0467c64bce4a0ULL, 0xac7cb3f6d05ddbdeULL},
+    {0x8aa22c0dbef60ee4ULL, 0x6bcdf07a423aa96bULL},
+    {0xad4ab7112eb3929dULL, 0x86c16c98d2c953c6ULL},
+    {0xd89d64d57a607744ULL, 0xe871c7bf077ba8b7ULL},
+    {0x87625f056c7c4a8bULL, 0x11471cd764ad4972ULL},
+    {0xa93af6c6c79b5d2dULL, 0xd598e40d3dd89bcfULL},
+    {0xd389b47879823479ULL, 0x4aff1d108d4ec2c3ULL},
+    {0x843610cb4bf160cbULL, 0xcedf722a585139baULL},
+    {0xa54394fe1eedb8feULL, 0xc2974eb4ee658828ULL},
+    {0xce947a3da6a9273eULL, 0x733d226229feea32ULL},
+    {0x811ccc668829b887ULL, 0x0806357d5a3f525fULL},
+    {0xa163ff802a3426a8ULL, 0xca07c2dcb0cf26f7ULL},
+    {0xc9bcff6034c13052ULL, 0xfc89b393dd02f0b5ULL},
+    {0xfc2c3f3841f17c67ULL, 0xbbac2078d443ace2ULL},
+    {0x9d9ba7832936edc0ULL, 0xd54b944b84aa4c0dULL},
+    {0xc5029163f384a931ULL, 0x0a9e795e65d4df11ULL},
+    {0xf64335bcf065d37dULL, 0x4d4617b5ff4a16d5ULL},
+    {0x99ea0196163fa42eULL, 0x504bced1bf8e4e45ULL},
+    {0xc06481fb9bcf8d39ULL, 0xe45ec2862f71e1d6ULL},
+    {0xf07da27a82c37088ULL, 0x5d767327bb4e5a4cULL},
+    {0x964e858c91ba2655ULL, 0x3a6a07f8d510f86fULL},
+    {0xbbe226efb628afeaULL, 0x890489f70a55368bULL},
+    {0xeadab0aba3b2dbe5ULL, 0x2b45ac74ccea842eULL},
+    {0x92c8ae6b464fc96fULL, 0x3b0b8bc90012929dULL},
+    {0xb77ada0617e3bbcbULL, 0x09ce6ebb40173744ULL},
+    {0xe55990879ddcaabdULL, 0xcc420a6a101d0515ULL},
+    {0x8f57fa54c2a9eab6ULL, 0x9fa946824a12232dULL},
+    {0xb32df8e9f3546564ULL, 0x47939822dc96abf9ULL},
+    {0xdff9772470297ebdULL, 0x59787e2b93bc56f7ULL},
+    {0x8bfbea76c619ef36ULL, 0x57eb4edb3c55b65aULL},
+    {0xaefae51477a06b03ULL, 0xede622920b6b23f1ULL},
+    {0xdab99e59958885c4ULL, 0xe95fab368e45ecedULL},
+    {0x88b402f7fd75539bULL, 0x11dbcb0218ebb414ULL},
+    {0xaae103b5fcd2a881ULL, 0xd652bdc29f26a119ULL},
+    {0xd59944a37c0752a2ULL, 0x4be76d3346f0495fULL},
+    {0x857fcae62d8493a5ULL, 0x6f70a4400c562ddbULL},
+    {0xa6dfbd9fb8e5b88eULL, 0xcb4ccd500f6bb952ULL},
+    {0xd097ad07a71f26b2ULL, 0x7e2000a41346a7a7ULL},
+    {0x825ecc24c873782fULL, 0x8ed400668c0c28c8ULL},
+    {0xa2f67f2dfa90563bULL, 0x728900802f0f32faULL},
+    {0xcbb41ef979346bcaULL, 0x4f2b40a03ad2ffb9ULL},
+    {0xfea126b7d78186bcULL, 0xe2f610c84987bfa8ULL},
+    {0x9f24b832e6b0f436ULL, 0x0dd9ca7d2df4d7c9ULL},
+    {0xc6ede63fa05d3143ULL, 0x91503d1c79720dbbULL},
+    {0xf8a95fcf88747d94ULL, 0x75a44c6397ce912aULL},
+    {0x9b69dbe1b548ce7cULL, 0xc986afbe3ee11abaULL},
+    {0xc24452da229b021bULL, 0xfbe85badce996168ULL},
+    {0xf2d56790ab41c2a2ULL, 0xfae27299423fb9c3ULL},
+    {0x97c560ba6b0919a5ULL, 0xdccd879fc967d41aULL},
+    {0xbdb6b8e905cb600fULL, 0x5400e987bbc1c920ULL},
+    {0xed246723473e3813ULL, 0x290123e9aab23b68ULL},
+    {0x9436c0760c86e30bULL, 0xf9a0b6720aaf6521ULL},
+    {0xb94470938fa89bceULL, 0xf808e40e8d5b3e69ULL},
+    {0xe7958cb87392c2c2ULL, 0xb60b1d1230b20e04ULL},
+    {0x90bd77f3483bb9b9ULL, 0xb1c6f22b5e6f48c2ULL},
+    {0xb4ecd5f01a4aa828ULL, 0x1e38aeb6360b1af3ULL},
+    {0xe2280b6c20dd5232ULL, 0x25c6da63c38de1b0ULL},
+    {0x8d590723948a535fULL, 0x579c487e5a38ad0eULL},
+    {0xb0af48ec79ace837ULL, 0x2d835a9df0c6d851ULL},
+    {0xdcdb1b2798182244ULL, 0xf8e431456cf88e65ULL},
+    {0x8a08f0f8bf0f156bULL, 0x1b8e9ecb641b58ffULL},
+    {0xac8b2d36eed2dac5ULL, 0xe272467e3d222f3fULL},
+    {0xd7adf884aa879177ULL, 0x5b0ed81dcc6abb0fULL},
+    {0x86ccbb52ea94baeaULL, 0x98e947129fc2b4e9ULL},
+    {0xa87fea27a539e9a5ULL, 0x3f2398d747b36224ULL},
+    {0xd29fe4b18e88640eULL, 0x8eec7f0d19a03aadULL},
+    {0x83a3eeeef9153e89ULL, 0x1953cf68300424acULL},
+    {0xa48ceaaab75a8e2bULL, 0x5fa8c3423c052dd7ULL},
+    {0xcdb02555653131b6ULL, 0x3792f412cb06794dULL},
+    {0x808e17555f3ebf11ULL, 0xe2bbd88bbee40bd0ULL},
+    {0xa0b19d2ab70e6ed6ULL, 0x5b6aceaeae9d0ec4ULL},
+    {0xc8de047564d20a8bULL, 0xf245825a5a445275ULL},
+    {0xfb158592be068d2eULL, 0xeed6e2f0f0d56712ULL},
+    {0x9ced737bb6c4183dULL, 0x55464dd69685606bULL},
+    {0xc428d05aa4751e4cULL, 0xaa97e14c3c26b886ULL},
+    {0xf53304714d9265dfULL, 0xd53dd99f4b3066a8ULL},
+    {0x993fe2c6d07b7fabULL, 0xe546a8038efe4029ULL},
+    {0xbf8fdb78849a5f96ULL, 0xde98520472bdd033ULL},
+    {0xef73d256a5c0f77cULL, 0x963e66858f6d4440ULL},
+    {0x95a8637627989aadULL, 0xdde7001379a44aa8ULL},
+    {0xbb127c53b17ec159ULL, 0x5560c018580d5d52ULL},
+    {0xe9d71b689dde71afULL, 0xaab8f01e6e10b4a6ULL},
+    {0x9226712162ab070dULL, 0xcab3961304ca70e8ULL},
+    {0xb6b00d69bb55c8d1ULL, 0x3d607b97c5fd0d22ULL},
+    {0xe45c10c42a2b3b05ULL, 0x8cb89a7db77c506aULL},
+    {0x8eb98a7a9a5b04e3ULL, 0x77f3608e92adb242ULL},
+    {0xb267ed1940f1c61cULL, 0x55f038b237591ed3ULL},
+    {0xdf01e85f912e37a3ULL, 0x6b6c46dec52f6688ULL},
+    {0x8b61313bbabce2c6ULL, 0x2323ac4b3b3da015ULL},
+    {0xae397d8aa96c1b77ULL, 0xabec975e0a0d081aULL},
+    {0xd9c7dced53c72255ULL, 0x96e7bd358c904a21ULL},
+    {0x881cea14545c7575ULL, 0x7e50d64177da2e54ULL},
+    {0xaa242499697392d2ULL, 0xdde50bd1d5d0b9e9ULL},
+    {0xd4ad2dbfc3d07787ULL, 0x955e4ec64b44e864ULL},
+    {0x84ec3c97da624ab4ULL, 0xbd5af13bef0b113eULL},
+    {0xa6274bbdd0fadd61ULL, 0xecb1ad8aeacdd58eULL},
+    {0xcfb11ead453994baULL, 0x67de18eda5814af2ULL},
+    {0x81ceb32c4b43fcf4ULL, 0x80eacf948770ced7ULL},
+    {0xa2425ff75e14fc31ULL, 0xa1258379a94d028dULL},
+    {0xcad2f7f5359a3b3eULL, 0x096ee45813a04330ULL},
+    {0xfd87b5f28300ca0dULL, 0x8bca9d6e188853fcULL},
+    {0x9e74d1b791e07e48ULL, 0x775ea264cf55347eULL},
+    {0xc612062576589ddaULL, 0x95364afe032a819eULL},
+    {0xf79687aed3eec551ULL, 0x3a83ddbd83f52205ULL},
+    {0x9abe14cd44753b52ULL, 0xc4926a9672793543ULL},
+    {0xc16d9a0095928a27ULL, 0x75b7053c0f178294ULL},
+    {0xf1c90080baf72cb1ULL, 0x5324c68b12dd6339ULL},
+    {0x971da05074da7beeULL, 0xd3f6fc16ebca5e04ULL},
+    {0xbce5086492111aeaULL, 0x88f4bb1ca6bcf585ULL},
+    {0xec1e4a7db69561a5ULL, 0x2b31e9e3d06c32e6ULL},
+    {0x9392ee8e921d5d07ULL, 0x3aff322e62439fd0ULL},
+    {0xb877aa3236a4b449ULL, 0x09befeb9fad487c3ULL},
+    {0xe69594bec44de15bULL, 0x4c2ebe687989a9b4ULL},
+    {0x901d7cf73ab0acd9ULL, 0x0f9d37014bf60a11ULL},
+    {0xb424dc35095cd80fULL, 0x538484c19ef38c95ULL},
+    {0xe12e13424bb40e13ULL, 0x2865a5f206b06fbaULL},
+    {0x8cbccc096f5088cbULL, 0xf93f87b7442e45d4ULL},
+    {0xafebff0bcb24aafeULL, 0xf78f69a51539d749ULL},
+    {0xdbe6fecebdedd5beULL, 0xb573440e5a884d1cULL},
+    {0x89705f4136b4a597ULL, 0x31680a88f8953031ULL},
+    {0xabcc77118461cefcULL, 0xfdc20d2b36ba7c3eULL},
+    {0xd6bf94d5e57a42bcULL, 0x3d32907604691b4dULL},
+    {0x8637bd05af6c69b5ULL, 0xa63f9a49c2c1b110ULL},
+    {0xa7c5ac471b478423ULL, 0x0fcf80dc33721d54ULL},
+    {0xd1b71758e219652bULL, 0xd3c36113404ea4a9ULL},
+    {0x83126e978d4fdf3bULL, 0x645a1cac083126eaULL},
+    {0xa3d70a3d70a3d70aULL, 0x3d70a3d70a3d70a4ULL},
+    {0xccccccccccccccccULL, 0xcccccccccccccccdULL},
+    {0x8000000000000000ULL, 0x0000000000000000ULL},
+    {0xa000000000000000ULL, 0x0000000000000000ULL},
+    {0xc800000000000000ULL, 0x0000000000000000ULL},
+    {0xfa00000000000000ULL, 0x0000000000000000ULL},
+    {0x9c40000000000000ULL, 0x0000000000000000ULL},
+    {0xc350000000000000ULL, 0x0000000000000000ULL},
+    {0xf424000000000000ULL, 0x0000000000000000ULL},
+    {0x9896800000000000ULL, 0x0000000000000000ULL},
+    {0xbebc200000000000ULL, 0x0000000000000000ULL},
+    {0xee6b280000000000ULL, 0x0000000000000000ULL},
+    {0x9502f90000000000ULL, 0x0000000000000000ULL},
+    {0xba43b74000000000ULL, 0x0000000000000000ULL},
+    {0xe8d4a51000000000ULL, 0x0000000000000000ULL},
+    {0x9184e72a00000000ULL, 0x0000000000000000ULL},
+    {0xb5e620f480000000ULL, 0x0000000000000000ULL},
+    {0xe35fa931a0000000ULL, 0x0000000000000000ULL},
+    {0x8e1bc9bf04000000ULL, 0x0000000000000000ULL},
+    {0xb1a2bc2ec5000000ULL, 0x0000000000000000ULL},
+    {0xde0b6b3a76400000ULL, 0x0000000000000000ULL},
+    {0x8ac7230489e80000ULL, 0x0000000000000000ULL},
+    {0xad78ebc5ac620000ULL, 0x0000000000000000ULL},
+    {0xd8d726b7177a8000ULL, 0x0000000000000000ULL},
+    {0x878678326eac9000ULL, 0x0000000000000000ULL},
+    {0xa968163f0a57b400ULL, 0x0000000000000000ULL},
+    {0xd3c21bcecceda100ULL, 0x0000000000000000ULL},
+    {0x84595161401484a0ULL, 0x0000000000000000ULL},
+    {0xa56fa5b99019a5c8ULL, 0x0000000000000000ULL},
+    {0xcecb8f27f4200f3aULL, 0x0000000000000000ULL},
+    {0x813f3978f8940984ULL, 0x4000000000000000ULL},
+    {0xa18f07d736b90be5ULL, 0x5000000000000000ULL},
+    {0xc9f2c9cd04674edeULL, 0xa400000000000000ULL},
+    {0xfc6f7c4045812296ULL, 0x4d00000000000000ULL},
+    {0x9dc5ada82b70b59dULL, 0xf020000000000000ULL},
+    {0xc5371912364ce305ULL, 0x6c28000000000000ULL},
+    {0xf684df56c3e01bc6ULL, 0xc732000000000000ULL},
+    {0x9a130b963a6c115cULL, 0x3c7f400000000000ULL},
+    {0xc097ce7bc90715b3ULL, 0x4b9f100000000000ULL},
+    {0xf0bdc21abb48db20ULL, 0x1e86d40000000000ULL},
+    {0x96769950b50d88f4ULL, 0x1314448000000000ULL},
+    {0xbc143fa4e250eb31ULL, 0x17d955a000000000ULL},
+    {0xeb194f8e1ae525fdULL, 0x5dcfab0800000000ULL},
+    {0x92efd1b8d0cf37beULL, 0x5aa1cae500000000ULL},
+    {0xb7abc627050305adULL, 0xf14a3d9e40000000ULL},
+    {0xe596b7b0c643c719ULL, 0x6d9ccd05d0000000ULL},
+    {0x8f7e32ce7bea5c6fULL, 0xe4820023a2000000ULL},
+    {0xb35dbf821ae4f38bULL, 0xdda2802c8a800000ULL},
+    {0xe0352f62a19e306eULL, 0xd50b2037ad200000ULL},
+    {0x8c213d9da502de45ULL, 0x4526f422cc340000ULL},
+    {0xaf298d050e4395d6ULL, 0x9670b12b7f410000ULL},
+    {0xdaf3f04651d47b4cULL, 0x3c0cdd765f114000ULL},
+    {0x88d8762bf324cd0fULL, 0xa5880a69fb6ac800ULL},
+    {0xab0e93b6efee0053ULL, 0x8eea0d047a457a00ULL},
+    {0xd5d238a4abe98068ULL, 0x72a4904598d6d880ULL},
+    {0x85a36366eb71f041ULL, 0x47a6da2b7f864750ULL},
+    {0xa70c3c40a64e6c51ULL, 0x999090b65f67d924ULL},
+    {0xd0cf4b50cfe20765ULL, 0xfff4b4e3f741cf6dULL},
+    {0x82818f1281ed449fULL, 0xbff8f10e7a8921a4ULL},
+    {0xa321f2d7226895c7ULL, 0xaff72d52192b6a0dULL},
+    {0xcbea6f8ceb02bb39ULL, 0x9bf4f8a69f764490ULL},
+    {0xfee50b7025c36a08ULL, 0x02f236d04753d5b4ULL},
+    {0x9f4f2726179a2245ULL, 0x01d762422c946590ULL},
+    {0xc722f0ef9d80aad6ULL, 0x424d3ad2b7b97ef5ULL},
+    {0xf8ebad2b84e0d58bULL, 0xd2e0898765a7deb2ULL},
+    {0x9b934c3b330c8577ULL, 0x63cc55f49f88eb2fULL},
+    {0xc2781f49ffcfa6d5ULL, 0x3cbf6b71c76b25fbULL},
+    {0xf316271c7fc3908aULL, 0x8bef464e3945ef7aULL},
+    {0x97edd871cfda3a56ULL, 0x97758bf0e3cbb5acULL},
+    {0xbde94e8e43d0c8ecULL, 0x3d52eeed1cbea317ULL},
+    {0xed63a231d4c4fb27ULL, 0x4ca7aaa863ee4bddULL},
+    {0x945e455f24fb1cf8ULL, 0x8fe8caa93e74ef6aULL},
+    {0xb975d6b6ee39e436ULL, 0xb3e2fd538e122b44ULL},
+    {0xe7d34c64a9c85d44ULL, 0x60dbbca87196b616ULL},
+    {0x90e40fbeea1d3a4aULL, 0xbc8955e946fe31cdULL},
+    {0xb51d13aea4a488ddULL, 0x6babab6398bdbe41ULL},
+    {0xe264589a4dcdab14ULL, 0xc696963c7eed2dd1ULL},
+    {0x8d7eb76070a08aecULL, 0xfc1e1de5cf543ca2ULL},
+    {0xb0de65388cc8ada8ULL, 0x3b25a55f43294bcbULL},
+    {0xdd15fe86affad912ULL, 0x49ef0eb713f39ebeULL},
+    {0x8a2dbf142dfcc7abULL, 0x6e3569326c784337ULL},
+    {0xacb92ed9397bf996ULL, 0x49c2c37f07965404ULL},
+    {0xd7e77a8f87daf7fbULL, 0xdc33745ec97be906ULL},
+    {0x86f0ac99b4e8dafdULL, 0x69a028bb3ded71a3ULL},
+    {0xa8acd7c0222311bcULL, 0xc40832ea0d68ce0cULL},
+    {0xd2d80db02aabd62bULL, 0xf50a3fa490c30190ULL},
+    {0x83c7088e1aab65dbULL, 0x792667c6da79e0faULL},
+    {0xa4b8cab1a1563f52ULL, 0x577001b891185938ULL},
+    {0xcde6fd5e09abcf26ULL, 0xed4c0226b55e6f86ULL},
+    {0x80b05e5ac60b6178ULL, 0x544f8158315b05b4ULL},
+    {0xa0dc75f1778e39d6ULL, 0x696361ae3db1c721ULL},
+    {0xc913936dd571c84cULL, 0x03bc3a19cd1e38e9ULL},
+    {0xfb5878494ace3a5fULL, 0x04ab48a04065c723ULL},
+    {0x9d174b2dcec0e47bULL, 0x62eb0d64283f9c76ULL},
+    {0xc45d1df942711d9aULL, 0x3ba5d0bd324f8394ULL},
+    {0xf5746577930d6500ULL, 0xca8f44ec7ee36479ULL},
+    {0x9968bf6abbe85f20ULL, 0x7e998b13cf4e1ecbULL},
+    {0xbfc2ef456ae276e8ULL, 0x9e3fedd8c321a67eULL},
+    {0xefb3ab16c59b14a2ULL, 0xc5cfe94ef3ea101eULL},
+    {0x95d04aee3b80ece5ULL, 0xbba1f1d158724a12ULL},
+    {0xbb445da9ca61281fULL, 0x2a8a6e45ae8edc97ULL},
+    {0xea1575143cf97226ULL, 0xf52d09d71a3293bdULL},
+    {0x924d692ca61be758ULL, 0x593c2626705f9c56ULL},
+    {0xb6e0c377cfa2e12eULL, 0x6f8b2fb00c77836cULL},
+    {0xe498f455c38b997aULL, 0x0b6dfb9c0f956447ULL},
+    {0x8edf98b59a373fecULL, 0x4724bd4189bd5eacULL},
+    {0xb2977ee300c50fe7ULL, 0x58edec91ec2cb657ULL},
+    {0xdf3d5e9bc0f653e1ULL, 0x2f2967b66737e3edULL},
+    {0x8b865b215899f46cULL, 0xbd79e0d20082ee74ULL},
+    {0xae67f1e9aec07187ULL, 0xecd8590680a3aa11ULL},
+    {0xda01ee641a708de9ULL, 0xe80e6f4820cc9495ULL},
+    {0x884134fe908658b2ULL, 0x3109058d147fdcddULL},
+    {0xaa51823e34a7eedeULL, 0xbd4b46f0599fd415ULL},
+    {0xd4e5e2cdc1d1ea96ULL, 0x6c9e18ac7007c91aULL},
+    {0x850fadc09923329eULL, 0x03e2cf6bc604ddb0ULL},
+    {0xa6539930bf6bff45ULL, 0x84db8346b786151cULL},
+    {0xcfe87f7cef46ff16ULL, 0xe612641865679a63ULL},
+    {0x81f14fae158c5f6eULL, 0x4fcb7e8f3f60c07eULL},
+    {0xa26da3999aef7749ULL, 0xe3be5e330f38f09dULL},
+    {0xcb090c8001ab551cULL, 0x5cadf5bfd3072cc5ULL},
+    {0xfdcb4fa002162a63ULL, 0x73d9732fc7c8f7f6ULL},
+    {0x9e9f11c4014dda7eULL, 0x2867e7fddcdd9afaULL},
+    {0xc646d63501a1511dULL, 0xb281e1fd541501b8ULL},
+    {0xf7d88bc24209a565ULL, 0x1f225a7ca91a4226ULL},
+    {0x9ae757596946075fULL, 0x3375788de9b06958ULL},
+    {0xc1a12d2fc3978937ULL, 0x0052d6b1641c83aeULL},
+    {0xf209787bb47d6b84ULL, 0xc0678c5dbd23a49aULL},
+    {0x9745eb4d50ce6332ULL, 0xf840b7ba963646e0ULL},
+    {0xbd176620a501fbffULL, 0xb650e5a93bc3d898ULL},
+    {0xec5d3fa8ce427affULL, 0xa3e51f138ab4cebeULL},
+    {0x93ba47c980e98cdfULL, 0xc66f336c36b10137ULL},
+    {0xb8a8d9bbe123f017ULL, 0xb80b0047445d4184ULL},
+    {0xe6d3102ad96cec1dULL, 0xa60dc059157491e5ULL},
+    {0x9043ea1ac7e41392ULL, 0x87c89837ad68db2fULL},
+    {0xb454e4a179dd1877ULL, 0x29babe4598c311fbULL},
+    {0xe16a1dc9d8545e94ULL, 0xf4296dd6fef3d67aULL},
+    {0x8ce2529e2734bb1dULL, 0x1899e4a65f58660cULL},
+    {0xb01ae745b101e9e4ULL, 0x5ec05dcff72e7f8fULL},
+    {0xdc21a1171d42645dULL, 0x76707543f4fa1f73ULL},
+    {0x899504ae72497ebaULL, 0x6a06494a791c53a8ULL},
+    {0xabfa45da0edbde69ULL, 0x0487db9d17636892ULL},
+    {0xd6f8d7509292d603ULL, 0x45a9d2845d3c42b6ULL},
+    {0x865b86925b9bc5c2ULL, 0x0b8a2392ba45a9b2ULL},
+    {0xa7f26836f282b732ULL, 0x8e6cac7768d7141eULL},
+    {0xd1ef0244af2364ffULL, 0x3207d795430cd926ULL},
+    {0x8335616aed761f1fULL, 0x7f44e6bd49e807b8ULL},
+    {0xa402b9c5a8d3a6e7ULL, 0x5f16206c9c6209a6ULL},
+    {0xcd036837130890a1ULL, 0x36dba887c37a8c0fULL},
+    {0x802221226be55a64ULL, 0xc2494954da2c9789ULL},
+    {0xa02aa96b06deb0fdULL, 0xf2db9baa10b7bd6cULL},
+    {0xc83553c5c8965d3dULL, 0x6f92829494e5acc7ULL},
+    {0xfa42a8b73abbf48cULL, 0xcb772339ba1f17f9ULL},
+    {0x9c69a97284b578d7ULL, 0xff2a760414536efbULL},
+    {0xc38413cf25e2d70dULL, 0xfef5138519684abaULL},
+    {0xf46518c2ef5b8cd1ULL, 0x7eb258665fc25d69ULL},
+    {0x98bf2f79d5993802ULL, 0xef2f773ffbd97a61ULL},
+    {0xbeeefb584aff8603ULL, 0xaafb550ffacfd8faULL},
+    {0xeeaaba2e5dbf6784ULL, 0x95ba2a53f983cf38ULL},
+    {0x952ab45cfa97a0b2ULL, 0xdd945a747bf26183ULL},
+    {0xba756174393d88dfULL, 0x94f971119aeef9e4ULL},
+    {0xe912b9d1478ceb17ULL, 0x7a37cd5601aab85dULL},
+    {0x91abb422ccb812eeULL, 0xac62e055c10ab33aULL},
+    {0xb616a12b7fe617aaULL, 0x577b986b314d6009ULL},
+    {0xe39c49765fdf9d94ULL, 0xed5a7e85fda0b80bULL},
+    {0x8e41ade9fbebc27dULL, 0x14588f13be847307ULL},
+    {0xb1d219647ae6b31cULL, 0x596eb2d8ae258fc8ULL},
+    {0xde469fbd99a05fe3ULL, 0x6fca5f8ed9aef3bbULL},
+    {0x8aec23d680043beeULL, 0x25de7bb9480d5854ULL},
+    {0xada72ccc20054ae9ULL, 0xaf561aa79a10ae6aULL},
+    {0xd910f7ff28069da4ULL, 0x1b2ba1518094da04ULL},
+    {0x87aa9aff79042286ULL, 0x90fb44d2f05d0842ULL},
+    {0xa99541bf57452b28ULL, 0x353a1607ac744a53ULL},
+    {0xd3fa922f2d1675f2ULL, 0x42889b8997915ce8ULL},
+    {0x847c9b5d7c2e09b7ULL, 0x69956135febada11ULL},
+    {0xa59bc234db398c25ULL, 0x43fab9837e699095ULL},
+    {0xcf02b2c21207ef2eULL, 0x94f967e45e03f4bbULL},
+    {0x8161afb94b44f57dULL, 0x1d1be0eebac278f5ULL},
+    {0xa1ba1ba79e1632dcULL, 0x6462d92a69731732ULL},
+    {0xca28a291859bbf93ULL, 0x7d7b8f7503cfdcfeULL},
+    {0xfcb2cb35e702af78ULL, 0x5cda735244c3d43eULL},
+    {0x9defbf01b061adabULL, 0x3a0888136afa64a7ULL},
+    {0xc56baec21c7a1916ULL, 0x088aaa1845b8fdd0ULL},
+    {0xf6c69a72a3989f5bULL, 0x8aad549e57273d45ULL},
+    {0x9a3c2087a63f6399ULL, 0x36ac54e2f678864bULL},
+    {0xc0cb28a98fcf3c7fULL, 0x84576a1bb416a7ddULL},
+    {0xf0fdf2d3f3c30b9fULL, 0x656d44a2a11c51d5ULL},
+    {0x969eb7c47859e743ULL, 0x9f644ae5a4b1b325ULL},
+    {0xbc4665b596706114ULL, 0x873d5d9f0dde1feeULL},
+    {0xeb57ff22fc0c7959ULL, 0xa90cb506d155a7eaULL},
+    {0x9316ff75dd87cbd8ULL, 0x09a7f12442d588f2ULL},
+    {0xb7dcbf5354e9beceULL, 0x0c11ed6d538aeb2fULL},
+    {0xe5d3ef282a242e81ULL, 0x8f1668c8a86da5faULL},
+    {0x8fa475791a569d10ULL, 0xf96e017d694487bcULL},
+    {0xb38d92d760ec4455ULL, 0x37c981dcc395a9acULL},
+    {0xe070f78d3927556aULL, 0x85bbe253f47b1417ULL},
+    {0x8c469ab843b89562ULL, 0x93956d7478ccec8eULL},
+    {0xaf58416654a6babbULL, 0x387ac8d1970027b2ULL},
+    {0xdb2e51bfe9d0696aULL, 0x06997b05fcc0319eULL},
+    {0x88fcf317f22241e2ULL, 0x441fece3bdf81f03ULL},
+    {0xab3c2fddeeaad25aULL, 0xd527e81cad7626c3ULL},
+    {0xd60b3bd56a5586f1ULL, 0x8a71e223d8d3b074ULL},
+    {0x85c7056562757456ULL, 0xf6872d5667844e49ULL},
+    {0xa738c6bebb12d16cULL, 0xb428f8ac016561dbULL},
+    {0xd106f86e69d785c7ULL, 0xe13336d701beba52ULL},
+    {0x82a45b450226b39cULL, 0xecc0024661173473ULL},
+    {0xa34d721642b06084ULL, 0x27f002d7f95d0190ULL},
+    {0xcc20ce9bd35c78a5ULL, 0x31ec038df7b441f4ULL},
+    {0xff290242c83396ceULL, 0x7e67047175a15271ULL},
+    {0x9f79a169bd203e41ULL, 0x0f0062c6e984d386ULL},
+    {0xc75809c42c684dd1ULL, 0x52c07b78a3e60868ULL},
+    {0xf92e0c3537826145ULL, 0xa7709a56ccdf8a82ULL},
+    {0x9bbcc7a142b17ccbULL, 0x88a66076400bb691ULL},
+    {0xc2abf989935ddbfeULL, 0x6acff893d00ea435ULL},
+    {0xf356f7ebf83552feULL, 0x0583f6b8c4124d43ULL},
+    {0x98165af37b2153deULL, 0xc3727a337a8b704aULL},
+    {0xbe1bf1b059e9a8d6ULL, 0x744f18c0592e4c5cULL},
+    {0xeda2ee1c7064130cULL, 0x1162def06f79df73ULL},
+    {0x9485d4d1c63e8be7ULL, 0x8addcb5645ac2ba8ULL},
+    {0xb9a74a0637ce2ee1ULL, 0x6d953e2bd7173692ULL},
+    {0xe8111c87c5c1ba99ULL, 0xc8fa8db6ccdd0437ULL},
+    {0x910ab1d4db9914a0ULL, 0x1d9c9892400a22a2ULL},
+    {0xb54d5e4a127f59c8ULL, 0x2503beb6d00cab4bULL},
+    {0xe2a0b5dc971f303aULL, 0x2e44ae64840fd61dULL},
+    {0x8da471a9de737e24ULL, 0x5ceaecfed289e5d2ULL},
+    {0xb10d8e1456105dadULL, 0x7425a83e872c5f47ULL},
+    {0xdd50f1996b947518ULL, 0xd12f124e28f77719ULL},
+    {0x8a5296ffe33cc92fULL, 0x82bd6b70d99aaa6fULL},
+    {0xace73cbfdc0bfb7bULL, 0x636cc64d1001550bULL},
+    {0xd8210befd30efa5aULL, 0x3c47f7e05401aa4eULL},
+    {0x8714a775e3e95c78ULL, 0x65acfaec34810a71ULL},
+    {0xa8d9d1535ce3b396ULL, 0x7f1839a741a14d0dULL},
+    {0xd31045a8341ca07cULL, 0x1ede48111209a050ULL},
+    {0x83ea2b892091e44dULL, 0x934aed0aab460432ULL},
+    {0xa4e4b66b68b65d60ULL, 0xf81da84d5617853fULL},
+    {0xce1de40642e3f4b9ULL, 0x36251260ab9d668eULL},
+    {0x80d2ae83e9ce78f3ULL, 0xc1d72b7c6b426019ULL},
+    {0xa1075a24e4421730ULL, 0xb24cf65b8612f81fULL},
+    {0xc94930ae1d529cfcULL, 0xdee033f26797b627ULL},
+    {0xfb9b7cd9a4a7443cULL, 0x169840ef017da3b1ULL},
+    {0x9d412e0806e88aa5ULL, 0x8e1f289560ee864eULL},
+    {0xc491798a08a2ad4eULL, 0xf1a6f2bab92a27e2ULL},
+    {0xf5b5d7ec8acb58a2ULL, 0xae10af696774b1dbULL},
+    {0x9991a6f3d6bf1765ULL, 0xacca6da1e0a8ef29ULL},
+    {0xbff610b0cc6edd3fULL, 0x17fd090a58d32af3ULL},
+    {0xeff394dcff8a948eULL, 0xddfc4b4cef07f5b0ULL},
+    {0x95f83d0a1fb69cd9ULL, 0x4abdaf101564f98eULL},
+    {0xbb764c4ca7a4440fULL, 0x9d6d1ad41abe37f1ULL},
+    {0xea53df5fd18d5513ULL, 0x84c86189216dc5edULL},
+    {0x92746b9be2f8552cULL, 0x32fd3cf5b4e49bb4ULL},
+    {0xb7118682dbb66a77ULL, 0x3fbc8c33221dc2a1ULL},
+    {0xe4d5e82392a40515ULL, 0x0fabaf3feaa5334aULL},
+    {0x8f05b1163ba6832dULL, 0x29cb4d87f2a7400eULL},
+    {0xb2c71d5bca9023f8ULL, 0x743e20e9ef511012ULL},
+    {0xdf78e4b2bd342cf6ULL, 0x914da9246b255416ULL},
+    {0x8bab8eefb6409c1aULL, 0x1ad089b6c2f7548eULL},
+    {0xae9672aba3d0c320ULL, 0xa184ac2473b529b1ULL},
+    {0xda3c0f568cc4f3e8ULL, 0xc9e5d72d90a2741eULL},
+    {0x8865899617fb1871ULL, 0x7e2fa67c7a658892ULL},
+    {0xaa7eebfb9df9de8dULL, 0xddbb901b98feeab7ULL},
+    {0xd51ea6fa85785631ULL, 0x552a74227f3ea565ULL},
+    {0x8533285c936b35deULL, 0xd53a88958f87275fULL},
+    {0xa67ff273b8460356ULL, 0x8a892abaf368f137ULL},
+    {0xd01fef10a657842cULL, 0x2d2b7569b0432d85ULL},
+    {0x8213f56a67f6b29bULL, 0x9c3b29620e29fc73ULL},
+    {0xa298f2c501f45f42ULL, 0x8349f3ba91b47b8fULL},
+    {0xcb3f2f7642717713ULL, 0x241c70a936219a73ULL},
+    {0xfe0efb53d30dd4d7ULL, 0xed238cd383aa0110ULL},
+    {0x9ec95d1463e8a506ULL, 0xf4363804324a40aaULL},
+    {0xc67bb4597ce2ce48ULL, 0xb143c6053edcd0d5ULL},
+    {0xf81aa16fdc1b81daULL, 0xdd94b7868e94050aULL},
+    {0x9b10a4e5e9913128ULL, 0xca7cf2b4191c8326ULL},
+    {0xc1d4ce1f63f57d72ULL, 0xfd1c2f611f63a3f0ULL},
+    {0xf24a01a73cf2dccfULL, 0xbc633b39673c8cecULL},
+    {0x976e41088617ca01ULL, 0xd5be0503e085d813ULL},
+    {0xbd49d14aa79dbc82ULL, 0x4b2d8644d8a74e18ULL},
+    {0xec9c459d51852ba2ULL, 0xddf8e7d60ed1219eULL},
+    {0x93e1ab8252f33b45ULL, 0xcabb90e5c942b503ULL},
+    {0xb8da1662e7b00a17ULL, 0x3d6a751f3b936243ULL},
+    {0xe7109bfba19c0c9dULL, 0x0cc512670a783ad4ULL},
+    {0x906a617d450187e2ULL, 0x27fb2b80668b24c5ULL},
+    {0xb484f9dc9641e9daULL, 0xb1f9f660802dedf6ULL},
+    {0xe1a63853bbd26451ULL, 0x5e7873f8a0396973ULL},
+    {0x8d07e33455637eb2ULL, 0xdb0b487b6423e1e8ULL},
+    {0xb049dc016abc5e5fULL, 0x91ce1a9a3d2cda62ULL},
+    {0xdc5c5301c56b75f7ULL, 0x7641a140cc7810fbULL},
+    {0x89b9b3e11b6329baULL, 0xa9e904c87fcb0a9dULL},
+    {0xac2820d9623bf429ULL, 0x546345fa9fbdcd44ULL},
+    {0xd732290fbacaf133ULL, 0xa97c177947ad4095ULL},
+    {0x867f59a9d4bed6c0ULL, 0x49ed8eabcccc485dULL},
+    {0xa81f301449ee8c70ULL, 0x5c68f256bfff5a74ULL},
+    {0xd226fc195c6a2f8cULL, 0x73832eec6fff3111ULL},
+    {0x83585d8fd9c25db7ULL, 0xc831fd53c5ff7eabULL},
+    {0xa42e74f3d032f525ULL, 0xba3e7ca8b77f5e55ULL},
+    {0xcd3a1230c43fb26fULL, 0x28ce1bd2e55f35ebULL},
+    {0x80444b5e7aa7cf85ULL, 0x7980d163cf5b81b3ULL},
+    {0xa0555e361951c366ULL, 0xd7e105bcc332621fULL},
+    {0xc86ab5c39fa63440ULL, 0x8dd9472bf3fefaa7ULL},
+    {0xfa856334878fc150ULL, 0xb14f98f6f0feb951ULL},
+    {0x9c935e00d4b9d8d2ULL, 0x6ed1bf9a569f33d3ULL},
+    {0xc3b8358109e84f07ULL, 0x0a862f80ec4700c8ULL},
+    {0xf4a642e14c6262c8ULL, 0xcd27bb612758c0faULL},
+    {0x98e7e9cccfbd7dbdULL, 0x8038d51cb897789cULL},
+    {0xbf21e44003acdd2cULL, 0xe0470a63e6bd56c3ULL},
+    {0xeeea5d5004981478ULL, 0x1858ccfce06cac74ULL},
+    {0x95527a5202df0ccbULL, 0x0f37801e0c43ebc8ULL},
+    {0xbaa718e68396cffdULL, 0xd30560258f54e6baULL},
+    {0xe950df20247c83fdULL, 0x47c6b82ef32a2069ULL},
+    {0x91d28b7416cdd27eULL, 0x4cdc331d57fa5441ULL},
+    {0xb6472e511c81471dULL, 0xe0133fe4adf8e952ULL},
+    {0xe3d8f9e563a198e5ULL, 0x58180fddd97723a6ULL},
+    {0x8e679c2f5e44ff8fULL, 0x570f09eaa7ea7648ULL},
+};
+
+/*
+ * w * 10^q correctly rounded to a double (w has at most 19 digits).
+ * Eisel-Lemire as in fast_float's compute_float(): the 128-bit product of
+ * w and 5^q always determines the result (Mushtak & Lemire, "Fast number
+ * parsing without fallback"), with round-to-even decided from the dropped
+ * bits where 5^q is exact.
+ */
+static double decimal_to_double(uint64_t w, int64_t q, int negative) {
+    uint64_t sign = negative ? 1ULL << 63 : 0;
+    double d;
+    if (w <= (1ULL << 53) && q >= -22 && q <= 22) {
+        /* Clinger: both operands are exact, so one rounding */
+        d = (double)w;
+        d = q < 0 ? d / exact_powers_of_10[-q] : d * exact_powers_of_10[q];
+        return negative ? -d : d;
+    }
+    uint64_t bits;
+    if (w == 0 || q < POW5_MIN_Q) {
+        bits = sign;
+    }
+    else if (q > POW5_MAX_Q) {
+        bits = sign | (0x7FFULL << 52);
+    }
+    else {
+        int lz = clz64(w);
+        w <<= lz;
+        const UInt128* pow5 = &powers_of_5_128[q - POW5_MIN_Q];
+        UInt128 product = umul64(w, pow5->hi);
+        /* 55 bits are needed: the implicit bit, a rounding bit and one lost
+           when the product is below 2^127 */
+        const uint64_t precision_mask = UINT64_MAX >> 55;
+        if ((product.hi & precision_mask) == precision_mask) {
+            UInt128 second = umul64(w, pow5->lo);
+            product.lo += second.hi;
+            if (second.hi > product.lo) product.hi++;
+        }
+        int upperbit = (int)(product.hi >> 63);
+        int shift = upperbit + 64 - 52 - 3;
+        uint64_t mantissa = product.hi >> shift;
+        /* floor(q * log2(10)) + 63, plus the bias */
+        int64_t power2 = (((152170 + 65536) * q) >> 16) + 63 + upperbit - lz + 1023;
+        if (power2 <= 0) {
+            /* Subnormal (or zero); ties to even cannot occur this far down */
+            if (-power2 + 1 >= 64) {
+                mantissa = 0;
+                power2 = 0;
+            }
+            else {
+                mantissa >>= -power2 + 1;
+                mantissa += mantissa & 1;
+                mantissa >>= 1;
+                power2 = mantissa < (1ULL << 52) ? 0 : 1;
+            }
+        }
+        else {
+            /* Halfway between two doubles: only possible where 5^q is exact */
+            if (product.lo <= 1 && q >= -4 && q <= 23 && (mantissa & 3) == 1
+                && (mantissa << shift) == product.hi) {
+                mantissa &= ~1ULL;
+            }
+            mantissa += mantissa & 1;
+            mantissa >>= 1;
+            if (mantissa >= (2ULL << 52)) {
+                mantissa = 1ULL << 52;
+                power2++;
+            }
+            mantissa &= ~(1ULL << 52);
+            if (power2 >= 0x7FF) {
+                power2 = 0x7FF;
+                mantissa = 0;
+            }
         }
-        PyErr_Clear();
+        bits = sign | ((uint64_t)power2 << 52) | mantissa;
     }
-    
-    /* Slow path: use Python json module */
-    return dumps_via_json(obj, ensure_ascii, allow_nan, separators);
+    memcpy(&d, &bits, sizeof(d));
+    return d;
 }
 
-/* ======================================================================
- * dumps_ndarray() - Fast ndarray serialization via PEP 3118 buffer protocol
- * ====================================================================== */
+typedef struct {
+    const unsigned char* p;
+    const unsigned char* end;  /* *end is a NUL byte */
+    PyObject* memo;            /* object keys, shared like json.scanner's memo */
+    PyObject** stack;          /* the items of the open arrays */
+    Py_ssize_t stack_size;
+    Py_ssize_t stack_capacity;
+    Py_UCS4* chars;            /* the characters of a string with escapes */
+    Py_ssize_t chars_capacity;
+} Decoder;
 
-typedef enum {
-    NAN_RAISE = 0,
-    NAN_NULL  = 1,
-    NAN_SKIP  = 2,
-} NanMode;
+#define IS_DIGIT(c) ((unsigned char)((c) - '0') < 10)
 
-static int parse_nan_mode(PyObject* nan_arg, NanMode* out) {
-    if (nan_arg == NULL || nan_arg == Py_None) {
-        *out = NAN_RAISE;
-        return 0;
-    }
-    if (!PyUnicode_Check(nan_arg)) {
-        PyErr_SetString(PyExc_TypeError,
-            "nan parameter must be 'raise', 'null', or 'skip'");
-        return -1;
-    }
-    if (PyUnicode_CompareWithASCIIString(nan_arg, "raise") == 0) {
-        *out = NAN_RAISE;
-    } else if (PyUnicode_CompareWithASCIIString(nan_arg, "null") == 0) {
-        *out = NAN_NULL;
-    } else if (PyUnicode_CompareWithASCIIString(nan_arg, "skip") == 0) {
-        *out = NAN_SKIP;
-    } else {
-        PyErr_Format(PyExc_ValueError,
-            "nan parameter must be 'raise', 'null', or 'skip', got '%U'",
-            nan_arg);
-        return -1;
-    }
-    return 0;
+static inline void decoder_skip_ws(Decoder* d) {
+    const unsigned char* p = d->p;
+    while (*p == ' ' || *p == '\n' || *p == '\r' || *p == '\t') p++;
+    d->p = p;
 }
 
-typedef struct {
-    NanMode nan_mode;
-    int use_precision;
-    int precision;
-    char format;  /* 'f' = float32, 'd' = float64 */
-} FormatConfig;
+/* Syntax errors only stop the native parse: json.loads() reports them */
+static PyObject* decoder_error(void) {
+    PyErr_SetNone(PyExc_ValueError);
+    return NULL;
+}
 
-static int buffer_append_precision_double(Buffer* buf, double x, int precision) {
-    char tmp[64];
-    int len = snprintf(tmp, sizeof(tmp), "%.*f", precision, x);
-    if (len < 0 || len >= (int)sizeof(tmp)) {
-        PyErr_SetString(PyExc_RuntimeError, "snprintf overflow in precision formatting");
-        return -1;
+static int decoder_push(Decoder* d, PyObject* item) {
+    if (d->stack_size == d->stack_capacity) {
+        Py_ssize_t capacity = d->stack_capacity ? 2 * d->stack_capacity : 64;
+        PyObject** stack = PyMem_Realloc(d->stack, (size_t)capacity * sizeof(PyObject*));
+        if (stack == NULL) {
+            Py_DECREF(item);
+            PyErr_NoMemory();
+            return -1;
+        }
+        d->stack = stack;
+        d->stack_capacity = capacity;
     }
-    return buffer_append(buf, tmp, (size_t)len);
+    d->stack[d->stack_size++] = item;
+    return 0;
 }
 
 /*
- * Format a single element from the data pointer.
- * Returns: 1 = written, 0 = skipped (NAN_SKIP), -1 = error
+ * Accumulate the decimal digits at p into *w (wrapping past 19 digits) and
+ * return the end of the run: 8 digits at a time (SWAR, as in fast_float)
+ * on little-endian targets, then one at a time.
  */
-static int format_element(Buffer* buf, const void* ptr, const FormatConfig* cfg) {
-    if (cfg->format == 'f') {
-        float x;
-        memcpy(&x, ptr, sizeof(float));
-        if (!isfinite(x)) {
-            switch (cfg->nan_mode) {
-            case NAN_RAISE:
-                PyErr_SetString(PyExc_ValueError,
-                    "Out of range float values are not JSON compliant");
-                return -1;
-            case NAN_NULL:
-                return buffer_append(buf, "null", 4) < 0 ? -1 : 1;
-            case NAN_SKIP:
-                return 0;
+static inline const unsigned char* scan_digits(const unsigned char* p, const unsigned char* end,
+                                               uint64_t* w) {
+    uint64_t value = *w;
+#if PY_LITTLE_ENDIAN
+    while (end - p >= 8) {
+        uint64_t x;
+        memcpy(&x, p, 8);
+        if ((((x + 0x4646464646464646ULL) | (x - 0x3030303030303030ULL))
+             & 0x8080808080808080ULL) != 0) {
+            break;
+        }
+        x -= 0x3030303030303030ULL;
+        x = x * 10 + (x >> 8);
+        x = (((x & 0x000000FF000000FFULL) * 0x000F424000000064ULL)
+             + (((x >> 16) & 0x000000FF000000FFULL) * 0x0000271000000001ULL)) >> 32;
+        value = value * 100000000 + x;
+        p += 8;
+    }
+#endif
+    while (IS_DIGIT(*p)) {
+        value = 10 * value + (uint64_t)(*p - '0');
+        p++;
+    }
+    *w = value;
+    return p;
+}
+
+/* An int or float token, with json.scanner's grammar */
+static PyObject* decode_number(Decoder* d) {
+    const unsigned char* start = d->p;
+    const unsigned char* p = start;
+    int negative = *p == '-';
+    if (negative) p++;
+    const unsigned char* digits = p;
+    /* The digits as an integer w, wrapping around past 19 digits */
+    uint64_t w = 0;
+    if (*p == '0') {
+        p++;
+    }
+    else if (IS_DIGIT(*p)) {
+        p = scan_digits(p, d->end, &w);
+    }
+    else if (negative && d->end - p >= 8 && memcmp(p, "Infinity", 8) == 0) {
+        d->p = p + 8;
+        return PyFloat_FromDouble(-Py_HUGE_VAL);
+    }
+    else {
+        return decoder_error();
+    }
+    Py_ssize_t n_digits = p - digits;
+    Py_ssize_t n_frac = 0;
+    int is_float = 0;
+    if (*p == '.' && IS_DIGIT(p[1])) {
+        const unsigned char* frac = ++p;
+        p = scan_digits(p, d->end, &w);
+        n_frac = p - frac;
+        n_digits += n_frac;
+        is_float = 1;
+    }
+    int64_t exponent = 0;
+    if (*p == 'e' || *p == 'E') {
+        const unsigned char* e = p + 1;
+        int exp_negative = *e == '-';
+        if (*e == '-' || *e == '+') e++;
+        if (IS_DIGIT(*e)) {
+            is_float = 1;
+            while (IS_DIGIT(*e)) {
+                /* Far past any double: only the sign matters beyond this */
+                if (exponent < 0x10000000) exponent = 10 * exponent + (*e - '0');
+                e++;
             }
+            if (exp_negative) exponent = -exponent;
+            p = e;
         }
-        if (cfg->use_precision)
-            return buffer_append_precision_double(buf, (double)x, cfg->precision) < 0 ? -1 : 1;
-        return buffer_append_finite_float(buf, x) < 0 ? -1 : 1;
-    } else {
-        double x;
-        memcpy(&x, ptr, sizeof(double));
-        if (!isfinite(x)) {
-            switch (cfg->nan_mode) {
-            case NAN_RAISE:
-                PyErr_SetString(PyExc_ValueError,
-                    "Out of range float values are not JSON compliant");
-                return -1;
-            case NAN_NULL:
-                return buffer_append(buf, "null", 4) < 0 ? -1 : 1;
-            case NAN_SKIP:
-                return 0;
+    }
+    d->p = p;
+
+    if (!is_float) {
+        if (n_digits <= 18) {
+            return PyLong_FromLongLong(negative ? -(int64_t)w : (int64_t)w);
+        }
+    }
+    else {
+        if (n_digits > 19) {
+            /* Leading zeros ("0.000123") are not significant */
+            for (const unsigned char* c = digits; *c == '0' || *c == '.'; c++) {
+                n_digits -= *c == '0';
             }
         }
-        if (cfg->use_precision)
-            return buffer_append_precision_double(buf, x, cfg->precision) < 0 ? -1 : 1;
-        return buffer_append_finite_double(buf, x) < 0 ? -1 : 1;
+        if (n_digits <= 19) {
+            return PyFloat_FromDouble(decimal_to_double(w, exponent - n_frac, negative));
+        }
     }
-}
 
-static int is_nonfinite_element(const void* ptr, char format) {
-    if (format == 'f') {
-        float x;
-        memcpy(&x, ptr, sizeof(float));
-        return !isfinite(x);
-    } else {
-        double x;
-        memcpy(&x, ptr, sizeof(double));
-        return !isfinite(x);
+    /* Big ints (with int()'s digit limit) and floats with over 19 digits */
+    Py_ssize_t len = p - start;
+    char small[64];
+    char* token = len < (Py_ssize_t)sizeof(small) ? small : PyMem_Malloc((size_t)len + 1);
+    if (token == NULL) return PyErr_NoMemory();
+    memcpy(token, start, (size_t)len);
+    token[len] = '\0';
+    PyObject* result;
+    if (!is_float) {
+        result = PyLong_FromString(token, NULL, 10);
+    }
+    else {
+        double value = PyOS_string_to_double(token, NULL, NULL);
+        result = value == -1.0 && PyErr_Occurred() ? NULL : PyFloat_FromDouble(value);
     }
+    if (token != small) PyMem_Free(token);
+    return result;
 }
 
-static PyObject*
-serialize_1d(const char* data, Py_ssize_t n, Py_ssize_t itemsize,
-             const FormatConfig* cfg)
-{
-    Buffer buf;
-    if (buffer_init(&buf, (size_t)n * 24 + 2) < 0) {
-        PyErr_NoMemory();
-        return NULL;
-    }
+static inline int hex_digit(unsigned char c) {
+    if (IS_DIGIT(c)) return c - '0';
+    c |= 0x20;
+    if (c >= 'a' && c <= 'f') return c - 'a' + 10;
+    return -1;
+}
 
-    if (buffer_append_char(&buf, '[') < 0) goto error;
+/* The 4 hex digits of a \uXXXX escape, or -1 */
+static inline int decode_hex4(const unsigned char* p) {
+    int value = 0;
+    for (int i = 0; i < 4; i++) {
+        int digit = hex_digit(p[i]);
+        if (digit < 0) return -1;
+        value = (value << 4) | digit;
+    }
+    return value;
+}
 
-    int need_comma = 0;
-    for (Py_ssize_t i = 0; i < n; i++) {
-        const void* ptr = data + i * itemsize;
+/*
+ * A UTF-8 sequence starting at *pp (the lead byte is >= 0x80), as decoded
+ * with errors="surrogatepass" like json.loads() decodes bytes; -1 if invalid.
+ */
+static Py_UCS4 decode_utf8_char(const unsigned char** pp) {
+    const unsigned char* p = *pp;
+    unsigned char c = p[0];
+    Py_UCS4 ch;
+    int n;
+    unsigned char low = 0x80, high = 0xBF;
+    if (c >= 0xC2 && c <= 0xDF) {
+        ch = c & 0x1F;
+        n = 1;
+    }
+    else if (c >= 0xE0 && c <= 0xEF) {
+        ch = c & 0x0F;
+        n = 2;
+        if (c == 0xE0) low = 0xA0;
+    }
+    else if (c >= 0xF0 && c <= 0xF4) {
+        ch = c & 0x07;
+        n = 3;
+        if (c == 0xF0) low = 0x90;
+        if (c == 0xF4) high = 0x8F;
+    }
+    else {
+        return (Py_UCS4)-1;
+    }
+    for (int i = 1; i <= n; i++) {
+        unsigned char b = p[i];
+        if (b < low || b > high) return (Py_UCS4)-1;
+        low = 0x80;
+        high = 0xBF;
+        ch = (ch << 6) | (b & 0x3F);
+    }
+    *pp = p + n + 1;
+    return ch;
+}
 
-        if (cfg->nan_mode == NAN_SKIP && is_nonfinite_element(ptr, cfg->format))
+/* A string with escapes, from s (after the quote) to the closing quote at q */
+static PyObject* decode_escaped_string(Decoder* d, const unsigned char* s,
+                                       const unsigned char* q) {
+    /* Never more characters than bytes */
+    if (q - s > d->chars_capacity) {
+        Py_ssize_t capacity = q - s > 256 ? q - s : 256;
+        PyMem_Free(d->chars);
+        d->chars = PyMem_Malloc((size_t)capacity * sizeof(Py_UCS4));
+        d->chars_capacity = d->chars == NULL ? 0 : capacity;
+        if (d->chars == NULL) return PyErr_NoMemory();
+    }
+    Py_UCS4* out = d->chars;
+    Py_ssize_t n = 0;
+    const unsigned char* p = s;
+    while (p < q) {
+        unsigned char c = *p;
+        if (c < 0x80 && c != '\\') {
+            out[n++] = c;
+            p++;
+            continue;
+        }
+        if (c >= 0x80) {
+            Py_UCS4 ch = decode_utf8_char(&p);
+            if (ch == (Py_UCS4)-1) return decoder_error();
+            out[n++] = ch;
             continue;
-
-        if (need_comma) {
-            if (buffer_append_char(&buf, ',') < 0) goto error;
         }
+        switch (p[1]) {
+            case '"': case '\\': case '/': out[n++] = p[1]; break;
+            case 'b': out[n++] = '\b'; break;
+            case 'f': out[n++] = '\f'; break;
+            case 'n': out[n++] = '\n'; break;
+            case 'r': out[n++] = '\r'; break;
+            case 't': out[n++] = '\t'; break;
+            case 'u': {
+                int ch = q - p >= 6 ? decode_hex4(p + 2) : -1;
+                if (ch < 0) return decoder_error();
+                p += 4;
+                /* A high surrogate escape followed by a low one is a pair */
+                if (Py_UNICODE_IS_HIGH_SURROGATE(ch) && q - p >= 8 && p[2] == '\\'
+                    && p[3] == 'u') {
+                    int low = decode_hex4(p + 4);
+                    if (low < 0) return decoder_error();
+                    if (Py_UNICODE_IS_LOW_SURROGATE(low)) {
+                        ch = (int)Py_UNICODE_JOIN_SURROGATES(ch, low);
+                        p += 6;
+                    }
+                }
+                out[n++] = (Py_UCS4)ch;
+                break;
+            }
+            default:
+                return decoder_error();
+        }
+        p += 2;
+    }
+    return PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, out, n);
+}
 
-        int rc = format_element(&buf, ptr, cfg);
-        if (rc < 0) goto error;
-        need_comma = 1;
+/* A string value; d->p is just past the opening quote */
+static PyObject* decode_string(Decoder* d) {
+    const unsigned char* s = d->p;
+    Py_ssize_t n = d->end - s;
+    Py_ssize_t i = 0;
+    int ascii = 1, escaped = 0;
+    for (;;) {
+        i = scan_plain_ascii(s, i, n);
+        unsigned char c = s[i];
+        if (c == '"') break;
+        if (c == '\\') {
+            /* Skip the escaped character, so \" does not end the string */
+            escaped = 1;
+            if (s[i + 1] < 0x20) return decoder_error();
+            i += 2;
+        }
+        else if (c >= 0x7f) {
+            ascii &= c == 0x7f;
+            i++;
+        }
+        else {
+            /* A control character, or the end of the document */
+            return decoder_error();
+        }
     }
+    d->p = s + i + 1;
+    if (escaped) return decode_escaped_string(d, s, s + i);
+    if (!ascii) return PyUnicode_DecodeUTF8((const char*)s, i, "surrogatepass");
+    PyObject* result = PyUnicode_New(i, 127);
+    if (result != NULL) memcpy(PyUnicode_1BYTE_DATA(result), s, (size_t)i);
+    return result;
+}
 
-    if (buffer_append_char(&buf, ']') < 0) goto error;
+static PyObject* decode_value(Decoder* d);
 
-    {
-        PyObject* result = PyUnicode_DecodeASCII(buf.data, buf.size, NULL);
-        buffer_free(&buf);
-        return result;
+static PyObject* decode_array(Decoder* d) {
+    Py_ssize_t base = d->stack_size;
+    d->p++;
+    decoder_skip_ws(d);
+    if (*d->p != ']') {
+        for (;;) {
+            /* Numbers first: arrays of floats are the common large document */
+            unsigned char c = *d->p;
+            PyObject* item = c == '-' || IS_DIGIT(c) ? decode_number(d) : decode_value(d);
+            if (item == NULL || decoder_push(d, item) < 0) return NULL;
+            decoder_skip_ws(d);
+            if (*d->p == ']') break;
+            if (*d->p != ',') return decoder_error();
+            d->p++;
+            decoder_skip_ws(d);
+        }
+    }
+    d->p++;
+    /* Move the items into a list of the exact size */
+    Py_ssize_t n = d->stack_size - base;
+    PyObject* list = PyList_New(n);
+    if (list == NULL) return NULL;
+    for (Py_ssize_t i = 0; i < n; i++) {
+        PyList_SET_ITEM(list, i, d->stack[base + i]);
+    }
+    d->stack_size = base;
+    return list;
+}
+
+static PyObject* decode_object(Decoder* d) {
+    PyObject* dict = PyDict_New();
+    if (dict == NULL) return NULL;
+    d->p++;
+    decoder_skip_ws(d);
+    if (*d->p != '}') {
+        for (;;) {
+            if (*d->p != '"') goto error;
+            d->p++;
+            PyObject* key = decode_string(d);
+            if (key == NULL) goto fail;
+            /* One str object per distinct key, as json.loads() does */
+            PyObject* memo_key = PyDict_SetDefault(d->memo, key, key);
+            Py_XINCREF(memo_key);
+            Py_DECREF(key);
+            if (memo_key == NULL) goto fail;
+            decoder_skip_ws(d);
+            if (*d->p != ':') {
+                Py_DECREF(memo_key);
+                goto error;
+            }
+            d->p++;
+            decoder_skip_ws(d);
+            PyObject* value = decode_value(d);
+            int rc = value == NULL ? -1 : PyDict_SetItem(dict, memo_key, value);
+            Py_DECREF(memo_key);
+            Py_XDECREF(value);
+            if (rc < 0) goto fail;
+            decoder_skip_ws(d);
+            if (*d->p == '}') break;
+            if (*d->p != ',') goto error;
+            d->p++;
+            decoder_skip_ws(d);
+        }
     }
+    d->p++;
+    return dict;
 
 error:
-    buffer_free(&buf);
-    if (!PyErr_Occurred()) PyErr_NoMemory();
+    decoder_error();
+fail:
+    Py_DECREF(dict);
     return NULL;
 }
 
-static int row_has_nonfinite(const char* row_data, Py_ssize_t cols,
-                             Py_ssize_t itemsize, char format)
-{
-    for (Py_ssize_t j = 0; j < cols; j++) {
-        if (is_nonfinite_element(row_data + j * itemsize, format))
-            return 1;
+static PyObject* decode_value(Decoder* d) {
+    const unsigned char* p = d->p;
+    Py_ssize_t left = d->end - p;
+    PyObject* result;
+    switch (*p) {
+        case '"':
+            d->p++;
+            return decode_string(d);
+        case '[':
+            if (Py_EnterRecursiveCall(" while decoding a JSON array from a unicode string"))
+                return NULL;
+            result = decode_array(d);
+            Py_LeaveRecursiveCall();
+            return result;
+        case '{':
+            if (Py_EnterRecursiveCall(" while decoding a JSON object from a unicode string"))
+                return NULL;
+            result = decode_object(d);
+            Py_LeaveRecursiveCall();
+            return result;
+        case 'n':
+            if (left >= 4 && memcmp(p, "null", 4) == 0) {
+                d->p += 4;
+                Py_RETURN_NONE;
+            }
+            break;
+        case 't':
+            if (left >= 4 && memcmp(p, "true", 4) == 0) {
+                d->p += 4;
+                Py_RETURN_TRUE;
+            }
+            break;
+        case 'f':
+            if (left >= 5 && memcmp(p, "false", 5) == 0) {
+                d->p += 5;
+                Py_RETURN_FALSE;
+            }
+            break;
+        case 'N':
+            if (left >= 3 && memcmp(p, "NaN", 3) == 0) {
+                d->p += 3;
+                return PyFloat_FromDouble(Py_NAN);
+            }
+            break;
+        case 'I':
+            if (left >= 8 && memcmp(p, "Infinity", 8) == 0) {
+                d->p += 8;
+                return PyFloat_FromDouble(Py_HUGE_VAL);
+            }
+            break;
+        default:
+            if (*p == '-' || IS_DIGIT(*p)) return decode_number(d);
     }
-    return 0;
+    return decoder_error();
 }
 
-static PyObject*
-serialize_2d(const char* data, Py_ssize_t rows, Py_ssize_t cols,
-             Py_ssize_t itemsize, const FormatConfig* cfg)
-{
-    Buffer buf;
-    size_t est = (size_t)rows * (size_t)cols * 24 + (size_t)rows * 2 + 2;
-    if (buffer_init(&buf, est) < 0) {
-        PyErr_NoMemory();
-        return NULL;
+/* The document in [data, data + len) (data[len] == '\0'), or NULL */
+static PyObject* decode_document(const char* data, Py_ssize_t len) {
+    Decoder d;
+    d.p = (const unsigned char*)data;
+    d.end = d.p + len;
+    d.stack = NULL;
+    d.stack_size = d.stack_capacity = 0;
+    d.chars = NULL;
+    d.chars_capacity = 0;
+    d.memo = PyDict_New();
+    if (d.memo == NULL) return NULL;
+    decoder_skip_ws(&d);
+    PyObject* result = decode_value(&d);
+    if (result != NULL) {
+        decoder_skip_ws(&d);
+        if (d.p != d.end) {
+            Py_CLEAR(result);
+            decoder_error();
+        }
     }
+    for (Py_ssize_t i = 0; i < d.stack_size; i++) {
+        Py_DECREF(d.stack[i]);
+    }
+    PyMem_Free(d.stack);
+    PyMem_Free(d.chars);
+    Py_DECREF(d.memo);
+    return result;
+}
 
-    if (buffer_append_char(&buf, '[') < 0) goto error;
-
-    int need_row_comma = 0;
-    for (Py_ssize_t i = 0; i < rows; i++) {
-        const char* row_data = data + i * cols * itemsize;
-
-        if (cfg->nan_mode == NAN_SKIP &&
-            row_has_nonfinite(row_data, cols, itemsize, cfg->format))
-            continue;
+/* bytes that json.detect_encoding() takes for UTF-8 without a BOM */
+static int is_plain_utf8(const unsigned char* b, Py_ssize_t len) {
+    if (len == 0) return 1;
+    if (b[0] == 0 || b[0] == 0xEF || b[0] == 0xFE || b[0] == 0xFF) return 0;
+    return len < 2 || b[1] != 0;
+}
 
-        if (need_row_comma) {
-            if (buffer_append_char(&buf, ',') < 0) goto error;
+/* The native decoding of a str, bytes or bytearray document, or NULL */
+static PyObject* decode_input(PyObject* s) {
+    if (PyUnicode_Check(s)) {
+        if (PyUnicode_IS_ASCII(s)) {
+            Py_ssize_t len;
+            const char* data = PyUnicode_AsUTF8AndSize(s, &len);
+            return data == NULL ? NULL : decode_document(data, len);
         }
+        /* Lone surrogates survive the round trip, as in json.loads() */
+        PyObject* utf8 = PyUnicode_AsEncodedString(s, "utf-8", "surrogatepass");
+        if (utf8 == NULL) return NULL;
+        PyObject* result = decode_document(PyBytes_AS_STRING(utf8), PyBytes_GET_SIZE(utf8));
+        Py_DECREF(utf8);
+        return result;
+    }
+    if (PyBytes_Check(s)) {
+        const char* data = PyBytes_AS_STRING(s);
+        Py_ssize_t len = PyBytes_GET_SIZE(s);
+        if (!is_plain_utf8((const unsigned char*)data, len)) return decoder_error();
+        return decode_document(data, len);
+    }
+    if (!PyByteArray_Check(s)) return decoder_error();
+    /* The export keeps another thread from resizing it (bytearray data is
+       NUL-terminated too) */
+    Py_buffer view;
+    if (PyObject_GetBuffer(s, &view, PyBUF_SIMPLE) < 0) return NULL;
+    PyObject* result = is_plain_utf8(view.buf, view.len)
+        ? decode_document(view.buf, view.len) : decoder_error();
+    PyBuffer_Release(&view);
+    return result;
+}
 
-        if (buffer_append_char(&buf, '[') < 0) goto error;
+/* The keywords of json.loads() that must be None for the native decoder */
+static const char* const loads_hook_names[] = {
+    "cls", "object_hook", "parse_float", "parse_int", "parse_constant",
+    "object_pairs_hook", NULL,
+};
 
-        for (Py_ssize_t j = 0; j < cols; j++) {
-            if (j > 0) {
-                if (buffer_append_char(&buf, ',') < 0) goto error;
+/*
+ * loads(): the json.loads() signature (vectorcall). Documents are decoded
+ * natively when no hooks or decoder options are given, and by json.loads()
+ * with the very same arguments otherwise or on any error, so results and
+ * exceptions (JSONDecodeError messages and positions) are exactly stdlib's.
+ */
+static PyObject*
+loads(PyObject* module, PyObject* const* args, Py_ssize_t nargs, PyObject* kwnames)
+{
+    ModuleState* st = get_module_state(module);
+    int native = nargs == 1;
+    Py_ssize_t nkw = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+    for (Py_ssize_t i = 0; i < nkw && native; i++) {
+        int known = 0;
+        for (const char* const* name = loads_hook_names; *name != NULL; name++) {
+            if (PyUnicode_CompareWithASCIIString(PyTuple_GET_ITEM(kwnames, i), *name) == 0) {
+                known = 1;
+                break;
             }
-            const void* ptr = row_data + j * itemsize;
-            int rc = format_element(&buf, ptr, cfg);
-            if (rc < 0) goto error;
         }
-
-        if (buffer_append_char(&buf, ']') < 0) goto error;
-        need_row_comma = 1;
+        native = known && args[nargs + i] == Py_None;
     }
-
-    if (buffer_append_char(&buf, ']') < 0) goto error;
-
-    {
-        PyObject* result = PyUnicode_DecodeASCII(buf.data, buf.size, NULL);
-        buffer_free(&buf);
-        return result;
+    if (native) {
+        PyObject* result = decode_input(args[0]);
+        if (result != NULL) return result;
+        PyErr_Clear();
     }
-
-error:
-    buffer_free(&buf);
-    if (!PyErr_Occurred()) PyErr_NoMemory();
-    return NULL;
+    return PyObject_Vectorcall(st->json_loads, args, (size_t)nargs, kwnames);
 }
 
 static PyObject*
-py_dumps_ndarray(PyObject* self, PyObject* args, PyObject* kwargs)
+set_arena_limit(PyObject* self, PyObject* arg)
 {
-    PyObject* array_obj;
-    PyObject* nan_arg = NULL;
-    PyObject* precision_arg = NULL;
-
-    static char* kwlist[] = {"array", "nan", "precision", NULL};
-
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|$OO", kwlist,
-                                     &array_obj, &nan_arg, &precision_arg))
+    Py_ssize_t limit = PyLong_AsSsize_t(arg);
+    if (limit == -1 && PyErr_Occurred())
         return NULL;
-
-    NanMode nan_mode;
-    if (parse_nan_mode(nan_arg, &nan_mode) < 0)
+    if (limit < 0) {
+        PyErr_SetString(PyExc_ValueError, "arena limit must be non-negative");
         return NULL;
-
-    int use_precision = 0;
-    int precision = 0;
-    if (precision_arg != NULL && precision_arg != Py_None) {
-        precision = (int)PyLong_AsLong(precision_arg);
-        if (precision == -1 && PyErr_Occurred())
-            return NULL;
-        if (precision < 0 || precision > 20) {
-            PyErr_SetString(PyExc_ValueError, "precision must be between 0 and 20");
-            return NULL;
+    }
+    Py_ssize_t previous = EXCHANGE_SSIZE(&arena_limit, limit);
+    if (limit == 0) {
+        /* Drop this thread's block now; other threads free theirs when they exit */
+        Arena* arena = thread_arena(get_module_state(self));
+        if (arena != NULL) {
+            PyMem_RawFree(arena->data);
+            arena->data = NULL;
+            arena->capacity = 0;
         }
-        use_precision = 1;
     }
+    return PyLong_FromSsize_t(previous);
+}
 
-    Py_buffer view;
-    if (PyObject_GetBuffer(array_obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) < 0)
-        return NULL;
+static PyObject*
+configure_parallel(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    Py_ssize_t workers = -1;
+    Py_ssize_t min_size = -1;
+    PyObject* workers_arg = Py_None;
+    PyObject* min_size_arg = Py_None;
 
-    if (view.ndim != 1 && view.ndim != 2) {
-        PyBuffer_Release(&view);
-        PyErr_Format(PyExc_ValueError,
-            "only 1D and 2D arrays are supported, got %dD", view.ndim);
-        return NULL;
-    }
+    static char* kwlist[] = {"workers", "min_size", NULL};
 
-    char format;
-    Py_ssize_t itemsize;
-    if (view.format != NULL && view.format[0] == 'f' && view.format[1] == '\0') {
-        format = 'f';
-        itemsize = 4;
-    } else if (view.format != NULL && view.format[0] == 'd' && view.format[1] == '\0') {
-        format = 'd';
-        itemsize = 8;
-    } else {
-        PyBuffer_Release(&view);
-        PyErr_Format(PyExc_TypeError,
-            "only float32 ('f') and float64 ('d') dtypes are supported, got '%s'",
-            view.format ? view.format : "(null)");
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|$OO", kwlist,
+                                     &workers_arg, &min_size_arg))
         return NULL;
-    }
 
-    if (view.itemsize != itemsize) {
-        PyBuffer_Release(&view);
-        PyErr_SetString(PyExc_RuntimeError, "itemsize mismatch");
-        return NULL;
+    if (workers_arg != Py_None) {
+        workers = PyLong_AsSsize_t(workers_arg);
+        if (workers == -1 && PyErr_Occurred())
+            return NULL;
+        if (workers < 1 || workers > PARALLEL_MAX_WORKERS) {
+            PyErr_Format(PyExc_ValueError,
+                "workers must be between 1 and %d, got %zd", PARALLEL_MAX_WORKERS, workers);
+            return NULL;
+        }
+    }
+    if (min_size_arg != Py_None) {
+        min_size = PyLong_AsSsize_t(min_size_arg);
+        if (min_size == -1 && PyErr_Occurred())
+            return NULL;
+        if (min_size < 0) {
+            PyErr_SetString(PyExc_ValueError, "min_size must be non-negative");
+            return NULL;
+        }
     }
 
-    FormatConfig cfg;
-    cfg.nan_mode = nan_mode;
-    cfg.use_precision = use_precision;
-    cfg.precision = precision;
-    cfg.format = format;
-
-    PyObject* result;
-    if (view.ndim == 1) {
-        result = serialize_1d((const char*)view.buf, view.shape[0],
-                              itemsize, &cfg);
-    } else {
-        result = serialize_2d((const char*)view.buf, view.shape[0], view.shape[1],
-                              itemsize, &cfg);
+    POOL_CONFIG_LOCK();
+    if (min_size != -1)
+        STORE_SSIZE(&parallel_min_size, min_size);
+    if (workers != -1 && workers != LOAD_INT(&parallel_workers)) {
+        if (pool_check_fork() < 0) {
+            POOL_CONFIG_UNLOCK();
+            return NULL;
+        }
+        /* Wait for a call that is using the pool to finish */
+        Py_BEGIN_ALLOW_THREADS
+        PyThread_acquire_lock(pool.mutex, WAIT_LOCK);
+        pool_shutdown();
+        if (workers > 1) pool_start((int)workers - 1);
+        PyThread_release_lock(pool.mutex);
+        Py_END_ALLOW_THREADS
+        STORE_INT(&parallel_workers, (int)workers);
     }
+    POOL_CONFIG_UNLOCK();
 
-    PyBuffer_Release(&view);
-    return result;
+    return Py_BuildValue("{s:i,s:n}", "workers", LOAD_INT(&parallel_workers),
+                         "min_size", LOAD_SSIZE(&parallel_min_size));
 }
 
 static PyMethodDef fastjson_methods[] = {
-    {"dumps", (PyCFunction)dumps, METH_VARARGS | METH_KEYWORDS,
-     "dumps(obj, *, ensure_ascii=True, separators=(', ', ': '), allow_nan=True) -> str\n\n"
-     "Serialize Python object to JSON string.\n\n"
-     "Fast path: list/tuple of floats is formatted directly in C using vitaut/zmij.\n"
-     "Slow path: delegates to standard json module for other types."},
+    {"dumps", (PyCFunction)(void(*)(void))dumps, METH_FASTCALL | METH_KEYWORDS,
+     "dumps($module, obj, *, skipkeys=False, ensure_ascii=True, check_circular=True,\n"
+     "      allow_nan=True, cls=None, indent=None, separators=None, default=None,\n"
+     "      sort_keys=False, native_arrays=False, **kw)\n--\n\n"
+     "Serialize obj to a JSON formatted str; drop-in replacement for json.dumps().\n\n"
+     "Fast path: list/tuple of floats is formatted directly in C using vitaut/zmij,\n"
+     "and list/tuple of ints with a two-digits-at-a-time writer.\n"
+     "Native path: dict/list/tuple/str/int/float/bool/None documents are encoded in C.\n"
+     "native_arrays=True also writes numpy arrays, array.array and other float, int\n"
+     "and bool buffers in place, like dumps_ndarray(), as nested lists.\n"
+     "Slow path: delegates to json.dumps() for other types, options and for errors\n"
+     "(with arrays converted by tolist() under native_arrays=True, so float16 and\n"
+     "float32 elements are written there as the float64 values tolist() returns)."},
+    {"dumps_bytes", (PyCFunction)(void(*)(void))dumps_bytes, METH_FASTCALL | METH_KEYWORDS,
+     "dumps_bytes($module, obj, *, skipkeys=False, ensure_ascii=True,\n"
+     "            check_circular=True, allow_nan=True, cls=None, indent=None,\n"
+     "            separators=None, default=None, sort_keys=False, native_arrays=False,\n"
+     "            output='bytes', **kw)\n"
+     "--\n\n"
+     "Like dumps(), but return the UTF-8 encoded JSON document.\n\n"
+     "Equivalent to dumps(...).encode() without the intermediate str.\n"
+     "With output='buffer' a JSONBuffer is returned instead: it owns the native\n"
+     "output buffer and exposes it through the buffer protocol, so it can be passed\n"
+     "to socket.send(), file.write() or memoryview() without a copy."},
+    {"dumps_into", (PyCFunction)dumps_into, METH_VARARGS | METH_KEYWORDS,
+     "dumps_into(obj, target, offset=0, *, ensure_ascii=True, indent=None,\n"
+     "           separators=None, allow_nan=True, check_circular=True,\n"
+     "           sort_keys=False) -> int\n\n"
+     "Write obj as UTF-8 JSON into the writable buffer target starting at offset and\n"
+     "return the number of bytes written. Raises BufferTooSmallError (with .needed,\n"
+     "the minimum len(target)) if the document does not fit."},
+    {"dump", (PyCFunction)dump, METH_VARARGS | METH_KEYWORDS,
+     "dump(obj, write, *, fd=-1, ensure_ascii=True, indent=None, separators=None,\n"
+     "     allow_nan=True, check_circular=True, sort_keys=False,\n"
+     "     chunk_size=65536) -> None | int\n\n"
+     "Stream obj as JSON in chunk_size pieces to write(str), or straight to the\n"
+     "file descriptor fd when write is None. Peak memory is bounded by chunk_size.\n\n"
+     "Returns None on success. If obj cannot be encoded natively, returns the number\n"
+     "of characters already written so the caller can finish with the json module."},
+    {"dump_ndjson", (PyCFunction)dump_ndjson, METH_VARARGS | METH_KEYWORDS,
+     "dump_ndjson(records, write, fallback, *, fd=-1, binary=False, native=True,\n"
+     "            ensure_ascii=True, separators=None, allow_nan=True,\n"
+     "            check_circular=True, sort_keys=False, chunk_size=65536) -> None\n\n"
+     "Write each record of the iterable as a line of JSON to write() (str, or bytes\n"
+     "when binary=True) or the file descriptor fd, in batches of whole lines of at\n"
+     "least chunk_size bytes. Records the native encoder cannot handle (all records\n"
+     "when native=False) are encoded by fallback(record) -> str.\n"},
+    {"iterencode", (PyCFunction)py_iterencode, METH_VARARGS | METH_KEYWORDS,
+     "iterencode(obj, *, ensure_ascii=True, indent=None, separators=None,\n"
+     "           allow_nan=True, check_circular=True, sort_keys=False,\n"
+     "           chunk_size=65536, output='str') -> iterator\n\n"
+     "The native encoding of obj as chunks of chunk_size bytes of UTF-8 or less\n"
+     "(decoded to str unless output='bytes', so non-ASCII str chunks hold fewer\n"
+     "characters), formatted one chunk at a time. If the native encoder cannot\n"
+     "finish, iteration stops early and the iterator's fallback_at is the length\n"
+     "already yielded, from which json.JSONEncoder.iterencode() output continues.\n"},
+    {"iterencode_ndarray", (PyCFunction)py_iterencode_ndarray, METH_VARARGS | METH_KEYWORDS,
+     "iterencode_ndarray(array, *, nan='raise', precision=None, significant_digits=None,\n"
+     "                   negative_zero='keep', indent=None, separators=None,\n"
+     "                   dtype=None, orient=None, lines=False, chunk_size=65536,\n"
+     "                   output='str') -> iterator\n\n"
+     "dumps_ndarray(array, ...) as str (or bytes) chunks of chunk_size characters\n"
+     "(bytes) or less, formatted one chunk at a time with the GIL released.\n"},
     {"dumps_ndarray", (PyCFunction)py_dumps_ndarray, METH_VARARGS | METH_KEYWORDS,
-     "dumps_ndarray(array, *, nan='raise', precision=None) -> str\n\n"
-     "Serialize a 1D or 2D C-contiguous float32/float64 array to a JSON string.\n\n"
-     "Uses PEP 3118 buffer protocol; works with numpy.ndarray and array.array.\n\n"
+     "dumps_ndarray(array, *, nan='raise', precision=None, significant_digits=None,\n"
+     "              negative_zero='keep', output='str', threads=1, indent=None,\n"
+     "              separators=None, dtype=None, orient=None) -> str | bytes | JSONBuffer\n\n"
+     "Serialize a float, integer or bool array of any shape to a JSON string of nested\n"
+     "arrays.\n\n"
+     "Uses PEP 3118 buffer protocol; works with numpy.ndarray and array.array, in any\n"
+     "memory layout (strided, transposed, Fortran order) and byte order.\n"
+     "Large arrays are formatted with the GIL released.\n\n"
      "Parameters:\n"
      "  array: object supporting the buffer protocol\n"
      "  nan: 'raise' (default), 'null', or 'skip'\n"
-     "  precision: None (shortest representation) or int 0-20 (fixed decimal places)\n"},
+     "  precision: None (shortest representation) or int 0-20 (fixed decimal places);\n"
+     "    floats only\n"
+     "  significant_digits: None or int 1-17, round floats to this many significant\n"
+     "    digits, written in repr layout without trailing zeros; exclusive with\n"
+     "    precision\n"
+     "  negative_zero: 'keep' (default) or 'drop' (write -0.0, and negative values\n"
+     "    that round to zero, without the sign)\n"
+     "  output: 'str' (default), 'bytes', or 'buffer' (JSONBuffer owning the output)\n"
+     "  threads: format large arrays in up to this many first-axis ranges in parallel\n"
+     "  indent, separators: as json.dumps(array.tolist(), ...); the default item\n"
+     "    separator is ','\n"
+     "  dtype: None, or 'bfloat16' to read 16-bit elements as bfloat16\n"
+     "  orient: structured dtypes as 'records' (objects, the default) or 'values'\n"
+     "    (arrays)\n\n"
+     "float16 and bfloat16 are written with the shortest repr that round-trips to\n"
+     "the same 16-bit value.\n"},
+    {"dumps_ndarray_into", (PyCFunction)py_dumps_ndarray_into, METH_VARARGS | METH_KEYWORDS,
+     "dumps_ndarray_into(array, target, offset=0, *, nan='raise', precision=None,\n"
+     "                   significant_digits=None, negative_zero='keep', threads=1,\n"
+     "                   indent=None, separators=None, dtype=None, orient=None) -> int\n\n"
+     "Write a float, integer or bool array of any shape as JSON into the writable\n"
+     "buffer target starting at offset and return the number of bytes written.\n"
+     "Raises BufferTooSmallError (with .needed) if the document does not fit."},
+    {"dump_ndarray", (PyCFunction)py_dump_ndarray, METH_VARARGS | METH_KEYWORDS,
+     "dump_ndarray(array, write, *, fd=-1, binary=False, nan='raise', precision=None,\n"
+     "             significant_digits=None, negative_zero='keep', indent=None,\n"
+     "             separators=None, dtype=None, orient=None, chunk_size=65536) -> None\n\n"
+     "Stream a float, integer or bool array of any shape as JSON in chunk_size pieces\n"
+     "to write() (str, or bytes when binary=True), or straight to the file descriptor\n"
+     "fd when write is None."},
+    {"dumps_columns", (PyCFunction)py_dumps_columns, METH_VARARGS | METH_KEYWORDS,
+     "dumps_columns(columns, names=None, *, orient='columns', nan='raise',\n"
+     "              precision=None, significant_digits=None, negative_zero='keep',\n"
+     "              output='str', indent=None, separators=None, dtype=None)\n"
+     "              -> str | bytes | JSONBuffer\n\n"
+     "Serialize a table of equal-length 1-D columns, a mapping of names to arrays or a\n"
+     "2-D array with a name per column, as 'columns' {name: [...]}, 'records'\n"
+     "[{name: value}, ...], 'split' {\"columns\": [...], \"data\": [[...], ...]} or\n"
+     "'values' [[...], ...]. Columns are read in place; names are escaped once.\n"},
+    {"loads", (PyCFunction)(void(*)(void))loads, METH_FASTCALL | METH_KEYWORDS,
+     "loads($module, s, *, cls=None, object_hook=None, parse_float=None,\n"
+     "      parse_int=None, parse_constant=None, object_pairs_hook=None, **kw)\n--\n\n"
+     "Deserialize s (a str, bytes or bytearray JSON document) to a Python object;\n"
+     "drop-in replacement for json.loads().\n\n"
+     "Native path: documents are parsed in C, with correctly rounded fast float\n"
+     "conversion (Eisel-Lemire) and lists built at their final size.\n"
+     "Slow path: delegates to json.loads() for hooks, cls, other options and for\n"
+     "invalid documents, so results and JSONDecodeError messages match exactly."},
+    {"configure_parallel", (PyCFunction)configure_parallel, METH_VARARGS | METH_KEYWORDS,
+     "configure_parallel(*, workers=None, min_size=None) -> dict\n\n"
+     "Format list[float]/tuple[float] of at least min_size elements (default 131072)\n"
+     "on `workers` threads (the caller plus a pool of workers-1 native threads),\n"
+     "without the GIL. workers=1 (the default) keeps encoding serial. The pool is\n"
+     "also used by dumps_ndarray(threads=). Returns the current settings.\n"},
+    {"set_arena_limit", (PyCFunction)set_arena_limit, METH_O,
+     "set_arena_limit(nbytes) -> int\n\n"
+     "Keep up to nbytes of output buffer per thread between dumps()/dumps_ndarray()\n"
+     "calls instead of allocating a new one each time; larger buffers are shrunk to\n"
+     "the limit. 0 (the default) disables the arena. Returns the previous limit."},
     {NULL, NULL, 0, NULL}
 };
 
+static int
+fastjson_exec(PyObject* m)
+{
+    ModuleState* st = get_module_state(m);
+
+    st->json_buffer_type = (PyTypeObject*)PyType_FromModuleAndSpec(m, &json_buffer_spec, NULL);
+    if (st->json_buffer_type == NULL)
+        return -1;
+    if (PyModule_AddType(m, st->json_buffer_type) < 0)
+        return -1;
+
+    st->encoder_type = (PyTypeObject*)PyType_FromModuleAndSpec(m, &encoder_spec, NULL);
+    if (st->encoder_type == NULL)
+        return -1;
+    if (PyModule_AddType(m, st->encoder_type) < 0)
+        return -1;
+
+    /* Not exported: only created by iterencode() and iterencode_ndarray() */
+    st->chunk_iterator_type = (PyTypeObject*)PyType_FromModuleAndSpec(m, &chunk_iterator_spec,
+                                                                       NULL);
+    if (st->chunk_iterator_type == NULL)
+        return -1;
+
+    st->buffer_too_small_error = PyErr_NewExceptionWithDoc(
+        "fastjson.BufferTooSmallError",
+        "The target buffer of dumps_into() is too small; .needed is the minimum length.",
+        PyExc_ValueError, NULL);
+    if (st->buffer_too_small_error == NULL)
+        return -1;
+    if (PyModule_AddObjectRef(m, "BufferTooSmallError", st->buffer_too_small_error) < 0)
+        return -1;
+
+    st->arena_key = PyUnicode_InternFromString("fastjson.arena");
+    if (st->arena_key == NULL)
+        return -1;
+
+    for (int k = 0; k < DUMPS_N_OPTIONS; k++) {
+        st->option_names[k] = PyUnicode_InternFromString(dumps_option_names[k]);
+        if (st->option_names[k] == NULL)
+            return -1;
+    }
+    PyObject* json_module = PyImport_ImportModule("json");
+    if (json_module == NULL)
+        return -1;
+    st->json_dumps = PyObject_GetAttrString(json_module, "dumps");
+    st->json_loads = st->json_dumps == NULL ? NULL
+        : PyObject_GetAttrString(json_module, "loads");
+    Py_DECREF(json_module);
+    if (st->json_loads == NULL)
+        return -1;
+    st->array_default = PyCFunction_New(&array_to_list_def, m);
+    if (st->array_default == NULL)
+        return -1;
+
+    /* Create the pool lock now, so that run_parallel() never races its creation */
+    return pool_check_fork();
+}
+
+static int
+fastjson_traverse(PyObject* m, visitproc visit, void* arg)
+{
+    ModuleState* st = get_module_state(m);
+    Py_VISIT(st->json_buffer_type);
+    Py_VISIT(st->encoder_type);
+    Py_VISIT(st->chunk_iterator_type);
+    Py_VISIT(st->buffer_too_small_error);
+    Py_VISIT(st->json_dumps);
+    Py_VISIT(st->json_loads);
+    Py_VISIT(st->array_default);
+    return 0;
+}
+
+static int
+fastjson_clear(PyObject* m)
+{
+    ModuleState* st = get_module_state(m);
+    Py_CLEAR(st->json_buffer_type);
+    Py_CLEAR(st->encoder_type);
+    Py_CLEAR(st->chunk_iterator_type);
+    Py_CLEAR(st->buffer_too_small_error);
+    Py_CLEAR(st->arena_key);
+    Py_CLEAR(st->json_dumps);
+    Py_CLEAR(st->json_loads);
+    Py_CLEAR(st->array_default);
+    for (int k = 0; k < DUMPS_N_OPTIONS; k++) {
+        Py_CLEAR(st->option_names[k]);
+    }
+    return 0;
+}
+
+static void
+fastjson_free(void* m)
+{
+    ModuleState* st = get_module_state((PyObject*)m);
+    for (int k = 0; k < 2; k++) {
+        PyMem_RawFree(st->float16_reprs[k]);
+        st->float16_reprs[k] = NULL;
+    }
+    fastjson_clear((PyObject*)m);
+}
+
+static PyModuleDef_Slot fastjson_slots[] = {
+    {Py_mod_exec, fastjson_exec},
+#if PY_VERSION_HEX >= 0x030C0000
+    /* The worker pool and the settings are shared by the whole process */
+    {Py_mod_multiple_interpreters, Py_MOD_MULTIPLE_INTERPRETERS_SUPPORTED},
+#endif
+#if PY_VERSION_HEX >= 0x030D0000
+    {Py_mod_gil, Py_MOD_GIL_NOT_USED},
+#endif
+    {0, NULL},
+};
+
 static struct PyModuleDef fastjson_module = {
     PyModuleDef_HEAD_INIT,
-    "_fastjson",
-    "Fastjson - High-performance JSON serializer using vitaut/zmij",
-    -1,
-    fastjson_methods
+    .m_name = "_fastjson",
+    .m_doc = "Fastjson - High-performance JSON serializer using vitaut/zmij",
+    .m_size = sizeof(ModuleState),
+    .m_methods = fastjson_methods,
+    .m_slots = fastjson_slots,
+    .m_traverse = fastjson_traverse,
+    .m_clear = fastjson_clear,
+    .m_free = fastjson_free,
 };
 
 PyMODINIT_FUNC
-PyInit__fastjson(void) {
-    return PyModule_Create(&fastjson_module);
+PyInit__fastjson(void)
+{
+    return PyModuleDef_Init(&fastjson_module);
 }
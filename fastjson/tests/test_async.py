@@ -0,0 +1,180 @@
+"""Tests for the asyncio helpers: dumps_async(), dumps_ndarray_async(), dump_async()."""
+
+import asyncio
+import decimal
+import json
+import threading
+import time
+
+import pytest
+
+import fastjson
+
+DOC = {"values": [float(i) / 3 for i in range(20_000)], "name": "café", "ok": [True, None]}
+
+
+class Writer:
+    """A StreamWriter stand-in recording writes and drains in order."""
+
+    def __init__(self):
+        self.events = []
+
+    def write(self, data):
+        assert type(data) is bytes
+        self.events.append(data)
+
+    async def drain(self):
+        self.events.append("drain")
+        await asyncio.sleep(0)
+
+    def data(self):
+        return b"".join(e for e in self.events if e != "drain")
+
+
+async def ticking(coro):
+    """Run coro while counting event loop ticks of 1 ms."""
+    ticks = 0
+    done = False
+
+    async def ticker():
+        nonlocal ticks
+        while not done:
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        result = await coro
+    finally:
+        done = True
+        await task
+    return result, ticks
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"indent": 2, "sort_keys": True}, {"ensure_ascii": False}, {"native_arrays": True}],
+    ids=str,
+)
+def test_dumps_async_matches_dumps(kwargs):
+    result = asyncio.run(fastjson.dumps_async(DOC, chunk_size=1000, **kwargs))
+    assert result == fastjson.dumps(DOC, **kwargs)
+
+
+def test_dumps_async_fallback_and_errors():
+    doc = {"d": decimal.Decimal("1.5"), "x": [1.0, 2.0]}
+    assert asyncio.run(fastjson.dumps_async(doc, default=str)) == json.dumps(doc, default=str)
+    with pytest.raises(TypeError) as info:
+        asyncio.run(fastjson.dumps_async(doc))
+    with pytest.raises(TypeError) as stdlib:
+        json.dumps(doc)
+    assert str(info.value) == str(stdlib.value)
+    with pytest.raises(ValueError, match="Out of range float"):
+        asyncio.run(fastjson.dumps_async([float("nan")], allow_nan=False))
+
+
+def test_dumps_async_runs_off_the_loop():
+    seen = []
+
+    class Probe:
+        pass
+
+    def default(o):
+        seen.append(threading.current_thread().name)
+        return "probe"
+
+    asyncio.run(fastjson.dumps_async([Probe()], default=default))
+    assert seen and seen[0].startswith("fastjson")
+    assert seen[0] != threading.main_thread().name
+
+
+def test_dumps_async_keeps_loop_responsive():
+    doc = [[float(i) / 7] * 50 for i in range(20_000)]
+    result, ticks = asyncio.run(ticking(fastjson.dumps_async(doc)))
+    assert result == json.dumps(doc)
+    assert ticks >= 3
+
+
+def test_concurrent_calls():
+    docs = [{"i": i, "x": [i / 3] * 100} for i in range(20)]
+
+    async def main():
+        return await asyncio.gather(*(fastjson.dumps_async(d) for d in docs))
+
+    assert asyncio.run(main()) == [json.dumps(d) for d in docs]
+
+
+class TestDumpAsync:
+    def test_drains_after_every_chunk(self):
+        writer = Writer()
+        asyncio.run(fastjson.dump_async(DOC, writer, chunk_size=4096, ensure_ascii=False))
+        assert writer.data() == json.dumps(DOC, ensure_ascii=False).encode()
+        writes = writer.events[0::2]
+        assert len(writes) > 10
+        assert writer.events[1::2] == ["drain"] * len(writes)
+        assert all(len(w) == 4096 for w in writes[:-1])
+
+    def test_yields_to_loop_between_chunks(self):
+        writer = Writer()
+        _, ticks = asyncio.run(ticking(fastjson.dump_async(DOC, writer, chunk_size=256)))
+        assert writer.data() == json.dumps(DOC).encode()
+        assert ticks >= 1
+
+    def test_error_after_chunks(self):
+        doc = {"head": [float(i) for i in range(1000)], "bad": decimal.Decimal("1")}
+        writer = Writer()
+        with pytest.raises(TypeError, match="not JSON serializable"):
+            asyncio.run(fastjson.dump_async(doc, writer, chunk_size=100))
+        assert json.dumps(doc, default=str).encode().startswith(writer.data())
+        assert len(writer.data()) >= 1000
+
+    def test_stream_writer(self):
+        doc = {"rows": [[i / 3, i] for i in range(5000)], "s": "é"}
+
+        async def main():
+            received = asyncio.Future()
+
+            async def handle(reader, writer):
+                received.set_result(await reader.read())
+                writer.close()
+
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                _, writer = await asyncio.open_connection("127.0.0.1", port)
+                await fastjson.dump_async(doc, writer, chunk_size=1024)
+                writer.close()
+                await writer.wait_closed()
+                return await received
+
+        assert asyncio.run(main()) == json.dumps(doc).encode()
+
+
+class TestNdarray:
+    def test_dumps_ndarray_async(self):
+        np = pytest.importorskip("numpy")
+        a = np.random.default_rng(24).standard_normal((500, 3))
+        for kwargs in [{}, {"precision": 3, "output": "bytes"}, {"lines": True}]:
+            result = asyncio.run(fastjson.dumps_ndarray_async(a, **kwargs))
+            assert result == fastjson.dumps_ndarray(a, **kwargs)
+        with pytest.raises(TypeError, match="only float32"):
+            asyncio.run(fastjson.dumps_ndarray_async(np.zeros(2, dtype=complex)))
+
+    def test_keeps_loop_responsive(self):
+        np = pytest.importorskip("numpy")
+        a = np.random.default_rng(0).standard_normal(2_000_000)
+        start = time.perf_counter()
+        fastjson.dumps_ndarray(a)
+        if time.perf_counter() - start < 0.02:
+            pytest.skip("formatting too fast to observe")
+        result, ticks = asyncio.run(ticking(fastjson.dumps_ndarray_async(a)))
+        assert result == fastjson.dumps_ndarray(a)
+        assert ticks >= 3
+
+    def test_dump_ndarray_async(self):
+        np = pytest.importorskip("numpy")
+        a = np.arange(3000, dtype=np.float64).reshape(1000, 3) / 7
+        writer = Writer()
+        asyncio.run(fastjson.dump_ndarray_async(a, writer, chunk_size=512, lines=True))
+        assert writer.data() == fastjson.dumps_ndjson(a).encode()
+        assert writer.events[1::2] == ["drain"] * len(writer.events[0::2])
@@ -0,0 +1,202 @@
+"""Tests for the streaming dump() / dump_ndarray() (chunked writes, fd path)."""
+
+import io
+import json
+
+import pytest
+
+import fastjson
+
+OBJECTS = [
+    None,
+    [0.1 * i for i in range(500)],
+    list(range(-300, 300)),
+    {"a": [1.0, None, True], "b": {"c": "café \U0001f600 \ud800"}, "n": 2**70},
+    ["日本語" * 50, "x" * 1000],
+]
+
+KWARGS = [
+    {},
+    {"ensure_ascii": False},
+    {"separators": (",", ":")},
+    {"indent": 2, "sort_keys": True},
+]
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, s):
+        self.chunks.append(s)
+        return len(s)
+
+    def getvalue(self):
+        return "".join(self.chunks)
+
+
+def dump_to_text(obj, **kwargs):
+    fp = io.StringIO()
+    fastjson.dump(obj, fp, **kwargs)
+    return fp.getvalue()
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize("kwargs", KWARGS)
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_dump_stringio_matches_stdlib(obj, kwargs, chunk_size):
+    assert dump_to_text(obj, chunk_size=chunk_size, **kwargs) == json.dumps(obj, **kwargs)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5])
+def test_dump_never_splits_multibyte_characters(chunk_size):
+    obj = ["é日\U0001f600" * 20]
+    fp = RecordingWriter()
+    fastjson.dump(obj, fp, ensure_ascii=False, chunk_size=chunk_size)
+    assert fp.getvalue() == json.dumps(obj, ensure_ascii=False)
+    assert all(type(c) is str and c for c in fp.chunks)
+
+
+def test_dump_chunks_are_bounded():
+    obj = [float(i) for i in range(100_000)]
+    fp = RecordingWriter()
+    fastjson.dump(obj, fp, chunk_size=4096)
+    assert fp.getvalue() == json.dumps(obj)
+    assert len(fp.chunks) > 100
+    assert max(len(c) for c in fp.chunks) <= 4096
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_dump_real_file(tmp_path, obj, ensure_ascii):
+    path = tmp_path / "out.json"
+    with open(path, "w", encoding="utf-8", errors="surrogatepass") as f:
+        f.write("<")
+        fastjson.dump(obj, f, ensure_ascii=ensure_ascii, chunk_size=64)
+        f.write(">")
+        pos = f.tell()
+    expected = "<" + json.dumps(obj, ensure_ascii=ensure_ascii) + ">"
+    assert path.read_text(encoding="utf-8", errors="surrogatepass") == expected
+    assert pos == len(expected.encode("utf-8", "surrogatepass"))
+
+
+def test_dump_append_mode_file(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("[1]\n")
+    with open(path, "a") as f:
+        fastjson.dump([2.5, 3.5], f)
+        f.write("\n")
+    assert path.read_text() == "[1]\n[2.5, 3.5]\n"
+
+
+@pytest.mark.parametrize("newline", ["\r\n", "\r", "\n", "", None])
+@pytest.mark.parametrize("kwargs", [{"indent": 2}, {"separators": (",\n", ":")}, {}])
+def test_dump_newline_translation_matches_stdlib(tmp_path, newline, kwargs):
+    obj = {"a": [1.5, 2.5], "b": {"c": "line\nbreak"}}
+    paths = tmp_path / "fastjson.json", tmp_path / "json.json"
+    for path, dump in zip(paths, (fastjson.dump, json.dump)):
+        with open(path, "w", newline=newline) as f:
+            dump(obj, f, **kwargs)
+            f.write("\n")
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 16, 65536])
+@pytest.mark.parametrize(
+    "obj",
+    [
+        [1.0] * 100 + [{1, 2}],
+        {"a": "x" * 200, "b": object()},
+        [1.0, 2.0, float("nan")],
+    ],
+)
+def test_dump_error_matches_stdlib_partial_output(obj, chunk_size):
+    kwargs = {"allow_nan": False}
+    expected_fp = io.StringIO()
+    with pytest.raises(Exception) as e_std:
+        json.dump(obj, expected_fp, **kwargs)
+
+    fp = io.StringIO()
+    with pytest.raises(type(e_std.value)) as e_fast:
+        fastjson.dump(obj, fp, chunk_size=chunk_size, **kwargs)
+    assert str(e_fast.value) == str(e_std.value)
+    assert fp.getvalue() == expected_fp.getvalue()
+
+
+def test_dump_write_errors_propagate():
+    class Broken:
+        def write(self, s):
+            raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        fastjson.dump([1.0, 2.0], Broken())
+
+
+def test_dump_chunk_size_must_be_positive():
+    with pytest.raises(ValueError):
+        fastjson.dump([1.0], io.StringIO(), chunk_size=0)
+
+
+def test_dump_list_mutated_by_write():
+    obj = [1.0] * 10
+
+    class Mutating(RecordingWriter):
+        def write(self, s):
+            obj.clear()
+            return super().write(s)
+
+    fp = Mutating()
+    fastjson.dump(obj, fp, chunk_size=4)
+    assert fp.getvalue().startswith("[1.0")
+
+
+class TestDumpNdarray:
+    np = pytest.importorskip("numpy")
+
+    @pytest.mark.parametrize("dtype", ["float32", "float64"])
+    @pytest.mark.parametrize("shape", [(0,), (1000,), (50, 20)])
+    @pytest.mark.parametrize("chunk_size", [1, 100, 65536])
+    def test_text_and_binary_streams(self, dtype, shape, chunk_size):
+        a = self.np.arange(self.np.prod(shape), dtype=dtype).reshape(shape) / 7
+        expected = fastjson.dumps_ndarray(a)
+
+        text = io.StringIO()
+        fastjson.dump_ndarray(a, text, chunk_size=chunk_size)
+        assert text.getvalue() == expected
+
+        binary = io.BytesIO()
+        fastjson.dump_ndarray(a, binary, chunk_size=chunk_size)
+        assert binary.getvalue() == expected.encode()
+
+    @pytest.mark.parametrize("mode", ["w", "wb"])
+    def test_real_file(self, tmp_path, mode):
+        a = self.np.linspace(-1, 1, 5000)
+        path = tmp_path / "a.json"
+        with open(path, mode) as f:
+            fastjson.dump_ndarray(a, f, precision=3, chunk_size=512)
+            pos = f.tell()
+        expected = fastjson.dumps_ndarray(a, precision=3)
+        assert path.read_text() == expected
+        assert pos == len(expected)
+
+    @pytest.mark.parametrize("newline", ["\r\n", "\n", None])
+    def test_newline_translation(self, tmp_path, newline):
+        a = self.np.arange(6.0).reshape(3, 2)
+        paths = tmp_path / "dump.json", tmp_path / "write.json"
+        with open(paths[0], "w", newline=newline) as f:
+            fastjson.dump_ndarray(a, f, indent=1)
+        with open(paths[1], "w", newline=newline) as f:
+            f.write(fastjson.dumps_ndarray(a, indent=1))
+        assert paths[0].read_bytes() == paths[1].read_bytes()
+
+    def test_nan_raise_propagates(self):
+        a = self.np.array([1.0, self.np.nan])
+        with pytest.raises(ValueError):
+            fastjson.dump_ndarray(a, io.StringIO())
+
+    def test_chunks_are_bounded(self):
+        a = self.np.random.default_rng(0).standard_normal(20_000)
+        fp = RecordingWriter()
+        fastjson.dump_ndarray(a, fp, nan="null", chunk_size=1024)
+        assert fp.getvalue() == fastjson.dumps_ndarray(a, nan="null")
+        assert max(len(c) for c in fp.chunks) <= 1024
@@ -0,0 +1,190 @@
+"""Tests for dumps_columns(): tables of 1-D columns or 2-D arrays, DataFrame-style orients."""
+
+import array
+import json
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+ORIENTS = ["columns", "records", "split", "values"]
+
+
+def as_python(columns, orient):
+    """The table as json.dumps() would get it from plain lists and dicts."""
+    names = list(columns)
+    lists = [c.tolist() for c in columns.values()]
+    rows = [list(r) for r in zip(*lists)]
+    if orient == "columns":
+        return dict(zip(names, lists))
+    if orient == "records":
+        return [dict(zip(names, r)) for r in rows]
+    if orient == "split":
+        return {"columns": names, "data": rows}
+    return rows
+
+
+def expected(columns, orient, **kwargs):
+    kwargs.setdefault("separators", (",", ": ") if kwargs.get("indent") is not None else (",", ":"))
+    return json.dumps(as_python(columns, orient), **kwargs)
+
+
+def table():
+    rng = np.random.default_rng(21)
+    n = 40
+    return {
+        "x": rng.standard_normal(n),
+        "y": rng.standard_normal(2 * n)[::2],  # strided
+        "t": np.arange(1_700_000_000_000, 1_700_000_000_000 + n, dtype=">u8"),
+        "label": rng.integers(-128, 127, n).astype(np.int8),
+        "ok": rng.standard_normal(n) > 0,
+        "h": (rng.integers(-64, 64, n) / 4).astype(np.float16),  # exact in float16
+        "d": array.array("d", rng.standard_normal(n).tolist()),
+        "i": memoryview(array.array("i", range(n))),
+    }
+
+
+@pytest.mark.parametrize("orient", ORIENTS)
+def test_matches_python(orient):
+    cols = table()
+    assert fastjson.dumps_columns(cols, orient=orient) == expected(cols, orient)
+
+
+def test_default_orient_is_columns():
+    cols = table()
+    assert fastjson.dumps_columns(cols) == expected(cols, "columns")
+
+
+@pytest.mark.parametrize("orient", ORIENTS)
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"indent": 2}, {"indent": "\t"}, {"separators": (", ", ": ")}, {"indent": 0, "separators": (",", "=")}],
+)
+def test_layouts(orient, kwargs):
+    cols = {"x": np.array([0.5, -1.25]), "n": np.array([3, 4], dtype=np.uint16)}
+    assert fastjson.dumps_columns(cols, orient=orient, **kwargs) == expected(cols, orient, **kwargs)
+
+
+@pytest.mark.parametrize("orient", ORIENTS)
+def test_2d_array(orient):
+    a = np.random.default_rng(2).standard_normal((6, 3))
+    names = ["x", "y", "z"]
+    for view in [a, np.asfortranarray(a), a[::-1, ::2], a.T.copy().T, a.astype(">f8")]:
+        cols = dict(zip(names[: view.shape[1]], view.T))
+        got = fastjson.dumps_columns(view, names[: view.shape[1]], orient=orient)
+        assert got == expected(cols, orient)
+    assert fastjson.dumps_columns(a, names=tuple(names), orient=orient) == expected(
+        dict(zip(names, a.T)), orient
+    )
+
+
+def test_names_escaped_like_json():
+    names = ["café", 'q"\\', "\U0001f600", ""]
+    cols = {name: np.arange(2) for name in names}
+    for orient in ORIENTS:
+        assert fastjson.dumps_columns(cols, orient=orient) == expected(cols, orient)
+        assert fastjson.dumps_columns(np.zeros((2, 4), np.int64), names, orient=orient) == (
+            expected(cols, orient).replace("1", "0")
+        )
+
+
+class TestNan:
+    def make(self):
+        return {
+            "x": np.array([1.0, np.nan, 2.0, 3.0]),
+            "y": np.array([0.5, 0.5, np.inf, 0.5], dtype=np.float16),
+            "n": np.array([1, 2, 3, 4]),
+        }
+
+    def test_raise(self):
+        with pytest.raises(ValueError, match="Out of range float"):
+            fastjson.dumps_columns(self.make())
+
+    def test_null(self):
+        assert fastjson.dumps_columns(self.make(), nan="null", orient="values") == (
+            "[[1.0,0.5,1],[null,0.5,2],[2.0,null,3],[3.0,0.5,4]]"
+        )
+
+    @pytest.mark.parametrize("orient", ORIENTS)
+    def test_skip_drops_rows_from_every_column(self, orient):
+        cols = {k: v[[0, 3]] for k, v in self.make().items()}
+        assert fastjson.dumps_columns(self.make(), nan="skip", orient=orient) == expected(
+            cols, orient
+        )
+
+    def test_skip_everything(self):
+        cols = {"x": np.array([np.nan]), "n": np.array([1])}
+        assert fastjson.dumps_columns(cols, nan="skip") == '{"x":[],"n":[]}'
+        assert fastjson.dumps_columns(cols, nan="skip", orient="split", indent=1) == (
+            '{\n "columns": [\n  "x",\n  "n"\n ],\n "data": []\n}'
+        )
+
+
+def test_options_apply_to_every_column():
+    cols = {
+        "x": np.array([1 / 3, -0.0001]),
+        "h": np.array([0.1, 2.5], np.float16),
+        "n": np.array([7, -7]),
+    }
+    assert fastjson.dumps_columns(cols, precision=2, negative_zero="drop", orient="records") == (
+        '[{"x":0.33,"h":0.10,"n":7},{"x":0.00,"h":2.50,"n":-7}]'
+    )
+    bf16 = {"b": np.array([0x3DCD, 0x4049], np.uint16)}
+    assert fastjson.dumps_columns(bf16, dtype="bfloat16") == '{"b":[0.1,3.14]}'
+
+
+@pytest.mark.parametrize("output", ["bytes", "buffer"])
+def test_output(output):
+    cols = table()
+    got = fastjson.dumps_columns(cols, orient="records", output=output)
+    assert bytes(got) == expected(cols, "records").encode()
+
+
+def test_empty_tables():
+    assert fastjson.dumps_columns({}) == "{}"
+    assert fastjson.dumps_columns({}, orient="records") == "[]"
+    assert fastjson.dumps_columns({}, orient="split") == '{"columns":[],"data":[]}'
+    assert fastjson.dumps_columns({"x": np.zeros(0)}, orient="values", indent=2) == "[]"
+    assert fastjson.dumps_columns(np.zeros((2, 0)), [], orient="records") == "[{},{}]"
+
+
+def test_large_table():
+    rng = np.random.default_rng(5)
+    cols = {"x": rng.standard_normal(50_000), "t": np.arange(50_000, dtype=np.int64)}
+    for orient in ORIENTS:
+        assert fastjson.dumps_columns(cols, orient=orient) == expected(cols, orient)
+
+
+class TestErrors:
+    def test_orient(self):
+        with pytest.raises(ValueError, match="orient must be 'columns', 'records', 'split' or 'values'"):
+            fastjson.dumps_columns({"x": np.zeros(1)}, orient="index")
+
+    def test_columns(self):
+        with pytest.raises(ValueError, match="same length, got 3 rows for column 'y', expected 2"):
+            fastjson.dumps_columns({"x": np.zeros(2), "y": np.zeros(3)})
+        with pytest.raises(ValueError, match="columns must be 1-D, got 2 dimensions for column 'x'"):
+            fastjson.dumps_columns({"x": np.zeros((2, 2))})
+        with pytest.raises(TypeError, match="column names must be str, not int"):
+            fastjson.dumps_columns({1: np.zeros(2)})
+        with pytest.raises(TypeError, match="structured dtypes are not supported as columns"):
+            fastjson.dumps_columns({"x": np.zeros(2, dtype=[("a", "f8")])})
+        with pytest.raises(TypeError, match="only float32"):
+            fastjson.dumps_columns({"x": np.zeros(2, dtype=complex)})
+        with pytest.raises(TypeError, match="columns must be a mapping"):
+            fastjson.dumps_columns([np.zeros(2)])
+
+    def test_2d(self):
+        a = np.zeros((2, 3))
+        with pytest.raises(TypeError, match="names is required with a 2-D array"):
+            fastjson.dumps_columns(a)
+        with pytest.raises(ValueError, match="got 2 names for 3 columns"):
+            fastjson.dumps_columns(a, ["x", "y"])
+        with pytest.raises(TypeError, match="column names must be str"):
+            fastjson.dumps_columns(a, ["x", "y", b"z"])
+        with pytest.raises(ValueError, match="got 1 dimensions"):
+            fastjson.dumps_columns(np.zeros(3), ["x"])
+        with pytest.raises(TypeError, match="names is only used with a 2-D array"):
+            fastjson.dumps_columns({"x": np.zeros(2)}, ["x"])
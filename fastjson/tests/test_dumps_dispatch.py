@@ -0,0 +1,88 @@
+"""Tests for the native dumps()/dumps_bytes() entry points (argument handling, fallback)."""
+
+import inspect
+import json
+
+import pytest
+
+import fastjson
+
+
+class Tagged(json.JSONEncoder):
+    def __init__(self, *, tag="t", **kw):
+        super().__init__(**kw)
+        self.tag = tag
+
+    def default(self, o):
+        return {self.tag: repr(o)}
+
+
+def same_result(call_fast, call_std):
+    try:
+        expected = call_std()
+    except Exception as e_std:  # noqa: BLE001 - exact parity with stdlib
+        with pytest.raises(type(e_std)) as e_fast:
+            call_fast()
+        assert str(e_fast.value) == str(e_std)
+    else:
+        assert call_fast() == expected
+
+
+@pytest.mark.parametrize(
+    "args, kwargs",
+    [
+        (([1.5],), {}),
+        ((), {"obj": [1.5, {"a": None}]}),
+        ((), {}),
+        (([1], [2]), {}),
+        (([1.5],), {"unknown": 1}),
+        (({1, 2},), {"cls": Tagged, "tag": "set"}),
+        (({1, 2},), {"default": sorted, "separators": (",", ":")}),
+        (({"b": 1, "a": [2.5]},), {"indent": "\t", "sort_keys": True}),
+        (({"k": 1},), {"skipkeys": 1, "check_circular": 0, "allow_nan": 1}),
+    ],
+)
+def test_arguments_match_stdlib(args, kwargs):
+    same_result(lambda: fastjson.dumps(*args, **kwargs), lambda: json.dumps(*args, **kwargs))
+    same_result(
+        lambda: fastjson.dumps_bytes(*args, **kwargs),
+        lambda: json.dumps(*args, **kwargs).encode(),
+    )
+
+
+def test_dumps_output_is_not_an_option():
+    # Not a json.dumps() option: it goes to cls like any other extra keyword
+    same_result(
+        lambda: fastjson.dumps([1.5], output="bytes"), lambda: json.dumps([1.5], output="bytes")
+    )
+
+
+def test_runtime_built_keyword_names():
+    # Keyword names that are not interned still select the right option
+    name = "".join(["sepa", "rators"])
+    kwargs = {name: (",", ":"), "".join(["allow", "_nan"]): False}
+    assert fastjson.dumps([1.0, 2.0], **kwargs) == "[1.0,2.0]"
+    with pytest.raises(ValueError):
+        fastjson.dumps([float("nan")], **kwargs)
+
+
+@pytest.mark.parametrize("output", ["bytes", "buffer"])
+@pytest.mark.parametrize("kwargs", [{}, {"indent": 2}, {"default": str}])
+def test_dumps_bytes_output(output, kwargs):
+    obj = {"a": [1.5, 2], "b": "café", "c": {1, 2} if "default" in kwargs else None}
+    got = fastjson.dumps_bytes(obj, output=output, **kwargs)
+    assert isinstance(got, bytes if output == "bytes" else fastjson.JSONBuffer)
+    assert bytes(got) == json.dumps(obj, **kwargs).encode()
+
+
+@pytest.mark.parametrize("output", ["str", "list", None, 1])
+def test_dumps_bytes_rejects_output(output):
+    with pytest.raises(ValueError, match="output parameter must be 'bytes' or 'buffer'"):
+        fastjson.dumps_bytes([1.0], output=output)
+
+
+def test_signatures_match_stdlib():
+    std = list(inspect.signature(json.dumps).parameters)
+    assert list(inspect.signature(fastjson.dumps).parameters) == [*std[:-1], "native_arrays", "kw"]
+    fast_bytes = inspect.signature(fastjson.dumps_bytes)
+    assert list(fast_bytes.parameters) == [*std[:-1], "native_arrays", "output", "kw"]
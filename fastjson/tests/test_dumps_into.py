@@ -0,0 +1,169 @@
+"""Tests for dumps_into() / dumps_ndarray_into() (writing into caller-owned buffers)."""
+
+import array
+import json
+import mmap
+
+import pytest
+
+import fastjson
+
+OBJECTS = [
+    None,
+    "café \U0001f600",
+    [1.0, 2.5, -0.0],
+    list(range(100)),
+    {"a": [1.0, None, True], "b": {"c": "d "}, "n": 2**70},
+]
+
+KWARGS = [
+    {},
+    {"ensure_ascii": False},
+    {"separators": (",", ":")},
+    {"indent": 2, "sort_keys": True},
+    {"separators": (";", "="), "ensure_ascii": False},  # arbitrary separators
+]
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize("kwargs", KWARGS)
+@pytest.mark.parametrize("offset", [0, 3])
+def test_dumps_into_bytearray_matches_stdlib(obj, kwargs, offset):
+    expected = json.dumps(obj, **kwargs).encode()
+    target = bytearray(b"#" * (offset + len(expected) + 5))
+    n = fastjson.dumps_into(obj, target, offset, **kwargs)
+    assert n == len(expected)
+    assert target[:offset] == b"#" * offset
+    assert target[offset : offset + n] == expected
+    assert target[offset + n :] == b"#" * 5
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize("kwargs", KWARGS)
+def test_dumps_into_exact_fit(obj, kwargs):
+    expected = json.dumps(obj, **kwargs).encode()
+    target = bytearray(len(expected))
+    assert fastjson.dumps_into(obj, target, **kwargs) == len(expected)
+    assert target == expected
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize("kwargs", KWARGS)
+@pytest.mark.parametrize("offset", [0, 2])
+def test_dumps_into_too_small_reports_needed(obj, kwargs, offset):
+    expected = json.dumps(obj, **kwargs).encode()
+    target = bytearray(offset + len(expected) - 1)
+    with pytest.raises(fastjson.BufferTooSmallError) as exc_info:
+        fastjson.dumps_into(obj, target, offset, **kwargs)
+    assert exc_info.value.needed == offset + len(expected)
+    assert str(len(target)) in str(exc_info.value)
+    assert isinstance(exc_info.value, ValueError)
+
+    target = bytearray(exc_info.value.needed)
+    assert fastjson.dumps_into(obj, target, offset, **kwargs) == len(expected)
+    assert target[offset:] == expected
+
+
+def test_dumps_into_large_document_into_tiny_target():
+    obj = {"x": [float(i) for i in range(10_000)]}
+    with pytest.raises(fastjson.BufferTooSmallError) as exc_info:
+        fastjson.dumps_into(obj, bytearray(0))
+    assert exc_info.value.needed == len(json.dumps(obj))
+
+
+def test_dumps_into_mmap():
+    obj = {"frame": [0.5] * 1000}
+    expected = json.dumps(obj, separators=(",", ":")).encode()
+    with mmap.mmap(-1, 1 << 16) as m:
+        n = fastjson.dumps_into(obj, m, 100, separators=(",", ":"))
+        assert m[100 : 100 + n] == expected
+
+
+def test_dumps_into_shared_memory():
+    shared_memory = pytest.importorskip("multiprocessing.shared_memory")
+    shm = shared_memory.SharedMemory(create=True, size=4096)
+    try:
+        n = fastjson.dumps_into([1, 2, 3], shm.buf)
+        assert bytes(shm.buf[:n]) == b"[1, 2, 3]"
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_dumps_into_reuses_target_across_calls():
+    target = bytearray(1 << 12)
+    for i in range(100):
+        obj = {"seq": i, "values": [i * 0.5] * (i % 7)}
+        n = fastjson.dumps_into(obj, target)
+        assert target[:n] == json.dumps(obj).encode()
+
+
+def test_dumps_into_errors_match_stdlib():
+    target = bytearray(1024)
+    for obj, kwargs in [
+        ({"a": object()}, {}),
+        ([1.0, float("nan")], {"allow_nan": False}),
+    ]:
+        with pytest.raises(Exception) as e_std:
+            json.dumps(obj, **kwargs)
+        with pytest.raises(type(e_std.value)) as e_fast:
+            fastjson.dumps_into(obj, target, **kwargs)
+        assert str(e_fast.value) == str(e_std.value)
+
+
+def test_dumps_into_surrogates_raise_like_encode():
+    with pytest.raises(UnicodeEncodeError):
+        fastjson.dumps_into("\ud800", bytearray(64), ensure_ascii=False)
+    assert fastjson.dumps_into("\ud800", bytearray(64)) == len('"\\ud800"')
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"indent": 2}])
+def test_dumps_into_rejects_readonly_target(kwargs):
+    with pytest.raises(BufferError):
+        fastjson.dumps_into([1.0], b"\0" * 64, **kwargs)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"indent": 2}])
+@pytest.mark.parametrize("offset", [-1, 65])
+def test_dumps_into_rejects_bad_offset(kwargs, offset):
+    with pytest.raises(ValueError, match="offset"):
+        fastjson.dumps_into([1.0], bytearray(64), offset, **kwargs)
+
+
+class TestDumpsNdarrayInto:
+    np = pytest.importorskip("numpy")
+
+    @pytest.mark.parametrize("dtype", ["float32", "float64"])
+    @pytest.mark.parametrize("shape", [(0,), (100,), (10, 3)])
+    @pytest.mark.parametrize("kwargs", [{}, {"precision": 3}, {"nan": "null"}])
+    def test_matches_dumps_ndarray(self, dtype, shape, kwargs):
+        a = self.np.arange(self.np.prod(shape), dtype=dtype).reshape(shape) / 3
+        expected = fastjson.dumps_ndarray(a, **kwargs).encode()
+        target = bytearray(len(expected) + 8)
+        n = fastjson.dumps_ndarray_into(a, target, 8, **kwargs)
+        assert n == len(expected)
+        assert target[8:] == expected
+
+    def test_numpy_uint8_target(self):
+        a = self.np.linspace(0, 1, 50)
+        target = self.np.zeros(4096, dtype=self.np.uint8)
+        n = fastjson.dumps_ndarray_into(a, target)
+        assert target[:n].tobytes() == fastjson.dumps_ndarray(a).encode()
+
+    def test_too_small_reports_needed(self):
+        a = self.np.random.default_rng(1).standard_normal((200, 3))
+        expected = fastjson.dumps_ndarray(a).encode()
+        with pytest.raises(fastjson.BufferTooSmallError) as exc_info:
+            fastjson.dumps_ndarray_into(a, bytearray(100), 10)
+        assert exc_info.value.needed == 10 + len(expected)
+
+    def test_nan_raise(self):
+        a = self.np.array([1.0, self.np.nan])
+        with pytest.raises(ValueError):
+            fastjson.dumps_ndarray_into(a, bytearray(64))
+
+    def test_array_module_source_and_target(self):
+        a = array.array("d", [1.5, 2.5])
+        target = array.array("B", bytes(32))
+        n = fastjson.dumps_ndarray_into(a, target)
+        assert target.tobytes()[:n] == b"[1.5,2.5]"
@@ -0,0 +1,136 @@
+"""Tests for the reusable fastjson.Encoder (options validated once)."""
+
+import collections
+import json
+import math
+
+import pytest
+
+import fastjson
+
+OBJECTS = [
+    None,
+    1.5,
+    "café \U0001f600 \ud800",
+    [1.0, 2.5, -0.0, 1e100],
+    list(range(-50, 50)),
+    {"a": [1.0, None, True], "b": {"c": "d"}, "n": 2**70, 3: "int key"},
+    collections.OrderedDict([("z", 1), ("a", [{"x": ()}])]),
+]
+
+OPTIONS = [
+    {},
+    {"separators": (",", ":")},
+    {"ensure_ascii": False},
+    {"check_circular": False},
+    {"allow_nan": False},
+    {"indent": 2},  # stdlib encoder
+    {"sort_keys": True, "separators": (",", ": ")},
+    {"default": repr},
+]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_matches_stdlib(options):
+    encoder = fastjson.Encoder(**options)
+    for obj in OBJECTS:
+        try:
+            expected = json.dumps(obj, **options)
+        except (TypeError, ValueError) as e:
+            with pytest.raises(type(e)) as e_fast:
+                encoder(obj)
+            assert str(e_fast.value) == str(e)
+            continue
+        assert encoder(obj) == expected
+        assert encoder.encode(obj) == expected
+
+
+@pytest.mark.parametrize(
+    "options, native",
+    [
+        ({}, True),
+        ({"separators": [",", ":"], "allow_nan": False, "ensure_ascii": 0}, True),
+        ({"indent": 2, "separators": (";", "=")}, True),
+        ({"indent": 2.0}, False),
+        ({"sort_keys": True}, True),
+        ({"sort_keys": 1}, False),
+        ({"skipkeys": True}, False),
+        ({"separators": (";", b"=")}, False),
+        ({"allow_nan": 0}, False),  # like dumps(): only exact True/False are native
+    ],
+)
+def test_native_flag(options, native):
+    assert fastjson.Encoder(**options).native is native
+
+
+@pytest.mark.parametrize("output", ["bytes", "buffer"])
+@pytest.mark.parametrize("options", [{}, {"ensure_ascii": False}, {"indent": 1}])
+def test_output_modes(output, options):
+    encoder = fastjson.Encoder(output=output, **options)
+    for obj in OBJECTS[:-1]:
+        got = encoder(obj) if obj != OBJECTS[2] or options.get("ensure_ascii", True) else None
+        if got is None:
+            with pytest.raises(UnicodeEncodeError):
+                encoder(obj)
+            continue
+        expected = json.dumps(obj, **options).encode()
+        assert bytes(got) == expected
+        assert isinstance(got, bytes if output == "bytes" else fastjson.JSONBuffer)
+
+
+def test_errors_match_stdlib():
+    encoder = fastjson.Encoder(allow_nan=False)
+    for obj in [{"a": object()}, [1.0, math.nan], {(1, 2): 3}]:
+        with pytest.raises(Exception) as e_std:
+            json.dumps(obj, allow_nan=False)
+        with pytest.raises(type(e_std.value)) as e_fast:
+            encoder(obj)
+        assert str(e_fast.value) == str(e_std.value)
+
+    circular = []
+    circular.append(circular)
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        fastjson.Encoder()(circular)
+
+
+def test_custom_cls_and_extra_kwargs():
+    class Tagged(json.JSONEncoder):
+        def __init__(self, *, tag, **kw):
+            super().__init__(**kw)
+            self.tag = tag
+
+        def default(self, o):
+            return {self.tag: repr(o)}
+
+    encoder = fastjson.Encoder(cls=Tagged, tag="obj", separators=(",", ":"))
+    assert not encoder.native
+    class Point:
+        def __repr__(self):
+            return "Point()"
+
+    obj = {"x": [1.5], "y": Point()}
+    assert encoder(obj) == json.dumps(obj, cls=Tagged, tag="obj", separators=(",", ":"))
+
+    with pytest.raises(TypeError):
+        fastjson.Encoder(unknown_option=1)  # rejected by json.JSONEncoder, like dumps()
+
+
+def test_call_signature():
+    encoder = fastjson.Encoder()
+    with pytest.raises(TypeError):
+        encoder()
+    with pytest.raises(TypeError):
+        encoder([1], [2])
+    with pytest.raises(TypeError):
+        encoder(obj=[1])
+    with pytest.raises(TypeError):
+        fastjson.Encoder({"indent": 2})
+    with pytest.raises(ValueError):
+        fastjson.Encoder(output="list")
+
+
+def test_reused_across_many_messages():
+    encoder = fastjson.Encoder(separators=(",", ":"))
+    for i in range(2000):
+        msg = {"seq": i, "v": [i * 0.25, -i], "ok": i % 3 == 0}
+        assert encoder(msg) == json.dumps(msg, separators=(",", ":"))
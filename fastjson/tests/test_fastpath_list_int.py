@@ -0,0 +1,73 @@
+"""Test fast path for list[int] serialization."""
+
+import json
+import random
+import sys
+
+import pytest
+
+import fastjson
+
+
+def test_list_int_basic():
+    data = [0, 1, -1, 42, 1234567890]
+    assert fastjson.dumps(data) == json.dumps(data)
+    assert fastjson.dumps(data, separators=(",", ":")) == json.dumps(data, separators=(",", ":"))
+
+
+def test_tuple_int_basic():
+    data = (3, 2, 1)
+    assert fastjson.dumps(data) == json.dumps(data)
+
+
+def test_int64_and_uint64_boundaries():
+    data = [
+        2**31 - 1, -(2**31), 2**32,
+        2**63 - 1, -(2**63), 2**63, -(2**63) - 1,
+        2**64 - 1, 2**64, -(2**64),
+        10**19, 10**20, -(10**19), -(10**20),
+    ]
+    assert fastjson.dumps(data) == json.dumps(data)
+
+
+def test_every_digit_count():
+    data = []
+    for digits in range(1, 40):
+        data.extend([10 ** (digits - 1), 10**digits - 1, -(10 ** (digits - 1)), -(10**digits - 1)])
+    assert fastjson.dumps(data) == json.dumps(data)
+
+
+def test_seeded_fuzz_ints_match_stdlib():
+    rng = random.Random(3)
+    data = [rng.getrandbits(rng.randrange(1, 80)) * rng.choice((1, -1)) for _ in range(2000)]
+    assert fastjson.dumps(data) == json.dumps(data)
+    assert fastjson.dumps(data, separators=(",", ":")) == json.dumps(data, separators=(",", ":"))
+
+
+def test_ms_timestamps_and_ids():
+    data = [1738368000123 + i * 17 for i in range(1000)]
+    assert fastjson.dumps(data, separators=(",", ":")) == json.dumps(data, separators=(",", ":"))
+
+
+def test_bools_are_not_ints():
+    data = [1, True, 0, False]
+    assert fastjson.dumps(data) == json.dumps(data)
+
+
+def test_int_subclass_uses_int_repr():
+    class MyInt(int):
+        def __repr__(self):
+            return "not used"
+
+    data = [1, MyInt(2), 3]
+    assert fastjson.dumps(data) == json.dumps(data)
+
+
+@pytest.mark.skipif(not hasattr(sys, "set_int_max_str_digits"), reason="int_max_str_digits not available")
+def test_int_max_str_digits_matches_exception():
+    data = [1, 10**5000]
+    with pytest.raises(ValueError) as e_fast:
+        fastjson.dumps(data)
+    with pytest.raises(ValueError) as e_std:
+        json.dumps(data)
+    assert str(e_fast.value) == str(e_std.value)
@@ -0,0 +1,173 @@
+"""Thread-safety tests: many threads encoding (and mutating) shared objects.
+
+They run on every build; on free-threaded CPython (3.13t+) they also check that
+importing fastjson keeps the GIL disabled.
+"""
+
+import importlib.util
+import json
+import random
+import sys
+import sysconfig
+import threading
+
+import pytest
+
+import fastjson
+from fastjson import _fastjson
+
+N_THREADS = 16
+
+free_threaded = pytest.mark.skipif(
+    not sysconfig.get_config_var("Py_GIL_DISABLED"), reason="needs a free-threaded build"
+)
+
+
+def run_threads(target, n=N_THREADS):
+    barrier = threading.Barrier(n)
+    errors = []
+
+    def worker(i):
+        barrier.wait()
+        try:
+            target(i)
+        except BaseException as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+
+def documents():
+    rng = random.Random(11)
+    return [
+        [rng.random() for _ in range(3000)],
+        list(range(-1500, 1500)),
+        {"frame": {"values": [rng.uniform(-1, 1) for _ in range(500)], "label": "café"}},
+        [{"id": i, "tags": ["a", "b"], "ok": i % 2 == 0, "v": None} for i in range(300)],
+    ]
+
+
+@free_threaded
+def test_import_keeps_gil_disabled():
+    assert not sys._is_gil_enabled()
+
+
+def test_second_module_instance_has_own_state():
+    spec = importlib.util.find_spec("fastjson._fastjson")
+    other = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(other)
+    assert other is not _fastjson
+    assert other.JSONBuffer is not _fastjson.JSONBuffer
+    assert other.BufferTooSmallError is not _fastjson.BufferTooSmallError
+    assert bytes(other.dumps_bytes([1.5, 2], output="buffer")) == b"[1.5, 2]"
+    with pytest.raises(other.BufferTooSmallError):
+        other.dumps_into([1.0, 2.0], bytearray(3))
+
+
+def test_hammer_shared_documents():
+    docs = documents()
+    expected = [json.dumps(d) for d in docs]
+
+    def target(i):
+        target_buf = bytearray(1 << 17)
+        for _ in range(10):
+            for doc, exp in zip(docs, expected):
+                assert fastjson.dumps(doc) == exp
+                assert fastjson.dumps_bytes(doc, output="buffer").decode() == exp
+                n = fastjson.dumps_into(doc, target_buf)
+                assert target_buf[:n] == exp.encode()
+
+    run_threads(target)
+
+
+def test_hammer_with_arena_toggling():
+    docs = documents()
+    expected = [json.dumps(d) for d in docs]
+    previous = fastjson.set_arena_limit(1 << 20)
+    try:
+
+        def target(i):
+            for k in range(20):
+                if i == 0:
+                    fastjson.set_arena_limit(0 if k % 2 else 1 << 16)
+                for doc, exp in zip(docs, expected):
+                    assert fastjson.dumps(doc) == exp
+
+        run_threads(target)
+    finally:
+        fastjson.set_arena_limit(previous)
+
+
+def test_hammer_while_reconfiguring_pool():
+    values = [random.Random(i).random() for i in range(40_000)]
+    expected = json.dumps(values)
+    previous = fastjson.configure_parallel()
+    try:
+
+        def target(i):
+            for k in range(6):
+                if i % 4 == 0:
+                    fastjson.configure_parallel(workers=1 + (i + k) % 4, min_size=0)
+                assert fastjson.dumps(values) == expected
+
+        run_threads(target, n=8)
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+def test_concurrent_mutation_never_crashes():
+    shared_list = [0.5] * 1000
+    shared_dict = {str(i): [i, float(i)] for i in range(200)}
+    doc = {"list": shared_list, "dict": shared_dict}
+    stop = threading.Event()
+
+    def mutate(i):
+        rng = random.Random(i)
+        while not stop.is_set():
+            shared_list.append(rng.random())
+            if len(shared_list) > 1500:
+                del shared_list[:500]
+            key = str(rng.randrange(400))
+            if shared_dict.pop(key, None) is None:
+                shared_dict[key] = [1, "x"]
+            shared_list[rng.randrange(len(shared_list))] = rng.choice([1, "s", None, 2.5])
+
+    def encode(i):
+        try:
+            for _ in range(30):
+                for obj in (shared_list, doc):
+                    try:
+                        out = fastjson.dumps(obj)
+                    except RuntimeError:
+                        continue  # "changed size during iteration" from the stdlib fallback
+                    json.loads(out)
+        finally:
+            stop.set()
+
+    def target(i):
+        (mutate if i < 4 else encode)(i)
+
+    run_threads(target, n=10)
+
+
+class TestNdarray:
+    np = pytest.importorskip("numpy")
+
+    def test_hammer_dumps_ndarray(self):
+        rng = self.np.random.default_rng(0)
+        arrays = [rng.standard_normal(5000), rng.standard_normal((200, 30)).astype("float32")]
+        expected = [fastjson.dumps_ndarray(a) for a in arrays]
+
+        def target(i):
+            for _ in range(10):
+                for a, exp in zip(arrays, expected):
+                    assert fastjson.dumps_ndarray(a, threads=1 + i % 3) == exp
+                    assert fastjson.dumps_ndarray(a, output="bytes") == exp.encode()
+
+        run_threads(target)
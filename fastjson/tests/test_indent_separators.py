@@ -0,0 +1,237 @@
+"""Tests for native indent= and arbitrary separators= (byte-for-byte with json.dumps)."""
+
+import io
+import json
+import random
+import re
+
+import pytest
+
+import fastjson
+
+DOCUMENTS = [
+    [],
+    {},
+    [[], {}, [[]], {"a": {}}],
+    [0.5 * i for i in range(50)],
+    list(range(-20, 20)),
+    (1.5, 2.5),
+    {"a": [1.0, None, True, False], "b": {"c": "d", "e": [{"f": []}]}, "n": 2**70},
+    {"café": ["日本語", "\U0001f600"], 1: 2.5, None: [[1, 2], [3.0]]},
+    [[[[[1]]]], [[[[]]]]],
+]
+
+INDENTS = [None, 0, 1, 2, 4, -1, "", "\t", "--", "→ ", True, False]
+
+SEPARATORS = [
+    None,
+    (",", ":"),
+    (", ", ": "),
+    [" ,", " : "],
+    (";", "="),
+    ("", ""),
+    ("、", "："),
+    (",\n", ":\t"),
+]
+
+
+@pytest.mark.parametrize("obj", DOCUMENTS)
+@pytest.mark.parametrize("indent", INDENTS)
+@pytest.mark.parametrize("separators", SEPARATORS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_dumps_matches_stdlib(obj, indent, separators, ensure_ascii):
+    kwargs = {"indent": indent, "separators": separators, "ensure_ascii": ensure_ascii}
+    expected = json.dumps(obj, **kwargs)
+    assert fastjson.dumps(obj, **kwargs) == expected
+    assert fastjson.dumps_bytes(obj, **kwargs) == expected.encode()
+    assert bytes(fastjson.dumps_bytes(obj, output="buffer", **kwargs)) == expected.encode()
+
+
+@pytest.mark.parametrize("indent", [2, "\t", "→"])
+def test_large_fast_path_sequences(indent):
+    rng = random.Random(11)
+    floats = [rng.random() for _ in range(5000)]
+    ints = [rng.randrange(-(10**12), 10**12) for _ in range(5000)]
+    for obj in [floats, ints]:
+        assert fastjson.dumps(obj, indent=indent) == json.dumps(obj, indent=indent)
+        assert fastjson.dumps(obj, indent=indent, separators=(" ,", ":")) == json.dumps(
+            obj, indent=indent, separators=(" ,", ":")
+        )
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4, min_size=0)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.parametrize("indent", [None, 3, "é"])
+def test_parallel_float_list(indent):
+    obj = [random.Random(2).uniform(-1, 1) for _ in range(100_000)]
+    assert fastjson.dumps(obj, indent=indent, separators=(";", ":")) == json.dumps(
+        obj, indent=indent, separators=(";", ":")
+    )
+
+
+def test_deep_nesting_grows_indent():
+    obj = leaf = []
+    for _ in range(100):
+        nxt = [{"k": []}, 1]
+        leaf.append(nxt)
+        leaf = nxt[0]["k"]
+    leaf.append(0.5)
+    for indent in [1, 8, "\t"]:
+        assert fastjson.dumps(obj, indent=indent) == json.dumps(obj, indent=indent)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"indent": 2.0},
+        {"indent": [2]},
+        {"separators": (",",)},
+        {"separators": ",:"},
+        {"separators": (",", 1)},
+        {"separators": ("\ud800", ":")},
+    ],
+)
+def test_unsupported_options_fall_back_to_stdlib(kwargs):
+    obj = {"a": [1.0, 2]}
+    try:
+        expected = json.dumps(obj, **kwargs)
+    except Exception as e_std:  # noqa: BLE001 - we want exact parity with stdlib
+        with pytest.raises(type(e_std)) as e_fast:
+            fastjson.dumps(obj, **kwargs)
+        assert str(e_fast.value) == str(e_std)
+    else:
+        assert fastjson.dumps(obj, **kwargs) == expected
+
+
+def test_indent_int_subclass():
+    class Width(int):
+        pass
+
+    obj = {"a": [1, [2]]}
+    assert fastjson.dumps(obj, indent=Width(3)) == json.dumps(obj, indent=Width(3))
+
+
+def test_separators_list_mutated_during_encoding():
+    seps = [",", ":"]
+
+    class Mutating(dict):
+        def items(self):
+            seps[0] = "#" * 1000
+            return super().items()
+
+    obj = [Mutating(a=1), Mutating(b=2)]
+    # Like json.JSONEncoder, the separators are read once per call
+    assert fastjson.dumps(obj, separators=seps, indent=1) == json.dumps(
+        obj, separators=[",", ":"], indent=1
+    )
+
+
+def test_errors_match_stdlib_with_indent():
+    for obj, kwargs in [
+        ({"a": [1, object()]}, {"indent": 2}),
+        ([1.0, float("nan")], {"indent": "\t", "allow_nan": False}),
+    ]:
+        with pytest.raises(Exception) as e_std:
+            json.dumps(obj, **kwargs)
+        with pytest.raises(type(e_std.value)) as e_fast:
+            fastjson.dumps(obj, **kwargs)
+        assert str(e_fast.value) == str(e_std.value)
+
+
+@pytest.mark.parametrize("obj", DOCUMENTS)
+@pytest.mark.parametrize(
+    "kwargs", [{"indent": 2}, {"indent": "→", "separators": ("、", "：")}]
+)
+def test_other_entry_points(obj, kwargs):
+    expected = json.dumps(obj, **kwargs)
+    assert fastjson.Encoder(**kwargs).encode(obj) == expected
+    assert fastjson.Encoder(output="bytes", **kwargs).encode(obj) == expected.encode()
+
+    target = bytearray(len(expected.encode()) + 4)
+    assert fastjson.dumps_into(obj, target, 4, **kwargs) == len(expected.encode())
+    assert target[4:] == expected.encode()
+
+    for chunk_size in [1, 65536]:
+        fp = io.StringIO()
+        fastjson.dump(obj, fp, chunk_size=chunk_size, **kwargs)
+        assert fp.getvalue() == expected
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"indent": 2}, {"indent": "→"}, {"separators": (",", "：")}]
+)
+def test_dump_real_file(tmp_path, kwargs):
+    obj = {"a": [0.25, {"b": [1, 2]}], "c": "é"}
+    path = tmp_path / "out.json"
+    with open(path, "w", encoding="utf-8") as f:
+        fastjson.dump(obj, f, **kwargs)
+        f.write("!")
+    assert path.read_text(encoding="utf-8") == json.dumps(obj, **kwargs) + "!"
+
+
+class TestNdarrayLayout:
+    np = pytest.importorskip("numpy")
+
+    @pytest.mark.parametrize("shape", [(0,), (7,), (0, 3), (3, 0), (4, 3)])
+    @pytest.mark.parametrize("indent", [None, 0, 2, "\t", "→"])
+    @pytest.mark.parametrize("separators", [None, (", ", ": "), ("、", ":")])
+    def test_matches_json_of_tolist(self, shape, indent, separators):
+        a = self.np.arange(self.np.prod(shape)).reshape(shape) / 4
+        expected = json.dumps(
+            a.tolist(), indent=indent, separators=separators or (",", ":"), ensure_ascii=False
+        )
+        got = fastjson.dumps_ndarray(a, indent=indent, separators=separators)
+        assert got == expected
+        assert fastjson.dumps_ndarray(a, indent=indent, separators=separators, output="bytes") == (
+            expected.encode()
+        )
+
+        target = bytearray(len(expected.encode()))
+        n = fastjson.dumps_ndarray_into(a, target, indent=indent, separators=separators)
+        assert target[:n] == expected.encode()
+
+        text = io.StringIO()
+        fastjson.dump_ndarray(a, text, indent=indent, separators=separators, chunk_size=5)
+        assert text.getvalue() == expected
+
+    @pytest.mark.parametrize("indent", [0, "\t"])
+    def test_float32_layout_matches_float64(self, indent):
+        a = self.np.arange(12).reshape(4, 3) / 4
+        number = re.compile(r"[-+.\de]+")
+        for kwargs in [{"indent": indent}, {"indent": indent, "separators": ("、", ":")}]:
+            got = fastjson.dumps_ndarray(a.astype("float32"), **kwargs)
+            assert number.sub("N", got) == number.sub("N", fastjson.dumps_ndarray(a, **kwargs))
+        assert json.loads(fastjson.dumps_ndarray(a.astype("float32"), indent=indent)) == a.tolist()
+
+    @pytest.mark.parametrize("nan", ["null", "skip"])
+    def test_nan_modes(self, nan):
+        a = self.np.array([[1.0, self.np.nan], [2.0, 3.0], [self.np.inf, 4.0]])
+        rows = [[None if not self.np.isfinite(x) else x for x in row] for row in a.tolist()]
+        if nan == "skip":
+            rows = [row for row in rows if None not in row]
+        expected = json.dumps(rows, indent=1, separators=(",", ":"))
+        assert fastjson.dumps_ndarray(a, nan=nan, indent=1) == expected
+        b = self.np.array([self.np.nan, self.np.nan])
+        assert fastjson.dumps_ndarray(b, nan="skip", indent=2) == "[]"
+
+    @pytest.mark.parametrize("shape", [(200_000,), (50_000, 3)])
+    def test_parallel_ranges(self, shape):
+        a = self.np.random.default_rng(4).standard_normal(shape)
+        expected = json.dumps(a.tolist(), indent=2, separators=(", ", ": "))
+        assert fastjson.dumps_ndarray(a, indent=2, separators=(", ", ": "), threads=4) == expected
+
+    @pytest.mark.parametrize(
+        "kwargs", [{"indent": 2.0}, {"separators": ","}, {"separators": (",", 1)}]
+    )
+    def test_invalid_layout(self, kwargs):
+        with pytest.raises(TypeError):
+            fastjson.dumps_ndarray(self.np.zeros(2), **kwargs)
@@ -0,0 +1,214 @@
+"""Tests for iterencode() and iterencode_ndarray(): bounded-size chunks."""
+
+import decimal
+import json
+import tracemalloc
+
+import pytest
+
+import fastjson
+
+DOCS = [
+    {"a": [1.5, 2, {"b": None, "c": True}], "s": "café \U0001f600", "empty": {}, "e": []},
+    [float(i) / 3 for i in range(5000)],
+    [1, "two", [3.0, [4, [5, {"six": 6}]]], (7, 8)],
+    {"z": 1, "a": {"y": [1, 2], "b": {}}, "m": [{}, []]},
+    "just a string",
+    1.25,
+    None,
+    [],
+    {},
+]
+
+LAYOUTS = [
+    {},
+    {"indent": 2},
+    {"indent": "\t", "sort_keys": True},
+    {"separators": (",", ":")},
+    {"ensure_ascii": False, "separators": (", ", " = ")},
+]
+
+
+@pytest.mark.parametrize("doc", DOCS, ids=lambda d: type(d).__name__)
+@pytest.mark.parametrize("kwargs", LAYOUTS, ids=str)
+def test_matches_dumps(doc, kwargs):
+    expected = json.dumps(doc, **kwargs)
+    for chunk_size in [1, 3, 16, 65536]:
+        chunks = list(fastjson.iterencode(doc, chunk_size=chunk_size, **kwargs))
+        assert "".join(chunks) == expected
+        assert all(type(c) is str and c for c in chunks)
+        assert all(len(c) <= max(chunk_size, 2) for c in chunks)
+        data = b"".join(fastjson.iterencode(doc, chunk_size=chunk_size, output="bytes", **kwargs))
+        assert data == expected.encode()
+
+
+def test_chunk_sizes():
+    doc = {"values": [float(i) for i in range(100_000)], "tags": ["é" * 7] * 1000}
+    chunks = list(fastjson.iterencode(doc, chunk_size=4096, ensure_ascii=False))
+    assert "".join(chunks) == json.dumps(doc, ensure_ascii=False)
+    # Full chunks, at most a character short where one would be split
+    assert all(4093 <= len(c.encode()) <= 4096 for c in chunks[:-1])
+    chunks = list(fastjson.iterencode(doc, chunk_size=4096, output="bytes", ensure_ascii=False))
+    assert all(len(c) == 4096 for c in chunks[:-1])
+
+
+def test_lazy():
+    doc = [[float(i)] * 100 for i in range(10_000)]
+    chunks = fastjson.iterencode(doc, chunk_size=1024)
+    first = next(chunks)
+    assert len(first) == 1024
+    assert json.dumps(doc).startswith(first)
+
+
+def test_bounded_memory():
+    doc = {"x": [float(i) / 7 for i in range(200_000)], "y": list(range(200_000))}
+    tracemalloc.start()
+    try:
+        for _ in fastjson.iterencode(doc, chunk_size=16384):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 1_000_000
+
+
+def test_deep_nesting():
+    doc = []
+    for _ in range(200):
+        doc = [doc, {"k": doc}] if len(str(doc)) < 1000 else [doc]
+    assert "".join(fastjson.iterencode(doc, chunk_size=64, indent=1)) == json.dumps(doc, indent=1)
+
+
+def test_fallback_options():
+    doc = {"d": decimal.Decimal("1.5"), "n": [1, 2], 3: "x", (1, 2): "skipped"}
+    kwargs = {"default": str, "skipkeys": True, "indent": 2}
+    chunks = list(fastjson.iterencode(doc, chunk_size=5, **kwargs))
+    assert "".join(chunks) == json.dumps(doc, **kwargs)
+    assert all(len(c) == 5 for c in chunks[:-1])
+
+    class Encoder(json.JSONEncoder):
+        def default(self, o):
+            return {"decimal": str(o)}
+
+    assert "".join(fastjson.iterencode(doc, cls=Encoder, skipkeys=True)) == json.dumps(
+        doc, cls=Encoder, skipkeys=True
+    )
+
+
+@pytest.mark.parametrize(
+    "bad, exc",
+    [
+        (decimal.Decimal("1"), TypeError),
+        (float("nan"), ValueError),
+        ({1j: 2}, TypeError),
+    ],
+)
+@pytest.mark.parametrize("output", ["str", "bytes"])
+def test_errors_after_chunks(bad, exc, output):
+    doc = {"head": [float(i) for i in range(1000)], "bad": bad}
+    got = []
+    with pytest.raises(exc) as info:
+        for chunk in fastjson.iterencode(doc, chunk_size=100, allow_nan=False, output=output):
+            got.append(chunk)
+    pieces = []
+    with pytest.raises(exc) as stdlib:
+        for piece in json.JSONEncoder(allow_nan=False).iterencode(doc):
+            pieces.append(piece)
+    assert str(info.value) == str(stdlib.value)
+    # The output before the error, in chunks
+    before = "".join(pieces)
+    joined = (b"" if output == "bytes" else "").join(got)
+    assert len(got) >= 10
+    assert (before.encode() if output == "bytes" else before).startswith(joined)
+
+
+def test_circular():
+    loop = {"a": [1.0] * 100}
+    loop["a"].append(loop)
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        list(fastjson.iterencode(loop, chunk_size=8))
+    assert "".join(fastjson.iterencode([loop["a"][:5]] * 3, chunk_size=8)) == json.dumps(
+        [loop["a"][:5]] * 3
+    )
+
+
+def test_surrogates():
+    doc = ["a\ud800b"] * 3
+    assert "".join(fastjson.iterencode(doc, ensure_ascii=False, chunk_size=4)) == json.dumps(
+        doc, ensure_ascii=False
+    )
+    with pytest.raises(UnicodeEncodeError):
+        list(fastjson.iterencode(doc, ensure_ascii=False, output="bytes"))
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match="chunk_size must be positive"):
+        fastjson.iterencode([1], chunk_size=0)
+    with pytest.raises(ValueError, match="output must be 'str' or 'bytes'"):
+        fastjson.iterencode([1], output="buffer")
+
+
+class TestNdarray:
+    def test_matches_dumps_ndarray(self):
+        np = pytest.importorskip("numpy")
+        a = np.random.default_rng(23).standard_normal((400, 3))
+        cases = [
+            (a, {}),
+            (a[::-1, ::2].astype(np.float32), {"indent": 2}),
+            (a.T, {"precision": 3, "separators": (", ", ": ")}),
+            (np.arange(1000, dtype=np.int16), {}),
+            (a, {"lines": True}),
+            (np.zeros(5, dtype=[("x", "f8"), ("t", "u8")]), {"indent": 1}),
+        ]
+        for arr, kwargs in cases:
+            expected = fastjson.dumps_ndarray(arr, **kwargs)
+            for chunk_size in [1, 7, 4096]:
+                chunks = list(fastjson.iterencode_ndarray(arr, chunk_size=chunk_size, **kwargs))
+                assert "".join(chunks) == expected
+                assert all(len(c) == chunk_size for c in chunks[:-1])
+                data = b"".join(
+                    fastjson.iterencode_ndarray(arr, chunk_size=chunk_size, output="bytes", **kwargs)
+                )
+                assert data == expected.encode()
+
+    def test_edge_shapes(self):
+        np = pytest.importorskip("numpy")
+        assert list(fastjson.iterencode_ndarray(np.float64(2.5))) == ["2.5"]
+        assert list(fastjson.iterencode_ndarray(np.zeros((0, 3)))) == ["[]"]
+        assert list(fastjson.iterencode_ndarray(np.zeros((0, 3)), lines=True)) == []
+
+    def test_nan(self):
+        np = pytest.importorskip("numpy")
+        a = np.arange(10_000, dtype=np.float64)
+        a[9000] = np.nan
+        chunks = fastjson.iterencode_ndarray(a, chunk_size=1024)
+        first = next(chunks)
+        assert fastjson.dumps_ndarray(a, nan="null").startswith(first)
+        with pytest.raises(ValueError, match="Out of range float"):
+            list(chunks)
+        skipped = "".join(fastjson.iterencode_ndarray(a, nan="skip", chunk_size=100))
+        assert skipped == fastjson.dumps_ndarray(a, nan="skip")
+
+    def test_bounded_memory(self):
+        np = pytest.importorskip("numpy")
+        a = np.random.default_rng(1).standard_normal((200_000, 3))
+        tracemalloc.start()
+        try:
+            for _ in fastjson.iterencode_ndarray(a, chunk_size=16384):
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < 1_000_000
+
+    def test_keeps_array_alive(self):
+        np = pytest.importorskip("numpy")
+        chunks = fastjson.iterencode_ndarray(np.arange(100.0) * 2, chunk_size=10)
+        assert "".join(chunks) == fastjson.dumps_ndarray(np.arange(100.0) * 2)
+
+    def test_errors(self):
+        np = pytest.importorskip("numpy")
+        with pytest.raises(TypeError, match="only float32"):
+            fastjson.iterencode_ndarray(np.zeros(2, dtype=complex))
+        with pytest.raises(ValueError, match="chunk_size must be positive"):
+            fastjson.iterencode_ndarray(np.zeros(2), chunk_size=-1)
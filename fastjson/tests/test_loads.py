@@ -0,0 +1,230 @@
+"""Tests for the native loads()/load() decoder against stdlib json."""
+
+import decimal
+import io
+import json
+import math
+import random
+import struct
+
+import pytest
+
+import fastjson
+
+
+def f64_from_bits(bits: int) -> float:
+    return struct.unpack("!d", struct.pack("!Q", bits & 0xFFFFFFFFFFFFFFFF))[0]
+
+
+def bits(value: float) -> int:
+    return struct.unpack("!Q", struct.pack("!d", value))[0]
+
+
+def outcome(loads, s):
+    """The result (by repr, so -0.0 and NaN compare), or the exception."""
+    try:
+        return "ok", repr(loads(s))
+    except json.JSONDecodeError as e:
+        return "JSONDecodeError", e.msg, e.pos, e.lineno, e.colno
+    except Exception as e:
+        return type(e).__name__, str(e)
+
+
+DOCS = [
+    '{"a": [1, 2.5, -3e-5, null, true, false], "b": {"c": "d", "": []}}',
+    "[1.5, 2, -0.0, -0, 1e400, -1e400, 1e-400, 1E5, 1e+2, 0.1, 123456789012345678]",
+    "[12345678901234567890123, -98765432109876543210, 1.2345678901234567890123e-7]",
+    '"\\"\\\\\\/\\b\\f\\n\\r\\t \\u00e9 \\u20AC \\ud83d\\ude00 \\ud800 \\udc00x \\ud800\\u0041"',
+    '"café \U0001f600 ünïcödé \x7f"',
+    "  [NaN, Infinity, -Infinity]\n\t\r ",
+    '{"k": 1, "k": 2, "j": {"k": [[], {}, [[[]]]]}}',
+    "[]",
+    "{}",
+    '""',
+    "0",
+    "-0",
+    "true",
+    "null",
+    '"\ud800 lone \udfff surrogates"',
+]
+
+
+@pytest.mark.parametrize("doc", DOCS)
+def test_matches_stdlib(doc):
+    expected = outcome(json.loads, doc)
+    assert expected[0] == "ok"
+    assert outcome(fastjson.loads, doc) == expected
+    data = doc.encode("utf-8", "surrogatepass")
+    assert outcome(fastjson.loads, data) == expected
+    assert outcome(fastjson.loads, bytearray(data)) == expected
+
+
+def test_types():
+    assert type(fastjson.loads("1")) is int
+    assert type(fastjson.loads("1.0")) is float
+    assert type(fastjson.loads("1e2")) is float
+    assert type(fastjson.loads("10000000000000000000000")) is int
+    assert fastjson.loads("[1]") == [1] and type(fastjson.loads("[1]")) is list
+    assert type(fastjson.loads('{"a": 1}')) is dict
+
+
+def test_keys_are_memoized():
+    rows = fastjson.loads('[{"name": 1, "value": 2}, {"name": 3, "value": 4}]')
+    assert [a is b for a, b in zip(rows[0], rows[1])] == [True, True]
+
+
+def test_dumps_round_trip():
+    rng = random.Random(25)
+    doc = {
+        "floats": [rng.gauss(0, 1) * 10 ** rng.randint(-30, 30) for _ in range(2000)],
+        "ints": [rng.randint(-(2**70), 2**70) for _ in range(200)],
+        "rows": [{"id": i, "tag": "é" * (i % 3), "ok": i % 2 == 0} for i in range(100)],
+    }
+    for kwargs in [{}, {"indent": 2}, {"separators": (",", ":")}, {"ensure_ascii": False}]:
+        text = fastjson.dumps(doc, **kwargs)
+        assert fastjson.loads(text) == doc
+        assert fastjson.loads(text.encode()) == doc
+
+
+class TestFloats:
+    def test_random_bits(self):
+        rng = random.Random(0)
+        for _ in range(20_000):
+            x = f64_from_bits(rng.getrandbits(64))
+            if not math.isfinite(x):
+                continue
+            for text in (repr(x), "%.17e" % x, "%.16g" % x, "%.3e" % x, "%.25e" % x):
+                assert bits(fastjson.loads(text)) == bits(float(text)), text
+
+    def test_random_decimals(self):
+        rng = random.Random(1)
+        for _ in range(20_000):
+            digits = "".join(rng.choice("0123456789") for _ in range(rng.randint(1, 21)))
+            text = f"{digits[0]}.{digits[1:] or '0'}e{rng.randint(-345, 310)}"
+            assert bits(fastjson.loads(text)) == bits(float(text)), text
+
+    def test_halfway_cases(self):
+        rng = random.Random(2)
+        for _ in range(2000):
+            x = rng.uniform(0, 2.0 ** rng.randint(-60, 60))
+            y = f64_from_bits(bits(x) + 1)
+            mid = (decimal.Decimal(x) + decimal.Decimal(y)) / 2
+            for text in (format(mid, "f"), format(mid, "e")):
+                assert bits(fastjson.loads(text)) == bits(float(text)), text
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "5e-324", "2.4703282292062327e-324", "2.4703282292062328e-324", "4.9406564584124654e-324",
+            "2.2250738585072011e-308", "2.2250738585072012e-308", "2.2250738585072014e-308",
+            "1.7976931348623157e308", "1.7976931348623158e308", "1.7976931348623159e308",
+            "9007199254740993", "9007199254740993.0", "9007199254740992.5", "0.1e-400",
+            "123456789012345678901234567890e-40", "1e23", "8.98846567431158e307",
+            "0.000000000000000000000000000000000000000000001", "0.0e10", "0e999999999999999",
+            "1e-99999999999999", "7.1e10", "1.00000000000000011102230246251565404236316680908203125",
+        ],
+    )
+    def test_edges(self, text):
+        assert bits(fastjson.loads(text)) == bits(float(text))
+        assert bits(fastjson.loads("-" + text)) == bits(float("-" + text))
+
+
+INVALID = [
+    "", " ", "[", "]", "[1,]", "[1 2]", '{"a" 1}', '{"a": 1,}', "{1: 2}", "{'a': 1}",
+    "01", "1.", ".5", "1e", "1e+", "-", "--1", "+1", "0x10", "1.5.5", "[1] [2]", "nul", "tru",
+    "True", "nan", "-nan", "infinity", "-Inf", '"abc', '"\\x"', '"\\u12"', '"\\u12g4"',
+    '"\\ud800\\u12"', '"tab\there"', '"nl\nhere"', '"\\', '["a" "b"]', "[1]\x00",
+    '{"a": [1, 2, {"b": }]}', "﻿[1]", "[1,\n2,\n3,\n]",
+]
+
+
+@pytest.mark.parametrize("doc", INVALID)
+def test_errors_match_stdlib(doc):
+    expected = outcome(json.loads, doc)
+    assert expected[0] != "ok"
+    assert outcome(fastjson.loads, doc) == expected
+    data = doc.encode("utf-8", "surrogatepass")
+    assert outcome(fastjson.loads, data) == outcome(json.loads, data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"\xef\xbb\xbf[1]",
+        "[1, \"é\"]".encode("utf-16"),
+        "[1]".encode("utf-16-le"),
+        "[1]".encode("utf-32-be"),
+        b'["\xed\xa0\x80"]',
+        b'["\xc3"]',
+        b"[1, \xff]",
+        b'"\xf4\x90\x80\x80"',
+        b'"\xe0\x80\x80"',
+        b"",
+    ],
+)
+def test_bytes_encodings(data):
+    assert outcome(fastjson.loads, data) == outcome(json.loads, data)
+
+
+def test_wrong_type():
+    for obj in [5, None, memoryview(b"[1]"), ["[1]"]]:
+        assert outcome(fastjson.loads, obj) == outcome(json.loads, obj)
+
+
+def test_deep_nesting():
+    doc = "[" * 50 + "1" + "]" * 50
+    assert fastjson.loads(doc) == json.loads(doc)
+    with pytest.raises(RecursionError):
+        fastjson.loads("[" * 100_000 + "]" * 100_000)
+
+
+def test_big_ints():
+    assert fastjson.loads("9" * 4000) == int("9" * 4000)
+    assert outcome(fastjson.loads, "[" + "1" * 5000 + "]") == outcome(json.loads, "[" + "1" * 5000 + "]")
+
+
+def test_hooks_fall_back():
+    doc = '{"a": 1.5, "b": [2, NaN], "c": {"d": "e"}}'
+    kwargs_list = [
+        {"parse_float": decimal.Decimal},
+        {"parse_int": float},
+        {"parse_constant": lambda name: name},
+        {"object_hook": lambda d: sorted(d)},
+        {"object_pairs_hook": list},
+        {"cls": json.JSONDecoder},
+        {"strict": False},
+        {"object_hook": None, "parse_float": None},
+    ]
+    for kwargs in kwargs_list:
+        assert repr(fastjson.loads(doc, **kwargs)) == repr(json.loads(doc, **kwargs))
+    assert fastjson.loads('"a\tb"', strict=False) == "a\tb"
+    assert fastjson.loads(s="[1]") == [1]
+    with pytest.raises(TypeError):
+        fastjson.loads("[1]", None)
+    with pytest.raises(TypeError):
+        fastjson.loads("[1]", bogus=1)
+
+
+def test_load():
+    doc = {"a": [1.5, "é"]}
+    assert fastjson.load(io.StringIO(json.dumps(doc))) == doc
+    assert fastjson.load(io.BytesIO(json.dumps(doc).encode())) == doc
+    assert fastjson.load(io.StringIO('{"a": 1.5}'), parse_float=str) == {"a": "1.5"}
+    with pytest.raises(json.JSONDecodeError, match="Expecting value"):
+        fastjson.load(io.StringIO("[1,]"))
+
+
+def test_seeded_mutation_fuzz():
+    rng = random.Random(3)
+    base = [DOCS[0], DOCS[3], json.dumps([rng.random() for _ in range(10)])]
+    alphabet = list('[]{}:,"\\ 0123456789.eE+-tfnrulsaINiyé\x00\x1f') + ["\\u", "\\ud800"]
+    for _ in range(5000):
+        chars = list(rng.choice(base))
+        for _ in range(rng.randint(1, 3)):
+            k = rng.randrange(len(chars) + 1)
+            if rng.random() < 0.5 and chars:
+                del chars[min(k, len(chars) - 1)]
+            else:
+                chars.insert(k, rng.choice(alphabet))
+        doc = "".join(chars)
+        assert outcome(fastjson.loads, doc) == outcome(json.loads, doc), doc
@@ -0,0 +1,199 @@
+"""Tests for dumps(..., native_arrays=True): buffers formatted in place inside documents."""
+
+import array
+import json
+from datetime import date
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+
+def tolist(obj):
+    return obj.tolist()
+
+
+def frame():
+    rng = np.random.default_rng(19)
+    return {
+        "ts": np.arange(1_700_000_000_000, 1_700_000_000_050, dtype=np.int64),
+        "values": rng.standard_normal(50),
+        "grid": rng.standard_normal((3, 4, 2)),
+        "mask": rng.standard_normal(7) > 0,
+        "labels": np.array([[0, 255], [7, 1]], dtype=np.uint8),
+        "meta": {"id": 7, "name": "sensor", "tags": ["a", "b"], "scale": 0.5},
+        "rows": [{"i": i, "v": rng.standard_normal(i)} for i in range(4)],
+    }
+
+
+LAYOUTS = [
+    {},
+    {"separators": (",", ":")},
+    {"indent": 2},
+    {"indent": "\t", "separators": (", ", " = ")},
+    {"indent": 0},
+    {"sort_keys": True, "indent": 1},
+]
+
+
+@pytest.mark.parametrize("kwargs", LAYOUTS)
+def test_matches_tolist(kwargs):
+    doc = frame()
+    expected = json.dumps(doc, default=tolist, **kwargs)
+    assert fastjson.dumps(doc, native_arrays=True, **kwargs) == expected
+    assert fastjson.dumps_bytes(doc, native_arrays=True, **kwargs) == expected.encode()
+    assert bytes(fastjson.dumps_bytes(doc, native_arrays=True, output="buffer", **kwargs)) == (
+        expected.encode()
+    )
+
+
+@pytest.mark.parametrize("kwargs", LAYOUTS)
+def test_nested_depth(kwargs):
+    doc = [[{"a": [np.arange(6).reshape(2, 3), np.zeros((2, 0)), np.zeros(0)]}]]
+    assert fastjson.dumps(doc, native_arrays=True, **kwargs) == json.dumps(
+        doc, default=tolist, **kwargs
+    )
+
+
+def test_top_level_and_views():
+    a = np.arange(24, dtype=">f8").reshape(2, 3, 4)
+    for view in [a, a[:, ::2, ::-1], a.transpose(2, 0, 1), np.asfortranarray(a), a[1, 2, 3]]:
+        assert fastjson.dumps(view, native_arrays=True) == json.dumps(view.tolist())
+
+
+def test_other_buffers_and_scalars():
+    doc = {
+        "d": array.array("d", [0.5, -2.0, 1e300]),
+        "q": array.array("q", [-(2**63), 2**63 - 1]),
+        "m": memoryview(array.array("i", [1, 2, 3, 4, 5, 6])).cast("B").cast("i", (2, 3)),
+        "i": np.int32(-7),
+        "u": np.uint64(2**64 - 1),
+        "b": np.bool_(False),
+        "f": np.float64(0.1),  # a float subclass: written like float
+    }
+    expected = json.dumps({k: v.tolist() for k, v in doc.items()})
+    assert fastjson.dumps(doc, native_arrays=True) == expected
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16])
+def test_narrow_floats(dtype):
+    a = np.random.default_rng(1).standard_normal((20, 3)).astype(dtype)
+    # Shortest digits of the narrow value, not of its float64 widening
+    out = fastjson.dumps({"a": a}, native_arrays=True, indent=2)
+    assert np.array(json.loads(out)["a"], dtype=dtype).tobytes() == a.tobytes()
+    assert len(out) < len(json.dumps({"a": a}, default=tolist, indent=2))
+    nested = fastjson.dumps_ndarray(a, indent=2).replace("\n", "\n  ")
+    assert out == '{\n  "a": ' + nested + "\n}"
+
+
+def test_nan_and_infinity():
+    a = np.array([1.5, np.nan, np.inf, -np.inf])
+    doc = {"f8": a, "f4": a[1:].astype(np.float32), "f2": a.astype(">f2")}
+    expected = '{"f8": [1.5, NaN, Infinity, -Infinity], "f4": [NaN, Infinity, -Infinity], '
+    expected += '"f2": [1.5, NaN, Infinity, -Infinity]}'
+    assert fastjson.dumps(doc, native_arrays=True) == expected
+    assert fastjson.dumps(np.float32("nan"), native_arrays=True) == "NaN"
+    with pytest.raises(ValueError, match="Out of range float values are not JSON compliant"):
+        fastjson.dumps(doc, native_arrays=True, allow_nan=False)
+
+
+def test_off_by_default():
+    with pytest.raises(TypeError, match="Object of type ndarray is not JSON serializable"):
+        fastjson.dumps({"a": np.zeros(2)})
+    with pytest.raises(TypeError, match="Object of type ndarray is not JSON serializable"):
+        fastjson.dumps({"a": np.zeros(2)}, native_arrays=False)
+
+
+@pytest.mark.parametrize("obj", [b"ab", bytearray(b"ab")])
+def test_bytes_are_not_arrays(obj):
+    with pytest.raises(TypeError, match="is not JSON serializable"):
+        fastjson.dumps([obj], native_arrays=True)
+
+
+class TestFallback:
+    def test_unsupported_buffers_use_tolist(self):
+        doc = {"o": np.array([1, "a", None], dtype=object), "u": array.array("u", "hi")}
+        assert fastjson.dumps(doc, native_arrays=True) == json.dumps(doc, default=tolist)
+        with pytest.raises(TypeError, match="Object of type complex is not JSON serializable"):
+            fastjson.dumps([np.array([1j])], native_arrays=True)
+
+    def test_stdlib_options(self):
+        doc = {1: np.arange(3), (2,): 1, "x": array.array("d", [0.5])}
+        expected = json.dumps(doc, default=tolist, skipkeys=True)
+        assert fastjson.dumps(doc, native_arrays=True, skipkeys=True) == expected
+        assert fastjson.dumps(doc, native_arrays=True, skipkeys=True, default=None) == expected
+
+    def test_user_default_wins(self):
+        out = fastjson.dumps([np.arange(2), {1, 2}], native_arrays=True, default=lambda o: "D")
+        assert out == '["D", "D"]'
+
+    def test_cls_keeps_its_default(self):
+        class DateEncoder(json.JSONEncoder):
+            def default(self, o):
+                if isinstance(o, date):
+                    return o.isoformat()
+                return super().default(o)
+
+        doc = {"t": date(2024, 1, 1), "a": np.arange(2.0), "m": memoryview(b"ab").cast("B")}
+        lists = {"t": doc["t"], "a": [0.0, 1.0], "m": [97, 98]}
+        expected = json.dumps(lists, cls=DateEncoder)
+        assert fastjson.dumps(doc, cls=DateEncoder, native_arrays=True) == expected
+        assert fastjson.dumps_bytes(doc, cls=DateEncoder, native_arrays=True) == expected.encode()
+        assert fastjson.Encoder(cls=DateEncoder, native_arrays=True)(doc) == expected
+        with pytest.raises(TypeError, match="Object of type set is not JSON serializable"):
+            fastjson.dumps([np.arange(2), {1}], cls=DateEncoder, native_arrays=True)
+        out = fastjson.dumps(doc, cls=DateEncoder, native_arrays=True, default=lambda o: "D")
+        assert out == '{"t": "D", "a": "D", "m": "D"}'
+
+    def test_narrow_floats_widen(self):
+        doc = {1.5: np.array([0.1, 1.5], dtype=np.float32), (2,): 0}
+        assert fastjson.dumps(doc, native_arrays=True, skipkeys=True) == json.dumps(
+            doc, default=tolist, skipkeys=True
+        )
+        assert fastjson.dumps(doc, native_arrays=True, skipkeys=True) == (
+            '{"1.5": [0.10000000149011612, 1.5]}'
+        )
+
+    def test_other_errors(self):
+        with pytest.raises(TypeError, match="Object of type set is not JSON serializable"):
+            fastjson.dumps([np.arange(2), {1}], native_arrays=True)
+        loop = [np.arange(2)]
+        loop.append(loop)
+        with pytest.raises(ValueError, match="Circular reference detected"):
+            fastjson.dumps(loop, native_arrays=True)
+
+
+class TestEncoder:
+    def test_native(self):
+        doc = frame()
+        encode = fastjson.Encoder(native_arrays=True, separators=(",", ":"))
+        assert encode.native
+        assert encode(doc) == json.dumps(doc, default=tolist, separators=(",", ":"))
+
+    def test_fallback(self):
+        doc = {(1,): 0, "a": np.arange(3)}
+        encode = fastjson.Encoder(native_arrays=True, skipkeys=True, output="bytes")
+        assert not encode.native
+        assert encode(doc) == b'{"a": [0, 1, 2]}'
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.parametrize("kwargs", [{}, {"indent": 2}])
+def test_large_arrays(kwargs):
+    rng = np.random.default_rng(3)
+    doc = {"a": [rng.standard_normal((300_000, 2)), rng.integers(-(10**9), 10**9, 200_000)]}
+    assert fastjson.dumps(doc, native_arrays=True, **kwargs) == json.dumps(
+        doc, default=tolist, **kwargs
+    )
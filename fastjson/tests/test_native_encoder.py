@@ -0,0 +1,194 @@
+"""Tests for the native recursive encoder (dict/list/str/int/float/bool/None)."""
+
+import collections
+import enum
+import json
+import random
+
+import pytest
+
+import fastjson
+
+
+def assert_same_dumps(obj, **kwargs):
+    try:
+        got = fastjson.dumps(obj, **kwargs)
+    except Exception as e_fast:  # noqa: BLE001 - we want exact parity with stdlib
+        with pytest.raises(type(e_fast)) as e_std:
+            json.dumps(obj, **kwargs)
+        assert str(e_fast) == str(e_std.value)
+    else:
+        assert got == json.dumps(obj, **kwargs)
+
+
+KWARGS = [
+    {},
+    {"separators": (",", ":")},
+    {"ensure_ascii": False},
+    {"check_circular": False},
+    {"allow_nan": False},
+]
+
+
+def sensor_frame():
+    rng = random.Random(7)
+    return {
+        "ts": 1738368000.123456,
+        "device": {"id": "dev-001", "fw": "1.2.3"},
+        "meta": {"site": "tokyo", "seq": rng.randint(0, 10**9)},
+        "series": [
+            {"name": f"s{i}", "unit": "ms", "values": [rng.uniform(-50, 50) for _ in range(50)]}
+            for i in range(4)
+        ],
+        "flags": [True, False, None],
+        "empty": {"d": {}, "l": [], "t": ()},
+    }
+
+
+@pytest.mark.parametrize("kwargs", KWARGS)
+def test_nested_document_matches_stdlib(kwargs):
+    assert_same_dumps(sensor_frame(), **kwargs)
+
+
+@pytest.mark.parametrize("kwargs", KWARGS)
+@pytest.mark.parametrize(
+    "s",
+    [
+        "",
+        "plain ascii",
+        "quote\" backslash\\ slash/",
+        "".join(chr(c) for c in range(0x00, 0x80)),
+        "latin-1: caf\u00e9 \u00ff \x7f \x80 \xa0",
+        "bmp: \u0800 \u2028 \u2029 \ufeff \uffff \u65e5\u672c",
+        "astral: \U0001f600 \U0010ffff",
+        "lone surrogates: \ud800 \udfff \udbff\udc00",
+    ],
+)
+def test_string_escaping_matches_stdlib(s, kwargs):
+    assert_same_dumps(s, **kwargs)
+    assert_same_dumps([s, s], **kwargs)
+    assert_same_dumps({s: s}, **kwargs)
+
+
+@pytest.mark.parametrize("kwargs", KWARGS)
+def test_non_str_keys_match_stdlib(kwargs):
+    obj = {1: "int", -2.5: "float", 1e20: "big", True: "t", False: "f", None: "n", 2**70: "bigint"}
+    assert_same_dumps(obj, **kwargs)
+
+
+def test_nonfinite_float_key_matches_stdlib():
+    obj = {float("nan"): 1, float("inf"): 2, float("-inf"): 3}
+    assert_same_dumps(obj)
+    assert_same_dumps(obj, allow_nan=False)
+
+
+def test_subclasses_match_stdlib():
+    class Color(enum.IntEnum):
+        RED = 1
+
+    class MyFloat(float):
+        def __repr__(self):
+            return "not used"
+
+    class MyStr(str):
+        def __str__(self):
+            return "not used"
+
+    class MyList(list):
+        pass
+
+    obj = {
+        "enum": Color.RED,
+        "float": MyFloat(1.5),
+        "str": MyStr("abc"),
+        "list": MyList([1, 2]),
+        "ordered": collections.OrderedDict([("b", 1), ("a", 2)]),
+        Color.RED: "enum key",
+    }
+    assert_same_dumps(obj)
+
+
+def test_dict_subclass_items_override_matches_stdlib():
+    class Reversed(dict):
+        def items(self):
+            return list(reversed(list(super().items())))
+
+    class BadItems(dict):
+        def items(self):
+            return [("a", 1, 2)]
+
+    assert_same_dumps(Reversed(a=1, b=2))
+    assert_same_dumps(BadItems(a=1))
+
+
+def test_sequence_subclass_iter_override_matches_stdlib():
+    class Nines(list):
+        def __iter__(self):
+            return iter([9.0, "nine"])
+
+    class Pair(tuple):
+        def __iter__(self):
+            return iter([{"k": Nines([1])}])
+
+    class Broken(list):
+        def __iter__(self):
+            raise KeyError("no items")
+
+    doc = {"list": Nines([1, 2]), "tuple": Pair((3,)), "empty": Nines(), "floats": [1.5, Nines([0.5])]}
+    for kwargs in [{}, {"indent": 2}, {"sort_keys": True, "separators": (",", ":")}]:
+        assert_same_dumps(doc, **kwargs)
+        assert fastjson.Encoder(**kwargs).encode(doc) == json.dumps(doc, **kwargs)
+        assert "".join(fastjson.iterencode(doc, chunk_size=4, **kwargs)) == json.dumps(doc, **kwargs)
+    target = bytearray(256)
+    n = fastjson.dumps_into(doc, target)
+    assert target[:n].decode() == json.dumps(doc)
+    assert_same_dumps([Broken([1])])
+
+
+@pytest.mark.parametrize("check_circular", [True, False])
+def test_shared_non_circular_references(check_circular):
+    shared = [1.0, {"x": "y"}]
+    obj = {"a": shared, "b": shared, "c": [shared, shared]}
+    assert_same_dumps(obj, check_circular=check_circular)
+
+
+def test_circular_references_match_exception():
+    d = {}
+    d["self"] = d
+    assert_same_dumps(d)
+
+    lst = [1, {"k": []}]
+    lst[1]["k"].append(lst)
+    assert_same_dumps(lst)
+
+
+def test_circular_reference_without_check_raises_recursion_error():
+    a = []
+    a.append(a)
+    with pytest.raises(RecursionError):
+        fastjson.dumps(a, check_circular=False)
+
+
+def test_unserializable_nested_value_matches_exception():
+    assert_same_dumps({"a": [1, 2, {"b": object()}]})
+    assert_same_dumps({"a": {1, 2}})
+    assert_same_dumps({(1, 2): "tuple key"})
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_allow_nan_false_nested_matches_exception(value):
+    assert_same_dumps({"a": [1, "x", value]}, allow_nan=False)
+    assert_same_dumps({"a": [1, "x", value]}, allow_nan=True)
+
+
+def test_huge_int_matches_stdlib():
+    assert_same_dumps({"n": [10**100, -(10**100), 0, -1]})
+
+
+def test_deep_nesting_matches_stdlib():
+    obj = leaf = []
+    for _ in range(200):
+        nxt = [{"k": []}]
+        leaf.append(nxt)
+        leaf = nxt[0]["k"]
+    assert_same_dumps(obj)
@@ -0,0 +1,172 @@
+"""Tests for float16 ('e') and dtype="bfloat16" in dumps_ndarray()."""
+
+import io
+import json
+import math
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+ALL_BITS = np.arange(1 << 16, dtype=np.uint16)
+
+
+def all_float16():
+    h = ALL_BITS.view(np.float16)
+    return h[np.isfinite(h)]
+
+
+def bfloat16_value(bits):
+    return float((np.asarray(bits, dtype=np.uint32) << 16).astype(np.uint32).view(np.float32))
+
+
+def round_to_bfloat16(x):
+    """float -> bfloat16 (round to nearest, ties to even), exactly."""
+    if x == 0 or not math.isfinite(x):
+        return x
+    _, e = math.frexp(abs(x))
+    unit = 2.0 ** max(e - 8, -133)
+    return math.copysign(round(abs(x) / unit) * unit, x)
+
+
+def shortest_bfloat16_repr(x):
+    """json.dumps of the shortest decimal that rounds back to x, closest first, then even."""
+    if x == 0:
+        return json.dumps(x)
+    for p in range(1, 18):
+        mantissa, exp = ("%.*e" % (p - 1, abs(x))).split("e")
+        d, q = int(mantissa.replace(".", "")), int(exp) - p + 1
+        sign = "-" if x < 0 else ""
+        candidates = [(float(f"{sign}{c}e{q}"), c) for c in (d - 1, d, d + 1)]
+        ok = [(abs(v - x), c % 2, v) for v, c in candidates if round_to_bfloat16(v) == x]
+        if ok:
+            return json.dumps(min(ok)[2])
+    raise AssertionError(x)
+
+
+class TestFloat16:
+    @pytest.mark.parametrize("chunk", [1000, None])
+    def test_every_value_is_shortest_repr(self, chunk):
+        h = all_float16()
+        # Small arrays format each element directly, large ones through a table
+        if chunk:
+            got = ",".join(
+                fastjson.dumps_ndarray(h[i : i + chunk])[1:-1] for i in range(0, len(h), chunk)
+            )
+        else:
+            got = fastjson.dumps_ndarray(h)[1:-1]
+        assert got.split(",") == [json.dumps(float(str(v))) for v in h]
+
+    def test_round_trip_and_size(self):
+        h = all_float16()
+        out = fastjson.dumps_ndarray(h)
+        back = np.array(json.loads(out), dtype=np.float64).astype(np.float16)
+        assert back.tobytes() == h.tobytes()
+        assert len(out) < len(fastjson.dumps_ndarray(h.astype(np.float32)))
+
+    def test_examples(self):
+        h = np.array([0.1, 65504, -0.0, 1e-7, 2**-14, 0.015625, 1 / 3], dtype=np.float16)
+        assert fastjson.dumps_ndarray(h) == "[0.1,65500.0,-0.0,1e-07,6.104e-05,0.01563,0.3333]"
+
+    @pytest.mark.parametrize("dtype", ["<f2", ">f2"])
+    def test_layouts(self, dtype):
+        a = (np.arange(60).reshape(3, 4, 5) / 7).astype(dtype)
+        expected = [[[float(str(v)) for v in row] for row in plane] for plane in a]
+        for view, exp in [(a, expected), (a.transpose(2, 0, 1), np.transpose(expected, (2, 0, 1)))]:
+            got = fastjson.dumps_ndarray(view, indent=1)
+            assert got == json.dumps(np.asarray(exp).tolist(), indent=1, separators=(",", ":"))
+        assert fastjson.dumps_ndarray(a[0, 0, 1]) == json.dumps(float(str(a[0, 0, 1])))
+
+    @pytest.mark.parametrize("size", [3, 10_000])
+    def test_nan_modes(self, size):
+        a = np.full(size, 1.5, dtype=">f2")
+        a[1] = np.nan
+        a[-1] = -np.inf
+        out = fastjson.dumps_ndarray(a, nan="null")
+        assert out == "[1.5,null," + "1.5," * (size - 3) + "null]"
+        assert fastjson.dumps_ndarray(a, nan="skip") == "[" + ",".join(["1.5"] * (size - 2)) + "]"
+        with pytest.raises(ValueError, match="Out of range float"):
+            fastjson.dumps_ndarray(a)
+
+    def test_precision(self):
+        a = np.array([0.1, -2.5, 65504], dtype=np.float16)
+        assert fastjson.dumps_ndarray(a, precision=3) == "[0.100,-2.500,65504.000]"
+
+
+class TestBfloat16:
+    def test_every_value_round_trips(self):
+        bits = ALL_BITS[np.isfinite((ALL_BITS.astype(np.uint32) << 16).view(np.float32))]
+        values = (bits.astype(np.uint32) << 16).view(np.float32).astype(np.float64)
+        out = fastjson.dumps_ndarray(bits, dtype="bfloat16")
+        back = json.loads(out)
+        assert all(round_to_bfloat16(b) == v for b, v in zip(back, values.tolist()))
+        assert back == values.tolist() or len(out) < len(fastjson.dumps_ndarray(values))
+
+    def test_shortest_repr(self):
+        # Every 7th bit pattern, through the direct path and through the table
+        bits = ALL_BITS[::7]
+        bits = bits[np.isfinite((bits.astype(np.uint32) << 16).view(np.float32))]
+        expected = [shortest_bfloat16_repr(bfloat16_value(b)) for b in bits]
+        assert fastjson.dumps_ndarray(bits, dtype="bfloat16")[1:-1].split(",") == expected
+        assert fastjson.dumps_ndarray(bits[:100], dtype="bfloat16")[1:-1].split(",") == expected[:100]
+
+    def test_examples(self):
+        values = [1.0, 0.1, -3.140625, 1e30, 2**-133, 3.3895313892515355e38]
+        bits = [np.float32(round_to_bfloat16(v)).view(np.uint32) >> 16 for v in values]
+        bits = np.array(bits, dtype=np.uint16)
+        assert (
+            fastjson.dumps_ndarray(bits, dtype="bfloat16")
+            == "[1.0,0.1,-3.14,1e+30,9e-41,3.39e+38]"
+        )
+
+    @pytest.mark.parametrize("dtype", ["<u2", ">u2", "<i2", ">f2"])
+    def test_any_16_bit_buffer(self, dtype):
+        bits = np.array([0x3F80, 0xBFC0, 0x7FC0, 0x0000], dtype=np.uint16)  # 1, -1.5, nan, 0
+        a = bits.astype(dtype.replace("f", "u")).view(dtype) if "f" in dtype else bits.astype(dtype)
+        assert fastjson.dumps_ndarray(a, dtype="bfloat16", nan="null") == "[1.0,-1.5,null,0.0]"
+
+    def test_layouts_and_entry_points(self):
+        values = np.linspace(-4, 4, 24, dtype=np.float32).reshape(2, 3, 4)
+        bits = (values.view(np.uint32) >> 16).astype(np.uint16).transpose(1, 0, 2)
+        expected = fastjson.dumps_ndarray(bits, dtype="bfloat16", indent=2)
+        exact = (bits.astype(np.uint32) << 16).view(np.float32).astype(np.float64)
+        loaded = np.array(json.loads(expected))
+        assert np.vectorize(round_to_bfloat16)(loaded).tolist() == exact.tolist()
+
+        target = bytearray(len(expected))
+        assert fastjson.dumps_ndarray_into(bits, target, dtype="bfloat16", indent=2) == len(target)
+        assert target == expected.encode()
+
+        fp = io.StringIO()
+        fastjson.dump_ndarray(bits, fp, dtype="bfloat16", indent=2, chunk_size=8)
+        assert fp.getvalue() == expected
+
+    def test_invalid_dtype(self):
+        with pytest.raises(ValueError, match="bfloat16"):
+            fastjson.dumps_ndarray(np.zeros(2, dtype=np.uint16), dtype="float8")
+        for a in [np.zeros(2, dtype=np.float32), np.zeros(2, dtype=bool)]:
+            with pytest.raises(TypeError, match="16-bit"):
+                fastjson.dumps_ndarray(a, dtype="bfloat16")
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_threads():
+    a = np.random.default_rng(2).standard_normal((1000, 200)).astype(np.float16)
+    expected = fastjson.dumps_ndarray(a)
+    assert fastjson.dumps_ndarray(a, threads=4) == expected
+    bits = a.view(np.uint16)
+    assert fastjson.dumps_ndarray(bits, dtype="bfloat16", threads=4) == fastjson.dumps_ndarray(
+        bits, dtype="bfloat16"
+    )
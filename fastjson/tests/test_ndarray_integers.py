@@ -0,0 +1,137 @@
+"""Tests for integer and bool dtypes in dumps_ndarray()."""
+
+import array
+import ctypes
+import io
+import json
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+INT_DTYPES = ["int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64"]
+
+
+def expected_json(a, **kwargs):
+    kwargs.setdefault("separators", (",", ":"))
+    return json.dumps(a.tolist(), **kwargs)
+
+
+def extremes(dtype):
+    info = np.iinfo(dtype)
+    values = {info.min, info.min + 1, info.max, info.max - 1, 0, 1, 9, 10, 99, 100}
+    values.update(10**k + d for k in range(20) for d in (-1, 0, 1))
+    return np.array(sorted(v for v in values if info.min <= v <= info.max), dtype=dtype)
+
+
+@pytest.mark.parametrize("dtype", INT_DTYPES)
+@pytest.mark.parametrize("order", ["<", ">"])
+def test_extremes_and_digit_boundaries(dtype, order):
+    a = extremes(dtype).astype(np.dtype(dtype).newbyteorder(order))
+    assert fastjson.dumps_ndarray(a) == expected_json(a)
+    assert fastjson.dumps_ndarray(a[::-2]) == expected_json(a[::-2])
+
+
+@pytest.mark.parametrize("dtype", INT_DTYPES)
+def test_random_values(dtype):
+    info = np.iinfo(dtype)
+    a = np.random.default_rng(0).integers(info.min, info.max, size=5000, dtype=dtype, endpoint=True)
+    assert fastjson.dumps_ndarray(a) == expected_json(a)
+
+
+@pytest.mark.parametrize("dtype", ["int16", "uint32", "bool"])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_nd_layouts(dtype, indent):
+    base = (np.arange(120).reshape(4, 5, 6) % 3).astype(dtype)
+    for a in [base, base.transpose(2, 0, 1), base[::2, ::-1, 1::2], base[0, 0], base[:0]]:
+        assert fastjson.dumps_ndarray(a, indent=indent) == expected_json(a, indent=indent)
+
+
+def test_bool():
+    a = np.array([[True, False], [False, True]])
+    assert fastjson.dumps_ndarray(a) == "[[true,false],[false,true]]"
+    assert fastjson.dumps_ndarray(a.T, separators=(", ", ":")) == json.dumps(a.T.tolist())
+    assert fastjson.dumps_ndarray(np.array(True)) == "true"
+    assert fastjson.dumps_ndarray(np.zeros(0, dtype=bool)) == "[]"
+
+
+def test_zero_dimensional():
+    assert fastjson.dumps_ndarray(np.array(-7, dtype=np.int8)) == "-7"
+    assert fastjson.dumps_ndarray(np.array(2**64 - 1, dtype=np.uint64)) == str(2**64 - 1)
+
+
+@pytest.mark.parametrize("nan", ["raise", "null", "skip"])
+def test_nan_modes_do_not_apply(nan):
+    a = np.arange(-5, 5, dtype=np.int32).reshape(2, 5)
+    assert fastjson.dumps_ndarray(a, nan=nan) == expected_json(a)
+
+
+def test_precision_does_not_apply():
+    a = np.array([1, -2, 3], dtype=np.int64)
+    assert fastjson.dumps_ndarray(a, precision=3) == "[1,-2,3]"
+
+
+@pytest.mark.parametrize(
+    "code, values",
+    [("b", [-128, 127]), ("B", [0, 255]), ("h", [-(2**15), 2**15 - 1]), ("H", [0, 2**16 - 1]),
+     ("i", [-(2**31), 2**31 - 1]), ("I", [0, 2**32 - 1]), ("l", [-5, 5]), ("L", [0, 5]),
+     ("q", [-(2**63), 2**63 - 1]), ("Q", [0, 2**64 - 1])],
+)
+def test_array_module_codes(code, values):
+    a = array.array(code, values)
+    assert fastjson.dumps_ndarray(a) == json.dumps(values, separators=(",", ":"))
+
+
+@pytest.mark.parametrize(
+    "ctype", ["c_int8", "c_uint16", "c_int32", "c_uint32", "c_int64", "c_uint64", "c_long"]
+)
+@pytest.mark.parametrize("order", ["__ctype_le__", "__ctype_be__"])
+def test_standard_size_formats(ctype, order):
+    # ctypes exports prefixed formats such as '<l', which use standard struct sizes
+    c_type = getattr(getattr(ctypes, ctype), order, getattr(ctypes, ctype))
+    values = [1, 2, 100, 127]
+    c_array = (c_type * 4)(*values)
+    assert fastjson.dumps_ndarray(c_array) == "[1,2,100,127]"
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.parametrize("dtype", ["int64", ">u2", "bool"])
+def test_large_threads_and_entry_points(dtype):
+    rng = np.random.default_rng(3)
+    a = rng.integers(0, 1000, size=(2000, 100)).astype(dtype)
+    expected = expected_json(a)
+    assert fastjson.dumps_ndarray(a, threads=4) == expected
+    assert fastjson.dumps_ndarray(a.T, threads=4) == expected_json(a.T)
+    assert fastjson.dumps_ndarray(a, output="bytes") == expected.encode()
+
+    target = bytearray(len(expected))
+    assert fastjson.dumps_ndarray_into(a, target) == len(expected)
+    assert target == expected.encode()
+
+    fp = io.StringIO()
+    fastjson.dump_ndarray(a, fp, chunk_size=1000)
+    assert fp.getvalue() == expected
+
+
+def test_not_overallocated():
+    tracemalloc = pytest.importorskip("tracemalloc")
+    a = np.arange(200_000, dtype=np.uint8).reshape(-1, 4)
+    tracemalloc.start()
+    try:
+        out = fastjson.dumps_ndarray(a)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 2.4 * len(out)
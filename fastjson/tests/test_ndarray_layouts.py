@@ -0,0 +1,176 @@
+"""Tests for dumps_ndarray() on strided, N-D and byte-swapped arrays."""
+
+import array
+import io
+import json
+import re
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+NUMBER = re.compile(r"[-+.\deinfa]+")
+
+
+def expected_json(a, **kwargs):
+    kwargs.setdefault("separators", (",", ":"))
+    return json.dumps(a.tolist(), **kwargs)
+
+
+def assert_matches_tolist(a, **kwargs):
+    """float64 matches json.dumps(a.tolist()); float32 matches structurally and by value."""
+    layout = {k: kwargs[k] for k in ("indent", "separators") if k in kwargs}
+    got = fastjson.dumps_ndarray(a, **kwargs)
+    if a.dtype.itemsize == 8:
+        assert got == expected_json(a, **layout)
+    else:
+        assert NUMBER.sub("N", got) == NUMBER.sub("N", expected_json(a.astype("f8"), **layout))
+        assert json.loads(got) == a.astype("f8").tolist()
+    return got
+
+
+def views(dtype="f8"):
+    base = (np.arange(120).reshape(4, 5, 6) / 8 - 3).astype(dtype)
+    return {
+        "step": base.ravel()[::3],
+        "reversed": base.ravel()[::-1],
+        "column": base[:, :, 2],
+        "transpose": base[0].T,
+        "fortran": np.asfortranarray(base[1]),
+        "3d_transpose": base.transpose(2, 0, 1),
+        "3d_slices": base[::2, ::-2, 1::2],
+        "broadcast": np.broadcast_to(base[0, 0], (3, 6)),
+        "4d": base.reshape(2, 2, 5, 6),
+        "5d_swapaxes": base.reshape(2, 2, 5, 3, 2).swapaxes(1, 3),
+    }
+
+
+@pytest.mark.parametrize("name", list(views()))
+@pytest.mark.parametrize("dtype", ["<f8", ">f8", "=f4", ">f4", "<f4"])
+def test_views_match_tolist(name, dtype):
+    a = views(dtype)[name]
+    assert_matches_tolist(a)
+    assert_matches_tolist(a, indent=2, separators=(", ", ": "))
+
+
+@pytest.mark.parametrize("dtype", ["<f8", ">f8", "<f4", ">f4"])
+def test_byte_order(dtype):
+    tiny = np.finfo(dtype).smallest_subnormal
+    a = np.array([0.1, -2.5, np.finfo(dtype).max, tiny, -0.0], dtype=dtype)
+    # Shortest round-trip repr of the swapped values, bit for bit
+    assert np.array(json.loads(fastjson.dumps_ndarray(a)), dtype=dtype).tobytes() == a.tobytes()
+    assert fastjson.dumps_ndarray(a) == fastjson.dumps_ndarray(a.astype(a.dtype.newbyteorder("=")))
+    assert fastjson.dumps_ndarray(a[:2], precision=3) == "[0.100,-2.500]"
+
+
+@pytest.mark.parametrize("ctype", ["c_double", "c_float"])
+@pytest.mark.parametrize("order", ["__ctype_le__", "__ctype_be__"])
+def test_ctypes_prefixed_formats(ctype, order):
+    ctypes = pytest.importorskip("ctypes")
+    values = (1.5, -0.25, 8.0)
+    c_array = (getattr(getattr(ctypes, ctype), order) * 3)(*values)
+    assert memoryview(c_array).format[0] in "<>"
+    assert json.loads(fastjson.dumps_ndarray(c_array)) == list(values)
+    assert fastjson.dumps_ndarray(c_array, precision=2) == "[1.50,-0.25,8.00]"
+    grid = ((getattr(getattr(ctypes, ctype), order) * 2) * 2)((1, 2), (3, 4))
+    assert json.loads(fastjson.dumps_ndarray(grid)) == [[1, 2], [3, 4]]
+
+
+def test_big_endian_nonfinite():
+    a = np.array([1.0, np.nan, -np.inf, 2.0], dtype=">f8")
+    assert fastjson.dumps_ndarray(a, nan="null") == "[1.0,null,null,2.0]"
+    assert fastjson.dumps_ndarray(a, nan="skip") == "[1.0,2.0]"
+    with pytest.raises(ValueError, match="Out of range float"):
+        fastjson.dumps_ndarray(a)
+
+
+@pytest.mark.parametrize("dtype", ["f8", ">f4"])
+def test_zero_dimensional(dtype):
+    a = np.array(2.5, dtype=dtype)
+    assert json.loads(fastjson.dumps_ndarray(a)) == 2.5
+    assert fastjson.dumps_ndarray(a, indent=2) == fastjson.dumps_ndarray(a)
+    assert fastjson.dumps_ndarray(a, precision=2) == "2.50"
+    assert fastjson.dumps_ndarray(np.array(np.nan, dtype=dtype), nan="null") == "null"
+    for nan in ["raise", "skip"]:
+        with pytest.raises(ValueError):
+            fastjson.dumps_ndarray(np.array(np.inf, dtype=dtype), nan=nan)
+
+
+@pytest.mark.parametrize(
+    "shape", [(0,), (0, 3), (3, 0), (2, 0, 4), (2, 3, 0), (0, 2, 3), (1, 1, 1, 1), (2, 1, 3, 1)]
+)
+@pytest.mark.parametrize("indent", [None, 1, "\t"])
+def test_empty_and_unit_dimensions(shape, indent):
+    a = np.arange(int(np.prod(shape)), dtype="f8").reshape(shape)
+    assert_matches_tolist(a, indent=indent)
+    assert_matches_tolist(a[::-1], indent=indent)
+
+
+def test_nan_skip_drops_first_axis_entries():
+    a = np.arange(24, dtype="f8").reshape(4, 3, 2)
+    a[1, 2, 0] = np.nan
+    a[3, 0, 1] = np.inf
+    expected = json.dumps(a[[0, 2]].tolist(), separators=(",", ":"))
+    assert fastjson.dumps_ndarray(a, nan="skip") == expected
+    assert fastjson.dumps_ndarray(a.transpose(0, 2, 1), nan="skip") == json.dumps(
+        a[[0, 2]].transpose(0, 2, 1).tolist(), separators=(",", ":")
+    )
+    nulls = json.loads(fastjson.dumps_ndarray(a, nan="null"))
+    assert nulls[1][2][0] is None and nulls[3][0][1] is None
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.parametrize("nan", ["raise", "null", "skip"])
+def test_large_strided_views_with_threads(nan):
+    rng = np.random.default_rng(7)
+    base = rng.standard_normal((300, 40, 20))
+    if nan != "raise":
+        base[rng.random(base.shape) < 1e-4] = np.nan
+    for a in [base[:, ::2, 1:], base.transpose(1, 0, 2), base.astype(">f8")[::-1]]:
+        expected = fastjson.dumps_ndarray(np.ascontiguousarray(a), nan=nan)
+        assert fastjson.dumps_ndarray(a, nan=nan) == expected
+        assert fastjson.dumps_ndarray(a, nan=nan, threads=4) == expected
+    assert fastjson.dumps_ndarray(base[:, ::2, 1:], nan=nan, indent=1) == fastjson.dumps_ndarray(
+        np.ascontiguousarray(base[:, ::2, 1:]), nan=nan, indent=1
+    )
+
+
+@pytest.mark.parametrize("dtype", ["f8", ">f4"])
+def test_other_entry_points(dtype):
+    a = (np.arange(60, dtype="f8").reshape(3, 4, 5) / 16).astype(dtype).transpose(2, 0, 1)
+    for kwargs in [{}, {"indent": 2}, {"precision": 1, "separators": (", ", ":")}]:
+        expected = fastjson.dumps_ndarray(a, **kwargs)
+        assert fastjson.dumps_ndarray(a, output="bytes", **kwargs) == expected.encode()
+
+        target = bytearray(len(expected) + 3)
+        n = fastjson.dumps_ndarray_into(a, target, 3, **kwargs)
+        assert target[3 : 3 + n] == expected.encode()
+
+        for fp in [io.StringIO(), io.BytesIO()]:
+            fastjson.dump_ndarray(a, fp, chunk_size=7, **kwargs)
+            assert fp.getvalue() == (expected if isinstance(fp, io.StringIO) else expected.encode())
+
+
+def test_array_module_and_memoryview_slices():
+    a = array.array("d", [0.5 * i for i in range(10)])
+    assert fastjson.dumps_ndarray(memoryview(a)[1::3]) == "[0.5,2.0,3.5]"
+    m = memoryview(a).cast("B").cast("d", (2, 5))
+    assert fastjson.dumps_ndarray(m) == json.dumps(m.tolist(), separators=(",", ":"))
+
+
+def test_readonly_source():
+    a = np.linspace(0, 1, 9).reshape(3, 3)
+    a.flags.writeable = False
+    assert fastjson.dumps_ndarray(a.T) == expected_json(a.T)
@@ -0,0 +1,190 @@
+"""Tests for dumps_ndarray(precision=, significant_digits=, negative_zero=)."""
+
+import io
+import json
+import random
+import struct
+import sys
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+
+def random_doubles(n, seed):
+    rng = random.Random(seed)
+    values = []
+    while len(values) < n:
+        r = rng.random()
+        if r < 0.3:  # any bit pattern, subnormals and huge values included
+            x = struct.unpack("d", struct.pack("Q", rng.getrandbits(64)))[0]
+        elif r < 0.6:
+            x = rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30)
+        else:  # binary fractions, many of them exact decimal ties
+            x = rng.randint(-(10**6), 10**6) / 2 ** rng.randint(0, 12) * 10 ** rng.randint(-3, 3)
+        if x == x and abs(x) != float("inf"):
+            values.append(x)
+    return values
+
+
+def repr_style(x, significant):
+    """x rounded to `significant` digits, trailing zeros stripped, in repr()'s layout."""
+    if x == 0:
+        return json.dumps(x)
+    mantissa, exp = format(x, f".{significant - 1}e").split("e")
+    sign = "-" if mantissa.startswith("-") else ""
+    digits = mantissa.lstrip("-").replace(".", "").rstrip("0") or "0"
+    exp10 = int(exp)
+    if exp10 < -4 or exp10 >= 16:
+        point = "." + digits[1:] if len(digits) > 1 else ""
+        return f"{sign}{digits[0]}{point}e{'-' if exp10 < 0 else '+'}{abs(exp10):02d}"
+    if exp10 < 0:
+        return f"{sign}0.{'0' * (-exp10 - 1)}{digits}"
+    whole = digits[: exp10 + 1].ljust(exp10 + 1, "0")
+    return f"{sign}{whole}.{digits[exp10 + 1:] or '0'}"
+
+
+VALUES = random_doubles(30_000, 1)
+
+
+@pytest.mark.parametrize("precision", [0, 1, 3, 6, 12, 17, 20])
+def test_precision_matches_printf(precision):
+    got = fastjson.dumps_ndarray(np.array(VALUES), precision=precision)
+    assert got[1:-1].split(",") == ["%.*f" % (precision, x) for x in VALUES]
+
+
+@pytest.mark.parametrize("significant", [1, 2, 3, 6, 9, 15, 16, 17])
+def test_significant_digits(significant):
+    got = fastjson.dumps_ndarray(np.array(VALUES), significant_digits=significant)[1:-1].split(",")
+    assert got == [repr_style(x, significant) for x in VALUES]
+    if significant <= 15:
+        # Up to 15 digits round-trip through a normal double, so this is
+        # also json.dumps() of the rounded float
+        for g, x in zip(got, VALUES):
+            rounded = float(format(x, f".{significant - 1}e"))
+            if sys.float_info.min <= abs(rounded) <= sys.float_info.max:
+                assert g == json.dumps(rounded)
+
+
+@pytest.mark.parametrize(
+    "x, precision, expected",
+    [
+        (0.125, 2, "0.12"),
+        (0.375, 2, "0.38"),
+        (2.5, 0, "2"),
+        (3.5, 0, "4"),
+        (0.15, 1, "0.1"),  # 0.1499999999999999944...
+        (9.9996, 3, "10.000"),
+        (1e-300, 3, "0.000"),
+        (5e-324, 20, "0.00000000000000000000"),
+        (2.0**64, 1, "18446744073709551616.0"),
+        (1.7976931348623157e308, 0, "%.0f" % 1.7976931348623157e308),
+    ],
+)
+def test_precision_rounding_edges(x, precision, expected):
+    assert fastjson.dumps_ndarray(np.array([x]), precision=precision) == f"[{expected}]"
+
+
+@pytest.mark.parametrize(
+    "x, significant, expected",
+    [
+        (123456.789, 3, "123000.0"),
+        (0.000123456, 3, "0.000123"),
+        (1.5e-9, 3, "1.5e-09"),
+        (9.9996, 4, "10.0"),
+        (99999.5, 5, "100000.0"),
+        (0.15, 1, "0.1"),
+        (2.5, 1, "2.0"),
+        (1e16, 3, "1e+16"),
+        (1234567890123456.0, 17, "1234567890123456.0"),
+        (5e-324, 17, "4.9406564584124654e-324"),
+        (0.1, 17, "0.10000000000000001"),
+        (859417161.5043201, 17, "859417161.50432014"),
+    ],
+)
+def test_significant_digits_edges(x, significant, expected):
+    got = fastjson.dumps_ndarray(np.array([x, -x]), significant_digits=significant)
+    assert got == f"[{expected},-{expected}]"
+
+
+@pytest.mark.parametrize("dtype", ["<f4", ">f4", "<f2", ">f2"])
+def test_narrow_floats_round_their_exact_value(dtype):
+    limit = float(np.finfo(dtype).max)
+    a = np.array([x for x in VALUES[:5000] if abs(x) < limit], dtype=dtype)
+    exact = a.astype("f8").tolist()
+    got = fastjson.dumps_ndarray(a, precision=4)[1:-1].split(",")
+    assert got == ["%.4f" % x for x in exact]
+    got = fastjson.dumps_ndarray(a, significant_digits=4)[1:-1].split(",")
+    assert got == [repr_style(x, 4) for x in exact]
+
+
+@pytest.mark.parametrize("dtype", ["f8", "f4", "f2"])
+def test_negative_zero(dtype):
+    a = np.array([-0.0, -0.0001, 0.0, -0.25, 0.0004], dtype=dtype)
+    shortest = json.loads(fastjson.dumps_ndarray(a))
+    assert fastjson.dumps_ndarray(a[:1]) == "[-0.0]"
+    assert fastjson.dumps_ndarray(a[:1], negative_zero="drop") == "[0.0]"
+    assert json.loads(fastjson.dumps_ndarray(a, negative_zero="drop"))[1:] == shortest[1:]
+    assert fastjson.dumps_ndarray(a, precision=1) == "[-0.0,-0.0,0.0,-0.2,0.0]"
+    assert fastjson.dumps_ndarray(a, precision=1, negative_zero="drop") == "[0.0,0.0,0.0,-0.2,0.0]"
+    assert fastjson.dumps_ndarray(a[:1], significant_digits=2) == "[-0.0]"
+    assert fastjson.dumps_ndarray(a[:1], significant_digits=2, negative_zero="keep") == "[-0.0]"
+    assert fastjson.dumps_ndarray(a[:1], significant_digits=2, negative_zero="drop") == "[0.0]"
+
+
+def test_bfloat16_and_integers():
+    bits = np.array([0x3DCD, 0x8000, 0xC049], dtype=np.uint16)  # 0.10009765625, -0.0, -3.140625
+    assert fastjson.dumps_ndarray(bits, dtype="bfloat16", precision=3) == "[0.100,-0.000,-3.141]"
+    assert (
+        fastjson.dumps_ndarray(bits, dtype="bfloat16", significant_digits=2, negative_zero="drop")
+        == "[0.1,0.0,-3.1]"
+    )
+    ints = np.array([-5, 0, 7])
+    assert fastjson.dumps_ndarray(ints, significant_digits=1, negative_zero="drop") == "[-5,0,7]"
+
+
+@pytest.mark.parametrize(
+    "kwargs, error",
+    [
+        ({"significant_digits": 0}, ValueError),
+        ({"significant_digits": 18}, ValueError),
+        ({"significant_digits": 3, "precision": 2}, ValueError),
+        ({"significant_digits": "3"}, TypeError),
+        ({"negative_zero": "strip"}, ValueError),
+        ({"negative_zero": False}, ValueError),
+    ],
+)
+def test_invalid_arguments(kwargs, error):
+    with pytest.raises(error):
+        fastjson.dumps_ndarray(np.zeros(2), **kwargs)
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.parametrize(
+    "kwargs", [{"precision": 3}, {"significant_digits": 4}, {"negative_zero": "drop"}]
+)
+def test_entry_points(kwargs):
+    a = np.random.default_rng(6).standard_normal((50_000, 3)) * 10.0 ** np.arange(-2, 1)
+    a[::7] *= -1e-6
+    expected = fastjson.dumps_ndarray(a, **kwargs)
+    assert fastjson.dumps_ndarray(a, threads=4, **kwargs) == expected
+
+    target = bytearray(len(expected))
+    assert fastjson.dumps_ndarray_into(a, target, threads=4, **kwargs) == len(target)
+    assert target == expected.encode()
+
+    fp = io.StringIO()
+    fastjson.dump_ndarray(a, fp, chunk_size=1000, **kwargs)
+    assert fp.getvalue() == expected
@@ -0,0 +1,217 @@
+"""Tests for structured (record) dtypes in dumps_ndarray() and orient=."""
+
+import io
+import json
+
+import pytest
+
+import fastjson
+
+np = pytest.importorskip("numpy")
+
+
+def oracle(x, records=True):
+    """The JSON value of a record, subarray or element, via Python objects."""
+    if isinstance(x, np.void) and x.dtype.names is not None:
+        values = [oracle(x[name], records) for name in x.dtype.names]
+        return dict(zip(x.dtype.names, values)) if records else values
+    if isinstance(x, np.ndarray):
+        return [oracle(v, records) for v in x]
+    return x.item()
+
+
+def expected(a, records=True, **kwargs):
+    kwargs.setdefault("separators", (",", ": ") if kwargs.get("indent") is not None else (",", ":"))
+    return json.dumps(oracle(a, records), **kwargs)
+
+
+def filled(dtype, shape=(5,), seed=0):
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(0, 256, size=int(np.prod(shape)) * np.dtype(dtype).itemsize, dtype=np.uint8)
+    a = raw.view(dtype).reshape(shape).copy()
+    for name in a.dtype.names:
+        field = a[name]
+        if field.dtype.kind == "f":
+            a[name] = rng.standard_normal(field.shape).astype(field.dtype)
+        elif field.dtype.kind == "b":
+            a[name] = rng.integers(0, 2, field.shape).astype(bool)
+    return a
+
+
+DTYPES = [
+    [("x", "f8"), ("y", "f8"), ("t", "u8")],
+    [("a", "i1"), ("b", ">f8"), ("c", "<i2"), ("ok", "?")],  # packed, mixed byte order
+    np.dtype([("a", "i1"), ("b", "f8"), ("c", "u2")], align=True),  # padding
+    [("pos", "f8", (3,)), ("id", ">u4")],
+    [("m", "<i4", (2, 3)), ("e", "i8", (0,))],
+    [("n", [("lo", "i2"), ("hi", ">i8")]), ("v", "f8")],
+    [("rows", [("a", "u1"), ("b", "f8")], (2,))],
+]
+
+INNER = [("a", "f8"), ("b", "u1")]  # trailing padding when aligned
+
+
+def nested(align):
+    inner = np.dtype(INNER, align=align)
+    return [
+        np.dtype([("c", "u1"), ("m", inner), ("z", "u2")], align=align),
+        np.dtype([("n", inner, (2,)), ("c", "u1"), ("m", inner, (3,)), ("z", "u2")], align=align),
+        np.dtype([("o", [("n", inner, (2,)), ("q", "u8")], (2,))], align=align),
+        np.dtype([("l", "i4"), ("n", [("q", "u8"), ("k", "u2")])], align=align),
+    ]
+
+
+@pytest.mark.parametrize("dtype", DTYPES, ids=str)
+@pytest.mark.parametrize("orient", ["records", "values"])
+def test_matches_python(dtype, orient):
+    a = filled(dtype)
+    records = orient == "records"
+    assert fastjson.dumps_ndarray(a, orient=orient) == expected(a, records)
+    if records:
+        assert fastjson.dumps_ndarray(a) == expected(a)
+
+
+@pytest.mark.parametrize("align", [False, True])
+def test_nested_alignment(align):
+    for dtype in nested(align):
+        a = np.zeros(3, dtype)
+        a.view(np.uint8)[:] = np.arange(a.nbytes) % 7
+        assert fastjson.dumps_ndarray(a) == expected(a), dtype
+        assert fastjson.dumps_ndarray(a, orient="values") == expected(a, records=False), dtype
+
+
+@pytest.mark.parametrize("dtype", DTYPES[:4], ids=str)
+def test_shapes_and_views(dtype):
+    a = filled(dtype, (4, 3, 2), seed=1)
+    for view in [a, a[::2, ::-1], a.transpose(2, 0, 1), a[1, 2, 1], a[:0]]:
+        assert fastjson.dumps_ndarray(view) == expected(view)
+        assert fastjson.dumps_ndarray(view, orient="values") == expected(view, records=False)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"indent": 2}, {"indent": "\t"}, {"separators": (", ", ": ")}, {"indent": 1, "separators": (",", "=")}],
+)
+def test_layouts(kwargs):
+    a = filled([("pos", "f8", (2,)), ("n", [("a", "i2")]), ("t", "u8")], (2, 2))
+    assert fastjson.dumps_ndarray(a, **kwargs) == expected(a, **kwargs)
+    assert fastjson.dumps_ndarray(a, orient="values", **kwargs) == expected(a, False, **kwargs)
+
+
+def test_point_cloud_float32():
+    a = filled([("x", "f4"), ("y", "f4"), ("z", "f4"), ("t", "u8")], (1000,))
+    out = json.loads(fastjson.dumps_ndarray(a))
+    assert [r["t"] for r in out] == a["t"].tolist()
+    for name in "xyz":
+        assert np.array([r[name] for r in out], dtype=np.float32).tobytes() == a[name].tobytes()
+
+
+def test_keys_escaped_like_json():
+    a = np.zeros(1, dtype=[("café", "i1"), ('q"\\', "i1"), ("\U0001f600", "i1")])
+    assert fastjson.dumps_ndarray(a) == json.dumps(oracle(a), separators=(",", ":"))
+
+
+def test_options_apply_to_float_fields():
+    a = np.zeros(2, dtype=[("x", "f8"), ("h", "f2"), ("n", "i4")])
+    a["x"] = [1 / 3, -0.0001]
+    a["h"] = [0.1, 2.5]
+    a["n"] = [7, -7]
+    assert fastjson.dumps_ndarray(a, precision=2, negative_zero="drop") == (
+        '[{"x":0.33,"h":0.10,"n":7},{"x":0.00,"h":2.50,"n":-7}]'
+    )
+    assert fastjson.dumps_ndarray(a, significant_digits=1, orient="values") == (
+        "[[0.3,0.1,7],[-0.0001,2.0,-7]]"
+    )
+
+
+class TestNan:
+    def make(self):
+        a = np.zeros(4, dtype=[("x", "f8"), ("v", "f4", (2,)), ("t", "u2")])
+        a["x"] = [1.0, np.nan, 2.0, 3.0]
+        a["v"][3, 1] = np.inf
+        a["t"] = [1, 2, 3, 4]
+        return a
+
+    def test_modes(self):
+        a = self.make()
+        with pytest.raises(ValueError, match="Out of range float"):
+            fastjson.dumps_ndarray(a)
+        assert fastjson.dumps_ndarray(a, nan="null", orient="values") == (
+            "[[1.0,[0.0,0.0],1],[null,[0.0,0.0],2],[2.0,[0.0,0.0],3],[3.0,[0.0,null],4]]"
+        )
+        assert fastjson.dumps_ndarray(a, nan="skip", orient="values") == (
+            "[[1.0,[0.0,0.0],1],[2.0,[0.0,0.0],3]]"
+        )
+        assert fastjson.dumps_ndarray(a.reshape(2, 2), nan="skip", orient="values") == "[]"
+
+    def test_scalar_record(self):
+        a = self.make()
+        with pytest.raises(ValueError, match="Out of range float"):
+            fastjson.dumps_ndarray(a[1], nan="skip")
+        assert fastjson.dumps_ndarray(a[0], nan="skip") == '{"x":1.0,"v":[0.0,0.0],"t":1}'
+
+
+class TestErrors:
+    def test_invalid_orient(self):
+        a = np.zeros(2, dtype=[("x", "f8")])
+        with pytest.raises(ValueError, match="orient must be 'records' or 'values'"):
+            fastjson.dumps_ndarray(a, orient="columns")
+        with pytest.raises(ValueError, match="needs a structured dtype"):
+            fastjson.dumps_ndarray(np.zeros(2), orient="records")
+        assert fastjson.dumps_ndarray(np.zeros(2), orient="values") == "[0.0,0.0]"
+
+    @pytest.mark.parametrize("field", ["S3", "U2", "c16", "M8[s]", "O"])
+    def test_unsupported_fields(self, field):
+        a = np.zeros(2, dtype=[("x", "f8"), ("y", field)])
+        with pytest.raises((TypeError, ValueError)):
+            fastjson.dumps_ndarray(a)
+
+    def test_ambiguous_stride(self):
+        # numpy's format is the same whether the last field's structs are 9 or 16 bytes apart
+        inner = np.dtype(INNER, align=True)
+        a = np.zeros(2, np.dtype([("o", [("q", "u8"), ("n", inner, (2,))], (1,))], align=True))
+        with pytest.raises(TypeError, match="structured dtypes"):
+            fastjson.dumps_ndarray(a)
+
+    def test_bfloat16(self):
+        with pytest.raises(TypeError, match="16-bit"):
+            fastjson.dumps_ndarray(np.zeros(2, dtype=[("b", "u2")]), dtype="bfloat16")
+
+
+class TestEntryPoints:
+    def test_into_and_stream(self):
+        a = filled([("x", "f8"), ("n", [("a", "i2")]), ("m", "u1", (2,))], (50,))
+        text = fastjson.dumps_ndarray(a, indent=2)
+        target = bytearray(len(text) + 4)
+        assert fastjson.dumps_ndarray_into(a, target, 4, indent=2) == len(text)
+        assert target[4:] == text.encode()
+
+        fp = io.StringIO()
+        fastjson.dump_ndarray(a, fp, indent=2, chunk_size=16)
+        assert fp.getvalue() == text
+
+    def test_dumps_native_arrays(self):
+        a = filled([("x", "f8"), ("t", "u8")], (3,))
+        doc = {"frame": a, "id": 1}
+        # Rows, like json.dumps(a.tolist()) in the fallback
+        assert fastjson.dumps(doc, native_arrays=True, indent=1) == json.dumps(
+            {"frame": oracle(a, records=False), "id": 1}, indent=1
+        )
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_threads():
+    a = filled([("x", "f8"), ("y", "f4"), ("t", "u8"), ("ok", "?")], (200_000,))
+    serial = fastjson.dumps_ndarray(a)
+    assert fastjson.dumps_ndarray(a, threads=4) == serial
+    assert json.loads(serial)[:3] == json.loads(fastjson.dumps_ndarray(a[:3]))
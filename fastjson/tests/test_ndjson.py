@@ -0,0 +1,236 @@
+"""Tests for JSON Lines output: dumps_ndjson(), lines=True and dump_ndjson()."""
+
+import decimal
+import io
+import json
+
+import pytest
+
+import fastjson
+
+
+def expected_lines(records, **kwargs):
+    return "".join(json.dumps(r, **kwargs) + "\n" for r in records)
+
+
+RECORDS = [
+    {"id": 1, "x": 1.5, "tags": ["a", "b"], "ok": True, "none": None},
+    {"id": 2, "x": -0.0, "nested": {"k": [1, 2.5e-300, 1e300]}},
+    "café \U0001f600",
+    [],
+    3,
+    {1: "int key", 2.5: "float key", -3: None},
+]
+
+
+class TestDumpNdjson:
+    def test_matches_json_dumps(self):
+        fp = io.StringIO()
+        fastjson.dump_ndjson(RECORDS, fp)
+        assert fp.getvalue() == expected_lines(RECORDS)
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"ensure_ascii": False},
+            {"separators": (",", ":")},
+            {"sort_keys": True, "separators": (", ", "=")},
+            {"allow_nan": True},
+        ],
+    )
+    def test_options(self, kwargs):
+        records = RECORDS + [{"b": float("inf"), "a": float("nan")}]
+        fp = io.StringIO()
+        fastjson.dump_ndjson(records, fp, **kwargs)
+        assert fp.getvalue() == expected_lines(records, **kwargs)
+
+    def test_generator_and_small_chunks(self):
+        records = [{"i": i, "s": "é" * (i % 5)} for i in range(1000)]
+        for chunk_size in [1, 7, 65536]:
+            fp = io.StringIO()
+            fastjson.dump_ndjson((r for r in records), fp, chunk_size=chunk_size, ensure_ascii=False)
+            assert fp.getvalue() == expected_lines(records, ensure_ascii=False)
+
+    def test_batches_whole_lines(self):
+        calls = []
+
+        class Writer:
+            def write(self, s):
+                calls.append(s)
+
+        records = [{"i": i} for i in range(10_000)]
+        fastjson.dump_ndjson(records, Writer(), chunk_size=4096)
+        assert "".join(calls) == expected_lines(records)
+        assert len(calls) < 100
+        assert all(chunk.endswith("\n") for chunk in calls)
+
+    def test_fallback_records(self):
+        records = [1, decimal.Decimal("1.5"), {"d": decimal.Decimal("2")}, 4]
+        fp = io.StringIO()
+        fastjson.dump_ndjson(records, fp, default=str)
+        assert fp.getvalue() == expected_lines(records, default=str)
+
+        class Encoder(json.JSONEncoder):
+            def default(self, o):
+                return [str(o)]
+
+        fp = io.StringIO()
+        fastjson.dump_ndjson(records, fp, cls=Encoder, ensure_ascii=False, skipkeys=True)
+        assert fp.getvalue() == expected_lines(records, cls=Encoder, skipkeys=True)
+
+    @pytest.mark.parametrize(
+        "bad, exc",
+        [
+            (decimal.Decimal("1"), TypeError),
+            ({3j: 1}, TypeError),
+            ({"x": float("nan")}, ValueError),
+        ],
+    )
+    def test_error_keeps_preceding_lines(self, bad, exc):
+        records = [{"i": i} for i in range(3)] + [bad, {"i": 4}]
+        fp = io.StringIO()
+        with pytest.raises(exc) as info:
+            fastjson.dump_ndjson(records, fp, allow_nan=False, chunk_size=10**6)
+        with pytest.raises(exc) as stdlib:
+            json.dumps(bad, allow_nan=False)
+        assert str(info.value) == str(stdlib.value)
+        assert fp.getvalue() == expected_lines(records[:3])
+
+    def test_iterator_error(self):
+        def records():
+            yield {"a": 1}
+            raise KeyError("boom")
+
+        fp = io.StringIO()
+        with pytest.raises(KeyError, match="boom"):
+            fastjson.dump_ndjson(records(), fp)
+        assert fp.getvalue() == '{"a": 1}\n'
+
+    def test_circular(self):
+        loop = []
+        loop.append(loop)
+        fp = io.StringIO()
+        with pytest.raises(ValueError, match="Circular reference detected"):
+            fastjson.dump_ndjson([1, loop], fp)
+        assert fp.getvalue() == "1\n"
+
+    def test_empty(self):
+        fp = io.StringIO()
+        fastjson.dump_ndjson([], fp)
+        assert fp.getvalue() == ""
+
+    def test_binary_stream(self):
+        fp = io.BytesIO()
+        fastjson.dump_ndjson(RECORDS, fp, ensure_ascii=False)
+        assert fp.getvalue() == expected_lines(RECORDS, ensure_ascii=False).encode()
+
+    @pytest.mark.parametrize("kwargs", [{}, {"default": str}])
+    def test_binary_stream_lone_surrogate(self, kwargs):
+        records = [{"ok": 1}, {"a": "\ud800"}]
+        with pytest.raises(UnicodeEncodeError) as info:
+            fastjson.dumps_bytes(records[1], ensure_ascii=False, **kwargs)
+        fp = io.BytesIO()
+        with pytest.raises(UnicodeEncodeError) as dumped:
+            fastjson.dump_ndjson(records, fp, ensure_ascii=False, **kwargs)
+        assert str(dumped.value) == str(info.value)
+        assert fp.getvalue() == b'{"ok": 1}\n'
+        text = io.StringIO()
+        fastjson.dump_ndjson(records, text, ensure_ascii=False, **kwargs)
+        assert text.getvalue() == expected_lines(records, ensure_ascii=False)
+
+    @pytest.mark.parametrize("mode", ["w", "wb"])
+    def test_real_file(self, tmp_path, mode):
+        path = tmp_path / "out.jsonl"
+        kwargs = {"encoding": "utf-8"} if mode == "w" else {}
+        with open(path, mode, **kwargs) as fp:
+            fp.write("# header\n" if mode == "w" else b"# header\n")
+            fastjson.dump_ndjson(RECORDS, fp, chunk_size=16)
+            fp.write("# footer\n" if mode == "w" else b"# footer\n")
+        assert path.read_text("utf-8") == "# header\n" + expected_lines(RECORDS) + "# footer\n"
+
+    @pytest.mark.parametrize("newline", ["\r\n", "\r", None])
+    def test_newline_translation(self, tmp_path, newline):
+        paths = tmp_path / "dump.jsonl", tmp_path / "write.jsonl"
+        with open(paths[0], "w", newline=newline) as fp:
+            fastjson.dump_ndjson(RECORDS, fp)
+        with open(paths[1], "w", newline=newline) as fp:
+            fp.write(expected_lines(RECORDS))
+        assert paths[0].read_bytes() == paths[1].read_bytes()
+
+
+def expected_rows(a, **kwargs):
+    kwargs.setdefault("separators", (",", ":"))
+    return expected_lines(a.tolist(), **kwargs)
+
+
+class TestArrayLines:
+    def test_rows(self):
+        np = pytest.importorskip("numpy")
+        a = np.random.default_rng(22).standard_normal((50, 3))
+        for view in [a, a[::-1, ::2], np.asfortranarray(a), a.astype(">f8")]:
+            assert fastjson.dumps_ndjson(view) == expected_rows(view)
+            assert fastjson.dumps_ndarray(view, lines=True) == expected_rows(view)
+
+    def test_shapes(self):
+        np = pytest.importorskip("numpy")
+        assert fastjson.dumps_ndjson(np.arange(3)) == "0\n1\n2\n"
+        assert fastjson.dumps_ndjson(np.arange(8).reshape(2, 2, 2)) == "[[0,1],[2,3]]\n[[4,5],[6,7]]\n"
+        assert fastjson.dumps_ndjson(np.zeros((0, 3))) == ""
+        assert fastjson.dumps_ndjson(np.float64(2.0)) == "2.0\n"
+
+    def test_options(self):
+        np = pytest.importorskip("numpy")
+        a = np.array([[1 / 3, np.nan], [-0.0001, 2.0], [np.inf, 1.0]])
+        assert fastjson.dumps_ndjson(a, nan="skip", precision=2, negative_zero="drop") == "[0.00,2.00]\n"
+        assert fastjson.dumps_ndjson(a, nan="null", separators=(", ", ": ")) == (
+            "[0.3333333333333333, null]\n[-0.0001, 2.0]\n[null, 1.0]\n"
+        )
+        with pytest.raises(ValueError, match="Out of range float"):
+            fastjson.dumps_ndjson(a)
+        assert fastjson.dumps_ndjson(a[1:2], output="bytes") == b"[-0.0001,2.0]\n"
+
+    def test_records(self):
+        np = pytest.importorskip("numpy")
+        a = np.zeros(3, dtype=[("x", "f8"), ("t", "u8")])
+        a["x"] = [0.5, 1.5, 2.5]
+        a["t"] = [1, 2, 3]
+        assert fastjson.dumps_ndjson(a) == '{"x":0.5,"t":1}\n{"x":1.5,"t":2}\n{"x":2.5,"t":3}\n'
+        assert fastjson.dumps_ndjson(a, orient="values") == "[0.5,1]\n[1.5,2]\n[2.5,3]\n"
+
+    def test_indent_rejected(self):
+        np = pytest.importorskip("numpy")
+        with pytest.raises(ValueError, match="indent cannot be used with lines=True"):
+            fastjson.dumps_ndarray(np.zeros((2, 2)), indent=2, lines=True)
+
+    def test_threads(self):
+        np = pytest.importorskip("numpy")
+        previous = fastjson.configure_parallel()
+        fastjson.configure_parallel(workers=4)
+        try:
+            a = np.random.default_rng(3).standard_normal((100_000, 3))
+            assert fastjson.dumps_ndjson(a, threads=4) == fastjson.dumps_ndjson(a)
+        finally:
+            fastjson.configure_parallel(**previous)
+
+    @pytest.mark.parametrize("target", ["text", "bytes", "file"])
+    def test_dump_ndarray_lines(self, tmp_path, target):
+        np = pytest.importorskip("numpy")
+        a = np.arange(600, dtype=np.int32).reshape(200, 3) - 300
+        text = expected_rows(a)
+        if target == "file":
+            path = tmp_path / "a.jsonl"
+            with open(path, "w") as fp:
+                fastjson.dump_ndarray(a, fp, lines=True, chunk_size=64)
+            assert path.read_text() == text
+            return
+        fp = io.StringIO() if target == "text" else io.BytesIO()
+        fastjson.dump_ndarray(a, fp, lines=True, chunk_size=64)
+        assert fp.getvalue() == (text if target == "text" else text.encode())
+
+    def test_dump_ndarray_lines_newline_translation(self, tmp_path):
+        np = pytest.importorskip("numpy")
+        a = np.arange(6.0).reshape(3, 2)
+        path = tmp_path / "a.jsonl"
+        with open(path, "w", newline="\r\n") as fp:
+            fastjson.dump_ndarray(a, fp, lines=True)
+        assert path.read_bytes() == expected_rows(a).replace("\n", "\r\n").encode()
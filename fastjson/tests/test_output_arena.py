@@ -0,0 +1,144 @@
+"""Tests for output-size estimation and the per-thread output arena (set_arena_limit)."""
+
+import json
+import random
+import threading
+import tracemalloc
+
+import pytest
+
+import fastjson
+
+
+@pytest.fixture
+def arena():
+    previous = fastjson.set_arena_limit(1 << 20)
+    try:
+        yield
+    finally:
+        fastjson.set_arena_limit(previous)
+
+
+def documents():
+    rng = random.Random(3)
+    return [
+        [rng.random() for _ in range(5000)],
+        [rng.randrange(-(10**15), 10**15) for _ in range(5000)],
+        [1.0, 2.0],
+        {"frame": {"values": [rng.uniform(-1, 1) for _ in range(300)], "label": "café"}},
+        ["x" * 100_000],
+        [],
+    ]
+
+
+def test_set_arena_limit_returns_previous():
+    previous = fastjson.set_arena_limit(4096)
+    try:
+        assert fastjson.set_arena_limit(8192) == 4096
+        assert fastjson.set_arena_limit(0) == 8192
+    finally:
+        fastjson.set_arena_limit(previous)
+
+
+def test_set_arena_limit_rejects_negative():
+    with pytest.raises(ValueError):
+        fastjson.set_arena_limit(-1)
+    with pytest.raises(TypeError):
+        fastjson.set_arena_limit("1")
+
+
+@pytest.mark.usefixtures("arena")
+@pytest.mark.parametrize("output", ["str", "bytes", "buffer"])
+def test_arena_output_matches_stdlib(output):
+    for _ in range(3):
+        for obj in documents():
+            expected = json.dumps(obj)
+            got = fastjson.dumps_bytes(obj, output=output) if output != "str" else fastjson.dumps(obj)
+            assert (bytes(got) if output != "str" else got) == (
+                expected.encode() if output != "str" else expected
+            )
+
+
+@pytest.mark.usefixtures("arena")
+def test_arena_reentrant_dumps():
+    class Nested(dict):
+        def items(self):
+            # Runs while the outer call holds the thread's arena block
+            inner = fastjson.dumps([float(i) for i in range(1000)])
+            return [("inner", len(inner))] + list(super().items())
+
+    obj = [Nested(a=1.5), Nested(b=[2.5] * 100)]
+    assert fastjson.dumps(obj) == json.dumps(obj)
+
+
+@pytest.mark.usefixtures("arena")
+def test_arena_is_per_thread():
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(50):
+                obj = [rng.random() for _ in range(rng.randrange(1, 2000))]
+                assert fastjson.dumps(obj) == json.dumps(obj)
+        except AssertionError as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+
+
+def test_output_buffer_is_traced_and_not_overallocated():
+    obj = [random.Random(5).random() * i for i in range(200_000)]
+    tracemalloc.start()
+    try:
+        out = fastjson.dumps(obj)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The native output buffer plus the returned str, with a small estimate headroom
+    assert 1.9 * len(out) < peak < 2.4 * len(out)
+
+
+def test_int_sequence_not_overallocated():
+    obj = list(range(200_000))
+    tracemalloc.start()
+    try:
+        out = fastjson.dumps(obj)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 2.4 * len(out)
+
+
+class TestNdarrayEstimate:
+    np = pytest.importorskip("numpy")
+
+    @pytest.mark.parametrize("dtype", ["float32", "float64"])
+    @pytest.mark.parametrize("kwargs", [{}, {"precision": 2}])
+    def test_not_overallocated(self, dtype, kwargs):
+        a = self.np.random.default_rng(0).standard_normal((500, 100)).astype(dtype)
+        tracemalloc.start()
+        try:
+            out = fastjson.dumps_ndarray(a, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < 2.4 * len(out)
+
+    @pytest.mark.usefixtures("arena")
+    @pytest.mark.parametrize("nan", ["raise", "null", "skip"])
+    def test_arena_output_unchanged(self, nan):
+        rng = self.np.random.default_rng(1)
+        for shape in [(10,), (5000,), (300, 3)]:
+            a = rng.standard_normal(shape)
+            if nan != "raise":
+                a[::7] = self.np.nan
+            expected = fastjson.dumps_ndarray(a, nan=nan, output="bytes")
+            for _ in range(2):
+                assert fastjson.dumps_ndarray(a, nan=nan) == expected.decode()
+                assert fastjson.dumps_ndarray(a, nan=nan, output="bytes") == expected
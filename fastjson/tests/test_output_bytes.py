@@ -0,0 +1,108 @@
+"""Tests for bytes / buffer-protocol output (dumps_bytes, output=)."""
+
+import array
+import json
+import socket
+
+import pytest
+
+import fastjson
+
+OBJECTS = [
+    None,
+    "café \U0001f600",
+    [1.0, 2.5, -0.0],
+    [1, 2, 3],
+    {"a": [1.0, None, True], "b": {"c": "d "}},
+]
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"ensure_ascii": False},
+        {"separators": (",", ":")},
+        {"indent": 2, "sort_keys": True},
+        {"separators": (";", "="), "ensure_ascii": False},  # arbitrary separators
+    ],
+)
+def test_dumps_bytes_matches_encoded_stdlib(obj, kwargs):
+    expected = json.dumps(obj, **kwargs).encode()
+    got = fastjson.dumps_bytes(obj, **kwargs)
+    assert type(got) is bytes
+    assert got == expected
+
+    buf = fastjson.dumps_bytes(obj, output="buffer", **kwargs)
+    assert isinstance(buf, fastjson.JSONBuffer)
+    assert bytes(buf) == expected
+    assert len(buf) == len(expected)
+
+
+def test_lone_surrogate_matches_encode_exception():
+    obj = ["x", "\ud800"]
+    with pytest.raises(UnicodeEncodeError) as e_fast:
+        fastjson.dumps_bytes(obj, ensure_ascii=False)
+    with pytest.raises(UnicodeEncodeError) as e_std:
+        json.dumps(obj, ensure_ascii=False).encode()
+    assert str(e_fast.value) == str(e_std.value)
+
+    # Escaped with ensure_ascii=True, so encodable
+    assert fastjson.dumps_bytes(obj) == json.dumps(obj).encode()
+
+
+def test_errors_match_stdlib():
+    with pytest.raises(TypeError) as e_fast:
+        fastjson.dumps_bytes({"a": object()})
+    with pytest.raises(TypeError) as e_std:
+        json.dumps({"a": object()})
+    assert str(e_fast.value) == str(e_std.value)
+
+
+def test_buffer_protocol():
+    buf = fastjson.dumps_bytes({"k": [1.0, 2.0]}, output="buffer")
+    view = memoryview(buf)
+    assert view.readonly
+    assert view.format == "B"
+    assert view.tobytes() == b'{"k": [1.0, 2.0]}'
+    assert buf.decode() == '{"k": [1.0, 2.0]}'
+    del view
+    with pytest.raises(TypeError):
+        memoryview(buf)[0] = 0  # type: ignore[index]
+
+
+def test_buffer_can_be_sent_over_socket():
+    payload = fastjson.dumps_bytes([float(i) for i in range(10000)], output="buffer")
+    a, b = socket.socketpair()
+    try:
+        a.sendall(payload)
+        a.shutdown(socket.SHUT_WR)
+        received = b"".join(iter(lambda: b.recv(65536), b""))
+    finally:
+        a.close()
+        b.close()
+    assert received == bytes(payload)
+
+
+def test_json_buffer_constructor_copies():
+    src = bytearray(b"[1,2]")
+    buf = fastjson.JSONBuffer(src)
+    src[0:1] = b"x"
+    assert bytes(buf) == b"[1,2]"
+
+
+def test_invalid_output_raises():
+    with pytest.raises(ValueError, match="output"):
+        fastjson.dumps_bytes([1.0], output="str")
+    with pytest.raises(ValueError, match="output"):
+        fastjson.dumps_ndarray(array.array("d", [1.0]), output="text")
+
+
+@pytest.mark.parametrize("typecode", ["f", "d"])
+def test_dumps_ndarray_output_modes(typecode):
+    a = array.array(typecode, [1.0, 2.5, 3.0])
+    s = fastjson.dumps_ndarray(a)
+    assert fastjson.dumps_ndarray(a, output="str") == s
+    assert fastjson.dumps_ndarray(a, output="bytes") == s.encode()
+    assert bytes(fastjson.dumps_ndarray(a, output="buffer")) == s.encode()
@@ -0,0 +1,157 @@
+"""Tests for parallel list[float] encoding (configure_parallel)."""
+
+import json
+import os
+import random
+import sys
+import threading
+
+import pytest
+
+import fastjson
+
+
+@pytest.fixture
+def parallel():
+    previous = fastjson.configure_parallel()
+    fastjson.configure_parallel(workers=4, min_size=0)
+    try:
+        yield
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+def floats(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.uniform(-1e6, 1e6) * 10 ** rng.randrange(-30, 30) for _ in range(n)]
+
+
+def test_configure_parallel_defaults_and_query():
+    settings = fastjson.configure_parallel()
+    assert set(settings) == {"workers", "min_size"}
+    assert settings["workers"] >= 1 and settings["min_size"] >= 0
+
+
+@pytest.mark.parametrize("kwargs", [{"workers": 0}, {"workers": 10_000}, {"min_size": -1}])
+def test_configure_parallel_rejects_bad_values(kwargs):
+    previous = fastjson.configure_parallel()
+    with pytest.raises(ValueError):
+        fastjson.configure_parallel(**kwargs)
+    assert fastjson.configure_parallel() == previous
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.parametrize("n", [0, 1, 16383, 16384, 32768, 100_001])
+@pytest.mark.parametrize("kwargs", [{}, {"separators": (",", ":")}])
+def test_output_identical_to_stdlib(n, kwargs):
+    obj = floats(n)
+    assert fastjson.dumps(obj, **kwargs) == json.dumps(obj, **kwargs)
+    assert fastjson.dumps(tuple(obj), **kwargs) == json.dumps(tuple(obj), **kwargs)
+    assert fastjson.dumps_bytes(obj, **kwargs) == json.dumps(obj, **kwargs).encode()
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3, 8])
+def test_output_identical_across_worker_counts(workers):
+    obj = floats(70_000, seed=workers)
+    previous = fastjson.configure_parallel(workers=workers, min_size=0)
+    try:
+        assert fastjson.dumps(obj) == json.dumps(obj)
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_special_values():
+    obj = [0.0, -0.0, 5e-324, 1.7976931348623157e308, 1e16, 1e-7, 0.1] * 10_000
+    obj[12_345] = float("nan")
+    obj[40_000] = float("-inf")
+    obj[-1] = float("inf")
+    assert fastjson.dumps(obj) == json.dumps(obj)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_allow_nan_false_matches_stdlib():
+    obj = [1.5] * 50_000 + [float("nan")]
+    with pytest.raises(ValueError) as e_std:
+        json.dumps(obj, allow_nan=False)
+    with pytest.raises(ValueError) as e_fast:
+        fastjson.dumps(obj, allow_nan=False)
+    assert str(e_fast.value) == str(e_std.value)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_float_subclasses_and_nested():
+    class MyFloat(float):
+        pass
+
+    obj = {"a": floats(40_000), "b": [MyFloat(0.5)] + floats(40_000, seed=1)}
+    assert fastjson.dumps(obj) == json.dumps(obj)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_dumps_into_and_dump(tmp_path):
+    obj = floats(50_000)
+    expected = json.dumps(obj, separators=(",", ":")).encode()
+    target = bytearray(len(expected))
+    assert fastjson.dumps_into(obj, target, separators=(",", ":")) == len(expected)
+    assert target == expected
+
+    path = tmp_path / "out.json"
+    with open(path, "w") as f:
+        fastjson.dump(obj, f, separators=(",", ":"))
+    assert path.read_bytes() == expected
+
+
+def test_min_size_threshold():
+    obj = floats(40_000)
+    previous = fastjson.configure_parallel(workers=2, min_size=len(obj) + 1)
+    try:
+        assert fastjson.dumps(obj) == json.dumps(obj)
+        fastjson.configure_parallel(min_size=len(obj))
+        assert fastjson.dumps(obj) == json.dumps(obj)
+    finally:
+        fastjson.configure_parallel(**previous)
+
+
+@pytest.mark.usefixtures("parallel")
+def test_concurrent_callers_share_pool():
+    errors = []
+
+    def worker(seed):
+        obj = floats(40_000, seed=seed)
+        try:
+            for _ in range(3):
+                assert fastjson.dumps(obj) == json.dumps(obj)
+        except AssertionError as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+
+
+@pytest.mark.usefixtures("parallel")
+@pytest.mark.skipif(not hasattr(os, "fork") or sys.platform == "darwin", reason="needs fork")
+def test_pool_after_fork():
+    obj = floats(40_000)
+    expected = json.dumps(obj)
+    assert fastjson.dumps(obj) == expected
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - child
+        os._exit(0 if fastjson.dumps(obj) == expected else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+class TestNdarrayPool:
+    np = pytest.importorskip("numpy")
+
+    @pytest.mark.usefixtures("parallel")
+    def test_threads_use_pool(self):
+        a = self.np.random.default_rng(0).standard_normal((400, 300))
+        expected = fastjson.dumps_ndarray(a)
+        assert fastjson.dumps_ndarray(a, threads=4) == expected
+        assert fastjson.dumps_ndarray(a, threads=8) == expected
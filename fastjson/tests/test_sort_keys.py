@@ -0,0 +1,168 @@
+"""Tests for native sort_keys=True (code point order, cached key orders)."""
+
+import collections
+import io
+import json
+import random
+
+import pytest
+
+import fastjson
+
+
+def assert_same_dumps(obj, **kwargs):
+    try:
+        got = fastjson.dumps(obj, sort_keys=True, **kwargs)
+    except Exception as e_fast:  # noqa: BLE001 - we want exact parity with stdlib
+        with pytest.raises(type(e_fast)) as e_std:
+            json.dumps(obj, sort_keys=True, **kwargs)
+        assert str(e_fast) == str(e_std.value)
+    else:
+        assert got == json.dumps(obj, sort_keys=True, **kwargs)
+
+
+KWARGS = [{}, {"indent": 2}, {"separators": (",", ":"), "ensure_ascii": False}]
+
+KEYS = [
+    "",
+    "a",
+    "ab",
+    "a\x00",
+    "B",
+    "b",
+    "é",
+    "z" * 40,
+    "Ā",
+    "ÿ",
+    "日本",
+    "日",
+    "￿",
+    "\U0001f600",
+    "\U00010000",
+    "\ud800",
+]
+
+
+@pytest.mark.parametrize("kwargs", KWARGS)
+def test_code_point_order(kwargs):
+    rng = random.Random(1)
+    for _ in range(20):
+        keys = KEYS[:]
+        rng.shuffle(keys)
+        assert_same_dumps({k: i for i, k in enumerate(keys)}, **kwargs)
+
+
+@pytest.mark.parametrize("kwargs", KWARGS)
+def test_records_with_same_keys(kwargs):
+    rng = random.Random(2)
+    fields = ["ts", "id", "value", "unit", "tags", "ok"]
+    records = []
+    for i in range(200):
+        order = fields[:]
+        rng.shuffle(order)  # same key set, different insertion order
+        records.append({k: [i, k] if k == "tags" else i * 0.5 for k in order})
+    assert_same_dumps({"records": records, "count": len(records)}, **kwargs)
+
+
+def test_cached_orders_do_not_leak_between_key_sets():
+    rng = random.Random(3)
+    records = []
+    for i in range(500):
+        # Many key sets of the same size, more than the cache holds
+        keys = rng.sample("abcdefghijklmnop", 4)
+        records.append({k: i for k in keys})
+    assert_same_dumps(records)
+    assert_same_dumps([{"a": 1, "b": 2}, {"a": 1, "c": 2}, {"a": 1, "b": 2, "c": 3}, {"b": 1}])
+
+
+def test_equal_keys_that_are_different_objects():
+    a = {"".join(["k", str(i)]): i for i in range(10)}
+    b = {"".join(["k", str(i)]): -i for i in reversed(range(10))}
+    assert_same_dumps([a, b, a])
+
+
+def test_non_str_keys_match_stdlib():
+    assert_same_dumps({3: "c", 1: "a", 2: "b"})
+    assert_same_dumps({2.5: 1, -1.0: 2, 1e20: 3})
+    assert_same_dumps({None: 1})
+    assert_same_dumps({True: 1, False: 0})
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"a": 1, 2: "b"},
+        {None: 1, "a": 2},
+        {(1, 2): 3, (0, 1): 4},
+        [{"a": 1}, {1: 2, "b": 3}],
+    ],
+)
+def test_unorderable_keys_raise_like_stdlib(obj):
+    assert_same_dumps(obj)
+
+
+def test_str_subclass_keys_use_their_ordering():
+    class Reverse(str):
+        def __lt__(self, other):
+            return str.__gt__(self, other)
+
+    obj = {Reverse("a"): 1, Reverse("c"): 2, Reverse("b"): 3}
+    assert_same_dumps(obj)
+
+
+def test_dict_subclasses():
+    class Reversed(dict):
+        def items(self):
+            return list(reversed(list(super().items())))
+
+    assert_same_dumps(Reversed(b=1, a=2, c=3))
+    assert_same_dumps(collections.OrderedDict([("b", 1), ("a", 2)]))
+    assert_same_dumps({"x": collections.Counter("hello")})
+
+
+def test_nested_and_empty():
+    obj = {"z": {}, "a": {"y": [], "b": {"d": 1, "c": [{"f": 1, "e": 2}]}}}
+    for kwargs in KWARGS:
+        assert_same_dumps(obj, **kwargs)
+
+
+def test_errors_match_stdlib():
+    assert_same_dumps({"b": 1, "a": object()})
+    assert_same_dumps({"b": 1.0, "a": float("nan")}, allow_nan=False)
+    d = {"b": 1}
+    d["a"] = d
+    assert_same_dumps(d)
+
+
+def test_sort_keys_must_be_bool_for_native_path():
+    obj = {"b": 1, "a": 2}
+    assert fastjson.dumps(obj, sort_keys=1) == json.dumps(obj, sort_keys=1)
+    assert fastjson.dumps(obj, sort_keys=0) == json.dumps(obj, sort_keys=0)
+
+
+@pytest.mark.parametrize("kwargs", KWARGS)
+def test_other_entry_points(kwargs):
+    obj = [{"b": i, "a": {"d": [1.5], "c": None}} for i in range(50)]
+    expected = json.dumps(obj, sort_keys=True, **kwargs)
+    assert fastjson.dumps_bytes(obj, sort_keys=True, **kwargs) == expected.encode()
+    assert fastjson.Encoder(sort_keys=True, **kwargs).encode(obj) == expected
+
+    target = bytearray(len(expected.encode()))
+    assert fastjson.dumps_into(obj, target, sort_keys=True, **kwargs) == len(target)
+    assert target == expected.encode()
+
+    fp = io.StringIO()
+    fastjson.dump(obj, fp, sort_keys=True, chunk_size=16, **kwargs)
+    assert fp.getvalue() == expected
+
+
+def test_dump_falls_back_mid_stream():
+    obj = {"b": [1.0] * 100, "a": {"z": 1, 3: 2}}
+    fp = io.StringIO()
+    with pytest.raises(TypeError) as e_fast:
+        fastjson.dump(obj, fp, sort_keys=True, chunk_size=8)
+    expected = io.StringIO()
+    with pytest.raises(TypeError) as e_std:
+        json.dump(obj, expected, sort_keys=True)
+    assert str(e_fast.value) == str(e_std.value)
+    assert fp.getvalue() == expected.getvalue()
@@ -0,0 +1,48 @@
+"""Tests for native string escaping (ensure_ascii=True / False)."""
+
+import json
+import random
+
+import pytest
+
+import fastjson
+
+SPECIALS = ['"', "\\", "\n", "\t", "\x00", "\x1f", "\x7f", "\x80", "\xe9", " ", "\U0001f600", "\ud800"]
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("special", SPECIALS)
+def test_special_char_at_every_offset(special, ensure_ascii):
+    # Exercise every position relative to the 8/16-byte scan blocks
+    for length in (1, 7, 8, 15, 16, 17, 31, 32, 33, 47):
+        for pos in range(length):
+            s = "a" * pos + special + "b" * (length - pos - 1)
+            assert fastjson.dumps(s, ensure_ascii=ensure_ascii) == json.dumps(s, ensure_ascii=ensure_ascii)
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_long_plain_ascii_strings(ensure_ascii):
+    for length in range(0, 70):
+        s = "".join(chr(0x20 + (i % 0x5F)) for i in range(length)).replace('"', "'").replace("\\", "/")
+        assert fastjson.dumps([s], ensure_ascii=ensure_ascii) == json.dumps([s], ensure_ascii=ensure_ascii)
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("max_char", [0x7F, 0xFF, 0xFFFF, 0x10FFFF])
+def test_seeded_fuzz_strings_match_stdlib(max_char, ensure_ascii):
+    rng = random.Random(max_char)
+    values = []
+    for _ in range(300):
+        n = rng.randrange(0, 64)
+        chars = []
+        for _ in range(n):
+            # Mostly plain ASCII with occasional characters from the full range
+            if rng.random() < 0.8:
+                chars.append(chr(rng.randrange(0x20, 0x7F)))
+            else:
+                chars.append(chr(rng.randrange(0, max_char + 1)))
+        values.append("".join(chars))
+
+    obj = {v: v for v in values}
+    assert fastjson.dumps(values, ensure_ascii=ensure_ascii) == json.dumps(values, ensure_ascii=ensure_ascii)
+    assert fastjson.dumps(obj, ensure_ascii=ensure_ascii) == json.dumps(obj, ensure_ascii=ensure_ascii)